@@ -0,0 +1,80 @@
+"""
+Compares building and serializing the dashboard as plotly objects against
+plain figure dicts, for growing numbers of languages.
+
+    uv run python benchmarks/figure_benchmark.py --languages 10,100,1000
+"""
+
+import time
+from collections.abc import Callable
+from functools import partial
+from typing import Annotated
+
+import typer
+from rich.console import Console
+from rich.table import Table
+from synthetic import synthetic_records
+
+from pilot_metrics.jsonio import dumps, resolve_backend
+from pilot_metrics.models import CopilotData
+from pilot_metrics.processing import flatten_copilot_data
+from pilot_metrics.visualizer import (
+    aggregate_dashboard_data,
+    build_dashboard_figure,
+    build_dashboard_spec,
+)
+
+
+def _best_of(repeat: int, run: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(
+    languages: Annotated[
+        str, typer.Option(help="Comma-separated languages per model.")
+    ] = "10,100,1000",
+    days: Annotated[int, typer.Option(help="Days in the synthetic input.")] = 28,
+    repeat: Annotated[int, typer.Option(help="Runs per path; the best counts.")] = 3,
+):
+    table = Table(title=f"Dashboard figure over {days} days ({resolve_backend()})")
+    for column in ("Languages", "Traces", "Path", "Build", "Serialize", "Speedup"):
+        table.add_column(column, justify="left" if column == "Path" else "right")
+
+    for count in (int(value) for value in languages.split(",")):
+        records = synthetic_records(days=days, languages=count)
+        completions, chats, pr_summaries = flatten_copilot_data(
+            CopilotData.model_validate(records).root
+        )
+        data = aggregate_dashboard_data(completions, chats, pr_summaries)
+        figure = build_dashboard_figure(data)
+        spec = build_dashboard_spec(data)
+        paths = {
+            "plotly objects": (
+                _best_of(repeat, partial(build_dashboard_figure, data)),
+                _best_of(repeat, figure.to_json),
+            ),
+            "dict spec": (
+                _best_of(repeat, partial(build_dashboard_spec, data)),
+                _best_of(repeat, partial(dumps, spec)),
+            ),
+        }
+        baseline = sum(paths["plotly objects"])
+        for name, (build, serialize) in paths.items():
+            table.add_row(
+                str(count),
+                str(len(spec["data"])),
+                name,
+                f"{build:.3f}",
+                f"{serialize:.3f}",
+                f"{baseline / (build + serialize):.2f}x",
+            )
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    typer.run(main)
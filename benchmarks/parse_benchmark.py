@@ -0,0 +1,88 @@
+"""
+Compares the parse and validate paths of load_data on a synthetic input.
+
+    uv run python benchmarks/parse_benchmark.py --days 365 --languages 50
+"""
+
+import json
+import os
+import tempfile
+import time
+from collections.abc import Callable
+from typing import Annotated
+
+import typer
+from rich.console import Console
+from rich.table import Table
+from synthetic import synthetic_records
+
+from pilot_metrics.jsonio import JsonBackend, loads, read_input, resolve_backend
+from pilot_metrics.models import CopilotData
+
+
+def _best_of(repeat: int, run: Callable[[], object]) -> float:
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def main(
+    days: Annotated[int, typer.Option(help="Days in the synthetic input.")] = 365,
+    languages: Annotated[int, typer.Option(help="Languages per model.")] = 50,
+    repeat: Annotated[int, typer.Option(help="Runs per path; the best counts.")] = 3,
+):
+    records = synthetic_records(days=days, languages=languages)
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        f.write(json.dumps(records).encode())
+        path = f.name
+
+    def parse(backend: JsonBackend, mmap_threshold: int | None):
+        with read_input(path, mmap_threshold) as content:
+            return CopilotData.model_validate(loads(content, backend))
+
+    def validate_json():
+        with read_input(path, None) as content:
+            return CopilotData.model_validate_json(bytes(content))
+
+    def text_stdlib():
+        with open(path) as text:
+            return CopilotData.model_validate(json.loads(text.read()))
+
+    paths = {
+        "text + json.loads + model_validate": text_stdlib,
+        "bytes + json.loads + model_validate": lambda: parse(JsonBackend.STDLIB, None),
+    }
+    if resolve_backend() == JsonBackend.ORJSON:
+        paths["bytes + orjson + model_validate"] = lambda: parse(
+            JsonBackend.ORJSON, None
+        )
+        paths["mmap + orjson + model_validate"] = lambda: parse(JsonBackend.ORJSON, 0)
+    paths["bytes + model_validate_json"] = validate_json
+
+    try:
+        size = os.path.getsize(path)
+        results = {name: _best_of(repeat, run) for name, run in paths.items()}
+    finally:
+        os.unlink(path)
+
+    baseline = results["text + json.loads + model_validate"]
+    table = Table(
+        title=f"Parse + validate of {size / 1024 / 1024:.1f} MB ({days} days)"
+    )
+    for column in ("Path", "Seconds", "MB/s", "Speedup"):
+        table.add_column(column, justify="left" if column == "Path" else "right")
+    for name, seconds in results.items():
+        table.add_row(
+            name,
+            f"{seconds:.3f}",
+            f"{size / 1024 / 1024 / seconds:,.1f}",
+            f"{baseline / seconds:.2f}x",
+        )
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    typer.run(main)
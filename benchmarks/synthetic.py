@@ -0,0 +1,117 @@
+"""Synthetic metrics API responses for benchmarks."""
+
+import random
+from datetime import date, timedelta
+from typing import Any
+
+
+def synthetic_records(
+    days: int = 28,
+    editors: int = 3,
+    models: int = 2,
+    languages: int = 20,
+    seed: int = 0,
+) -> list[dict[str, Any]]:
+    """Builds `days` daily records with every editor/model/language leaf set."""
+    rng = random.Random(seed)
+    start = date(2024, 1, 1)
+    language_names = [f"language-{i}" for i in range(languages)]
+
+    def counters() -> dict[str, int]:
+        suggestions = rng.randint(100, 1000)
+        lines_suggested = suggestions * 2
+        return {
+            "total_engaged_users": rng.randint(1, 100),
+            "total_code_suggestions": suggestions,
+            "total_code_acceptances": rng.randint(0, suggestions),
+            "total_code_lines_suggested": lines_suggested,
+            "total_code_lines_accepted": rng.randint(0, lines_suggested),
+        }
+
+    records = []
+    for offset in range(days):
+        editor_list = [
+            {
+                "name": f"editor-{e}",
+                "total_engaged_users": rng.randint(10, 500),
+                "models": [
+                    {
+                        "name": f"model-{m}",
+                        "is_custom_model": m > 0,
+                        "total_engaged_users": rng.randint(10, 500),
+                        "languages": [
+                            {"name": name, **counters()} for name in language_names
+                        ],
+                    }
+                    for m in range(models)
+                ],
+            }
+            for e in range(editors)
+        ]
+        chat_editors = [
+            {
+                "name": f"editor-{e}",
+                "total_engaged_users": rng.randint(1, 100),
+                "models": [
+                    {
+                        "name": f"model-{m}",
+                        "is_custom_model": m > 0,
+                        "total_engaged_users": rng.randint(1, 100),
+                        "total_chats": rng.randint(0, 500),
+                        "total_chat_copy_events": rng.randint(0, 100),
+                        "total_chat_insertion_events": rng.randint(0, 100),
+                    }
+                    for m in range(models)
+                ],
+            }
+            for e in range(editors)
+        ]
+        records.append(
+            {
+                "date": (start + timedelta(days=offset)).isoformat(),
+                "total_active_users": rng.randint(500, 1000),
+                "total_engaged_users": rng.randint(100, 500),
+                "copilot_ide_code_completions": {
+                    "total_engaged_users": rng.randint(100, 500),
+                    "languages": [
+                        {"name": name, "total_engaged_users": rng.randint(1, 200)}
+                        for name in language_names
+                    ],
+                    "editors": editor_list,
+                },
+                "copilot_ide_chat": {
+                    "total_engaged_users": rng.randint(1, 200),
+                    "editors": chat_editors,
+                },
+                "copilot_dotcom_chat": {
+                    "total_engaged_users": rng.randint(1, 100),
+                    "models": [
+                        {
+                            "name": "default",
+                            "is_custom_model": False,
+                            "total_engaged_users": rng.randint(1, 100),
+                            "total_chats": rng.randint(0, 500),
+                        }
+                    ],
+                },
+                "copilot_dotcom_pull_requests": {
+                    "total_engaged_users": rng.randint(1, 50),
+                    "repositories": [
+                        {
+                            "name": f"repo-{r}",
+                            "total_engaged_users": rng.randint(1, 20),
+                            "models": [
+                                {
+                                    "name": "default",
+                                    "is_custom_model": False,
+                                    "total_pr_summaries_created": rng.randint(0, 30),
+                                    "total_engaged_users": rng.randint(1, 20),
+                                }
+                            ],
+                        }
+                        for r in range(5)
+                    ],
+                },
+            }
+        )
+    return records
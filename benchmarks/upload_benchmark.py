@@ -0,0 +1,99 @@
+"""
+Pushes synthetic datasets of increasing size through the BigQuery uploader
+against an in-process fake, without touching GCP.
+
+    uv run python benchmarks/upload_benchmark.py --days 28,365,1095 --languages 50
+
+Serialize is the time spent encoding rows as newline-delimited JSON the way
+load_table_from_json does; Upload is the whole of upload_tables, including
+that encoding, the HTTP round trips and job polling; Receive is the time the
+fake spent reading payloads off the socket.
+"""
+
+import json
+import time
+from typing import Annotated
+
+import typer
+from rich.console import Console
+from rich.table import Table
+from synthetic import synthetic_records
+
+from pilot_metrics.bigquery_fake import FakeBigQuery
+from pilot_metrics.bigquery_uploader import SUMMARY_TABLES, upload_tables
+from pilot_metrics.models import CopilotData
+from pilot_metrics.processing import flatten_copilot_data, flatten_summaries
+
+PROJECT = "benchmark"
+DATASET = f"{PROJECT}.copilot"
+
+
+def _serialize_seconds(tables: dict[str, list[dict]]) -> float:
+    start = time.perf_counter()
+    for rows in tables.values():
+        "\n".join(json.dumps(row, ensure_ascii=False) for row in rows).encode()
+    return time.perf_counter() - start
+
+
+def main(
+    days: Annotated[
+        str, typer.Option(help="Comma-separated days per synthetic dataset.")
+    ] = "28,365,1095",
+    languages: Annotated[int, typer.Option(help="Languages per model.")] = 20,
+    job_latency: Annotated[
+        float, typer.Option(help="Seconds the fake waits before finishing a job.")
+    ] = 0.0,
+):
+    table = Table(title="Upload through a fake BigQuery")
+    for column in (
+        "Days",
+        "Rows",
+        "Payload",
+        "Serialize (s)",
+        "Upload (s)",
+        "Receive (s)",
+        "Rows/s",
+        "MB/s",
+    ):
+        table.add_column(column, justify="right")
+
+    with FakeBigQuery(job_latency=job_latency) as fake:
+        client = fake.client(PROJECT)
+        for size in (int(value) for value in days.split(",")):
+            daily_stats = CopilotData.model_validate(
+                synthetic_records(days=size, languages=languages)
+            ).root
+            completions, chats, _ = flatten_copilot_data(daily_stats)
+            tables = {
+                "code_completions": completions,
+                "chats": chats,
+                **dict(
+                    zip(SUMMARY_TABLES, flatten_summaries(daily_stats), strict=True)
+                ),
+            }
+            rows = sum(len(table_rows) for table_rows in tables.values())
+
+            serialize = _serialize_seconds(tables)
+            first_load = len(fake.loads)
+            start = time.perf_counter()
+            upload_tables(client, DATASET, tables)
+            upload = time.perf_counter() - start
+
+            loads = fake.loads[first_load:]
+            payload = sum(load.payload_bytes for load in loads) / 1024 / 1024
+            table.add_row(
+                f"{size:,}",
+                f"{rows:,}",
+                f"{payload:.1f} MB",
+                f"{serialize:.3f}",
+                f"{upload:.3f}",
+                f"{sum(load.receive_seconds for load in loads):.3f}",
+                f"{rows / upload:,.0f}",
+                f"{payload / upload:,.1f}",
+            )
+
+    Console().print(table)
+
+
+if __name__ == "__main__":
+    typer.run(main)
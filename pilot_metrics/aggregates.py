@@ -0,0 +1,206 @@
+import hashlib
+import os
+from bisect import bisect_left
+from collections.abc import Iterable
+from enum import StrEnum
+
+from pydantic import BaseModel, Field
+
+from .compression import codec_for_path, open_output
+from .jsonio import read_input
+from .models import DailyCopilotStats, Tenant
+from .processing import Projection, flatten_copilot_data
+
+AGGREGATE_METRICS = (
+    "total_code_acceptances",
+    "total_code_suggestions",
+    "total_code_lines_accepted",
+    "total_code_lines_suggested",
+)
+AGGREGATE_DIMENSIONS = ("editor", "model", "language")
+
+_PROJECTION: Projection = {
+    "completions": frozenset({*AGGREGATE_DIMENSIONS, *AGGREGATE_METRICS}),
+}
+
+
+class RevisionPolicy(StrEnum):
+    """
+    What to do when a day that is already in the state arrives with
+    different content.
+
+    REPLACE swaps the old day for the new one and recomputes the cumulative
+    sums from that day onwards. KEEP leaves the stored day untouched. ERROR
+    raises RevisionError.
+    """
+
+    REPLACE = "replace"
+    KEEP = "keep"
+    ERROR = "error"
+
+
+class RevisionError(Exception):
+    """Raised when a stored day is revised under RevisionPolicy.ERROR."""
+
+
+class DayAggregate(BaseModel):
+    """Contribution of one tenant's daily record to the aggregates."""
+
+    date: str
+    fingerprint: str
+    language_lines: dict[str, int] = Field(default_factory=dict)
+    totals: dict[str, int] = Field(default_factory=dict)
+    dimension_totals: dict[str, dict[str, dict[str, int]]] = Field(default_factory=dict)
+
+
+class ApplyResult(BaseModel):
+    added: list[str] = Field(default_factory=list)
+    revised: list[str] = Field(default_factory=list)
+    unchanged: list[str] = Field(default_factory=list)
+    kept: list[str] = Field(default_factory=list)
+
+
+def _add_counts(target: dict[str, int], counts: dict[str, int], sign: int) -> None:
+    for key, value in counts.items():
+        target[key] = target.get(key, 0) + sign * value
+
+
+class AggregateState(BaseModel):
+    """
+    Running dashboard aggregates that are updated one day at a time.
+
+    Keeps per-day and cumulative accepted lines by language, per-day metric
+    totals and all-time totals by editor, model and language. Appending a
+    new day costs O(languages); revising or back-filling a past day
+    recomputes the cumulative sums from that day onwards only.
+    """
+
+    version: int = 1
+    days: dict[str, DayAggregate] = Field(default_factory=dict)
+    daily_language_lines: dict[str, dict[str, int]] = Field(default_factory=dict)
+    cumulative_language_lines: dict[str, dict[str, int]] = Field(default_factory=dict)
+    daily_totals: dict[str, dict[str, int]] = Field(default_factory=dict)
+    dimension_totals: dict[str, dict[str, dict[str, int]]] = Field(default_factory=dict)
+
+    @classmethod
+    def load(cls, path: str) -> "AggregateState":
+        """Loads a state file, or returns an empty state if it does not exist."""
+        if not os.path.exists(path):
+            return cls()
+        with read_input(path, None) as content:
+            return cls.model_validate_json(bytes(content))
+
+    def save(self, path: str) -> None:
+        """
+        Writes the state atomically so an interrupted run keeps the old one,
+        compressed when the path ends in .gz, .zst or .bz2.
+        """
+        temp_path = f"{path}.tmp"
+        with open_output(temp_path, codec_for_path(path)) as f:
+            f.write(self.model_dump_json().encode())
+        os.replace(temp_path, path)
+
+    @property
+    def dates(self) -> list[str]:
+        return sorted(self.daily_totals)
+
+    def apply(
+        self,
+        daily_stats: Iterable[DailyCopilotStats],
+        tenant: Tenant | None = None,
+        policy: RevisionPolicy = RevisionPolicy.REPLACE,
+    ) -> ApplyResult:
+        """Applies new or revised daily records as deltas to the aggregates."""
+        tenant = tenant or Tenant()
+        result = ApplyResult()
+        dirty_from: str | None = None
+
+        for daily_stat in daily_stats:
+            key = f"{tenant.label}|{daily_stat.date}"
+            # Only the completions section feeds the aggregates
+            fingerprint = hashlib.sha1(
+                daily_stat.copilot_ide_code_completions.model_dump_json().encode()
+            ).hexdigest()
+            existing = self.days.get(key)
+
+            if existing is not None:
+                if existing.fingerprint == fingerprint:
+                    result.unchanged.append(daily_stat.date)
+                    continue
+                if policy == RevisionPolicy.KEEP:
+                    result.kept.append(daily_stat.date)
+                    continue
+                if policy == RevisionPolicy.ERROR:
+                    raise RevisionError(
+                        f"Day {daily_stat.date} of '{tenant.label}' was revised"
+                    )
+                self._remove_day(existing)
+                result.revised.append(daily_stat.date)
+            else:
+                result.added.append(daily_stat.date)
+
+            day = self._aggregate_day(daily_stat, tenant, fingerprint)
+            self._add_day(day)
+            self.days[key] = day
+            if dirty_from is None or day.date < dirty_from:
+                dirty_from = day.date
+
+        if dirty_from is not None:
+            self._recompute_cumulative(dirty_from)
+        return result
+
+    def _aggregate_day(
+        self, daily_stat: DailyCopilotStats, tenant: Tenant, fingerprint: str
+    ) -> DayAggregate:
+        completions, _, _ = flatten_copilot_data(
+            [daily_stat], projection=_PROJECTION, tenant=tenant
+        )
+        day = DayAggregate(
+            date=daily_stat.date,
+            fingerprint=fingerprint,
+            totals=dict.fromkeys(AGGREGATE_METRICS, 0),
+            dimension_totals={dimension: {} for dimension in AGGREGATE_DIMENSIONS},
+        )
+        for row in completions:
+            metrics = {metric: row[metric] for metric in AGGREGATE_METRICS}
+            _add_counts(day.totals, metrics, 1)
+            _add_counts(
+                day.language_lines,
+                {row["language"]: row["total_code_lines_accepted"]},
+                1,
+            )
+            for dimension in AGGREGATE_DIMENSIONS:
+                _add_counts(
+                    day.dimension_totals[dimension].setdefault(row[dimension], {}),
+                    metrics,
+                    1,
+                )
+        return day
+
+    def _apply_day(self, day: DayAggregate, sign: int) -> None:
+        _add_counts(
+            self.daily_language_lines.setdefault(day.date, {}),
+            day.language_lines,
+            sign,
+        )
+        _add_counts(self.daily_totals.setdefault(day.date, {}), day.totals, sign)
+        for dimension, values in day.dimension_totals.items():
+            dimension_totals = self.dimension_totals.setdefault(dimension, {})
+            for value, metrics in values.items():
+                _add_counts(dimension_totals.setdefault(value, {}), metrics, sign)
+
+    def _add_day(self, day: DayAggregate) -> None:
+        self._apply_day(day, 1)
+
+    def _remove_day(self, day: DayAggregate) -> None:
+        self._apply_day(day, -1)
+
+    def _recompute_cumulative(self, start: str) -> None:
+        dates = self.dates
+        first = bisect_left(dates, start)
+        running = (
+            dict(self.cumulative_language_lines[dates[first - 1]]) if first else {}
+        )
+        for date in dates[first:]:
+            _add_counts(running, self.daily_language_lines.get(date, {}), 1)
+            self.cumulative_language_lines[date] = dict(running)
@@ -0,0 +1,170 @@
+import hashlib
+import json
+import os
+from collections.abc import Iterable, Iterator
+from typing import Any
+
+from pydantic import BaseModel, Field
+
+from .aggregates import ApplyResult, RevisionError, RevisionPolicy
+from .filters import MetricsFilter
+from .jsonio import loads
+from .models import DailyCopilotStats, Tenant
+
+INDEX_FILE = "index.json"
+OBJECTS_DIR = "objects"
+
+
+class ArchivedDay(BaseModel):
+    """Where the current revision of one tenant's day is stored."""
+
+    digest: str
+    revision: int = 1
+    source: str | None = None
+
+
+class ArchivedTenant(BaseModel):
+    tenant: Tenant
+    days: dict[str, ArchivedDay] = Field(default_factory=dict)
+
+
+class ArchiveIndex(BaseModel):
+    version: int = 1
+    # Keyed by tenant label
+    tenants: dict[str, ArchivedTenant] = Field(default_factory=dict)
+
+
+def record_digest(record: dict[str, Any]) -> str:
+    """Returns the SHA-256 of a raw record's canonical JSON encoding."""
+    canonical = json.dumps(record, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+
+def _write_atomic(path: str, content: bytes) -> None:
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "wb") as f:
+        f.write(content)
+    os.replace(temp_path, path)
+
+
+class SnapshotArchive:
+    """
+    Content-addressed store of daily records gathered from many snapshots.
+
+    The metrics API returns an overlapping 28-day window, so consecutive
+    snapshots repeat most of their days. The archive keeps one current
+    record per (tenant, date): each distinct record is written once under
+    objects/ keyed by its content hash, and index.json points every day at
+    its latest revision. Superseded revisions stay in objects/.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        index_path = os.path.join(path, INDEX_FILE)
+        if os.path.exists(index_path):
+            with open(index_path, "rb") as f:
+                self.index = ArchiveIndex.model_validate_json(f.read())
+        else:
+            self.index = ArchiveIndex()
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.path, OBJECTS_DIR, digest[:2], f"{digest}.json")
+
+    def _store(self, digest: str, record: dict[str, Any]) -> None:
+        path = self._object_path(digest)
+        if os.path.exists(path):
+            return
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        _write_atomic(path, json.dumps(record, separators=(",", ":")).encode())
+
+    def ingest(
+        self,
+        raw_records: Iterable[dict[str, Any]],
+        tenant: Tenant | None = None,
+        source: str | None = None,
+        policy: RevisionPolicy = RevisionPolicy.REPLACE,
+    ) -> ApplyResult:
+        """
+        Adds the records of one snapshot, validating only new revisions;
+        days already archived with the same content are skipped unparsed.
+
+        Snapshots should be ingested oldest first: under REPLACE a day whose
+        content differs from the archived one is taken to be a later revision.
+        """
+        tenant = tenant or Tenant()
+        archived = self.index.tenants.setdefault(
+            tenant.label, ArchivedTenant(tenant=tenant)
+        )
+        result = ApplyResult()
+
+        for record in raw_records:
+            digest = record_digest(record)
+            date = record.get("date") if isinstance(record, dict) else None
+            if not isinstance(date, str):
+                # Raises the model's error for the missing or invalid date
+                date = DailyCopilotStats.model_validate(record).date
+            existing = archived.days.get(date)
+
+            if existing is not None:
+                if existing.digest == digest:
+                    result.unchanged.append(date)
+                    continue
+                if policy == RevisionPolicy.KEEP:
+                    result.kept.append(date)
+                    continue
+                if policy == RevisionPolicy.ERROR:
+                    raise RevisionError(f"Day {date} of '{tenant.label}' was revised")
+
+            # Unchanged days were validated when they were first archived
+            DailyCopilotStats.model_validate(record)
+            if existing is not None:
+                result.revised.append(date)
+                revision = existing.revision + 1
+            else:
+                result.added.append(date)
+                revision = 1
+
+            self._store(digest, record)
+            archived.days[date] = ArchivedDay(
+                digest=digest, revision=revision, source=source
+            )
+
+        return result
+
+    def save(self) -> None:
+        """Writes the index atomically, after the objects it points to."""
+        os.makedirs(self.path, exist_ok=True)
+        _write_atomic(
+            os.path.join(self.path, INDEX_FILE), self.index.model_dump_json().encode()
+        )
+
+    @property
+    def tenants(self) -> list[Tenant]:
+        return [archived.tenant for archived in self.index.tenants.values()]
+
+    def day_count(self) -> int:
+        return sum(len(archived.days) for archived in self.index.tenants.values())
+
+    def records(
+        self, tenant: Tenant | None = None, filters: MetricsFilter | None = None
+    ) -> list[dict[str, Any]]:
+        """
+        Returns the current raw record of each of a tenant's days, in date
+        order. Days outside the filter's date range are not read.
+        """
+        return list(self.iter_records(tenant, filters))
+
+    def iter_records(
+        self, tenant: Tenant | None = None, filters: MetricsFilter | None = None
+    ) -> Iterator[dict[str, Any]]:
+        """Yields the records returned by records one day at a time."""
+        archived = self.index.tenants.get((tenant or Tenant()).label)
+        if archived is None:
+            return
+        filters = filters or MetricsFilter()
+
+        for date in sorted(archived.days):
+            if not filters.includes_date(date):
+                continue
+            with open(self._object_path(archived.days[date].digest), "rb") as f:
+                yield loads(f.read())
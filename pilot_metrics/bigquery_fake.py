@@ -0,0 +1,285 @@
+import itertools
+import json
+import threading
+import time
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Self
+from urllib.parse import parse_qs, urlparse
+
+from google.api_core.client_options import ClientOptions
+from google.auth.credentials import AnonymousCredentials
+from google.cloud import bigquery
+from pydantic import BaseModel
+
+_API_PREFIX = "/bigquery/v2/projects/"
+_UPLOAD_PREFIX = "/upload/bigquery/v2/projects/"
+
+
+class LoadJobRecord(BaseModel):
+    """What the fake received for one load job."""
+
+    job_id: str
+    table_id: str
+    payload_bytes: int
+    rows: int
+    # Time spent receiving the payload, from the first request of the job
+    receive_seconds: float
+    started_at: float
+    finished_at: float
+
+
+class FakeBigQuery:
+    """
+    In-process stand-in for the BigQuery REST API.
+
+    Serves the dataset, table and load job endpoints the uploader uses on a
+    local port, so a real bigquery.Client serializes and sends rows exactly
+    as it would to GCP. Every load job is recorded with its payload size,
+    row count and timings. job_latency seconds are added before each load
+    job is acknowledged, to stand in for server-side processing.
+
+        with FakeBigQuery() as fake:
+            upload_tables(fake.client("project"), "project.dataset", tables)
+            print(fake.loads)
+    """
+
+    def __init__(self, job_latency: float = 0.0):
+        self.job_latency = job_latency
+        self.datasets: dict[str, dict[str, Any]] = {}
+        self.tables: dict[str, dict[str, Any]] = {}
+        self.loads: list[LoadJobRecord] = []
+        self._payloads: dict[str, list[bytes]] = {}
+        # Resumable uploads awaiting their data, by upload id
+        self._uploads: dict[str, tuple[dict[str, Any], float, bytearray]] = {}
+        # Never reused, as uploads finish in any order
+        self._upload_ids = itertools.count()
+        self._jobs: dict[str, dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._server: ThreadingHTTPServer | None = None
+        self._thread: threading.Thread | None = None
+
+    @property
+    def url(self) -> str:
+        if self._server is None:
+            raise RuntimeError("FakeBigQuery is not started; call start() first")
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> Self:
+        fake = self
+
+        class Handler(_Handler):
+            bigquery = fake
+
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> Self:
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def client(self, project: str) -> bigquery.Client:
+        """Returns a BigQuery client that talks to this fake."""
+        return bigquery.Client(
+            project=project,
+            credentials=AnonymousCredentials(),
+            client_options=ClientOptions(api_endpoint=self.url),
+        )
+
+    def rows(self, table_id: str) -> list[dict[str, Any]]:
+        """Returns every row loaded into a table, in load order."""
+        return [
+            json.loads(line)
+            for payload in self._payloads.get(table_id, [])
+            for line in payload.splitlines()
+            if line.strip()
+        ]
+
+    def _finish_load(
+        self, metadata: dict[str, Any], payload: bytes, started_at: float
+    ) -> dict[str, Any]:
+        received_at = time.perf_counter()
+        if self.job_latency:
+            time.sleep(self.job_latency)
+
+        reference = metadata.get("jobReference", {})
+        destination = metadata["configuration"]["load"]["destinationTable"]
+        table_id = ".".join(
+            (destination["projectId"], destination["datasetId"], destination["tableId"])
+        )
+        # Newline-delimited JSON, the last row may lack its newline
+        rows = payload.count(b"\n") + int(bool(payload) and not payload.endswith(b"\n"))
+        job = {
+            "kind": "bigquery#job",
+            "id": f"{reference.get('projectId')}:{reference.get('jobId')}",
+            "jobReference": {**reference, "location": "US"},
+            "configuration": metadata["configuration"],
+            "status": {"state": "DONE"},
+            "statistics": {
+                "load": {"outputRows": str(rows), "inputFileBytes": str(len(payload))}
+            },
+        }
+        with self._lock:
+            self._payloads.setdefault(table_id, []).append(payload)
+            self._jobs[reference.get("jobId")] = job
+            self.loads.append(
+                LoadJobRecord(
+                    job_id=reference.get("jobId", ""),
+                    table_id=table_id,
+                    payload_bytes=len(payload),
+                    rows=rows,
+                    receive_seconds=received_at - started_at,
+                    started_at=started_at,
+                    finished_at=time.perf_counter(),
+                )
+            )
+        return job
+
+
+def _parse_multipart(body: bytes, content_type: str) -> tuple[dict[str, Any], bytes]:
+    boundary = content_type.split("boundary=", 1)[1].strip('"').encode()
+    # Parts are metadata JSON then the data, each after its headers
+    parts = body.split(b"--" + boundary)
+    metadata, data = (part.split(b"\r\n\r\n", 1)[1] for part in parts[1:3])
+    return json.loads(metadata), data.removesuffix(b"\r\n")
+
+
+class _Handler(BaseHTTPRequestHandler):
+    bigquery: FakeBigQuery
+    protocol_version = "HTTP/1.1"
+    # Replies are written in pieces; without this each waits on a delayed ACK
+    disable_nagle_algorithm = True
+
+    def log_message(self, format: str, *args: Any) -> None:
+        pass
+
+    def _body(self) -> bytes:
+        return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+    def _reply(
+        self,
+        status: HTTPStatus,
+        body: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        content = json.dumps(body if body is not None else {}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(content)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(content)
+
+    def _not_found(self) -> None:
+        self._reply(
+            HTTPStatus.NOT_FOUND,
+            {"error": {"code": 404, "message": f"Not found: {self.path}"}},
+        )
+
+    def _resource(self) -> tuple[str, list[str]]:
+        """Returns the kind of resource addressed and its path segments."""
+        path = urlparse(self.path).path
+        if path.startswith(_UPLOAD_PREFIX):
+            return "upload", path.removeprefix(_UPLOAD_PREFIX).split("/")
+        # project/datasets/dataset/tables/table or project/jobs/job
+        return "api", path.removeprefix(_API_PREFIX).split("/")
+
+    def do_GET(self) -> None:
+        fake = self.bigquery
+        _, segments = self._resource()
+        resource = None
+        if len(segments) == 3 and segments[1] == "datasets":
+            resource = fake.datasets.get(f"{segments[0]}.{segments[2]}")
+        elif len(segments) == 5 and segments[3] == "tables":
+            resource = fake.tables.get(f"{segments[0]}.{segments[2]}.{segments[4]}")
+        elif len(segments) == 3 and segments[1] == "jobs":
+            resource = fake._jobs.get(segments[2])
+        if resource is None:
+            self._not_found()
+        else:
+            self._reply(HTTPStatus.OK, resource)
+
+    def do_POST(self) -> None:
+        fake = self.bigquery
+        started_at = time.perf_counter()
+        kind, segments = self._resource()
+        body = self._body()
+
+        if kind == "upload":
+            upload_type = parse_qs(urlparse(self.path).query)["uploadType"][0]
+            if upload_type == "multipart":
+                metadata, payload = _parse_multipart(body, self.headers["Content-Type"])
+                self._reply(
+                    HTTPStatus.OK, fake._finish_load(metadata, payload, started_at)
+                )
+                return
+            with fake._lock:
+                upload_id = str(next(fake._upload_ids))
+                fake._uploads[upload_id] = (json.loads(body), started_at, bytearray())
+            location = f"{fake.url}{urlparse(self.path).path}?upload_id={upload_id}"
+            self._reply(HTTPStatus.OK, headers={"Location": location})
+            return
+
+        resource = json.loads(body or b"{}")
+        if segments[1:] == ["datasets"]:
+            reference = resource["datasetReference"]
+            fake.datasets[f"{reference['projectId']}.{reference['datasetId']}"] = (
+                resource
+            )
+        elif len(segments) == 4 and segments[3] == "tables":
+            reference = resource["tableReference"]
+            table_id = ".".join(
+                (reference["projectId"], reference["datasetId"], reference["tableId"])
+            )
+            fake.tables[table_id] = resource
+        else:
+            self._not_found()
+            return
+        self._reply(HTTPStatus.OK, resource)
+
+    def do_PATCH(self) -> None:
+        fake = self.bigquery
+        _, segments = self._resource()
+        table_id = f"{segments[0]}.{segments[2]}.{segments[4]}"
+        if table_id not in fake.tables:
+            self._not_found()
+            return
+        fake.tables[table_id].update(json.loads(self._body()))
+        self._reply(HTTPStatus.OK, fake.tables[table_id])
+
+    def do_PUT(self) -> None:
+        # A chunk of a resumable upload
+        fake = self.bigquery
+        upload_id = parse_qs(urlparse(self.path).query)["upload_id"][0]
+        with fake._lock:
+            metadata, started_at, received = fake._uploads[upload_id]
+        received.extend(self._body())
+
+        # Content-Range: bytes first-last/total, total is * until the last chunk
+        total = self.headers.get("Content-Range", "").rsplit("/", 1)[-1]
+        if total == "*":
+            self._reply(
+                HTTPStatus.PERMANENT_REDIRECT,
+                headers={"Range": f"bytes=0-{len(received) - 1}"},
+            )
+            return
+        with fake._lock:
+            del fake._uploads[upload_id]
+        self._reply(
+            HTTPStatus.OK, fake._finish_load(metadata, bytes(received), started_at)
+        )
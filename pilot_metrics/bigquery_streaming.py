@@ -0,0 +1,334 @@
+from collections import deque
+from collections.abc import Callable, Iterable
+from concurrent.futures import Future
+from datetime import date
+from enum import StrEnum
+from itertools import chain
+from typing import Any, Protocol
+
+from google.cloud import bigquery
+from google.protobuf import descriptor_pb2, descriptor_pool, message_factory
+
+from .bigquery_uploader import (
+    SUMMARY_TABLES,
+    TABLE_SCHEMAS,
+    dataset_from_env,
+    ensure_tables,
+)
+from .instrumentation import stage
+from .processing import SummaryTables
+
+# AppendRows requests are capped at 10MB, leave room for request overhead
+DEFAULT_MAX_BATCH_BYTES = 5 * 1024 * 1024
+DEFAULT_MAX_IN_FLIGHT = 4
+DEFAULT_MAX_RETRIES = 3
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+_PROTO_TYPES = {
+    "STRING": descriptor_pb2.FieldDescriptorProto.TYPE_STRING,
+    "INTEGER": descriptor_pb2.FieldDescriptorProto.TYPE_INT64,
+    "BOOLEAN": descriptor_pb2.FieldDescriptorProto.TYPE_BOOL,
+    # The Storage Write API takes DATE as days since the epoch
+    "DATE": descriptor_pb2.FieldDescriptorProto.TYPE_INT32,
+}
+
+
+class StreamMode(StrEnum):
+    """
+    COMMITTED rows are visible as soon as each append succeeds. PENDING rows
+    become visible atomically when the stream is committed at the end.
+    """
+
+    COMMITTED = "committed"
+    PENDING = "pending"
+
+
+class StreamingUploadError(Exception):
+    """Raised when a batch cannot be appended after retrying."""
+
+
+class RowWriter(Protocol):
+    """A single write stream into one table."""
+
+    def encode(self, row: dict[str, Any]) -> bytes: ...
+
+    def append(self, rows: list[bytes], offset: int) -> Future: ...
+
+    def finalize(self) -> None: ...
+
+    def commit(self) -> None: ...
+
+
+WriterFactory = Callable[[str, list[bigquery.SchemaField], StreamMode], RowWriter]
+
+
+class ProtoRowEncoder:
+    """Serializes flattened rows into proto2 messages matching a table schema."""
+
+    def __init__(self, schema: list[bigquery.SchemaField], name: str = "CopilotRow"):
+        self.descriptor = descriptor_pb2.DescriptorProto(name=name)
+        for number, field in enumerate(schema, start=1):
+            self.descriptor.field.add(
+                name=field.name,
+                number=number,
+                type=_PROTO_TYPES[field.field_type],
+                label=descriptor_pb2.FieldDescriptorProto.LABEL_OPTIONAL,
+            )
+
+        pool = descriptor_pool.DescriptorPool()
+        pool.Add(
+            descriptor_pb2.FileDescriptorProto(
+                name=f"{name}.proto", message_type=[self.descriptor]
+            )
+        )
+        self._message_class = message_factory.GetMessageClass(
+            pool.FindMessageTypeByName(name)
+        )
+        self._fields = [field.name for field in schema]
+        self._date_fields = {
+            field.name for field in schema if field.field_type == "DATE"
+        }
+
+    def encode(self, row: dict[str, Any]) -> bytes:
+        message = self._message_class()
+        for name in self._fields:
+            value = row.get(name)
+            if value is None:
+                continue
+            if name in self._date_fields:
+                value = date.fromisoformat(value).toordinal() - _EPOCH_ORDINAL
+            setattr(message, name, value)
+        return message.SerializeToString()
+
+
+class StorageWriteApiWriter:
+    """
+    RowWriter backed by a BigQuery Storage Write API stream.
+
+    Requires the optional google-cloud-bigquery-storage dependency.
+    """
+
+    def __init__(
+        self,
+        table_id: str,
+        schema: list[bigquery.SchemaField],
+        mode: StreamMode,
+        client: Any = None,
+    ):
+        try:
+            from google.api_core.exceptions import AlreadyExists
+            from google.cloud import bigquery_storage_v1
+            from google.cloud.bigquery_storage_v1 import types, writer
+        except ImportError as e:
+            raise ImportError(
+                "The streaming sink requires google-cloud-bigquery-storage. "
+                "Install it with: pip install 'pilot-metrics[streaming]'"
+            ) from e
+
+        self._types = types
+        self._writer = writer
+        self._already_exists = AlreadyExists
+        self._client = client or bigquery_storage_v1.BigQueryWriteClient()
+        self._mode = mode
+        self._encoder = ProtoRowEncoder(schema)
+        self._append_stream = None
+
+        project, dataset, table = table_id.split(".")
+        self._parent = self._client.table_path(project, dataset, table)
+        stream_type = (
+            types.WriteStream.Type.PENDING
+            if mode == StreamMode.PENDING
+            else types.WriteStream.Type.COMMITTED
+        )
+        self._stream_name = self._client.create_write_stream(
+            parent=self._parent, write_stream=types.WriteStream(type_=stream_type)
+        ).name
+
+    def encode(self, row: dict[str, Any]) -> bytes:
+        return self._encoder.encode(row)
+
+    def _open(self):
+        template = self._types.AppendRowsRequest(
+            write_stream=self._stream_name,
+            proto_rows=self._types.AppendRowsRequest.ProtoData(
+                writer_schema=self._types.ProtoSchema(
+                    proto_descriptor=self._encoder.descriptor
+                )
+            ),
+        )
+        stream = self._writer.AppendRowsStream(self._client, template)
+        # A failed append closes the connection; reopen on the next append
+        stream.add_close_callback(lambda *_: setattr(self, "_append_stream", None))
+        return stream
+
+    def append(self, rows: list[bytes], offset: int) -> Future:
+        if self._append_stream is None:
+            self._append_stream = self._open()
+
+        request = self._types.AppendRowsRequest(
+            offset=offset,
+            proto_rows=self._types.AppendRowsRequest.ProtoData(
+                rows=self._types.ProtoRows(serialized_rows=rows)
+            ),
+        )
+        result: Future = Future()
+
+        def _done(future):
+            error = future.exception()
+            # ALREADY_EXISTS means a resend of rows that were already written
+            if error is None or isinstance(error, self._already_exists):
+                result.set_result(None)
+            else:
+                result.set_exception(error)
+
+        self._append_stream.send(request).add_done_callback(_done)
+        return result
+
+    def finalize(self) -> None:
+        if self._append_stream is not None:
+            self._append_stream.close()
+        self._client.finalize_write_stream(name=self._stream_name)
+
+    def commit(self) -> None:
+        if self._mode != StreamMode.PENDING:
+            return
+        response = self._client.batch_commit_write_streams(
+            self._types.BatchCommitWriteStreamsRequest(
+                parent=self._parent, write_streams=[self._stream_name]
+            )
+        )
+        if response.stream_errors:
+            raise StreamingUploadError(
+                f"Commit of {self._stream_name} failed: {response.stream_errors}"
+            )
+
+
+def _append_with_retries(
+    writer: RowWriter,
+    rows: list[bytes],
+    offset: int,
+    max_retries: int,
+    error: Exception,
+) -> None:
+    for _ in range(max_retries):
+        try:
+            writer.append(rows, offset).result()
+            return
+        except Exception as e:
+            error = e
+    raise StreamingUploadError(
+        f"Append at offset {offset} failed after {max_retries} retries: {error}"
+    ) from error
+
+
+def stream_rows(
+    rows: Iterable[dict[str, Any]],
+    writer: RowWriter,
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    max_retries: int = DEFAULT_MAX_RETRIES,
+) -> int:
+    """
+    Streams rows through a writer in size-capped batches.
+
+    Rows are consumed lazily and at most max_in_flight batches are awaiting
+    acknowledgement at once, so memory stays bounded by
+    max_in_flight * max_batch_bytes. Every batch carries the stream offset
+    of its first row, which makes resends after a failure exactly-once.
+
+    Returns:
+        Number of rows written
+    """
+    in_flight: deque[tuple[int, list[bytes], Future]] = deque()
+
+    def wait_oldest() -> None:
+        offset, batch, future = in_flight.popleft()
+        try:
+            future.result()
+            return
+        except Exception as e:
+            failure = e
+
+        # Appends on a stream are ordered, so once one fails every later
+        # in-flight batch fails too. Resend them all in order.
+        retry = [(offset, batch)]
+        for later_offset, later_batch, later_future in in_flight:
+            try:
+                later_future.result()
+            except Exception:
+                pass
+            retry.append((later_offset, later_batch))
+        in_flight.clear()
+        for retry_offset, retry_batch in retry:
+            _append_with_retries(
+                writer, retry_batch, retry_offset, max_retries, failure
+            )
+
+    def send(offset: int, batch: list[bytes]) -> None:
+        if len(in_flight) >= max_in_flight:
+            wait_oldest()
+        in_flight.append((offset, batch, writer.append(batch, offset)))
+
+    offset = 0
+    batch: list[bytes] = []
+    batch_bytes = 0
+    for row in rows:
+        encoded = writer.encode(row)
+        if batch and batch_bytes + len(encoded) > max_batch_bytes:
+            send(offset, batch)
+            offset += len(batch)
+            batch, batch_bytes = [], 0
+        batch.append(encoded)
+        batch_bytes += len(encoded)
+
+    if batch:
+        send(offset, batch)
+        offset += len(batch)
+
+    while in_flight:
+        wait_oldest()
+
+    writer.finalize()
+    writer.commit()
+    return offset
+
+
+def stream_to_bigquery(
+    completions_data: Iterable[dict[str, Any]],
+    chats_data: Iterable[dict[str, Any]],
+    mode: StreamMode = StreamMode.COMMITTED,
+    max_batch_bytes: int = DEFAULT_MAX_BATCH_BYTES,
+    max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+    writer_factory: WriterFactory | None = None,
+    summaries: SummaryTables | None = None,
+) -> dict[str, int]:
+    """
+    Streams flattened Copilot data into BigQuery with the Storage Write API.
+
+    Requires GCP_PROJECT_ID and BQ_DATASET environment variables.
+
+    Returns:
+        Mapping of table id to number of rows written
+    """
+    project_id, dataset_id = dataset_from_env()
+    client = bigquery.Client(project=project_id)
+    tables = {"code_completions": completions_data, "chats": chats_data}
+    if summaries is not None:
+        tables.update(zip(SUMMARY_TABLES, summaries, strict=True))
+    table_ids = ensure_tables(client, dataset_id, tables)
+    writer_factory = writer_factory or StorageWriteApiWriter
+
+    written = {}
+    for name, rows in tables.items():
+        rows = iter(rows)
+        first = next(rows, None)
+        if first is None:
+            continue
+        table_id = table_ids[name]
+        with stage(f"bigquery.stream.{name}", "rows") as timing:
+            writer = writer_factory(table_id, TABLE_SCHEMAS[name], mode)
+            written[table_id] = timing.items = stream_rows(
+                chain([first], rows), writer, max_batch_bytes, max_in_flight
+            )
+    return written
@@ -1,15 +1,117 @@
 import os
+from collections.abc import Iterable
 from typing import Any
 
 from google.cloud import bigquery
 from google.cloud.exceptions import NotFound
 
-
-def upload_to_bigquery(
-    completions_data: list[dict[str, Any]], chats_data: list[dict[str, Any]]
-) -> None:
+from .instrumentation import stage
+from .processing import Projection, SummaryTables
+
+TENANT_SCHEMA = [
+    bigquery.SchemaField("enterprise", "STRING"),
+    bigquery.SchemaField("org", "STRING"),
+    bigquery.SchemaField("team", "STRING"),
+]
+
+COMPLETIONS_SCHEMA = [
+    bigquery.SchemaField("date", "DATE"),
+    *TENANT_SCHEMA,
+    bigquery.SchemaField("editor", "STRING"),
+    bigquery.SchemaField("model", "STRING"),
+    bigquery.SchemaField("is_custom_model", "BOOLEAN"),
+    bigquery.SchemaField("language", "STRING"),
+    bigquery.SchemaField("total_engaged_users", "INTEGER"),
+    bigquery.SchemaField("total_code_acceptances", "INTEGER"),
+    bigquery.SchemaField("total_code_suggestions", "INTEGER"),
+    bigquery.SchemaField("total_code_lines_accepted", "INTEGER"),
+    bigquery.SchemaField("total_code_lines_suggested", "INTEGER"),
+]
+
+CHATS_SCHEMA = [
+    bigquery.SchemaField("date", "DATE"),
+    *TENANT_SCHEMA,
+    bigquery.SchemaField("chat_type", "STRING"),
+    bigquery.SchemaField("editor", "STRING"),
+    bigquery.SchemaField("model", "STRING"),
+    bigquery.SchemaField("is_custom_model", "BOOLEAN"),
+    bigquery.SchemaField("total_chats", "INTEGER"),
+    bigquery.SchemaField("total_engaged_users", "INTEGER"),
+    bigquery.SchemaField("total_chat_copy_events", "INTEGER"),
+    bigquery.SchemaField("total_chat_insertion_events", "INTEGER"),
+]
+
+_COMPLETION_COUNTER_SCHEMA = [
+    bigquery.SchemaField("total_code_acceptances", "INTEGER"),
+    bigquery.SchemaField("total_code_suggestions", "INTEGER"),
+    bigquery.SchemaField("total_code_lines_accepted", "INTEGER"),
+    bigquery.SchemaField("total_code_lines_suggested", "INTEGER"),
+]
+
+DAILY_TOTALS_SCHEMA = [
+    bigquery.SchemaField("date", "DATE"),
+    *TENANT_SCHEMA,
+    bigquery.SchemaField("total_active_users", "INTEGER"),
+    bigquery.SchemaField("total_engaged_users", "INTEGER"),
+    bigquery.SchemaField("code_completions_engaged_users", "INTEGER"),
+    bigquery.SchemaField("ide_chat_engaged_users", "INTEGER"),
+    bigquery.SchemaField("dotcom_chat_engaged_users", "INTEGER"),
+    bigquery.SchemaField("dotcom_pull_requests_engaged_users", "INTEGER"),
+    *_COMPLETION_COUNTER_SCHEMA,
+]
+
+LANGUAGE_TOTALS_SCHEMA = [
+    bigquery.SchemaField("date", "DATE"),
+    *TENANT_SCHEMA,
+    bigquery.SchemaField("language", "STRING"),
+    bigquery.SchemaField("total_engaged_users", "INTEGER"),
+    *_COMPLETION_COUNTER_SCHEMA,
+]
+
+EDITOR_TOTALS_SCHEMA = [
+    bigquery.SchemaField("date", "DATE"),
+    *TENANT_SCHEMA,
+    bigquery.SchemaField("feature", "STRING"),
+    bigquery.SchemaField("editor", "STRING"),
+    bigquery.SchemaField("total_engaged_users", "INTEGER"),
+    *_COMPLETION_COUNTER_SCHEMA,
+    bigquery.SchemaField("total_chats", "INTEGER"),
+    bigquery.SchemaField("total_chat_copy_events", "INTEGER"),
+    bigquery.SchemaField("total_chat_insertion_events", "INTEGER"),
+]
+
+MODEL_TOTALS_SCHEMA = [
+    bigquery.SchemaField("date", "DATE"),
+    *TENANT_SCHEMA,
+    bigquery.SchemaField("feature", "STRING"),
+    bigquery.SchemaField("editor", "STRING"),
+    bigquery.SchemaField("model", "STRING"),
+    bigquery.SchemaField("is_custom_model", "BOOLEAN"),
+    bigquery.SchemaField("total_engaged_users", "INTEGER"),
+]
+
+# Table name -> schema, in upload order
+TABLE_SCHEMAS: dict[str, list[bigquery.SchemaField]] = {
+    "code_completions": COMPLETIONS_SCHEMA,
+    "chats": CHATS_SCHEMA,
+    "daily_totals": DAILY_TOTALS_SCHEMA,
+    "language_totals": LANGUAGE_TOTALS_SCHEMA,
+    "editor_totals": EDITOR_TOTALS_SCHEMA,
+    "model_totals": MODEL_TOTALS_SCHEMA,
+}
+SUMMARY_TABLES = ("daily_totals", "language_totals", "editor_totals", "model_totals")
+
+# Columns the uploader reads from the flattened data
+UPLOAD_PROJECTION: Projection = {
+    "completions": frozenset(field.name for field in COMPLETIONS_SCHEMA),
+    "chats": frozenset(field.name for field in CHATS_SCHEMA),
+    "summaries": None,
+}
+
+
+def dataset_from_env() -> tuple[str, str]:
     """
-    Uploads flattened Copilot data to BigQuery tables.
+    Returns the (project_id, dataset_id) configured by the environment.
 
     Requires environment variables:
     - GCP_PROJECT_ID: Google Cloud Project ID
@@ -23,9 +125,33 @@ def upload_to_bigquery(
             "GCP_PROJECT_ID and BQ_DATASET environment variables must be set"
         )
 
-    client = bigquery.Client(project=project_id)
-    dataset_id = f"{project_id}.{dataset_name}"
+    return project_id, f"{project_id}.{dataset_name}"
 
+
+def _add_missing_columns(
+    client: bigquery.Client,
+    table: bigquery.Table,
+    schema: list[bigquery.SchemaField],
+) -> None:
+    # Tables created before the tenant columns existed get them appended
+    existing = {field.name for field in table.schema}
+    missing = [field for field in schema if field.name not in existing]
+    if missing:
+        table.schema = [*table.schema, *missing]
+        client.update_table(table, ["schema"])
+
+
+def ensure_tables(
+    client: bigquery.Client,
+    dataset_id: str,
+    table_names: Iterable[str] = ("code_completions", "chats"),
+) -> dict[str, str]:
+    """
+    Creates the dataset and the named tables if they do not exist yet.
+
+    Returns:
+        Mapping of table name to full table id
+    """
     # Ensure dataset exists
     try:
         client.get_dataset(dataset_id)
@@ -34,68 +160,63 @@ def upload_to_bigquery(
         dataset.location = "US"
         client.create_dataset(dataset, exists_ok=True)
 
-    # Define table schemas
-    completions_schema = [
-        bigquery.SchemaField("date", "DATE"),
-        bigquery.SchemaField("editor", "STRING"),
-        bigquery.SchemaField("model", "STRING"),
-        bigquery.SchemaField("is_custom_model", "BOOLEAN"),
-        bigquery.SchemaField("language", "STRING"),
-        bigquery.SchemaField("total_engaged_users", "INTEGER"),
-        bigquery.SchemaField("total_code_acceptances", "INTEGER"),
-        bigquery.SchemaField("total_code_suggestions", "INTEGER"),
-        bigquery.SchemaField("total_code_lines_accepted", "INTEGER"),
-        bigquery.SchemaField("total_code_lines_suggested", "INTEGER"),
-    ]
-
-    chats_schema = [
-        bigquery.SchemaField("date", "DATE"),
-        bigquery.SchemaField("chat_type", "STRING"),
-        bigquery.SchemaField("editor", "STRING"),
-        bigquery.SchemaField("model", "STRING"),
-        bigquery.SchemaField("is_custom_model", "BOOLEAN"),
-        bigquery.SchemaField("total_chats", "INTEGER"),
-        bigquery.SchemaField("total_engaged_users", "INTEGER"),
-        bigquery.SchemaField("total_chat_copy_events", "INTEGER"),
-        bigquery.SchemaField("total_chat_insertion_events", "INTEGER"),
-    ]
-
     # Create or update tables
-    completions_table_id = f"{dataset_id}.code_completions"
-    chats_table_id = f"{dataset_id}.chats"
-
-    completions_table = bigquery.Table(completions_table_id, schema=completions_schema)
-    chats_table = bigquery.Table(chats_table_id, schema=chats_schema)
+    table_ids = {}
+    for name in table_names:
+        table_id = f"{dataset_id}.{name}"
+        schema = TABLE_SCHEMAS[name]
+        try:
+            existing = client.get_table(table_id)
+        except NotFound:
+            client.create_table(bigquery.Table(table_id, schema=schema))
+        else:
+            _add_missing_columns(client, existing, schema)
+        table_ids[name] = table_id
+
+    return table_ids
+
+
+def load_rows(
+    client: bigquery.Client, table_id: str, rows: list[dict[str, Any]]
+) -> None:
+    """Appends rows to a table with one load job and waits for it to finish."""
+    job_config = bigquery.LoadJobConfig(
+        write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
+        source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
+    )
+    job = client.load_table_from_json(rows, table_id, job_config=job_config)
+    job.result()
 
-    try:
-        client.get_table(completions_table_id)
-    except NotFound:
-        client.create_table(completions_table)
 
-    try:
-        client.get_table(chats_table_id)
-    except NotFound:
-        client.create_table(chats_table)
+def upload_tables(
+    client: bigquery.Client, dataset_id: str, tables: dict[str, list[dict[str, Any]]]
+) -> None:
+    """Appends each table's rows to the BigQuery table of the same name."""
+    table_ids = ensure_tables(client, dataset_id, tables)
+    for name, rows in tables.items():
+        if not rows:
+            continue
+        with stage(f"bigquery.load.{name}", "rows") as timing:
+            load_rows(client, table_ids[name], rows)
+            timing.items = len(rows)
 
-    # Upload data
-    if completions_data:
-        job_config = bigquery.LoadJobConfig(
-            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
-            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
-        )
 
-        completions_job = client.load_table_from_json(
-            completions_data, completions_table_id, job_config=job_config
-        )
-        completions_job.result()
+def upload_to_bigquery(
+    completions_data: list[dict[str, Any]],
+    chats_data: list[dict[str, Any]],
+    summaries: SummaryTables | None = None,
+) -> None:
+    """
+    Uploads flattened Copilot data to BigQuery tables with load jobs.
 
-    if chats_data:
-        job_config = bigquery.LoadJobConfig(
-            write_disposition=bigquery.WriteDisposition.WRITE_APPEND,
-            source_format=bigquery.SourceFormat.NEWLINE_DELIMITED_JSON,
-        )
+    Summary tables from processing.flatten_summaries are uploaded to the
+    daily_totals, language_totals, editor_totals and model_totals tables.
 
-        chats_job = client.load_table_from_json(
-            chats_data, chats_table_id, job_config=job_config
-        )
-        chats_job.result()
+    Requires GCP_PROJECT_ID and BQ_DATASET environment variables.
+    """
+    project_id, dataset_id = dataset_from_env()
+    client = bigquery.Client(project=project_id)
+    tables = {"code_completions": completions_data, "chats": chats_data}
+    if summaries is not None:
+        tables.update(zip(SUMMARY_TABLES, summaries, strict=True))
+    upload_tables(client, dataset_id, tables)
@@ -0,0 +1,79 @@
+import pandas as pd
+from pydantic import BaseModel, ConfigDict, Field
+
+# Series the values beyond a dimension's limit are folded into
+OTHER = "Other"
+
+# Metric each charted dimension's values are ranked by
+RANK_METRICS = {
+    "language": "total_code_lines_accepted",
+    "editor": "total_code_lines_accepted",
+    "repository": "total_pr_summaries_created",
+}
+
+
+class CardinalityLimits(BaseModel):
+    """
+    How many values of each dimension the dashboard charts separately.
+
+    The values with the largest RANK_METRICS total over the selected data
+    are kept and every other value is folded into OTHER. None keeps all
+    values of a dimension.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    language: int | None = Field(default=None, ge=1)
+    editor: int | None = Field(default=None, ge=1)
+    repository: int | None = Field(default=None, ge=1)
+
+    @property
+    def is_empty(self) -> bool:
+        return self.language is None and self.editor is None and self.repository is None
+
+    def kept(self, df: pd.DataFrame, dimension: str) -> frozenset[str] | None:
+        """
+        Returns the values of dimension in df to chart separately, or None
+        when all of them fit within the limit.
+        """
+        limit = getattr(self, dimension)
+        if limit is None or df.empty or dimension not in df.columns:
+            return None
+        totals = df.groupby(dimension)[RANK_METRICS[dimension]].sum()
+        if len(totals) <= limit:
+            return None
+        # A stable sort breaks ties by name, as groupby sorted the values
+        ranked = totals.sort_values(ascending=False, kind="stable")
+        return frozenset(ranked.index[:limit])
+
+    def fold(self, df: pd.DataFrame, *dimensions: str) -> pd.DataFrame:
+        """
+        Replaces the values of each dimension in df beyond its limit with
+        OTHER, so grouping by the dimension sums them into one series.
+        """
+        for dimension in dimensions:
+            kept = self.kept(df, dimension)
+            if kept is not None:
+                df = df.assign(**{dimension: fold_values(df[dimension], kept)})
+        return df
+
+
+def fold_values(values: pd.Series, kept: frozenset[str]) -> pd.Series:
+    """Replaces every value not in kept with OTHER."""
+    return values.where(values.isin(kept), OTHER)
+
+
+def fold_columns(frame: pd.DataFrame, kept: frozenset[str] | None) -> pd.DataFrame:
+    """Sums the columns of a wide frame not in kept into a last OTHER column."""
+    if kept is None:
+        return frame
+    columns = [column for column in frame.columns if column in kept]
+    other = frame.drop(columns=columns).sum(axis=1)
+    return frame[columns].assign(**{OTHER: other})
+
+
+def other_last(frame: pd.DataFrame) -> pd.DataFrame:
+    """Moves an OTHER column of a wide frame after the named values."""
+    if OTHER not in frame.columns:
+        return frame
+    return frame[[column for column in frame.columns if column != OTHER] + [OTHER]]
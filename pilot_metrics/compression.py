@@ -0,0 +1,82 @@
+import bz2
+import gzip
+import os
+from enum import StrEnum
+from typing import IO, cast
+
+
+class Codec(StrEnum):
+    NONE = "none"
+    GZIP = "gzip"
+    ZSTD = "zstd"
+    BZ2 = "bz2"
+
+
+EXTENSIONS = {".gz": Codec.GZIP, ".zst": Codec.ZSTD, ".bz2": Codec.BZ2}
+MAGIC_BYTES = {
+    Codec.GZIP: b"\x1f\x8b",
+    Codec.ZSTD: b"\x28\xb5\x2f\xfd",
+    Codec.BZ2: b"BZh",
+}
+# Longest magic number, enough to sniff any codec
+MAGIC_LENGTH = 4
+
+
+def _zstandard():
+    try:
+        import zstandard
+    except ImportError as e:
+        raise ImportError(
+            "Zstandard files require zstandard. "
+            "Install it with: pip install 'pilot-metrics[zstd]'"
+        ) from e
+    return zstandard
+
+
+def codec_for_path(path: str) -> Codec:
+    """Returns the codec implied by a file name's extension."""
+    return EXTENSIONS.get(os.path.splitext(path)[1].lower(), Codec.NONE)
+
+
+def sniff_codec(head: bytes) -> Codec:
+    """Returns the codec whose magic number the leading bytes start with."""
+    for codec, magic in MAGIC_BYTES.items():
+        if head[: len(magic)] == magic:
+            return codec
+    return Codec.NONE
+
+
+def open_decompressed(raw: IO[bytes], codec: Codec) -> IO[bytes]:
+    """
+    Wraps a binary stream so reads return decompressed bytes.
+
+    Decompression happens as the stream is read, without intermediate files.
+    """
+    # Every codec's file object reads bytes like IO[bytes], without being
+    # typed as one
+    if codec == Codec.GZIP:
+        return cast(IO[bytes], gzip.GzipFile(fileobj=raw, mode="rb"))
+    if codec == Codec.BZ2:
+        return cast(IO[bytes], bz2.BZ2File(raw, mode="rb"))
+    if codec == Codec.ZSTD:
+        reader = _zstandard().ZstdDecompressor().stream_reader(raw, closefd=False)
+        return cast(IO[bytes], reader)
+    return raw
+
+
+def open_output(path: str, codec: Codec | None = None) -> IO[bytes]:
+    """
+    Opens a binary file for writing, compressed according to codec or, when
+    codec is None, the path's extension.
+    """
+    codec = codec_for_path(path) if codec is None else codec
+    if codec == Codec.GZIP:
+        return cast(IO[bytes], gzip.open(path, "wb"))
+    if codec == Codec.BZ2:
+        return cast(IO[bytes], bz2.open(path, "wb"))
+    if codec == Codec.ZSTD:
+        writer = (
+            _zstandard().ZstdCompressor().stream_writer(open(path, "wb"), closefd=True)
+        )
+        return cast(IO[bytes], writer)
+    return cast(IO[bytes], open(path, "wb"))
@@ -0,0 +1,174 @@
+from collections.abc import Iterable, Iterator
+from datetime import date
+from typing import Any, Self
+
+import numpy as np
+from pydantic import BaseModel, Field
+
+from .filters import MetricsFilter
+from .models import DailyCopilotStats
+
+_EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+
+class DayScan(BaseModel):
+    """Ordering problems found in a tenant's daily records."""
+
+    # Days that come after a later day
+    out_of_order: list[str] = Field(default_factory=list)
+    # Days that appear more than once
+    duplicates: list[str] = Field(default_factory=list)
+
+
+def scan_days(daily_stats: Iterable[DailyCopilotStats]) -> DayScan:
+    """Finds out-of-order and duplicate days in one pass over the records."""
+    scan = DayScan()
+    seen: set[int] = set()
+    latest = None
+    for daily_stat in daily_stats:
+        day = daily_stat.day
+        if day in seen:
+            scan.duplicates.append(daily_stat.date)
+        elif latest is not None and day < latest:
+            scan.out_of_order.append(daily_stat.date)
+        seen.add(day)
+        latest = day if latest is None else max(latest, day)
+    return scan
+
+
+def sort_days(
+    daily_stats: list[DailyCopilotStats],
+) -> tuple[list[DailyCopilotStats], DayScan]:
+    """
+    Returns the records in date order along with the problems found.
+
+    Duplicate days are kept, in their original order, for the caller to
+    resolve.
+    """
+    scan = scan_days(daily_stats)
+    if scan.out_of_order:
+        daily_stats = sorted(daily_stats, key=lambda daily_stat: daily_stat.day)
+    return daily_stats, scan
+
+
+def rows_at(rows: list, positions: slice | np.ndarray) -> list:
+    """Returns the rows at positions from a DateIndex."""
+    if isinstance(positions, slice):
+        return rows[positions]
+    return [rows[position] for position in positions]
+
+
+def ordinal_datetimes(days: np.ndarray) -> np.ndarray:
+    """Converts day ordinals to datetime64 days."""
+    return (days - _EPOCH_ORDINAL).astype("datetime64[D]")
+
+
+def _ordinal(value: date | None) -> int | None:
+    return None if value is None else value.toordinal()
+
+
+class DateIndex:
+    """
+    Sorted day ordinals with the offsets of each day's rows.
+
+    Rows are flattened tables or daily records, one day ordinal per row.
+    When the rows are already in date order, which is how they come out of
+    flattening a sorted tenant, day i covers rows offsets[i]:offsets[i + 1]
+    and a date range is a contiguous slice found by binary search. Otherwise
+    the index also keeps the stable sort order of the rows and a range maps
+    to a run of that order.
+    """
+
+    def __init__(self, row_days: np.ndarray):
+        self.row_days = row_days
+        if len(row_days) and np.any(row_days[1:] < row_days[:-1]):
+            self.order: np.ndarray | None = np.argsort(row_days, kind="stable")
+            sorted_days = row_days[self.order]
+        else:
+            self.order = None
+            sorted_days = row_days
+        self.days, starts = np.unique(sorted_days, return_index=True)
+        self.offsets = np.append(starts, len(row_days))
+
+    @classmethod
+    def from_rows(cls, rows: list[dict[str, Any]], column: str = "date") -> Self:
+        """Indexes rows by their ISO date column, parsing each distinct date once."""
+        ordinals: dict[str, int] = {}
+
+        def ordinal(value: str) -> int:
+            if value not in ordinals:
+                ordinals[value] = date.fromisoformat(value).toordinal()
+            return ordinals[value]
+
+        return cls(
+            np.fromiter((ordinal(row[column]) for row in rows), np.int32, len(rows))
+        )
+
+    @classmethod
+    def from_daily_stats(cls, daily_stats: list[DailyCopilotStats]) -> Self:
+        return cls(
+            np.fromiter(
+                (daily_stat.day for daily_stat in daily_stats),
+                np.int32,
+                len(daily_stats),
+            )
+        )
+
+    def __len__(self) -> int:
+        return len(self.row_days)
+
+    def positions(
+        self, since: date | None = None, until: date | None = None
+    ) -> slice | np.ndarray:
+        """Returns the rows dated within since..until, both inclusive."""
+        since_ordinal, until_ordinal = _ordinal(since), _ordinal(until)
+        first = (
+            0
+            if since_ordinal is None
+            else np.searchsorted(self.days, since_ordinal, side="left")
+        )
+        last = (
+            len(self.days)
+            if until_ordinal is None
+            else np.searchsorted(self.days, until_ordinal, side="right")
+        )
+        start, stop = int(self.offsets[first]), int(self.offsets[max(first, last)])
+        if self.order is None:
+            return slice(start, stop)
+        return self.order[start:stop]
+
+    def take(
+        self, rows: list, since: date | None = None, until: date | None = None
+    ) -> list:
+        """Returns the rows dated within since..until, in date order."""
+        return rows_at(rows, self.positions(since, until))
+
+    def groups(self) -> Iterator[tuple[date, slice | np.ndarray]]:
+        """Yields each day with the positions of its rows."""
+        for i, day in enumerate(self.days):
+            start, stop = int(self.offsets[i]), int(self.offsets[i + 1])
+            positions = (
+                slice(start, stop) if self.order is None else self.order[start:stop]
+            )
+            yield date.fromordinal(int(day)), positions
+
+    def datetimes(self) -> np.ndarray:
+        """Returns each row's day as datetime64, in row order."""
+        return ordinal_datetimes(self.row_days)
+
+
+def select_days(
+    daily_stats: list[DailyCopilotStats],
+    filters: MetricsFilter | None,
+    index: DateIndex | None = None,
+) -> list[DailyCopilotStats]:
+    """
+    Returns the records within a filter's date range, in date order.
+
+    The records are indexed here unless their index is given.
+    """
+    if filters is None or (filters.since is None and filters.until is None):
+        return daily_stats
+    if index is None:
+        index = DateIndex.from_daily_stats(daily_stats)
+    return index.take(daily_stats, filters.since, filters.until)
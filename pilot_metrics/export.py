@@ -0,0 +1,217 @@
+import hashlib
+import os
+import re
+from collections import defaultdict
+from enum import StrEnum
+from typing import Any
+from urllib.parse import quote
+
+import pandas as pd
+from pydantic import BaseModel, Field
+
+from .dates import DateIndex, rows_at
+from .jsonio import dumps
+from .processing import TENANT_FIELDS, Projection
+
+# Flattened tables and the names of their folders under the export root
+EXPORT_TABLES = ("code_completions", "chats", "pr_summaries")
+EXPORT_PROJECTION: Projection = dict.fromkeys(("completions", "chats", "pr_summaries"))
+
+# Low-cardinality columns stored dictionary-encoded in Parquet
+DICTIONARY_COLUMNS = ("editor", "model", "language")
+_STRING_COLUMNS = {
+    "enterprise",
+    "org",
+    "team",
+    "chat_type",
+    "repository",
+    *DICTIONARY_COLUMNS,
+}
+_BOOLEAN_COLUMNS = {"is_custom_model"}
+
+DEFAULT_ROW_GROUP_ROWS = 64 * 1024
+# Hive's name for the partition of rows whose partition column is null
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+# part-<tenant digest>-<content digest>.<extension>
+_PART_FILE = re.compile(r"part-([0-9a-f]{12})-([0-9a-f]{16})\.")
+
+
+class ExportFormat(StrEnum):
+    PARQUET = "parquet"
+    CSV = "csv"
+
+
+class ExportResult(BaseModel):
+    rows: dict[str, int] = Field(default_factory=dict)
+    files: list[str] = Field(default_factory=list)
+    # Files left alone because an earlier export wrote the same rows
+    skipped: list[str] = Field(default_factory=list)
+    # Files of an earlier export removed because their day was revised
+    replaced: list[str] = Field(default_factory=list)
+    # Partitions not written to because they hold files whose tenant is unknown
+    unkeyed: list[str] = Field(default_factory=list)
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError(
+            "Parquet export requires pyarrow. "
+            "Install it with: pip install 'pilot-metrics[parquet]'"
+        ) from e
+    return pyarrow
+
+
+def _arrow_schema(pa, columns: list[str]):
+    fields = []
+    for column in columns:
+        if column in DICTIONARY_COLUMNS:
+            field_type = pa.dictionary(pa.int32(), pa.string())
+        elif column in _STRING_COLUMNS:
+            field_type = pa.string()
+        elif column in _BOOLEAN_COLUMNS:
+            field_type = pa.bool_()
+        else:
+            field_type = pa.int64()
+        fields.append(pa.field(column, field_type))
+    return pa.schema(fields)
+
+
+def partition_path(date: str, org: str | None = None, by_org: bool = False) -> str:
+    """Returns the Hive-style folder of a day, below its table's folder."""
+    parts = []
+    if by_org:
+        parts.append(f"org={quote(org, safe='') if org else NULL_PARTITION}")
+    parts.append(f"date={date}")
+    return os.path.join(*parts)
+
+
+def _write_parquet(
+    path: str, rows: list[dict[str, Any]], columns: list[str], row_group_rows: int
+) -> None:
+    pa = _pyarrow()
+    schema = _arrow_schema(pa, columns)
+    table = pa.Table.from_pylist(rows, schema=schema)
+    pa.parquet.write_table(
+        table,
+        path,
+        row_group_size=row_group_rows,
+        use_dictionary=[column for column in DICTIONARY_COLUMNS if column in columns],
+        compression="zstd",
+    )
+
+
+def _write_csv(path: str, rows: list[dict[str, Any]], columns: list[str]) -> None:
+    pd.DataFrame(rows, columns=pd.Index(columns)).to_csv(path, index=False)
+
+
+def _digest(value: Any, length: int) -> str:
+    return hashlib.sha1(dumps(value)).hexdigest()[:length]
+
+
+def _by_tenant(rows: list[dict[str, Any]]) -> dict[str, list[dict[str, Any]]]:
+    """Groups rows by a digest of their enterprise, org and team."""
+    tenants: dict[tuple, list[dict[str, Any]]] = defaultdict(list)
+    for row in rows:
+        tenants[tuple(row.get(field) for field in TENANT_FIELDS)].append(row)
+    return {_digest(tenant, 12): tenant_rows for tenant, tenant_rows in tenants.items()}
+
+
+def export_tables(
+    tables: dict[str, list[dict[str, Any]]],
+    output_dir: str,
+    export_format: ExportFormat = ExportFormat.PARQUET,
+    by_org: bool = False,
+    row_group_rows: int = DEFAULT_ROW_GROUP_ROWS,
+    result: ExportResult | None = None,
+) -> ExportResult:
+    """
+    Writes flattened tables as files partitioned by day, and optionally org.
+
+    Each table gets a folder under output_dir with one date=YYYY-MM-DD
+    folder per day, below org=<org> folders when by_org is set. Partition
+    columns are encoded in the path rather than stored in the files, so
+    engines that read Hive partitioning can prune days and orgs without
+    opening files. Parquet files are written in row groups of
+    row_group_rows rows with editor, model and language dictionary-encoded.
+
+    Each tenant's rows of a partition go to their own file, named after
+    digests of the tenant and of the rows. Re-exporting rows already
+    written finds that file and skips them, so exporting an overlapping
+    window only adds new days and tenants. A tenant's revised day gets a
+    new file that replaces the one an earlier export wrote. Partitions
+    holding files not named this way, whose tenant cannot be told, are left
+    alone and listed in the result's unkeyed partitions. Files are written
+    under a hidden name and renamed into place, so readers never see a
+    partial file.
+
+    To export in chunks, pass the result of the previous chunk: files from
+    that result are never replaced, so a tenant's rows of one day spread
+    over several chunks are all kept.
+    """
+    extension = "parquet" if export_format == ExportFormat.PARQUET else "csv"
+    result = result or ExportResult()
+    own_files = set(result.files)
+
+    for name, rows in tables.items():
+        partitions: dict[str, list[dict[str, Any]]] = defaultdict(list)
+        for day, positions in DateIndex.from_rows(rows).groups():
+            day_rows = rows_at(rows, positions)
+            if not by_org:
+                partitions[partition_path(day.isoformat())] = day_rows
+                continue
+            for row in day_rows:
+                path = partition_path(day.isoformat(), row.get("org"), by_org)
+                partitions[path].append(row)
+
+        partition_columns = {"date", "org"} if by_org else {"date"}
+        for partition, partition_rows in sorted(partitions.items()):
+            folder = os.path.join(output_dir, name, partition)
+            # Earlier files by tenant digest
+            existing: dict[str, list[str]] = defaultdict(list)
+            entries = os.listdir(folder) if os.path.isdir(folder) else []
+            unkeyed = False
+            for entry in entries:
+                if entry.startswith((".", "_")):
+                    continue
+                if match := _PART_FILE.match(entry):
+                    existing[match.group(1)].append(entry)
+                else:
+                    unkeyed = True
+            if unkeyed:
+                result.unkeyed.append(os.path.join(name, partition))
+                continue
+
+            for tenant, tenant_rows in sorted(_by_tenant(partition_rows).items()):
+                file_name = f"part-{tenant}-{_digest(tenant_rows, 16)}.{extension}"
+                path = os.path.join(folder, file_name)
+                if file_name in existing[tenant]:
+                    result.skipped.append(os.path.join(name, partition, file_name))
+                    continue
+
+                columns = [
+                    column
+                    for column in tenant_rows[0]
+                    if column not in partition_columns
+                ]
+                os.makedirs(folder, exist_ok=True)
+                temp_path = os.path.join(folder, f".{file_name}.tmp")
+                if export_format == ExportFormat.PARQUET:
+                    _write_parquet(temp_path, tenant_rows, columns, row_group_rows)
+                else:
+                    _write_csv(temp_path, tenant_rows, columns)
+                os.replace(temp_path, path)
+                # The revised day supersedes what earlier exports wrote
+                for old_name in existing[tenant]:
+                    old_path = os.path.join(folder, old_name)
+                    if old_path not in own_files:
+                        os.remove(old_path)
+                        result.replaced.append(old_path)
+
+                result.files.append(path)
+                own_files.add(path)
+                result.rows[name] = result.rows.get(name, 0) + len(tenant_rows)
+
+    return result
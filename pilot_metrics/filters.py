@@ -0,0 +1,129 @@
+from datetime import date
+from typing import Any
+
+from pydantic import BaseModel, ConfigDict
+
+
+class MetricsFilter(BaseModel):
+    """
+    Selects a slice of the Copilot metrics by date range and dimension.
+
+    Dimension filters only restrict records that carry that dimension: an
+    editor filter drops IDE completions and IDE chats for other editors but
+    keeps dotcom chats and PR summaries, which have no editor.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    since: date | None = None
+    until: date | None = None
+    editors: frozenset[str] | None = None
+    models: frozenset[str] | None = None
+    languages: frozenset[str] | None = None
+
+    @property
+    def is_empty(self) -> bool:
+        return (
+            self.since is None
+            and self.until is None
+            and not self.editors
+            and not self.models
+            and not self.languages
+        )
+
+    @property
+    def has_dimensions(self) -> bool:
+        return bool(self.editors or self.models or self.languages)
+
+    def includes_date(self, value: str) -> bool:
+        # API dates are ISO formatted, so string comparison preserves order
+        if self.since is not None and value < self.since.isoformat():
+            return False
+        return self.until is None or value <= self.until.isoformat()
+
+    def includes_editor(self, name: str) -> bool:
+        return not self.editors or name in self.editors
+
+    def includes_model(self, name: str) -> bool:
+        return not self.models or name in self.models
+
+    def includes_language(self, name: str) -> bool:
+        return not self.languages or name in self.languages
+
+
+def _prune(items: list[dict[str, Any]], keep) -> list[dict[str, Any]]:
+    return [item for item in items if keep(item.get("name"))]
+
+
+def filter_raw_records(
+    raw_records: list[dict[str, Any]], filters: MetricsFilter
+) -> list[dict[str, Any]]:
+    """
+    Applies a filter to raw API records before they are validated.
+
+    Days outside the date range are dropped without being touched, and
+    non-matching editors, models and languages are removed from the nested
+    lists so they are never validated or flattened.
+    """
+    if filters.is_empty:
+        return raw_records
+
+    selected = []
+    for record in raw_records:
+        if not isinstance(record, dict) or not filters.includes_date(
+            str(record.get("date", ""))
+        ):
+            continue
+        selected.append(_prune_record(record, filters))
+    return selected
+
+
+def _prune_record(record: dict[str, Any], filters: MetricsFilter) -> dict[str, Any]:
+    if not filters.has_dimensions:
+        return record
+
+    record = dict(record)
+
+    completions = record.get("copilot_ide_code_completions")
+    if isinstance(completions, dict) and completions.get("editors"):
+        editors = []
+        for editor in _prune(completions["editors"], filters.includes_editor):
+            models = []
+            for model in _prune(editor.get("models", []), filters.includes_model):
+                languages = _prune(
+                    model.get("languages", []), filters.includes_language
+                )
+                models.append({**model, "languages": languages})
+            editors.append({**editor, "models": models})
+        record["copilot_ide_code_completions"] = {**completions, "editors": editors}
+
+    ide_chat = record.get("copilot_ide_chat")
+    if isinstance(ide_chat, dict) and ide_chat.get("editors"):
+        editors = [
+            {
+                **editor,
+                "models": _prune(editor.get("models", []), filters.includes_model),
+            }
+            for editor in _prune(ide_chat["editors"], filters.includes_editor)
+        ]
+        record["copilot_ide_chat"] = {**ide_chat, "editors": editors}
+
+    dotcom_chat = record.get("copilot_dotcom_chat")
+    if isinstance(dotcom_chat, dict) and dotcom_chat.get("models"):
+        record["copilot_dotcom_chat"] = {
+            **dotcom_chat,
+            "models": _prune(dotcom_chat["models"], filters.includes_model),
+        }
+
+    pull_requests = record.get("copilot_dotcom_pull_requests")
+    if isinstance(pull_requests, dict) and pull_requests.get("repositories"):
+        repositories = [
+            {**repo, "models": _prune(repo.get("models", []), filters.includes_model)}
+            for repo in pull_requests["repositories"]
+        ]
+        record["copilot_dotcom_pull_requests"] = {
+            **pull_requests,
+            "repositories": repositories,
+        }
+
+    return record
@@ -0,0 +1,132 @@
+import json
+import time
+import tracemalloc
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from pydantic import BaseModel, Field
+from rich.table import Table
+
+
+class StageTiming(BaseModel):
+    """Measurements of one pipeline stage."""
+
+    name: str
+    wall_seconds: float = 0.0
+    items: int = 0
+    item_label: str = "items"
+    bytes_read: int = 0
+    bytes_written: int = 0
+    peak_memory_bytes: int | None = None
+
+    @property
+    def items_per_second(self) -> float | None:
+        if not self.items or not self.wall_seconds:
+            return None
+        return self.items / self.wall_seconds
+
+
+class Timings(BaseModel):
+    """Stage timings collected by record_timings, in the order stages ran."""
+
+    stages: list[StageTiming] = Field(default_factory=list)
+    trace_memory: bool = False
+
+    def to_dict(self) -> dict:
+        return {
+            "stages": [
+                {**stage.model_dump(), "items_per_second": stage.items_per_second}
+                for stage in self.stages
+            ],
+            "total_seconds": sum(stage.wall_seconds for stage in self.stages),
+        }
+
+    def save(self, path: str) -> None:
+        with open(path, "w") as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+    def table(self) -> Table:
+        table = Table(title="Stage timings")
+        for column in ("Stage", "Wall (s)", "Items", "Items/s", "Read", "Written"):
+            table.add_column(column, justify="left" if column == "Stage" else "right")
+        if self.trace_memory:
+            table.add_column("Peak memory", justify="right")
+
+        for stage in self.stages:
+            rate = stage.items_per_second
+            row = [
+                stage.name,
+                f"{stage.wall_seconds:.3f}",
+                f"{stage.items:,} {stage.item_label}" if stage.items else "",
+                f"{rate:,.0f}" if rate else "",
+                _format_bytes(stage.bytes_read),
+                _format_bytes(stage.bytes_written),
+            ]
+            if self.trace_memory:
+                row.append(_format_bytes(stage.peak_memory_bytes or 0))
+            table.add_row(*row)
+        return table
+
+
+def _format_bytes(size: int) -> str:
+    if not size:
+        return ""
+    value = float(size)
+    for unit in ("B", "KB", "MB"):
+        if value < 1024:
+            return f"{value:.0f} {unit}"
+        value /= 1024
+    return f"{value:.1f} GB"
+
+
+_current: ContextVar[Timings | None] = ContextVar("pilot_metrics_timings", default=None)
+
+
+@contextmanager
+def record_timings(trace_memory: bool = False) -> Iterator[Timings]:
+    """
+    Collects the timings of every stage run inside the block.
+
+    trace_memory records each stage's tracemalloc peak, which slows
+    allocation-heavy stages down noticeably.
+    """
+    timings = Timings(trace_memory=trace_memory)
+    token = _current.set(timings)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    try:
+        yield timings
+    finally:
+        if started_tracing:
+            tracemalloc.stop()
+        _current.reset(token)
+
+
+@contextmanager
+def stage(name: str, item_label: str = "items") -> Iterator[StageTiming]:
+    """
+    Times a pipeline stage when timings are being recorded.
+
+    The yielded StageTiming can be filled in with item and byte counts.
+    Outside record_timings this only costs creating that object. Stages
+    should not be nested when memory is traced.
+    """
+    timing = StageTiming(name=name, item_label=item_label)
+    timings = _current.get()
+    if timings is None:
+        yield timing
+        return
+
+    if timings.trace_memory:
+        tracemalloc.reset_peak()
+        baseline = tracemalloc.get_traced_memory()[0]
+    start = time.perf_counter()
+    try:
+        yield timing
+    finally:
+        timing.wall_seconds = time.perf_counter() - start
+        if timings.trace_memory:
+            timing.peak_memory_bytes = tracemalloc.get_traced_memory()[1] - baseline
+        timings.stages.append(timing)
@@ -0,0 +1,269 @@
+import codecs
+import io
+import json
+import mmap
+import os
+import re
+import sys
+from collections.abc import Iterator
+from contextlib import contextmanager
+from enum import StrEnum
+from functools import cache
+from typing import IO, Any, cast
+
+import numpy as np
+import pandas as pd
+
+from .compression import (
+    MAGIC_LENGTH,
+    Codec,
+    codec_for_path,
+    open_decompressed,
+    sniff_codec,
+)
+
+# Files at least this large are memory-mapped instead of read into memory
+MMAP_THRESHOLD = 64 * 1024 * 1024
+# Bytes read at a time when streaming the elements of an array
+STREAM_BLOCK_SIZE = 1024 * 1024
+
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
+JsonInput = bytes | bytearray | memoryview | str
+
+
+class JsonBackend(StrEnum):
+    """
+    Parser used for raw JSON. AUTO picks orjson when it is installed and
+    falls back to the standard library.
+    """
+
+    AUTO = "auto"
+    ORJSON = "orjson"
+    STDLIB = "stdlib"
+
+
+def _orjson():
+    try:
+        import orjson
+    except ImportError as e:
+        raise ImportError(
+            "The orjson backend requires orjson. "
+            "Install it with: pip install 'pilot-metrics[fast]'"
+        ) from e
+    return orjson
+
+
+@cache
+def _has_orjson() -> bool:
+    try:
+        _orjson()
+    except ImportError:
+        return False
+    return True
+
+
+def resolve_backend(backend: JsonBackend = JsonBackend.AUTO) -> JsonBackend:
+    if backend == JsonBackend.AUTO:
+        return JsonBackend.ORJSON if _has_orjson() else JsonBackend.STDLIB
+    if backend == JsonBackend.ORJSON:
+        _orjson()
+    return backend
+
+
+def loads(data: JsonInput, backend: JsonBackend = JsonBackend.AUTO) -> Any:
+    """
+    Parses JSON from bytes, a memory-mapped view or text.
+
+    Decode errors raise json.JSONDecodeError with either backend.
+    """
+    if resolve_backend(backend) == JsonBackend.ORJSON:
+        return _orjson().loads(data)
+    if isinstance(data, memoryview):
+        data = data.tobytes()
+    return json.loads(data)
+
+
+def _plain(value: Any) -> Any:
+    # Arrays and pandas objects the backends cannot write themselves
+    if isinstance(value, pd.Series | pd.Index):
+        value = value.to_numpy()
+    if isinstance(value, np.ndarray):
+        if value.dtype.kind == "M":
+            return np.asarray(np.datetime_as_string(value, unit="s")).tolist()
+        if value.dtype.kind == "f":
+            return np.where(np.isnan(value), None, value).tolist()
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return _plain(np.asarray(value))
+    if isinstance(value, pd.Timestamp):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+def _orjson_default(value: Any) -> Any:
+    # Numeric and datetime arrays are written by orjson natively
+    if isinstance(value, pd.Series | pd.Index):
+        value = value.to_numpy()
+        if value.dtype.kind in "biufM":
+            return value
+    return _plain(value)
+
+
+def dumps(value: Any, backend: JsonBackend = JsonBackend.AUTO) -> bytes:
+    """
+    Writes JSON that may contain numpy arrays and pandas Series or Index
+    objects, with NaN written as null and datetimes as ISO strings.
+    """
+    if resolve_backend(backend) == JsonBackend.ORJSON:
+        orjson = _orjson()
+        return orjson.dumps(
+            value, default=_orjson_default, option=orjson.OPT_SERIALIZE_NUMPY
+        )
+    return json.dumps(value, default=_plain, separators=(",", ":")).encode()
+
+
+def _stdin() -> IO[bytes]:
+    # Decompressed as sniffed from its magic bytes, as it has no extension
+    stdin = sys.stdin.buffer
+    # Sniffing peeks at the magic bytes, which needs a buffered reader
+    if hasattr(stdin, "peek"):
+        buffered = cast(io.BufferedReader, stdin)
+    else:
+        buffered = io.BufferedReader(cast(io.RawIOBase, stdin))
+    return open_decompressed(buffered, sniff_codec(buffered.peek(MAGIC_LENGTH)))
+
+
+@contextmanager
+def read_input(
+    path: str, mmap_threshold: int | None = MMAP_THRESHOLD
+) -> Iterator[bytes | memoryview]:
+    """
+    Yields the undecoded content of a file, or of stdin when path is '-'.
+
+    gzip, zstd and bz2 input, recognized by file extension or magic bytes,
+    is decompressed while it is read. Uncompressed files of at least
+    mmap_threshold bytes are memory-mapped and yielded as a read-only
+    memoryview, which is only valid inside the block. A None threshold
+    always reads the file into bytes.
+    """
+    if path == "-":
+        yield _stdin().read()
+        return
+
+    with open(path, "rb") as f:
+        codec = codec_for_path(path)
+        if codec == Codec.NONE:
+            codec = sniff_codec(f.peek(MAGIC_LENGTH))
+        if codec != Codec.NONE:
+            yield open_decompressed(f, codec).read()
+            return
+
+        size = os.fstat(f.fileno()).st_size
+        if mmap_threshold is None or size < mmap_threshold or size == 0:
+            yield f.read()
+            return
+        with (
+            mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mapped,
+            memoryview(mapped) as view,
+        ):
+            yield view
+
+
+@contextmanager
+def open_input(path: str) -> Iterator[IO[bytes]]:
+    """
+    Yields a binary stream over the decompressed content of a file, or of
+    stdin when path is '-'. Codecs are recognized as in read_input.
+    """
+    if path == "-":
+        yield _stdin()
+        return
+    with open(path, "rb") as f:
+        codec = codec_for_path(path)
+        if codec == Codec.NONE:
+            codec = sniff_codec(f.peek(MAGIC_LENGTH))
+        yield open_decompressed(f, codec)
+
+
+class _BlockReader:
+    """The decoded, not yet parsed text of a stream read a block at a time."""
+
+    def __init__(self, stream: IO[bytes], block_size: int):
+        self.stream = stream
+        self.block_size = block_size
+        self.utf8 = codecs.getincrementaldecoder("utf-8-sig")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def more(self) -> bool:
+        """Appends the next block to the unparsed rest of the buffer."""
+        if self.eof:
+            return False
+        # Grows reads along with an element that spans several blocks
+        block = self.stream.read(max(self.block_size, len(self.buffer) - self.pos))
+        self.eof = not block
+        self.buffer = self.buffer[self.pos :] + self.utf8.decode(block, final=self.eof)
+        self.pos = 0
+        return True
+
+    def token(self) -> str:
+        """The next non-whitespace character, or "" at the end of the input."""
+        while True:
+            # The pattern matches the empty string, so it never fails
+            if match := _WHITESPACE.match(self.buffer, self.pos):
+                self.pos = match.end()
+            if self.pos < len(self.buffer) or not self.more():
+                return self.buffer[self.pos : self.pos + 1]
+
+
+def iter_array(stream: IO[bytes], block_size: int = STREAM_BLOCK_SIZE) -> Iterator[Any]:
+    """
+    Yields the elements of a top-level JSON array in a UTF-8 binary stream
+    one at a time.
+
+    The stream is read block_size bytes at a time, so only the current
+    block and the element being parsed are held in memory, however large
+    the array. Elements are parsed with the standard library. Input that is
+    not an array raises json.JSONDecodeError, as do malformed elements.
+    """
+    decoder = json.JSONDecoder()
+    reader = _BlockReader(stream, block_size)
+    if reader.token() != "[":
+        raise json.JSONDecodeError("Expecting '['", reader.buffer, reader.pos)
+    reader.pos += 1
+    if reader.token() == "]":
+        return
+    while True:
+        reader.token()
+        while True:
+            try:
+                value, end = decoder.raw_decode(reader.buffer, reader.pos)
+            except json.JSONDecodeError:
+                if reader.more():
+                    continue
+                raise
+            # A number at the end of a block may continue in the next one
+            if end < len(reader.buffer) or not reader.more():
+                break
+        reader.pos = end
+        yield value
+
+        separator = reader.token()
+        reader.pos += 1
+        if separator == "]":
+            return
+        if separator != ",":
+            raise json.JSONDecodeError(
+                "Expecting ',' delimiter", reader.buffer, reader.pos - 1
+            )
+
+
+def iter_records(path: str, block_size: int = STREAM_BLOCK_SIZE) -> Iterator[Any]:
+    """
+    Streams the elements of the JSON array in a file, or in stdin when path
+    is '-', decompressing as read_input does.
+    """
+    with open_input(path) as stream:
+        yield from iter_array(stream, block_size)
@@ -1,14 +1,77 @@
+import cProfile
 import json
-import sys
-from typing import Annotated
+import os
+from collections.abc import Iterable, Iterator
+from datetime import datetime
+from enum import StrEnum
+from functools import partial
+from typing import Annotated, NoReturn
 
 import typer
+from pydantic import ValidationError
 from rich.console import Console
 
-from .bigquery_uploader import upload_to_bigquery
-from .models import CopilotData
-from .processing import flatten_copilot_data
-from .visualizer import create_dashboard
+from .aggregates import AggregateState, ApplyResult, RevisionError, RevisionPolicy
+from .archive import SnapshotArchive
+from .bigquery_streaming import (
+    DEFAULT_MAX_BATCH_BYTES,
+    DEFAULT_MAX_IN_FLIGHT,
+    StreamMode,
+    stream_to_bigquery,
+)
+from .bigquery_uploader import SUMMARY_TABLES, UPLOAD_PROJECTION, upload_to_bigquery
+from .cardinality import CardinalityLimits
+from .compression import open_output
+from .dates import sort_days
+from .export import (
+    DEFAULT_ROW_GROUP_ROWS,
+    EXPORT_PROJECTION,
+    EXPORT_TABLES,
+    ExportFormat,
+    ExportResult,
+    export_tables,
+)
+from .filters import MetricsFilter, filter_raw_records
+from .instrumentation import record_timings, stage
+from .jsonio import MMAP_THRESHOLD, loads, read_input
+from .models import CopilotData, DailyCopilotStats, Tenant, TenantManifest
+from .outofcore import aggregate_chunks, flatten_chunks, parse_memory, read_chunks
+from .pipelined import (
+    DEFAULT_WORKERS,
+    Source,
+    read_source,
+    stream_source,
+    upload_pipelined,
+)
+from .processing import (
+    ALL_SECTIONS,
+    Projection,
+    SummaryTables,
+    TenantBatch,
+    drop_unused_sections,
+    flatten_tenant_summaries,
+    flatten_tenants,
+    required_sections,
+)
+from .quality import QualityError, QualityPolicy, QualityReport, enforce_quality
+from .seats import (
+    DEFAULT_FETCH_CONCURRENCY,
+    NEVER,
+    SeatTable,
+    fetch_seats,
+    github_page_fetcher,
+    parse_seats,
+    seats_url,
+)
+from .server import MetricsStore, create_server, start_refresher
+from .trends import TREND_PROJECTION, compute_trends
+from .visualizer import (
+    DASHBOARD_PROJECTION,
+    SUMMARY_DASHBOARD_PROJECTION,
+    Engine,
+    create_dashboard,
+    render_dashboard,
+)
 
 app = typer.Typer(
     name="pilot-metrics",
@@ -18,33 +81,209 @@ app = typer.Typer(
 console = Console()
 
 
-def load_data(input_file: str) -> list:
-    """Load and parse Copilot data from file or stdin."""
+class Sink(StrEnum):
+    LOAD = "load"
+    STREAM = "stream"
+
+
+SinceOption = Annotated[
+    datetime | None,
+    typer.Option(help="Only include days on or after this date.", formats=["%Y-%m-%d"]),
+]
+UntilOption = Annotated[
+    datetime | None,
+    typer.Option(
+        help="Only include days on or before this date.", formats=["%Y-%m-%d"]
+    ),
+]
+EditorOption = Annotated[
+    list[str] | None,
+    typer.Option("--editor", help="Only include this editor. Repeatable."),
+]
+ModelOption = Annotated[
+    list[str] | None,
+    typer.Option("--model", help="Only include this model. Repeatable."),
+]
+LanguageOption = Annotated[
+    list[str] | None,
+    typer.Option("--language", help="Only include this language. Repeatable."),
+]
+
+OrgOption = Annotated[
+    str | None, typer.Option(help="Organization the input data belongs to.")
+]
+TeamOption = Annotated[str | None, typer.Option(help="Team the input data belongs to.")]
+EnterpriseOption = Annotated[
+    str | None, typer.Option(help="Enterprise the input data belongs to.")
+]
+ArchiveOption = Annotated[
+    str | None,
+    typer.Option(
+        "--archive",
+        help="Snapshot archive to read de-duplicated records from. Replaces "
+        "INPUT_FILE.",
+    ),
+]
+TenantsOption = Annotated[
+    str | None,
+    typer.Option(
+        "--tenants",
+        help="JSON manifest of {enterprise, org, team, path} entries to process "
+        "together. Replaces INPUT_FILE.",
+    ),
+]
+
+MaxMemoryOption = Annotated[
+    int | None,
+    typer.Option(
+        parser=parse_memory,
+        metavar="SIZE",
+        help="Memory budget such as 512M or 2G. Streams the input and "
+        "aggregates it a few days at a time, spilling partial aggregates to "
+        "temporary files beyond the budget, so inputs larger than memory can "
+        "be processed.",
+    ),
+]
+
+QualityOption = Annotated[
+    QualityPolicy,
+    typer.Option(
+        "--quality",
+        help="What to do with rows that fail the data-quality checks, such as "
+        "more acceptances than suggestions or negative counters: 'warn' keeps "
+        "them, 'quarantine' leaves them out, 'fail' stops. --max-memory and "
+        "--pipelined runs check each chunk of days as it is processed.",
+    ),
+]
+QuarantineFileOption = Annotated[
+    str, typer.Option(help="Where --quality quarantine writes the rows it left out.")
+]
+
+
+@app.callback()
+def main(
+    ctx: typer.Context,
+    timings: Annotated[
+        bool,
+        typer.Option(
+            "--timings",
+            help="Print per-stage wall time, throughput, bytes and peak memory.",
+        ),
+    ] = False,
+    timings_file: Annotated[
+        str, typer.Option(help="Where --timings writes its JSON report.")
+    ] = "timings.json",
+    profile: Annotated[
+        str | None,
+        typer.Option(help="Write cProfile stats for the whole run to this file."),
+    ] = None,
+):
+    """
+    CLI to process and visualize GitHub Copilot usage data.
+    """
+    if profile:
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+        def write_profile() -> None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+            console.print(f"[cyan]Profile written to '{profile}'.[/cyan]")
+
+        ctx.call_on_close(write_profile)
+
+    if timings:
+        recorded = ctx.with_resource(record_timings(trace_memory=True))
+
+        def report_timings() -> None:
+            console.print(recorded.table())
+            recorded.save(timings_file)
+            console.print(f"[cyan]Timings written to '{timings_file}'.[/cyan]")
+
+        ctx.call_on_close(report_timings)
+
+
+def build_filter(
+    since: datetime | None = None,
+    until: datetime | None = None,
+    editors: list[str] | None = None,
+    models: list[str] | None = None,
+    languages: list[str] | None = None,
+) -> MetricsFilter:
+    """Builds a MetricsFilter from CLI option values."""
+    return MetricsFilter(
+        since=since.date() if since else None,
+        until=until.date() if until else None,
+        editors=frozenset(editors) if editors else None,
+        models=frozenset(models) if models else None,
+        languages=frozenset(languages) if languages else None,
+    )
+
+
+def read_json(input_file: str, raw: bool = False):
+    """
+    Reads and parses a JSON file, or stdin when input_file is '-'.
+
+    With raw, the undecoded bytes are returned for pydantic to parse.
+    """
     if input_file == "-":
         console.print("[cyan]Reading data from stdin...[/cyan]")
-        try:
-            raw_data = json.load(sys.stdin)
-        except (json.JSONDecodeError, TypeError):
-            console.print("[bold red]Error: Invalid JSON data provided.[/bold red]")
-            raise typer.Exit(code=1) from None
     else:
         console.print(f"[cyan]Reading data from '{input_file}'...[/cyan]")
-        try:
-            with open(input_file) as f:
-                raw_data = json.load(f)
-        except FileNotFoundError:
-            console.print(f"[bold red]Error: File '{input_file}' not found.[/bold red]")
-            raise typer.Exit(code=1) from None
-        except (json.JSONDecodeError, TypeError):
-            console.print("[bold red]Error: Invalid JSON data provided.[/bold red]")
-            raise typer.Exit(code=1) from None
+    try:
+        with (
+            stage("parse", "bytes") as timing,
+            read_input(input_file, None if raw else MMAP_THRESHOLD) as content,
+        ):
+            timing.bytes_read = timing.items = len(content)
+            return content if raw else loads(content)
+    except FileNotFoundError:
+        console.print(f"[bold red]Error: File '{input_file}' not found.[/bold red]")
+        raise typer.Exit(code=1) from None
+    except (json.JSONDecodeError, TypeError):
+        console.print("[bold red]Error: Invalid JSON data provided.[/bold red]")
+        raise typer.Exit(code=1) from None
+    except Exception as e:
+        # Corrupt compressed input surfaces as the codec's own error
+        console.print(f"[bold red]Error: Could not read '{input_file}': {e}[/bold red]")
+        raise typer.Exit(code=1) from None
+
+
+def parse_records(
+    raw_data,
+    filters: MetricsFilter | None = None,
+    projection: Projection | None = None,
+) -> list[DailyCopilotStats]:
+    """
+    Validates API records, either parsed or as raw JSON bytes.
 
+    Records outside the filter, and API sections the projection does not
+    need, are dropped before validation. Raw bytes are validated as they
+    are, so only pass them when there is nothing to drop.
+    """
     try:
-        parsed_data = CopilotData.model_validate(raw_data)
+        with stage("validate", "records") as timing:
+            if isinstance(raw_data, bytes):
+                parsed_data = CopilotData.model_validate_json(raw_data)
+            else:
+                if filters is not None and isinstance(raw_data, list):
+                    raw_data = filter_raw_records(raw_data, filters)
+                if projection is not None and isinstance(raw_data, list):
+                    raw_data = drop_unused_sections(raw_data, projection)
+                parsed_data = CopilotData.model_validate(raw_data)
+            timing.items = len(parsed_data.root)
         console.print(
             f"[green]Successfully parsed {len(parsed_data.root)} daily records.[/green]"
         )
         return parsed_data.root
+    except ValidationError as e:
+        if e.errors()[0]["type"] == "json_invalid":
+            console.print("[bold red]Error: Invalid JSON data provided.[/bold red]")
+        else:
+            console.print(
+                f"[bold red]An unexpected error occurred during parsing: {e}[/bold red]"
+            )
+        raise typer.Exit(code=1) from None
     except Exception as e:
         console.print(
             f"[bold red]An unexpected error occurred during parsing: {e}[/bold red]"
@@ -52,6 +291,345 @@ def load_data(input_file: str) -> list:
         raise typer.Exit(code=1) from None
 
 
+def load_data(
+    input_file: str,
+    filters: MetricsFilter | None = None,
+    projection: Projection | None = None,
+) -> list:
+    """
+    Load and parse Copilot data from file or stdin.
+
+    Records outside the filter, and API sections the projection does not
+    need, are dropped before validation. When nothing is dropped pydantic
+    validates the raw bytes directly, skipping the intermediate dicts.
+    """
+    prunes = (filters is not None and not filters.is_empty) or (
+        projection is not None and required_sections(projection) != ALL_SECTIONS
+    )
+    return parse_records(read_json(input_file, raw=not prunes), filters, projection)
+
+
+def load_archive(
+    archive_dir: str,
+    tenant: Tenant,
+    filters: MetricsFilter | None = None,
+    projection: Projection | None = None,
+) -> list[TenantBatch]:
+    """
+    Loads the de-duplicated daily records of an archive's tenants, which
+    are already in date order, and indexes them.
+
+    When a tenant is given, only that tenant's records are loaded.
+    """
+    if not os.path.isdir(archive_dir):
+        console.print(f"[bold red]Error: Archive '{archive_dir}' not found.[/bold red]")
+        raise typer.Exit(code=1)
+
+    archive = SnapshotArchive(archive_dir)
+    console.print(
+        f"[cyan]Reading {archive.day_count()} archived days from "
+        f"'{archive_dir}'...[/cyan]"
+    )
+    batches = []
+    for archived_tenant in archive.tenants:
+        if tenant.label and archived_tenant != tenant:
+            continue
+        with stage("archive.read", "records") as timing:
+            raw_data = archive.records(archived_tenant, filters)
+            timing.items = len(raw_data)
+        batches.append(
+            TenantBatch.indexed(
+                archived_tenant, parse_records(raw_data, filters, projection)
+            )
+        )
+    return batches
+
+
+def load_tenants(
+    input_file: str,
+    tenant: Tenant,
+    tenants_file: str | None = None,
+    filters: MetricsFilter | None = None,
+    projection: Projection | None = None,
+    archive_dir: str | None = None,
+) -> list[TenantBatch]:
+    """
+    Loads the daily records of every tenant to process, in date order and
+    indexed by date once for every table flattened from them.
+
+    Without a manifest or archive, INPUT_FILE is loaded for the single given
+    tenant. Relative paths in a manifest are resolved against the manifest's
+    folder.
+    """
+    if archive_dir is not None:
+        if tenants_file is not None:
+            console.print(
+                "[bold red]Error: --archive and --tenants cannot be combined."
+                "[/bold red]"
+            )
+            raise typer.Exit(code=1)
+        return load_archive(archive_dir, tenant, filters, projection)
+
+    if tenants_file is None:
+        return [in_date_order(tenant, load_data(input_file, filters, projection))]
+
+    return [
+        in_date_order(manifest_tenant, load_data(path, filters, projection))
+        for manifest_tenant, path in read_manifest(tenants_file)
+    ]
+
+
+def in_date_order(tenant: Tenant, daily_stats: list[DailyCopilotStats]) -> TenantBatch:
+    """
+    Sorts a tenant's records by day and indexes them, warning about
+    out-of-order and duplicate days found on the way.
+    """
+    daily_stats, scan = sort_days(daily_stats)
+    name = f" for '{tenant.label}'" if tenant.label else ""
+    if scan.out_of_order:
+        console.print(
+            f"[yellow]Warning: {len(scan.out_of_order)} daily records{name} were "
+            f"out of date order (first: {scan.out_of_order[0]}); sorted them."
+            "[/yellow]"
+        )
+    if scan.duplicates:
+        console.print(
+            f"[yellow]Warning: {len(scan.duplicates)} duplicate days{name}: "
+            f"{', '.join(scan.duplicates[:5])}"
+            f"{', ...' if len(scan.duplicates) > 5 else ''}.[/yellow]"
+        )
+    return TenantBatch.indexed(tenant, daily_stats)
+
+
+def read_manifest(tenants_file: str) -> list[tuple[Tenant, str]]:
+    """
+    Returns each tenant of a manifest with the path of its input. Relative
+    paths are resolved against the manifest's folder.
+    """
+    try:
+        with open(tenants_file) as f:
+            manifest = TenantManifest.model_validate_json(f.read())
+    except FileNotFoundError:
+        console.print(f"[bold red]Error: File '{tenants_file}' not found.[/bold red]")
+        raise typer.Exit(code=1) from None
+    except ValueError as e:
+        console.print(f"[bold red]Error: Invalid tenant manifest: {e}[/bold red]")
+        raise typer.Exit(code=1) from None
+
+    base_dir = os.path.dirname(tenants_file)
+    return [
+        (
+            Tenant.model_validate(source.model_dump(exclude={"path"})),
+            os.path.join(base_dir, source.path),
+        )
+        for source in manifest.root
+    ]
+
+
+def tenant_sources(
+    input_file: str,
+    tenant: Tenant,
+    tenants_file: str | None = None,
+    filters: MetricsFilter | None = None,
+    archive_dir: str | None = None,
+    stream: bool = False,
+) -> list[Source]:
+    """
+    Returns a deferred loader of raw records for every tenant to process,
+    for the pipelined upload and --max-memory runs. Inputs are chosen as in
+    load_tenants. With stream, loaders return an iterator that parses one
+    record at a time instead of the whole input.
+    """
+    if archive_dir is not None:
+        if tenants_file is not None:
+            console.print(
+                "[bold red]Error: --archive and --tenants cannot be combined."
+                "[/bold red]"
+            )
+            raise typer.Exit(code=1)
+        if not os.path.isdir(archive_dir):
+            console.print(
+                f"[bold red]Error: Archive '{archive_dir}' not found.[/bold red]"
+            )
+            raise typer.Exit(code=1)
+        archive = SnapshotArchive(archive_dir)
+        records = archive.iter_records if stream else archive.records
+        return [
+            (archived_tenant, partial(records, archived_tenant, filters))
+            for archived_tenant in archive.tenants
+            if not tenant.label or archived_tenant == tenant
+        ]
+
+    read = stream_source if stream else read_source
+    if tenants_file is None:
+        return [(tenant, partial(read, input_file))]
+    return [
+        (manifest_tenant, partial(read, path))
+        for manifest_tenant, path in read_manifest(tenants_file)
+    ]
+
+
+def print_apply_result(result: ApplyResult) -> None:
+    console.print(
+        f"[cyan]Aggregate state: {len(result.added)} days added, "
+        f"{len(result.revised)} revised, "
+        f"{len(result.unchanged) + len(result.kept)} unchanged.[/cyan]"
+    )
+
+
+def applied_chunks(
+    chunks: Iterable[tuple[Tenant, list[DailyCopilotStats]]],
+    aggregates: AggregateState,
+    policy: RevisionPolicy,
+) -> Iterator[tuple[Tenant, list[DailyCopilotStats]]]:
+    """
+    Applies each chunk to the aggregate state as it passes through, and
+    prints the combined result once the chunks run out.
+    """
+    total = ApplyResult()
+    for tenant, daily_stats in chunks:
+        result = aggregates.apply(daily_stats, tenant, policy)
+        for field in ApplyResult.model_fields:
+            getattr(total, field).extend(getattr(result, field))
+        yield tenant, daily_stats
+    print_apply_result(total)
+
+
+def checked_tables(
+    tables: dict[str, list[dict]],
+    quality: QualityPolicy,
+    quarantine_file: str,
+) -> dict[str, list[dict]]:
+    """
+    Runs the data-quality checks over flattened tables and prints what
+    they found, returning the tables left after the policy is applied.
+    """
+    try:
+        with stage("quality", "rows") as timing:
+            timing.items = sum(len(rows) for rows in tables.values())
+            tables, report = enforce_quality(tables, quality)
+    except QualityError as e:
+        quality_failed(e)
+    print_quality_report(report, quarantine_file)
+    return tables
+
+
+def quality_failed(error: QualityError) -> NoReturn:
+    """Prints the rows that failed the data-quality checks and exits."""
+    console.print(error.report.table())
+    console.print(f"[bold red]Error: {error}[/bold red]")
+    raise typer.Exit(code=1) from None
+
+
+def print_quality_report(report: QualityReport, quarantine_file: str) -> None:
+    """
+    Prints what the data-quality checks found and writes the rows they left
+    out to quarantine_file.
+    """
+    if not report.ok:
+        console.print(report.table())
+    if report.quarantined:
+        with open(quarantine_file, "w", encoding="utf-8") as f:
+            json.dump(report.quarantined, f, indent=2, default=str)
+        console.print(
+            f"[yellow]Left out {sum(map(len, report.quarantined.values()))} rows, "
+            f"written to '{quarantine_file}'.[/yellow]"
+        )
+    elif not report.ok:
+        console.print(
+            "[yellow]Warning: Kept the rows above. Use --quality quarantine to "
+            "leave them out or --quality fail to stop.[/yellow]"
+        )
+
+
+def flatten_batches(
+    batches: list[TenantBatch],
+    filters: MetricsFilter,
+    projection: Projection,
+    quality: QualityPolicy = QualityPolicy.WARN,
+    quarantine_file: str = "quarantine.json",
+) -> tuple[list, list, list, SummaryTables | None]:
+    """
+    Flattens loaded tenants into the projected tables, plus the summary
+    tables unless dimension filters are set, and checks their quality.
+    """
+    with stage("flatten", "rows") as timing:
+        completions, chats, pr_data = flatten_tenants(batches, filters, projection)
+        timing.items = len(completions) + len(chats) + len(pr_data)
+        # Summary engaged-user counts cannot be narrowed to a dimension filter
+        summaries = None
+        if not filters.has_dimensions:
+            summaries = flatten_tenant_summaries(batches, filters)
+            timing.items += sum(len(rows) for rows in summaries)
+
+    tables = dict(zip(EXPORT_TABLES, (completions, chats, pr_data), strict=True))
+    if summaries is not None:
+        tables.update(zip(SUMMARY_TABLES, summaries, strict=True))
+    tables = checked_tables(tables, quality, quarantine_file)
+    if summaries is not None:
+        summaries = SummaryTables._make(tables[name] for name in SUMMARY_TABLES)
+    return (
+        tables["code_completions"],
+        tables["chats"],
+        tables["pr_summaries"],
+        summaries,
+    )
+
+
+@app.command("archive")
+def archive_snapshots(
+    archive_dir: Annotated[
+        str, typer.Argument(help="Archive directory. Created if missing.")
+    ],
+    snapshots: Annotated[
+        list[str], typer.Argument(help="Snapshot JSON files to add, oldest first.")
+    ],
+    org: OrgOption = None,
+    team: TeamOption = None,
+    enterprise: EnterpriseOption = None,
+    on_revision: Annotated[
+        RevisionPolicy,
+        typer.Option(help="How days whose content changed are handled."),
+    ] = RevisionPolicy.REPLACE,
+):
+    """
+    Adds metrics snapshots to a de-duplicated archive of daily records.
+    """
+    tenant = Tenant(enterprise=enterprise, org=org, team=team)
+    archive = SnapshotArchive(archive_dir)
+    totals = ApplyResult()
+    for snapshot in snapshots:
+        raw_data = read_json(snapshot)
+        if not isinstance(raw_data, list):
+            console.print(
+                f"[bold red]Error: '{snapshot}' is not a list of daily records."
+                "[/bold red]"
+            )
+            raise typer.Exit(code=1)
+        try:
+            with stage("archive.ingest", "records") as timing:
+                result = archive.ingest(raw_data, tenant, snapshot, on_revision)
+                timing.items = len(raw_data)
+        except RevisionError as e:
+            console.print(f"[bold red]Error: {e}[/bold red]")
+            raise typer.Exit(code=1) from None
+        except ValueError as e:
+            console.print(
+                f"[bold red]Error: Invalid record in '{snapshot}': {e}[/bold red]"
+            )
+            raise typer.Exit(code=1) from None
+        for field in ApplyResult.model_fields:
+            getattr(totals, field).extend(getattr(result, field))
+
+    archive.save()
+    console.print(
+        f"[green]Archived {len(snapshots)} snapshots: {len(totals.added)} days "
+        f"added, {len(totals.revised)} revised, "
+        f"{len(totals.unchanged) + len(totals.kept)} unchanged. The archive holds "
+        f"{archive.day_count()} days.[/green]"
+    )
+
+
 @app.command()
 def upload_to_bq(
     input_file: Annotated[
@@ -60,17 +638,98 @@ def upload_to_bq(
             help="Path to the JSON data file. Use '-' to read from stdin.",
         ),
     ] = "-",
+    since: SinceOption = None,
+    until: UntilOption = None,
+    editor: EditorOption = None,
+    model: ModelOption = None,
+    language: LanguageOption = None,
+    org: OrgOption = None,
+    team: TeamOption = None,
+    enterprise: EnterpriseOption = None,
+    tenants: TenantsOption = None,
+    archive: ArchiveOption = None,
+    sink: Annotated[
+        Sink,
+        typer.Option(
+            help="'load' uses batch load jobs, 'stream' the Storage Write API.",
+        ),
+    ] = Sink.LOAD,
+    stream_mode: Annotated[
+        StreamMode,
+        typer.Option(help="Storage Write API stream type for --sink stream."),
+    ] = StreamMode.COMMITTED,
+    max_batch_bytes: Annotated[
+        int, typer.Option(help="Maximum size of one streamed append request.")
+    ] = DEFAULT_MAX_BATCH_BYTES,
+    max_in_flight: Annotated[
+        int, typer.Option(help="Maximum number of unacknowledged appends.")
+    ] = DEFAULT_MAX_IN_FLIGHT,
+    pipelined: Annotated[
+        bool,
+        typer.Option(
+            help="Overlap reading, validation, flattening and load jobs, with "
+            "several inputs or days in flight at once.",
+        ),
+    ] = False,
+    workers: Annotated[
+        int, typer.Option(help="Worker processes that validate and flatten.")
+    ] = DEFAULT_WORKERS,
+    quality: QualityOption = QualityPolicy.WARN,
+    quarantine_file: QuarantineFileOption = "quarantine.json",
 ):
     """
     Uploads the processed data to BigQuery tables.
     Requires GCP_PROJECT_ID and BQ_DATASET env variables.
     """
-    daily_stats = load_data(input_file)
-    completions, chats, pr_data = flatten_copilot_data(daily_stats)
+    filters = build_filter(since, until, editor, model, language)
+    tenant = Tenant(enterprise=enterprise, org=org, team=team)
+    if pipelined:
+        if sink != Sink.LOAD:
+            console.print(
+                "[bold red]Error: --pipelined only supports --sink load.[/bold red]"
+            )
+            raise typer.Exit(code=1)
+        sources = tenant_sources(
+            input_file, tenant, tenants, filters, archive, stream=True
+        )
+        console.print("[cyan]Starting pipelined upload to BigQuery...[/cyan]")
+        report = QualityReport()
+        try:
+            written = upload_pipelined(
+                sources, filters, workers=workers, quality=quality, report=report
+            )
+        except QualityError as e:
+            quality_failed(e)
+        except Exception as e:
+            console.print(f"[bold red]BigQuery upload failed: {e}[/bold red]")
+            raise typer.Exit(code=1) from None
+        print_quality_report(report, quarantine_file)
+        console.print(
+            f"[bold green]BigQuery upload complete: {sum(written.values())} rows "
+            f"loaded.[/bold green]"
+        )
+        return
+
+    batches = load_tenants(
+        input_file, tenant, tenants, filters, UPLOAD_PROJECTION, archive
+    )
+    completions, chats, _, summaries = flatten_batches(
+        batches, filters, UPLOAD_PROJECTION, quality, quarantine_file
+    )
 
     console.print("[cyan]Starting upload to BigQuery...[/cyan]")
     try:
-        upload_to_bigquery(completions, chats)
+        if sink == Sink.STREAM:
+            stream_to_bigquery(
+                completions,
+                chats,
+                stream_mode,
+                max_batch_bytes,
+                max_in_flight,
+                summaries=summaries,
+            )
+        else:
+            upload_to_bigquery(completions, chats, summaries)
         console.print("[bold green]BigQuery upload complete.[/bold green]")
     except Exception as e:
         console.print(f"[bold red]BigQuery upload failed: {e}[/bold red]")
@@ -85,16 +744,463 @@ def visualize(
             help="Path to the JSON data file. Use '-' to read from stdin.",
         ),
     ] = "-",
+    since: SinceOption = None,
+    until: UntilOption = None,
+    editor: EditorOption = None,
+    model: ModelOption = None,
+    language: LanguageOption = None,
+    org: OrgOption = None,
+    team: TeamOption = None,
+    enterprise: EnterpriseOption = None,
+    tenants: TenantsOption = None,
+    archive: ArchiveOption = None,
+    state_file: Annotated[
+        str | None,
+        typer.Option(
+            help="Incremental aggregate state to update with the input and chart "
+            "accumulated lines from. Created if missing.",
+        ),
+    ] = None,
+    on_revision: Annotated[
+        RevisionPolicy,
+        typer.Option(help="How --state-file handles days whose data changed."),
+    ] = RevisionPolicy.REPLACE,
+    output: Annotated[
+        str,
+        typer.Option(
+            help="Dashboard file to write. A .gz, .zst or .bz2 suffix compresses "
+            "it instead of opening it in the browser.",
+        ),
+    ] = "dashboard.html",
+    pages: Annotated[
+        bool,
+        typer.Option(
+            help="Write a directory with one tab per chart, each loaded only when "
+            "opened. --output names the directory, without its .html suffix.",
+        ),
+    ] = False,
+    max_memory: MaxMemoryOption = None,
+    render_cache: Annotated[
+        str | None,
+        typer.Option(
+            help="Directory to cache drawn charts in. Charts whose data did not "
+            "change since the last run are reused, and an unchanged dashboard is "
+            "not written again.",
+        ),
+    ] = None,
+    top_languages: Annotated[
+        int | None,
+        typer.Option(
+            min=1,
+            help="Chart only this many languages, those with the most accepted "
+            "lines, and fold the rest into 'Other'.",
+        ),
+    ] = None,
+    top_editors: Annotated[
+        int | None,
+        typer.Option(
+            min=1,
+            help="Chart only this many editors, those with the most accepted "
+            "lines, and fold the rest into 'Other'.",
+        ),
+    ] = None,
+    top_repositories: Annotated[
+        int | None,
+        typer.Option(
+            min=1,
+            help="Chart only this many repositories, those with the most PR "
+            "summaries, and fold the rest into 'Other'.",
+        ),
+    ] = None,
+    engine: Annotated[
+        Engine,
+        typer.Option(
+            help="Library to aggregate the charts with. 'polars' runs them as one "
+            "multi-threaded lazy query and needs the polars extra. --max-memory "
+            "runs always use pandas.",
+        ),
+    ] = Engine.PANDAS,
+    quality: QualityOption = QualityPolicy.WARN,
+    quarantine_file: QuarantineFileOption = "quarantine.json",
 ):
     """
     Generates a local, interactive HTML dashboard from the data.
     """
-    daily_stats = load_data(input_file)
-    completions, chats, pr_data = flatten_copilot_data(daily_stats)
+    if state_file and (editor or model or language):
+        console.print(
+            "[bold red]Error: --state-file tracks unfiltered totals and cannot be "
+            "combined with --editor, --model or --language.[/bold red]"
+        )
+        raise typer.Exit(code=1)
+
+    filters = build_filter(since, until, editor, model, language)
+    limits = CardinalityLimits(
+        language=top_languages, editor=top_editors, repository=top_repositories
+    )
+    tenant = Tenant(enterprise=enterprise, org=org, team=team)
+    # Dimension filters need the completion leaves; otherwise the charts
+    # read the much smaller summary tables
+    projection = (
+        DASHBOARD_PROJECTION if filters.has_dimensions else SUMMARY_DASHBOARD_PROJECTION
+    )
+    if pages:
+        output = output.removesuffix(".html")
+    aggregates = AggregateState.load(state_file) if state_file else None
 
-    if not completions:
+    if max_memory is not None:
+        chunks = read_chunks(
+            tenant_sources(input_file, tenant, tenants, filters, archive, stream=True),
+            filters,
+            projection,
+        )
+        if aggregates is not None:
+            chunks = applied_chunks(chunks, aggregates, on_revision)
+        report = QualityReport()
+        try:
+            data = aggregate_chunks(
+                chunks,
+                filters,
+                projection,
+                max_memory,
+                aggregates,
+                limits=limits,
+                quality=quality,
+                report=report,
+            )
+        except QualityError as e:
+            quality_failed(e)
+        except RevisionError as e:
+            console.print(f"[bold red]Error: {e}[/bold red]")
+            raise typer.Exit(code=1) from None
+        except (ValidationError, ValueError) as e:
+            console.print(f"[bold red]Error: Could not read input: {e}[/bold red]")
+            raise typer.Exit(code=1) from None
+        print_quality_report(report, quarantine_file)
+        if aggregates is not None and state_file:
+            aggregates.save(state_file)
+        if data is None:
+            console.print("[yellow]No completion data found to visualize.[/yellow]")
+            raise typer.Exit()
+        console.print("[cyan]Generating local dashboard...[/cyan]")
+        render_dashboard(
+            data, output_file=output, pages=pages, render_cache=render_cache
+        )
+        return
+
+    batches = load_tenants(input_file, tenant, tenants, filters, projection, archive)
+    completions, chats, pr_data, summaries = flatten_batches(
+        batches, filters, projection, quality, quarantine_file
+    )
+
+    if aggregates is not None and state_file:
+        try:
+            for batch_tenant, daily_stats, _ in batches:
+                print_apply_result(
+                    aggregates.apply(daily_stats, batch_tenant, on_revision)
+                )
+        except RevisionError as e:
+            console.print(f"[bold red]Error: {e}[/bold red]")
+            raise typer.Exit(code=1) from None
+        aggregates.save(state_file)
+
+    if not (summaries.languages if summaries else completions):
         console.print("[yellow]No completion data found to visualize.[/yellow]")
         raise typer.Exit()
 
     console.print("[cyan]Generating local dashboard...[/cyan]")
-    create_dashboard(completions, chats, pr_data)
+    try:
+        create_dashboard(
+            completions,
+            chats,
+            pr_data,
+            aggregates,
+            summaries,
+            output_file=output,
+            pages=pages,
+            render_cache=render_cache,
+            limits=limits,
+            engine=engine,
+        )
+    except ImportError as e:
+        console.print(f"[bold red]Error: {e}[/bold red]")
+        raise typer.Exit(code=1) from None
+
+
+@app.command("export")
+def export_files(
+    input_file: Annotated[
+        str,
+        typer.Argument(
+            help="Path to the JSON data file. Use '-' to read from stdin.",
+        ),
+    ] = "-",
+    since: SinceOption = None,
+    until: UntilOption = None,
+    editor: EditorOption = None,
+    model: ModelOption = None,
+    language: LanguageOption = None,
+    org: OrgOption = None,
+    team: TeamOption = None,
+    enterprise: EnterpriseOption = None,
+    tenants: TenantsOption = None,
+    archive: ArchiveOption = None,
+    output: Annotated[
+        str, typer.Option(help="Folder to write one subfolder per table into.")
+    ] = "export",
+    export_format: Annotated[
+        ExportFormat, typer.Option("--format", help="File format to write.")
+    ] = ExportFormat.PARQUET,
+    partition_by_org: Annotated[
+        bool, typer.Option(help="Partition by org=<org>/ above date=<day>/.")
+    ] = False,
+    row_group_rows: Annotated[
+        int, typer.Option(help="Rows per Parquet row group.")
+    ] = DEFAULT_ROW_GROUP_ROWS,
+    max_memory: MaxMemoryOption = None,
+    quality: QualityOption = QualityPolicy.WARN,
+    quarantine_file: QuarantineFileOption = "quarantine.json",
+):
+    """
+    Exports completions, chats and PR summaries as date-partitioned files.
+    """
+    filters = build_filter(since, until, editor, model, language)
+    tenant = Tenant(enterprise=enterprise, org=org, team=team)
+    report = QualityReport()
+    if max_memory is None:
+        batches = load_tenants(
+            input_file, tenant, tenants, filters, EXPORT_PROJECTION, archive
+        )
+        with stage("flatten", "rows") as timing:
+            tables = flatten_tenants(batches, filters, EXPORT_PROJECTION)
+            timing.items = sum(len(rows) for rows in tables)
+        tables = checked_tables(
+            dict(zip(EXPORT_TABLES, tables, strict=True)), quality, quarantine_file
+        )
+        flattened = [tuple(tables[name] for name in EXPORT_TABLES)]
+    else:
+        chunks = read_chunks(
+            tenant_sources(input_file, tenant, tenants, filters, archive, stream=True),
+            filters,
+            EXPORT_PROJECTION,
+        )
+        flattened = flatten_chunks(
+            chunks, filters, EXPORT_PROJECTION, max_memory, quality, report
+        )
+
+    result = ExportResult()
+    try:
+        for tables in flattened:
+            with stage("export", "rows") as timing:
+                written = sum(result.rows.values())
+                export_tables(
+                    dict(zip(EXPORT_TABLES, tables, strict=True)),
+                    output,
+                    export_format,
+                    partition_by_org,
+                    row_group_rows,
+                    result,
+                )
+                timing.items = sum(result.rows.values()) - written
+    except QualityError as e:
+        quality_failed(e)
+    except ImportError as e:
+        console.print(f"[bold red]Error: {e}[/bold red]")
+        raise typer.Exit(code=1) from None
+    except (ValidationError, ValueError) as e:
+        console.print(f"[bold red]Error: Could not read input: {e}[/bold red]")
+        raise typer.Exit(code=1) from None
+    print_quality_report(report, quarantine_file)
+
+    console.print(
+        f"[green]Wrote {sum(result.rows.values())} rows in {len(result.files)} "
+        f"files to '{output}'. {len(result.skipped)} files were already "
+        f"exported and {len(result.replaced)} replaced by revised days.[/green]"
+    )
+    if result.unkeyed:
+        console.print(
+            f"[yellow]Warning: Left {len(result.unkeyed)} partitions alone, as "
+            "they hold files from an older export whose tenant is unknown: "
+            f"{', '.join(result.unkeyed)}. Move those files away and export "
+            "again to write them.[/yellow]"
+        )
+
+
+@app.command("seats")
+def seats_report(
+    input_file: Annotated[
+        str,
+        typer.Argument(
+            help="Seats JSON saved from the billing seats endpoint, a seat table "
+            "saved with --save (.npz), or '-' for stdin.",
+        ),
+    ] = "-",
+    org: OrgOption = None,
+    enterprise: EnterpriseOption = None,
+    fetch: Annotated[
+        bool,
+        typer.Option(
+            help="Fetch the seats of --org or --enterprise from the GitHub API "
+            "with GITHUB_TOKEN instead of reading INPUT_FILE.",
+        ),
+    ] = False,
+    concurrency: Annotated[
+        int, typer.Option(help="Pages fetched at once with --fetch.")
+    ] = DEFAULT_FETCH_CONCURRENCY,
+    idle_days: Annotated[
+        int, typer.Option(help="Report seats with no activity in this many days.")
+    ] = 30,
+    as_of: Annotated[
+        datetime | None,
+        typer.Option(help="Day idleness is measured from.", formats=["%Y-%m-%d"]),
+    ] = None,
+    save: Annotated[
+        str | None, typer.Option(help="Save the seat table to this .npz file.")
+    ] = None,
+    output: Annotated[
+        str | None, typer.Option(help="Write the idle seats to this CSV file.")
+    ] = None,
+):
+    """
+    Finds idle Copilot seats from the billing seats endpoint.
+    """
+    if fetch:
+        token = os.getenv("GITHUB_TOKEN")
+        if not token:
+            console.print(
+                "[bold red]Error: --fetch requires the GITHUB_TOKEN environment "
+                "variable.[/bold red]"
+            )
+            raise typer.Exit(code=1)
+        try:
+            url = seats_url(org, enterprise)
+            with stage("seats.fetch", "seats") as timing:
+                seats = fetch_seats(github_page_fetcher(url, token), concurrency)
+                timing.items = len(seats)
+        except Exception as e:
+            console.print(f"[bold red]Error: Could not fetch seats: {e}[/bold red]")
+            raise typer.Exit(code=1) from None
+        table = SeatTable.from_seats(seats)
+    elif input_file.endswith(".npz"):
+        table = SeatTable.load(input_file)
+    else:
+        raw_data = read_json(input_file)
+        try:
+            table = SeatTable.from_seats(parse_seats(raw_data))
+        except ValidationError as e:
+            console.print(f"[bold red]Error: Invalid seat data: {e}[/bold red]")
+            raise typer.Exit(code=1) from None
+
+    if save:
+        table.save(save)
+        console.print(f"[green]Saved {len(table)} seats to '{save}'.[/green]")
+
+    idle = table.idle(idle_days, as_of.date() if as_of else None)
+    never = int((table.last_activity_day[idle] == NEVER).sum())
+    console.print(
+        f"[cyan]{len(table)} seats: {len(idle)} idle for {idle_days}+ days, "
+        f"{never} never active.[/cyan]"
+    )
+    if output:
+        with open_output(output) as f:
+            table.frame(idle).to_csv(f, index=False)
+        console.print(f"[green]Wrote {len(idle)} idle seats to '{output}'.[/green]")
+
+
+@app.command("trends")
+def export_trends(
+    input_file: Annotated[
+        str,
+        typer.Argument(
+            help="Path to the JSON data file. Use '-' to read from stdin.",
+        ),
+    ] = "-",
+    since: SinceOption = None,
+    until: UntilOption = None,
+    editor: EditorOption = None,
+    model: ModelOption = None,
+    language: LanguageOption = None,
+    org: OrgOption = None,
+    team: TeamOption = None,
+    enterprise: EnterpriseOption = None,
+    tenants: TenantsOption = None,
+    archive: ArchiveOption = None,
+    output: Annotated[
+        str,
+        typer.Option(
+            help="CSV file to write. A .gz, .zst or .bz2 suffix compresses it."
+        ),
+    ] = "trends.csv",
+    quality: QualityOption = QualityPolicy.WARN,
+    quarantine_file: QuarantineFileOption = "quarantine.json",
+):
+    """
+    Exports 7/28-day rolling trends and week-over-week deltas as CSV.
+    """
+    filters = build_filter(since, until, editor, model, language)
+    tenant = Tenant(enterprise=enterprise, org=org, team=team)
+    projection = TREND_PROJECTION if filters.has_dimensions else {"summaries": None}
+    batches = load_tenants(input_file, tenant, tenants, filters, projection, archive)
+    completions, _, _, summaries = flatten_batches(
+        batches, filters, projection, quality, quarantine_file
+    )
+
+    with stage("trends", "rows") as timing:
+        table = compute_trends(completions, summaries)
+        timing.items = len(table)
+    if table.empty:
+        console.print("[yellow]No completion data found to compute trends.[/yellow]")
+        raise typer.Exit()
+
+    with stage("write_csv", "rows") as timing, open_output(output) as f:
+        table.to_csv(f, index=False)
+        timing.items = len(table)
+    console.print(f"[green]Wrote {len(table)} trend rows to '{output}'.[/green]")
+
+
+@app.command()
+def serve(
+    input_file: Annotated[
+        str | None,
+        typer.Argument(help="Path to the JSON data file to serve and watch."),
+    ] = None,
+    org: OrgOption = None,
+    team: TeamOption = None,
+    enterprise: EnterpriseOption = None,
+    tenants: TenantsOption = None,
+    host: Annotated[str, typer.Option(help="Interface to listen on.")] = "127.0.0.1",
+    port: Annotated[int, typer.Option(help="Port to listen on.")] = 8050,
+    refresh_interval: Annotated[
+        float, typer.Option(help="Seconds between checks for new data.")
+    ] = 5.0,
+):
+    """
+    Serves a live dashboard and JSON API from in-memory aggregates.
+    """
+    if tenants is not None:
+        sources = read_manifest(tenants)
+    elif input_file is not None:
+        sources = [(Tenant(enterprise=enterprise, org=org, team=team), input_file)]
+    else:
+        console.print("[bold red]Error: Provide INPUT_FILE or --tenants.[/bold red]")
+        raise typer.Exit(code=1)
+
+    store = MetricsStore(sources)
+    try:
+        store.refresh()
+    except Exception as e:
+        console.print(f"[bold red]Error: Could not load data: {e}[/bold red]")
+        raise typer.Exit(code=1) from None
+    console.print(f"[green]Loaded {len(store.dates)} days of data.[/green]")
+
+    server = create_server(store, host, port)
+    stop_refresh = start_refresher(store, refresh_interval)
+    console.print(
+        f"[bold green]Serving dashboard on http://{host}:{port}/[/bold green]"
+    )
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stop_refresh.set()
+        server.server_close()
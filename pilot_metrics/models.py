@@ -1,4 +1,8 @@
-from pydantic import BaseModel, Field, RootModel
+from datetime import date, datetime
+from functools import cached_property
+from typing import Self
+
+from pydantic import BaseModel, Field, RootModel, model_validator
 
 
 class LanguageMetrics(BaseModel):
@@ -10,6 +14,11 @@ class LanguageMetrics(BaseModel):
     total_code_lines_suggested: int = 0
 
 
+class LanguageSummary(BaseModel):
+    name: str
+    total_engaged_users: int = 0
+
+
 class ChatModel(BaseModel):
     name: str
     is_custom_model: bool
@@ -68,7 +77,7 @@ class CopilotDotComPullRequests(BaseModel):
 
 class CopilotIdeCodeCompletions(BaseModel):
     editors: list[CompletionEditor] = Field(default_factory=list)
-    languages: list[dict]
+    languages: list[LanguageSummary]
     total_engaged_users: int = 0
 
 
@@ -81,6 +90,92 @@ class DailyCopilotStats(BaseModel):
     copilot_dotcom_pull_requests: CopilotDotComPullRequests
     copilot_ide_code_completions: CopilotIdeCodeCompletions
 
+    @cached_property
+    def day(self) -> int:
+        """The date as a day ordinal, parsed on first use only."""
+        return date.fromisoformat(self.date).toordinal()
+
 
 class CopilotData(RootModel[list[DailyCopilotStats]]):
     root: list[DailyCopilotStats]
+
+
+class Tenant(BaseModel):
+    """Identifies whose metrics a set of daily records describes."""
+
+    enterprise: str | None = None
+    org: str | None = None
+    team: str | None = None
+
+    @property
+    def label(self) -> str:
+        return "/".join(part for part in (self.enterprise, self.org, self.team) if part)
+
+    def covers(self, other: "Tenant") -> bool:
+        """
+        Whether other's metrics are part of this tenant's, as a team's are
+        part of its org's. A tenant covers itself; one without identifiers
+        covers nothing.
+        """
+        parts = {
+            name: value
+            for name in ("enterprise", "org", "team")
+            if (value := getattr(self, name)) is not None
+        }
+        return bool(parts) and all(
+            getattr(other, name) == value for name, value in parts.items()
+        )
+
+
+class TenantSource(Tenant):
+    """A tenant and the path to its metrics file, as listed in a manifest."""
+
+    path: str
+
+
+class TenantManifest(RootModel[list[TenantSource]]):
+    root: list[TenantSource]
+
+    @model_validator(mode="after")
+    def _check_disjoint(self) -> Self:
+        # Metrics and active users are summed across tenants, so a tenant
+        # inside another would be counted twice
+        for i, source in enumerate(self.root):
+            for other in self.root[i + 1 :]:
+                if source.covers(other) or other.covers(source):
+                    raise ValueError(
+                        f"Tenants '{source.label}' and '{other.label}' overlap; "
+                        "list only disjoint tenants, such as the teams of an "
+                        "org or the org itself"
+                    )
+        return self
+
+
+class SeatAssignee(BaseModel):
+    login: str
+    id: int | None = None
+    type: str = "User"
+
+
+class SeatTeam(BaseModel):
+    slug: str
+    name: str | None = None
+
+
+class CopilotSeat(BaseModel):
+    """One Copilot license, as listed by the billing seats endpoint."""
+
+    assignee: SeatAssignee
+    assigning_team: SeatTeam | None = None
+    created_at: datetime
+    updated_at: datetime | None = None
+    pending_cancellation_date: str | None = None
+    last_activity_at: datetime | None = None
+    # Editor, editor version and plugin version, e.g. vscode/1.90.0/copilot/1.200.0
+    last_activity_editor: str | None = None
+    plan_type: str | None = None
+
+
+class CopilotSeatsPage(BaseModel):
+    total_seats: int
+    seats: list[CopilotSeat] = Field(default_factory=list)
@@ -0,0 +1,456 @@
+import os
+import re
+import sys
+import tempfile
+from collections.abc import Iterable, Iterator
+from itertools import islice
+from typing import Any, NamedTuple, Self
+
+import numpy as np
+import pandas as pd
+
+from .aggregates import AggregateState
+from .bigquery_uploader import SUMMARY_TABLES
+from .cardinality import CardinalityLimits
+from .dates import DateIndex, ordinal_datetimes
+from .export import EXPORT_TABLES
+from .filters import MetricsFilter, filter_raw_records
+from .instrumentation import stage
+from .jsonio import loads
+from .models import CopilotData, DailyCopilotStats, Tenant
+from .pipelined import Source
+from .processing import (
+    CHAT_COUNTERS,
+    Projection,
+    SummaryTables,
+    drop_unused_sections,
+    flatten_copilot_data,
+    flatten_summaries,
+)
+from .quality import QualityPolicy, QualityReport, enforce_quality
+from .trends import trend_frame
+from .visualizer import (
+    DashboardData,
+    build_dashboard_data,
+    fold_languages,
+    language_pivot,
+    repository_totals,
+    tenant_labels,
+)
+
+DEFAULT_CHUNK_DAYS = 7
+
+_SIZE = re.compile(r"(\d+(?:\.\d+)?)\s*([kmgt]?)(?:i?b)?", re.IGNORECASE)
+_UNITS = {"": 1, "k": 1024, "m": 1024**2, "g": 1024**3, "t": 1024**4}
+
+_COUNTERS = (
+    "total_code_acceptances",
+    "total_code_suggestions",
+    "total_code_lines_accepted",
+)
+_SUMS = dict.fromkeys(_COUNTERS, "sum")
+
+
+class PartialTable(NamedTuple):
+    """Group keys of a partial aggregate and how each value merges."""
+
+    keys: tuple[str, ...]
+    values: dict[str, str]
+
+
+# Everything the dashboard charts and trends are drawn from, as group-by
+# aggregates that can be merged in any order. "day" is a day ordinal.
+PARTIAL_TABLES: dict[str, PartialTable] = {
+    # total_engaged_users only comes from summary tables
+    "languages": PartialTable(
+        ("day", "language"), {**_SUMS, "total_engaged_users": "sum"}
+    ),
+    "editors": PartialTable(("day", "editor"), {**_SUMS, "total_engaged_users": "sum"}),
+    "daily": PartialTable(("day", "tenant"), {**_SUMS, "active_users": "max"}),
+    "repositories": PartialTable(
+        ("repository",), {"total_pr_summaries_created": "sum"}
+    ),
+    # A single row of totals
+    "chats": PartialTable((), dict.fromkeys(CHAT_COUNTERS, "sum")),
+}
+
+
+def parse_memory(text: str) -> int:
+    """Parses a memory size such as 512M, 2G or 1.5GiB into bytes."""
+    match = _SIZE.fullmatch(text.strip())
+    if match is None:
+        raise ValueError(f"Invalid memory size '{text}'")
+    return int(float(match[1]) * _UNITS[match[2].lower()])
+
+
+def read_chunks(
+    sources: Iterable[Source],
+    filters: MetricsFilter,
+    projection: Projection,
+    chunk_days: int = DEFAULT_CHUNK_DAYS,
+) -> Iterator[tuple[Tenant, list[DailyCopilotStats]]]:
+    """
+    Yields each source's daily records chunk_days raw records at a time.
+
+    Sources that stream their records are never held whole; others hold
+    one source's raw records at once. Each chunk is validated just before
+    it is yielded.
+    """
+    for tenant, load in sources:
+        records = load()
+        if isinstance(records, bytes | bytearray | memoryview | str):
+            records = loads(records)
+        if not isinstance(records, list | Iterator):
+            raise ValueError(
+                f"Input of '{tenant.label}' is not a list of daily records"
+            )
+        records = iter(records)
+        while raw_records := list(islice(records, chunk_days)):
+            raw_records = drop_unused_sections(
+                filter_raw_records(raw_records, filters), projection
+            )
+            yield tenant, CopilotData.model_validate(raw_records).root
+
+
+def _rows_nbytes(rows: list[dict[str, Any]]) -> int:
+    # Rows of a table share their interned keys and have values of the same
+    # types, so one row's dict and values are a fair estimate for the others
+    if not rows:
+        return 0
+    row = rows[0]
+    row_nbytes = sys.getsizeof(row) + sum(map(sys.getsizeof, row.values()))
+    return row_nbytes * len(rows)
+
+
+def _checked(
+    tables: dict[str, list[dict[str, Any]]],
+    quality: QualityPolicy,
+    report: QualityReport | None,
+) -> dict[str, list[dict[str, Any]]]:
+    # Every rule compares rows of the same day and chunks hold whole days,
+    # so checking chunk by chunk finds what checking all rows at once would
+    tables, chunk_report = enforce_quality(tables, quality)
+    if report is not None:
+        report.extend(chunk_report)
+    return tables
+
+
+def flatten_chunks(
+    chunks: Iterable[tuple[Tenant, list[DailyCopilotStats]]],
+    filters: MetricsFilter,
+    projection: Projection,
+    max_memory: int,
+    quality: QualityPolicy = QualityPolicy.WARN,
+    report: QualityReport | None = None,
+) -> Iterator[tuple[list, list, list]]:
+    """
+    Flattens chunks of daily records, yielding (completions, chats, pr_data)
+    each time the rows buffered so far exceed about max_memory bytes, and
+    once more at the end.
+
+    Each chunk's rows are checked with quality.enforce_quality under
+    quality before they are buffered, and what the checks found is added to
+    report.
+
+    Raises:
+        QualityError: When rows break a rule under QualityPolicy.FAIL
+    """
+    buffered: tuple[list, list, list] = ([], [], [])
+    nbytes = 0
+    for tenant, daily_stats in chunks:
+        with stage("flatten", "rows") as timing:
+            tables = flatten_copilot_data(daily_stats, filters, projection, tenant)
+            checked = _checked(
+                dict(zip(EXPORT_TABLES, tables, strict=True)), quality, report
+            )
+            for rows, name in zip(buffered, EXPORT_TABLES, strict=True):
+                rows.extend(checked[name])
+                nbytes += _rows_nbytes(checked[name])
+            timing.items = sum(len(rows) for rows in tables)
+        if nbytes > max_memory:
+            yield buffered
+            buffered, nbytes = ([], [], []), 0
+    if any(buffered):
+        yield buffered
+
+
+def _merge(name: str, frames: list[pd.DataFrame]) -> pd.DataFrame:
+    """Combines partial aggregates of one table into one row per key."""
+    table = PARTIAL_TABLES[name]
+    df = frames[0] if len(frames) == 1 else pd.concat(frames, ignore_index=True)
+    values = {
+        column: how for column, how in table.values.items() if column in df.columns
+    }
+    if not table.keys:
+        return df.agg(values).to_frame().T
+    return df.groupby(list(table.keys), sort=False).agg(values).reset_index()
+
+
+def _keyed_frame(rows: list[dict[str, Any]]) -> pd.DataFrame:
+    df = pd.DataFrame(rows)
+    df["day"] = DateIndex.from_rows(rows).row_days
+    df["tenant"] = tenant_labels(df)
+    return df
+
+
+def partial_aggregates(
+    completions_data: list[dict[str, Any]],
+    chats_data: list[dict[str, Any]],
+    pr_data: list[dict[str, Any]],
+    summaries: SummaryTables | None = None,
+) -> dict[str, pd.DataFrame]:
+    """
+    Reduces flattened rows to the PARTIAL_TABLES they contribute to.
+
+    As in aggregate_dashboard_data, completion charts come from the summary
+    tables when they are given and from the completion leaves otherwise.
+    """
+    sources: dict[str, pd.DataFrame] = {}
+    if summaries is not None:
+        if summaries.daily:
+            daily = _keyed_frame(summaries.daily)
+            sources["daily"] = daily.assign(active_users=daily["total_active_users"])
+        if summaries.languages:
+            languages = _keyed_frame(summaries.languages)
+            # None for languages the API reported no user count for
+            sources["languages"] = languages.assign(
+                total_engaged_users=pd.to_numeric(
+                    languages["total_engaged_users"]
+                ).fillna(0)
+            )
+        editors = [
+            row for row in summaries.editors if row["feature"] == "code_completions"
+        ]
+        if editors:
+            sources["editors"] = _keyed_frame(editors)
+    elif completions_data:
+        # Leaf user counts only give the largest leaf per day and tenant
+        completions = _keyed_frame(completions_data)
+        sources["daily"] = completions.assign(
+            active_users=completions["total_engaged_users"]
+        )
+        completions = completions.drop(columns="total_engaged_users")
+        sources["languages"] = sources["editors"] = completions
+    if pr_data:
+        sources["repositories"] = pd.DataFrame(pr_data)
+    if chats_data:
+        sources["chats"] = pd.DataFrame(chats_data)
+
+    return {name: _merge(name, [df]) for name, df in sources.items()}
+
+
+def _column_array(column: pd.Series) -> np.ndarray:
+    if column.dtype == object:
+        return column.to_numpy(dtype=str)
+    return column.to_numpy()
+
+
+class SpillingAggregator:
+    """
+    Merges partial aggregates within a memory budget.
+
+    Partial aggregates are kept in memory until they exceed max_memory
+    bytes. They are then merged, which is enough when chunks share most of
+    their keys, and if that still leaves more than half the budget they are
+    written to a temporary .npz file, one array per column, and dropped.
+    merged() folds the spill files one at a time into what is in memory, so
+    only the merged result and a single spill file are held at once.
+    """
+
+    def __init__(self, max_memory: int, spill_dir: str | None = None):
+        self.max_memory = max_memory
+        self.spills: list[str] = []
+        self._frames: dict[str, list[pd.DataFrame]] = {
+            name: [] for name in PARTIAL_TABLES
+        }
+        self._nbytes = 0
+        self._spill_dir = tempfile.TemporaryDirectory(
+            prefix="pilot-metrics-spill-", dir=spill_dir
+        )
+
+    def __enter__(self) -> Self:
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """Removes the spill files."""
+        self._spill_dir.cleanup()
+
+    def add(self, partials: dict[str, pd.DataFrame]) -> None:
+        for name, frame in partials.items():
+            self._frames[name].append(frame)
+            self._nbytes += int(frame.memory_usage(deep=True).sum())
+        if self._nbytes > self.max_memory:
+            self._compact()
+            if self._nbytes > self.max_memory // 2:
+                self._spill()
+
+    def _compact(self) -> None:
+        self._nbytes = 0
+        for name, frames in self._frames.items():
+            if len(frames) > 1:
+                self._frames[name] = frames = [_merge(name, frames)]
+            self._nbytes += sum(
+                int(frame.memory_usage(deep=True).sum()) for frame in frames
+            )
+
+    def _spill(self) -> None:
+        path = os.path.join(self._spill_dir.name, f"spill-{len(self.spills):05d}.npz")
+        with stage("spill", "bytes") as timing:
+            arrays: dict[str, np.ndarray] = {
+                f"{name}.{column}": _column_array(frame[column])
+                for name, frames in self._frames.items()
+                for frame in frames
+                for column in frame.columns
+            }
+            np.savez(path, **arrays)
+            timing.bytes_written = timing.items = os.path.getsize(path)
+        self.spills.append(path)
+        self._frames = {name: [] for name in PARTIAL_TABLES}
+        self._nbytes = 0
+
+    def merged(self) -> dict[str, pd.DataFrame]:
+        """Returns every partial aggregate table merged into one row per key."""
+        self._compact()
+        merged = {name: frames[0] for name, frames in self._frames.items() if frames}
+        for path in self.spills:
+            with stage("spill.merge", "bytes") as timing:
+                for name, frame in _load_spill(path).items():
+                    merged[name] = (
+                        _merge(name, [merged[name], frame]) if name in merged else frame
+                    )
+                timing.bytes_read = timing.items = os.path.getsize(path)
+        return merged
+
+
+def _load_spill(path: str) -> dict[str, pd.DataFrame]:
+    columns: dict[str, dict[str, np.ndarray]] = {}
+    with np.load(path) as spill:
+        for key in spill.files:
+            name, column = key.split(".", 1)
+            columns.setdefault(name, {})[column] = spill[key]
+    return {name: pd.DataFrame(table) for name, table in columns.items()}
+
+
+def _dated(df: pd.DataFrame) -> pd.DataFrame:
+    dates = ordinal_datetimes(df["day"].to_numpy()).astype("datetime64[ns]")
+    return df.drop(columns="day").assign(date=dates)
+
+
+def dashboard_data_from_partials(
+    partials: dict[str, pd.DataFrame],
+    aggregates: AggregateState | None = None,
+    limits: CardinalityLimits | None = None,
+) -> DashboardData:
+    """
+    Builds the dashboard's chart series from merged partial aggregates,
+    folding dimension values beyond limits as aggregate_dashboard_data does.
+    """
+    limits = limits or CardinalityLimits()
+    daily = _dated(partials["daily"]).sort_values(["date", "tenant"])
+    languages, kept_languages = fold_languages(_dated(partials["languages"]), limits)
+    editors = limits.fold(_dated(partials["editors"]), "editor")
+    has_users = "total_engaged_users" in languages.columns
+
+    trends = pd.concat(
+        [
+            trend_frame(daily, None, "active_users" if has_users else None),
+            trend_frame(
+                languages, "language", "total_engaged_users" if has_users else None
+            ),
+            trend_frame(
+                editors, "editor", "total_engaged_users" if has_users else None
+            ),
+        ],
+        ignore_index=True,
+    )
+
+    return build_dashboard_data(
+        tenants=sorted(daily["tenant"].unique()),
+        language_lines=language_pivot(languages, "total_code_lines_accepted"),
+        language_acceptances=language_pivot(languages, "total_code_acceptances"),
+        daily_lines=daily.groupby("date")["total_code_lines_accepted"]
+        .sum()
+        .reset_index(),
+        editor_lines=editors.groupby("editor")["total_code_lines_accepted"]
+        .sum()
+        .reset_index(),
+        daily_users=daily[["date", "tenant", "active_users"]].reset_index(drop=True),
+        language_totals=languages.groupby("language")
+        .agg({"total_code_suggestions": "sum", "total_code_acceptances": "sum"})
+        .reset_index(),
+        repo_summaries=repository_totals(partials["repositories"], limits)
+        if "repositories" in partials
+        else None,
+        chat_totals=partials["chats"].sum() if "chats" in partials else None,
+        trends=trends,
+        aggregates=aggregates,
+        kept_languages=kept_languages,
+    )
+
+
+def aggregate_chunks(
+    chunks: Iterable[tuple[Tenant, list[DailyCopilotStats]]],
+    filters: MetricsFilter,
+    projection: Projection,
+    max_memory: int,
+    aggregates: AggregateState | None = None,
+    spill_dir: str | None = None,
+    limits: CardinalityLimits | None = None,
+    quality: QualityPolicy = QualityPolicy.WARN,
+    report: QualityReport | None = None,
+) -> DashboardData | None:
+    """
+    Aggregates chunks of daily records into dashboard data within a memory
+    budget.
+
+    Each chunk is flattened, reduced to partial aggregates and dropped, so
+    no more than one chunk's flattened rows exist at a time. The partial
+    aggregates are spilled to disk as needed, see SpillingAggregator, and
+    only their final merge, one row per day and dimension value, and one
+    spill file have to fit in memory. Returns None when there is no completion data.
+
+    Each chunk's rows are checked with quality.enforce_quality under
+    quality before they are aggregated, and what the checks found is added
+    to report.
+
+    Raises:
+        QualityError: When rows break a rule under QualityPolicy.FAIL
+    """
+    with SpillingAggregator(max_memory, spill_dir) as aggregator:
+        for tenant, daily_stats in chunks:
+            with stage("aggregate.chunk", "rows") as timing:
+                index = DateIndex.from_daily_stats(daily_stats)
+                completions, chats, pr_data = flatten_copilot_data(
+                    daily_stats, filters, projection, tenant, index
+                )
+                # Summary engaged-user counts cannot be narrowed to a
+                # dimension filter
+                summaries = None
+                tables = dict(
+                    zip(EXPORT_TABLES, (completions, chats, pr_data), strict=True)
+                )
+                if not filters.has_dimensions:
+                    summaries = flatten_summaries(daily_stats, filters, tenant, index)
+                    tables.update(zip(SUMMARY_TABLES, summaries, strict=True))
+                tables = _checked(tables, quality, report)
+                completions, chats, pr_data = (tables[name] for name in EXPORT_TABLES)
+                if summaries is not None:
+                    summaries = SummaryTables._make(
+                        tables[name] for name in SUMMARY_TABLES
+                    )
+                aggregator.add(
+                    partial_aggregates(completions, chats, pr_data, summaries)
+                )
+                timing.items = len(completions) + len(chats) + len(pr_data)
+                if summaries is not None:
+                    timing.items += sum(len(rows) for rows in summaries)
+
+        with stage("aggregate.merge", "rows") as timing:
+            partials = aggregator.merged()
+            timing.items = sum(len(df) for df in partials.values())
+            if "languages" not in partials:
+                return None
+            return dashboard_data_from_partials(partials, aggregates, limits)
@@ -0,0 +1,386 @@
+import hashlib
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any
+
+from google.cloud import bigquery
+from pydantic import BaseModel, ConfigDict, Field
+
+from .bigquery_uploader import (
+    SUMMARY_TABLES,
+    UPLOAD_PROJECTION,
+    dataset_from_env,
+    ensure_tables,
+    load_rows,
+)
+from .cardinality import CardinalityLimits
+from .dates import DateIndex
+from .export import EXPORT_PROJECTION, EXPORT_TABLES, ExportFormat, export_tables
+from .filters import MetricsFilter, filter_raw_records
+from .instrumentation import StageTiming, record_timings, stage
+from .jsonio import loads
+from .models import CopilotData, DailyCopilotStats, Tenant
+from .processing import (
+    ALL_SECTIONS,
+    Projection,
+    SummaryTables,
+    drop_unused_sections,
+    flatten_copilot_data,
+    flatten_summaries,
+    required_sections,
+)
+from .quality import QualityPolicy, QualityReport, enforce_quality
+from .visualizer import (
+    DASHBOARD_PROJECTION,
+    SUMMARY_DASHBOARD_PROJECTION,
+    DashboardData,
+    Engine,
+    aggregate_dashboard_data,
+    write_dashboard,
+)
+
+# Raw JSON, raw records, or records already validated
+PipelineInput = bytes | bytearray | memoryview | str | list
+DEFAULT_CACHE_SIZE = 16
+
+
+class PipelineResult(BaseModel):
+    """What one Pipeline call produced, with the timings of its stages."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    # Daily records validated, or taken as given
+    days: int = 0
+    # Rows flattened per table by flatten(), or written by upload() and export()
+    rows: dict[str, int] = Field(default_factory=dict)
+    # Flattened tables, from flatten() only
+    tables: dict[str, list[dict[str, Any]]] = Field(default_factory=dict)
+    dashboard: DashboardData | None = None
+    # Dashboard file, or export folder
+    output: str | None = None
+    files: list[str] = Field(default_factory=list)
+    quality: QualityReport = Field(default_factory=QualityReport)
+    timings: list[StageTiming] = Field(default_factory=list)
+
+    @property
+    def total_seconds(self) -> float:
+        return sum(timing.wall_seconds for timing in self.timings)
+
+
+class Pipeline:
+    """
+    Processes Copilot metrics in-process, for schedulers that run many
+    orgs from one long-lived worker.
+
+    Unlike the CLI, a Pipeline takes JSON bytes or text, raw records or
+    validated DailyCopilotStats, never prints or exits, raises the
+    underlying error, and returns a PipelineResult. It keeps its state
+    between calls: validated inputs are cached by content, the BigQuery
+    client is created once, and each dataset's tables are only checked on
+    first use. Flattened tables go through the data-quality checks under
+    the quality policy, and the report is returned with the result.
+
+    A Pipeline may be shared between threads. Stage timings are collected
+    per call, the caches are guarded by locks, and dashboards written
+    through a render cache are written one at a time.
+
+        pipeline = Pipeline(dataset_id="project.copilot")
+        for org, payload in fetched.items():
+            result = pipeline.upload(payload, Tenant(org=org))
+            print(org, result.rows, result.total_seconds)
+    """
+
+    def __init__(
+        self,
+        dataset_id: str | None = None,
+        client: bigquery.Client | None = None,
+        cache_size: int = DEFAULT_CACHE_SIZE,
+        render_cache: str | None = None,
+        quality: QualityPolicy = QualityPolicy.WARN,
+    ):
+        self.dataset_id = dataset_id
+        self.quality = quality
+        self.cache_size = cache_size
+        self.render_cache = render_cache
+        self._client = client
+        self._parsed: OrderedDict[tuple, list[DailyCopilotStats]] = OrderedDict()
+        self._ensured: set[tuple[str, str]] = set()
+        self._lock = threading.Lock()
+        self._bigquery_lock = threading.Lock()
+        self._render_lock = threading.Lock()
+
+    @contextmanager
+    def _timed(self) -> Iterator[PipelineResult]:
+        result = PipelineResult()
+        # Timings live in a context variable, so threads do not mix them up
+        with record_timings() as timings:
+            yield result
+        result.timings = timings.stages
+
+    def parse(
+        self,
+        data: PipelineInput,
+        filters: MetricsFilter | None = None,
+        projection: Projection | None = None,
+    ) -> list[DailyCopilotStats]:
+        """
+        Validates input into daily records.
+
+        Records outside the filter and API sections the projection does not
+        need are dropped before validation. JSON input is cached by content,
+        so the same payload is only validated once.
+        """
+        if isinstance(data, list) and all(
+            isinstance(record, DailyCopilotStats) for record in data
+        ):
+            return data
+
+        filters = filters or MetricsFilter()
+        sections = ALL_SECTIONS if projection is None else required_sections(projection)
+        key = None
+        if not isinstance(data, list):
+            if isinstance(data, bytearray | memoryview):
+                data = bytes(data)
+            key = (
+                hashlib.sha1(
+                    data.encode() if isinstance(data, str) else data
+                ).hexdigest(),
+                filters.model_dump_json(),
+                sections,
+            )
+            with self._lock:
+                if key in self._parsed:
+                    self._parsed.move_to_end(key)
+                    return self._parsed[key]
+
+        with stage("validate", "records") as timing:
+            prunes = not filters.is_empty or sections != ALL_SECTIONS
+            if key is not None and not prunes:
+                daily_stats = CopilotData.model_validate_json(data).root
+            else:
+                records = data if isinstance(data, list) else loads(data)
+                if not isinstance(records, list):
+                    raise ValueError("Input is not a list of daily records")
+                records = filter_raw_records(records, filters)
+                if projection is not None:
+                    records = drop_unused_sections(records, projection)
+                daily_stats = CopilotData.model_validate(records).root
+            timing.items = len(daily_stats)
+
+        if key is not None:
+            with self._lock:
+                self._parsed[key] = daily_stats
+                while len(self._parsed) > self.cache_size:
+                    self._parsed.popitem(last=False)
+        return daily_stats
+
+    def _flatten(
+        self,
+        data: PipelineInput,
+        tenant: Tenant | None,
+        filters: MetricsFilter | None,
+        projection: Projection,
+        result: PipelineResult,
+    ) -> tuple[list, list, list, SummaryTables | None]:
+        filters = filters or MetricsFilter()
+        daily_stats = self.parse(data, filters, projection)
+        result.days = len(daily_stats)
+        index = DateIndex.from_daily_stats(daily_stats)
+        with stage("flatten", "rows") as timing:
+            completions, chats, pr_data = flatten_copilot_data(
+                daily_stats, filters, projection, tenant, index
+            )
+            timing.items = len(completions) + len(chats) + len(pr_data)
+            # Summary engaged-user counts cannot be narrowed to a dimension
+            # filter
+            summaries = None
+            if "summaries" in projection and not filters.has_dimensions:
+                summaries = flatten_summaries(daily_stats, filters, tenant, index)
+                timing.items += sum(len(rows) for rows in summaries)
+
+        tables = dict(zip(EXPORT_TABLES, (completions, chats, pr_data), strict=True))
+        if summaries is not None:
+            tables.update(zip(SUMMARY_TABLES, summaries, strict=True))
+        with stage("quality", "rows") as timing:
+            timing.items = sum(len(rows) for rows in tables.values())
+            tables, result.quality = enforce_quality(tables, self.quality)
+        if summaries is not None:
+            summaries = SummaryTables._make(tables[name] for name in SUMMARY_TABLES)
+        return (
+            tables["code_completions"],
+            tables["chats"],
+            tables["pr_summaries"],
+            summaries,
+        )
+
+    def flatten(
+        self,
+        data: PipelineInput,
+        tenant: Tenant | None = None,
+        filters: MetricsFilter | None = None,
+        projection: Projection | None = None,
+    ) -> PipelineResult:
+        """
+        Flattens input into the code_completions, chats and pr_summaries
+        tables, plus the summary tables unless dimension filters are set.
+        """
+        projection = projection or {**EXPORT_PROJECTION, "summaries": None}
+        with self._timed() as result:
+            *tables, summaries = self._flatten(
+                data, tenant, filters, projection, result
+            )
+            result.tables = dict(zip(EXPORT_TABLES, tables, strict=True))
+            if summaries is not None:
+                result.tables.update(zip(SUMMARY_TABLES, summaries, strict=True))
+            result.rows = {name: len(rows) for name, rows in result.tables.items()}
+        return result
+
+    def dashboard(
+        self,
+        data: PipelineInput,
+        tenant: Tenant | None = None,
+        filters: MetricsFilter | None = None,
+        output_file: str | None = None,
+        pages: bool = False,
+        limits: CardinalityLimits | None = None,
+        engine: Engine = Engine.PANDAS,
+    ) -> PipelineResult:
+        """
+        Aggregates input into DashboardData with engine, and writes the
+        dashboard to output_file when one is given. Nothing is opened in a
+        browser. Limits fold the dimension values beyond them into "Other".
+
+        Raises:
+            ValueError: When there is no completion data to chart
+        """
+        filters = filters or MetricsFilter()
+        projection = (
+            DASHBOARD_PROJECTION
+            if filters.has_dimensions
+            else SUMMARY_DASHBOARD_PROJECTION
+        )
+        with self._timed() as result:
+            completions, chats, pr_data, summaries = self._flatten(
+                data, tenant, filters, projection, result
+            )
+            if not (summaries.languages if summaries else completions):
+                raise ValueError("No completion data to visualize")
+            with stage("aggregate", "rows"):
+                result.dashboard = aggregate_dashboard_data(
+                    completions,
+                    chats,
+                    pr_data,
+                    summaries=summaries,
+                    limits=limits,
+                    engine=engine,
+                )
+            if output_file is not None:
+                result.output = self._write_dashboard(
+                    result.dashboard, output_file, pages
+                )
+        return result
+
+    def _write_dashboard(self, data: DashboardData, output_file: str, pages: bool):
+        if self.render_cache is None:
+            return write_dashboard(data, output_file, pages).path
+        # The render cache's manifest is one file
+        with self._render_lock:
+            return write_dashboard(data, output_file, pages, self.render_cache).path
+
+    def client(self) -> bigquery.Client:
+        """Returns the BigQuery client, created on first use."""
+        with self._bigquery_lock:
+            if self._client is None:
+                project_id, _ = dataset_from_env()
+                self._client = bigquery.Client(project=project_id)
+            return self._client
+
+    def _table_ids(self, dataset_id: str, names: list[str]) -> dict[str, str]:
+        client = self.client()
+        with self._bigquery_lock:
+            missing = [
+                name for name in names if (dataset_id, name) not in self._ensured
+            ]
+            if missing:
+                ensure_tables(client, dataset_id, missing)
+                self._ensured.update((dataset_id, name) for name in missing)
+        return {name: f"{dataset_id}.{name}" for name in names}
+
+    def upload(
+        self,
+        data: PipelineInput,
+        tenant: Tenant | None = None,
+        filters: MetricsFilter | None = None,
+        dataset_id: str | None = None,
+    ) -> PipelineResult:
+        """
+        Appends the flattened input to BigQuery with one load job per table.
+
+        The dataset is dataset_id, else the Pipeline's, else the one set by
+        GCP_PROJECT_ID and BQ_DATASET.
+        """
+        dataset_id = dataset_id or self.dataset_id or dataset_from_env()[1]
+        with self._timed() as result:
+            completions, chats, _, summaries = self._flatten(
+                data, tenant, filters, UPLOAD_PROJECTION, result
+            )
+            tables = {"code_completions": completions, "chats": chats}
+            if summaries is not None:
+                tables.update(zip(SUMMARY_TABLES, summaries, strict=True))
+            tables = {name: rows for name, rows in tables.items() if rows}
+            table_ids = self._table_ids(dataset_id, list(tables))
+            for name, rows in tables.items():
+                with stage(f"bigquery.load.{name}", "rows") as timing:
+                    load_rows(self.client(), table_ids[name], rows)
+                    timing.items = result.rows[name] = len(rows)
+        return result
+
+    def export(
+        self,
+        data: PipelineInput,
+        output_dir: str,
+        tenant: Tenant | None = None,
+        filters: MetricsFilter | None = None,
+        export_format: ExportFormat = ExportFormat.PARQUET,
+        by_org: bool = False,
+    ) -> PipelineResult:
+        """Writes the flattened input as date-partitioned files, see export_tables."""
+        with self._timed() as result:
+            *tables, _ = self._flatten(data, tenant, filters, EXPORT_PROJECTION, result)
+            with stage("export", "rows"):
+                exported = export_tables(
+                    dict(zip(EXPORT_TABLES, tables, strict=True)),
+                    output_dir,
+                    export_format,
+                    by_org,
+                )
+            result.rows = exported.rows
+            result.files = exported.files
+            result.output = output_dir
+        return result
+
+    def map(
+        self,
+        call: Callable[..., PipelineResult],
+        inputs: Iterable[tuple[Tenant, PipelineInput]],
+        max_workers: int | None = None,
+        **options: Any,
+    ) -> list[PipelineResult]:
+        """
+        Runs one of the pipeline's methods for each tenant's input on a
+        thread pool, returning results in input order and raising the first
+        error any of them raised. The tenant is passed by keyword, and
+        options as the method's other arguments.
+
+            pipeline.map(pipeline.upload, [(Tenant(org="a"), payload), ...])
+            pipeline.map(pipeline.export, inputs, output_dir="out", by_org=True)
+        """
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(call, data, tenant=tenant, **options)
+                for tenant, data in inputs
+            ]
+            return [future.result() for future in futures]
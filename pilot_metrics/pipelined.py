@@ -0,0 +1,280 @@
+import asyncio
+import os
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, ProcessPoolExecutor
+from itertools import islice
+from typing import Any
+
+from google.cloud import bigquery
+
+from .bigquery_uploader import (
+    SUMMARY_TABLES,
+    UPLOAD_PROJECTION,
+    dataset_from_env,
+    ensure_tables,
+    load_rows,
+)
+from .dates import DateIndex
+from .filters import MetricsFilter, filter_raw_records
+from .instrumentation import stage
+from .jsonio import iter_records, loads, read_input
+from .models import CopilotData, Tenant
+from .processing import (
+    Projection,
+    drop_unused_sections,
+    flatten_copilot_data,
+    flatten_summaries,
+)
+from .quality import QualityPolicy, QualityReport, enforce_quality
+
+DEFAULT_CHUNK_DAYS = 7
+DEFAULT_QUEUE_SIZE = 8
+DEFAULT_WORKERS = min(4, os.cpu_count() or 1)
+DEFAULT_MAX_LOADS = 2
+# Rows buffered per table before a load job is started
+DEFAULT_LOAD_ROWS = 100_000
+# Sources read at once; each returning a list holds its parsed records until
+# fully queued
+MAX_CONCURRENT_READS = 2
+
+# A tenant and a callable returning its raw JSON, or its already parsed
+# records as a list or an iterator
+Source = tuple[Tenant, Callable[[], Any]]
+
+
+def read_source(path: str) -> bytes:
+    """Reads a file, or stdin when path is '-', for use as a Source loader."""
+    with read_input(path, None) as content:
+        return bytes(content)
+
+
+def stream_source(path: str) -> Iterator[Any]:
+    """
+    Streams the records of a file, or of stdin when path is '-', one at a
+    time, for use as a Source loader that never holds the whole input.
+    """
+    return iter_records(path)
+
+
+def _take(records: Iterator[Any], count: int) -> list[Any]:
+    return list(islice(records, count))
+
+
+def process_chunk(
+    raw_records: list[dict[str, Any]],
+    tenant: Tenant,
+    filters: MetricsFilter,
+    projection: Projection,
+    with_summaries: bool,
+    quality: QualityPolicy = QualityPolicy.WARN,
+) -> tuple[dict[str, list[dict[str, Any]]], QualityReport]:
+    """
+    Validates and flattens a chunk of raw daily records into upload tables,
+    and applies the quality policy to them. Every rule compares rows of
+    the same day, and chunks hold whole days, so checking chunk by chunk
+    finds what checking all tables at once would.
+
+    Runs in a worker process, so validated models never cross a process
+    boundary; only the raw chunk goes in and flat rows come back.
+
+    Returns:
+        Tuple of (tables, report), as from quality.enforce_quality
+
+    Raises:
+        QualityError: When rows break a rule under QualityPolicy.FAIL
+    """
+    raw_records = drop_unused_sections(
+        filter_raw_records(raw_records, filters), projection
+    )
+    daily_stats = CopilotData.model_validate(raw_records).root
+    index = DateIndex.from_daily_stats(daily_stats)
+    completions, chats, _ = flatten_copilot_data(
+        daily_stats, filters, projection, tenant, index
+    )
+    tables = {"code_completions": completions, "chats": chats}
+    if with_summaries:
+        summaries = flatten_summaries(daily_stats, filters, tenant, index)
+        tables.update(zip(SUMMARY_TABLES, summaries, strict=True))
+    return enforce_quality(tables, quality)
+
+
+async def _run(
+    sources: list[Source],
+    client: bigquery.Client,
+    table_ids: dict[str, str],
+    filters: MetricsFilter,
+    projection: Projection,
+    executor: Executor,
+    workers: int,
+    chunk_days: int,
+    queue_size: int,
+    max_loads: int,
+    load_rows_at: int,
+    quality: QualityPolicy,
+    report: QualityReport,
+) -> dict[str, int]:
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue = asyncio.Queue(queue_size)
+    results: asyncio.Queue = asyncio.Queue(queue_size)
+    reads = asyncio.Semaphore(MAX_CONCURRENT_READS)
+    load_slots = asyncio.Semaphore(max_loads)
+    with_summaries = not filters.has_dimensions
+    written: dict[str, int] = {}
+
+    async def read(tenant: Tenant, load: Callable[[], Any]) -> None:
+        async with reads:
+            with stage("pipelined.read", "records") as timing:
+                records = await asyncio.to_thread(load)
+                if isinstance(records, bytes | bytearray | memoryview | str):
+                    records = await asyncio.to_thread(loads, records)
+                if not isinstance(records, list | Iterator):
+                    raise ValueError(
+                        f"Input of '{tenant.label}' is not a list of daily records"
+                    )
+                if isinstance(records, list):
+                    timing.items = len(records)
+            records = iter(records)
+            # Streamed records are parsed as each chunk is taken
+            while chunk := await asyncio.to_thread(_take, records, chunk_days):
+                # Blocks while the workers are behind
+                await chunks.put((tenant, chunk))
+
+    async def process() -> None:
+        while (item := await chunks.get()) is not None:
+            tenant, records = item
+            with stage("pipelined.process", "records") as timing:
+                tables, chunk_report = await loop.run_in_executor(
+                    executor,
+                    process_chunk,
+                    records,
+                    tenant,
+                    filters,
+                    projection,
+                    with_summaries,
+                    quality,
+                )
+                timing.items = len(records)
+            report.extend(chunk_report)
+            await results.put(tables)
+
+    async def load(name: str, rows: list[dict[str, Any]]) -> None:
+        try:
+            with stage(f"pipelined.load.{name}", "rows") as timing:
+                await asyncio.to_thread(load_rows, client, table_ids[name], rows)
+                timing.items = len(rows)
+            written[table_ids[name]] = written.get(table_ids[name], 0) + len(rows)
+        finally:
+            load_slots.release()
+
+    async def upload(group: asyncio.TaskGroup) -> None:
+        pending: dict[str, list[dict[str, Any]]] = {name: [] for name in table_ids}
+
+        async def start_load(name: str) -> None:
+            # Waiting for a free slot stops draining results, which in turn
+            # stalls the workers and readers
+            await load_slots.acquire()
+            group.create_task(load(name, pending[name]))
+            pending[name] = []
+
+        while (tables := await results.get()) is not None:
+            for name, rows in tables.items():
+                pending[name].extend(rows)
+                if len(pending[name]) >= load_rows_at:
+                    await start_load(name)
+        for name, rows in pending.items():
+            if rows:
+                await start_load(name)
+
+    async with asyncio.TaskGroup() as group:
+        readers = [group.create_task(read(tenant, load)) for tenant, load in sources]
+        processors = [group.create_task(process()) for _ in range(workers)]
+        group.create_task(upload(group))
+
+        await asyncio.gather(*readers)
+        for _ in processors:
+            await chunks.put(None)
+        await asyncio.gather(*processors)
+        await results.put(None)
+
+    return written
+
+
+def upload_pipelined(
+    sources: Iterable[Source],
+    filters: MetricsFilter | None = None,
+    projection: Projection = UPLOAD_PROJECTION,
+    client: bigquery.Client | None = None,
+    dataset_id: str | None = None,
+    executor: Executor | None = None,
+    workers: int = DEFAULT_WORKERS,
+    chunk_days: int = DEFAULT_CHUNK_DAYS,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+    max_loads: int = DEFAULT_MAX_LOADS,
+    load_rows_at: int = DEFAULT_LOAD_ROWS,
+    quality: QualityPolicy = QualityPolicy.WARN,
+    report: QualityReport | None = None,
+) -> dict[str, int]:
+    """
+    Uploads sources to BigQuery with reading, processing and loading
+    overlapped.
+
+    Sources are read concurrently and split into chunks of chunk_days
+    records. A pool of workers validates and flattens chunks while earlier
+    rows are being loaded, in jobs of about load_rows_at rows with at most
+    max_loads running at once. Bounded queues of queue_size items sit
+    between the stages, so a slow stage holds the ones before it back
+    instead of piling up chunks and rows. Sources whose loader returns an
+    iterator, such as stream_source, are parsed a chunk at a time; others
+    are held whole, up to MAX_CONCURRENT_READS at once, while they are
+    queued.
+
+    Each chunk's rows are checked against the data-quality rules by the
+    worker that flattened them, with quality deciding what happens to the
+    rows that break one. What the checks found is added to report.
+
+    Workers are processes unless an executor is given. The dataset and
+    client default to those configured by GCP_PROJECT_ID and BQ_DATASET.
+
+    Returns:
+        Mapping of table id to number of rows loaded
+
+    Raises:
+        QualityError: When rows break a rule under QualityPolicy.FAIL
+    """
+    filters = filters or MetricsFilter()
+    if client is None or dataset_id is None:
+        project_id, env_dataset_id = dataset_from_env()
+        client = client or bigquery.Client(project=project_id)
+        dataset_id = dataset_id or env_dataset_id
+
+    table_names = ["code_completions", "chats"]
+    if not filters.has_dimensions:
+        table_names.extend(SUMMARY_TABLES)
+    table_ids = ensure_tables(client, dataset_id, table_names)
+
+    owns_executor = executor is None
+    executor = executor or ProcessPoolExecutor(max_workers=workers)
+    try:
+        return asyncio.run(
+            _run(
+                list(sources),
+                client,
+                table_ids,
+                filters,
+                projection,
+                executor,
+                workers,
+                chunk_days,
+                queue_size,
+                max_loads,
+                load_rows_at,
+                quality,
+                QualityReport() if report is None else report,
+            )
+        )
+    except ExceptionGroup as group:
+        # Report the failure that stopped the pipeline, not the cancellations
+        raise group.exceptions[0] from None
+    finally:
+        if owns_executor:
+            executor.shutdown()
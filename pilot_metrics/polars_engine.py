@@ -0,0 +1,228 @@
+from typing import Any
+
+import pandas as pd
+
+from .aggregates import AggregateState
+from .cardinality import OTHER, RANK_METRICS, CardinalityLimits
+from .processing import CHAT_COUNTERS, TENANT_FIELDS, SummaryTables
+from .trends import compute_trends
+from .visualizer import DashboardData, build_dashboard_data
+
+
+def _polars():
+    try:
+        import polars
+    except ImportError as e:
+        raise ImportError(
+            "The polars engine requires polars. "
+            "Install it with: pip install 'pilot-metrics[polars]'"
+        ) from e
+    return polars
+
+
+def _frame(pl, rows: list[dict[str, Any]]):
+    """
+    Returns rows as a LazyFrame. As in pandas, integer columns with missing
+    values are floats.
+    """
+    df = pl.from_dicts(rows, infer_schema_length=None)
+    nulls = df.null_count().row(0, named=True)
+    return df.with_columns(
+        pl.col(name).cast(pl.Float64)
+        for name, dtype in df.schema.items()
+        if dtype.is_integer() and nulls[name]
+    ).lazy()
+
+
+def _dated(pl, frame):
+    """Parses dates and adds the "enterprise/org/team" tenant label."""
+    columns = [name for name in TENANT_FIELDS if name in frame.collect_schema()]
+    tenant = (
+        pl.concat_str(
+            [pl.col(name).cast(pl.String).fill_null("") for name in columns],
+            separator="/",
+        )
+        .str.replace_all("/{2,}", "/")
+        .str.strip_chars("/")
+        if columns
+        else pl.lit("")
+    )
+    return frame.with_columns(
+        pl.col("date").str.to_date().cast(pl.Datetime("ns")), tenant.alias("tenant")
+    )
+
+
+def _kept(pl, frame, dimension: str, limit: int | None):
+    """
+    The query for the values of dimension to keep, as CardinalityLimits.kept
+    ranks them, or None without a limit.
+    """
+    if limit is None:
+        return None
+    metric = RANK_METRICS[dimension]
+    return (
+        frame.drop_nulls(dimension)
+        .group_by(dimension)
+        .agg(pl.col(metric).sum())
+        .sort([metric, dimension], descending=[True, False])
+    )
+
+
+def _folded(pl, frame, dimension: str, kept: frozenset[str] | None):
+    if kept is None:
+        return frame
+    return frame.with_columns(
+        pl.when(pl.col(dimension).is_in(list(kept)))
+        .then(pl.col(dimension))
+        .otherwise(pl.lit(OTHER))
+        .alias(dimension)
+    )
+
+
+def _top(ranked, dimension: str, limit: int | None) -> frozenset[str] | None:
+    if ranked is None or ranked.height <= limit:
+        return None
+    return frozenset(ranked[dimension].head(limit).to_list())
+
+
+def _pivot(pl, frame, metric: str, languages: list[str]):
+    return (
+        frame.drop_nulls("language")
+        .pivot(
+            "language",
+            on_columns=languages,
+            index="date",
+            values=metric,
+            aggregate_function="sum",
+        )
+        .sort("date")
+        .fill_null(0)
+    )
+
+
+def _wide(df) -> pd.DataFrame:
+    frame = df.to_pandas().set_index("date")
+    frame.columns.name = "language"
+    return frame
+
+
+def aggregate_dashboard_data(
+    completions_data: list[dict[str, Any]],
+    chats_data: list[dict[str, Any]],
+    pr_data: list[dict[str, Any]],
+    aggregates: AggregateState | None = None,
+    summaries: SummaryTables | None = None,
+    limits: CardinalityLimits | None = None,
+) -> DashboardData:
+    """
+    Aggregates flattened Copilot data as visualizer.aggregate_dashboard_data
+    does, with polars.
+
+    The chart series are lazy queries over the rows: date x language
+    pivots, daily, per-editor and per-language totals and active users.
+    They are optimized and run together, on every core, with
+    polars.collect_all, and share the scans and folds they have in common.
+    Only the distinct languages and the top-N rankings are collected first,
+    as a pivot needs its columns up front. The collected series are turned
+    into DashboardData by visualizer.build_dashboard_data, as the other
+    engines' are. Trends are computed by trends.compute_trends.
+
+    Returns:
+        DashboardData equal to the pandas engine's
+    """
+    pl = _polars()
+    limits = limits or CardinalityLimits()
+
+    if summaries is not None:
+        languages = _dated(pl, _frame(pl, summaries.languages))
+        daily = _dated(pl, _frame(pl, summaries.daily))
+        editors = (
+            _frame(pl, summaries.editors)
+            .filter(pl.col("feature") == "code_completions")
+            .select("editor", "total_code_lines_accepted")
+        )
+        daily_users = daily.select(
+            "date", "tenant", pl.col("total_active_users").alias("active_users")
+        )
+    else:
+        languages = daily = editors = _dated(pl, _frame(pl, completions_data))
+        daily_users = (
+            daily.group_by("date", "tenant")
+            .agg(pl.col("total_engaged_users").max().alias("active_users"))
+            .sort("date", "tenant")
+        )
+    repositories = _frame(pl, pr_data) if pr_data else None
+
+    rankings = {
+        "language": _kept(pl, languages, "language", limits.language),
+        "editor": _kept(pl, editors, "editor", limits.editor),
+    }
+    if repositories is not None:
+        rankings["repository"] = _kept(
+            pl, repositories, "repository", limits.repository
+        )
+    queries = {name: query for name, query in rankings.items() if query is not None}
+    queries["names"] = languages.select(pl.col("language").drop_nulls().unique().sort())
+    collected = dict(zip(queries, pl.collect_all(queries.values()), strict=True))
+    kept = {
+        dimension: _top(collected.get(dimension), dimension, getattr(limits, dimension))
+        for dimension in rankings
+    }
+
+    names = collected["names"]["language"].to_list()
+    if kept["language"] is not None:
+        names = sorted(kept["language"]) + [OTHER]
+    elif OTHER in names:
+        names = [name for name in names if name != OTHER] + [OTHER]
+    languages = _folded(pl, languages, "language", kept["language"])
+    editors = _folded(pl, editors, "editor", kept["editor"])
+
+    queries = {
+        "lines": _pivot(pl, languages, "total_code_lines_accepted", names),
+        "acceptances": _pivot(pl, languages, "total_code_acceptances", names),
+        "daily_lines": daily.group_by("date")
+        .agg(pl.col("total_code_lines_accepted").sum())
+        .sort("date"),
+        "editor_lines": editors.drop_nulls("editor")
+        .group_by("editor")
+        .agg(pl.col("total_code_lines_accepted").sum())
+        .sort("editor"),
+        "daily_users": daily_users,
+        "language_totals": languages.drop_nulls("language")
+        .group_by("language")
+        .agg(pl.col("total_code_suggestions", "total_code_acceptances").sum())
+        .sort("language"),
+        "tenants": daily.select(pl.col("tenant").unique().sort()),
+    }
+    if repositories is not None:
+        queries["repo_summaries"] = (
+            _folded(pl, repositories, "repository", kept["repository"])
+            .drop_nulls("repository")
+            .group_by("repository")
+            .agg(pl.col("total_pr_summaries_created").sum())
+            .sort("repository")
+        )
+    if chats_data:
+        queries["chat_totals"] = _frame(pl, chats_data).select(
+            pl.col(*CHAT_COUNTERS).sum()
+        )
+    results = dict(zip(queries, pl.collect_all(queries.values()), strict=True))
+
+    return build_dashboard_data(
+        tenants=results["tenants"]["tenant"].to_list(),
+        language_lines=_wide(results["lines"]),
+        language_acceptances=_wide(results["acceptances"]),
+        daily_lines=results["daily_lines"].to_pandas(),
+        editor_lines=results["editor_lines"].to_pandas(),
+        daily_users=results["daily_users"].to_pandas(),
+        language_totals=results["language_totals"].to_pandas(),
+        repo_summaries=results["repo_summaries"].to_pandas()
+        if "repo_summaries" in results
+        else None,
+        chat_totals=results["chat_totals"].row(0, named=True)
+        if "chat_totals" in results
+        else None,
+        trends=compute_trends(completions_data, summaries, limits=limits),
+        aggregates=aggregates,
+        kept_languages=kept["language"],
+    )
@@ -1,14 +1,104 @@
-from typing import Any
+from collections.abc import Iterable
+from typing import Any, NamedTuple, Self
 
-from .models import DailyCopilotStats
+from .dates import DateIndex, select_days
+from .filters import MetricsFilter
+from .models import DailyCopilotStats, Tenant
+
+# Maps each flattened table name to the columns to keep, or None for all
+# columns. Tables missing from a projection are not flattened at all.
+Projection = dict[str, frozenset[str] | None]
+
+# API sections each flattened table is built from
+TABLE_SECTIONS: dict[str, tuple[str, ...]] = {
+    "completions": ("copilot_ide_code_completions",),
+    "chats": ("copilot_ide_chat", "copilot_dotcom_chat"),
+    "pr_summaries": ("copilot_dotcom_pull_requests",),
+    # Built by flatten_summaries rather than flatten_copilot_data
+    "summaries": (
+        "copilot_ide_code_completions",
+        "copilot_ide_chat",
+        "copilot_dotcom_chat",
+        "copilot_dotcom_pull_requests",
+    ),
+}
+
+# Tenant columns carried on every flattened record
+TENANT_FIELDS = tuple(Tenant.model_fields)
+
+ALL_SECTIONS = frozenset(
+    section for sections in TABLE_SECTIONS.values() for section in sections
+)
+# What a dropped section validates as: nothing but its required fields
+EMPTY_SECTIONS: dict[str, dict[str, Any]] = {
+    "copilot_ide_code_completions": {"languages": []},
+    "copilot_ide_chat": {},
+    "copilot_dotcom_chat": {},
+    "copilot_dotcom_pull_requests": {},
+}
+
+
+def merge_projections(*projections: Projection) -> Projection:
+    """Combines projections into one that satisfies all of them."""
+    merged: Projection = {}
+    for projection in projections:
+        for table, fields in projection.items():
+            current = merged.get(table, frozenset())
+            merged[table] = (
+                None if current is None or fields is None else current | fields
+            )
+    return merged
+
+
+def required_sections(projection: Projection) -> frozenset[str]:
+    """Returns the API sections needed to build the projected tables."""
+    return frozenset(
+        section for table in projection for section in TABLE_SECTIONS[table]
+    )
+
+
+def drop_unused_sections(
+    raw_records: list[dict[str, Any]], projection: Projection
+) -> list[dict[str, Any]]:
+    """
+    Replaces the API sections a projection does not need with empty ones in
+    raw records, so their contents are never validated. The sections stay
+    required everywhere else.
+    """
+    unused = ALL_SECTIONS - required_sections(projection)
+    if not unused:
+        return raw_records
+    empty = {section: EMPTY_SECTIONS[section] for section in unused}
+    return [
+        record | empty if isinstance(record, dict) else record for record in raw_records
+    ]
+
+
+def _project(record: dict[str, Any], fields: frozenset[str] | None) -> dict[str, Any]:
+    if fields is None:
+        return record
+    return {key: value for key, value in record.items() if key in fields}
 
 
 def flatten_copilot_data(
     daily_stats: list[DailyCopilotStats],
+    filters: MetricsFilter | None = None,
+    projection: Projection | None = None,
+    tenant: Tenant | None = None,
+    index: DateIndex | None = None,
 ) -> tuple[list[dict[str, Any]], list[dict[str, Any]], list[dict[str, Any]]]:
     """
     Flattens nested Copilot data into flat dictionaries for easier analysis.
 
+    Every record carries the enterprise, org and team of the tenant the data
+    belongs to (None when not given).
+
+    When filters are given, days outside the date range and non-matching
+    editors, models and languages are skipped instead of being flattened;
+    the date range is looked up in index, the DateIndex of daily_stats, when
+    given. When a projection is given, only the tables and fields it names are
+    produced; other tables come back empty.
+
     Returns:
         Tuple of (completions_data, chats_data, pr_data) where each is a list
         of flat dictionaries
@@ -16,16 +106,35 @@ def flatten_copilot_data(
     completions = []
     chats = []
     pr_summaries = []
+    filters = filters or MetricsFilter()
+    if projection is None:
+        projection = dict.fromkeys(TABLE_SECTIONS)
+    want_completions = "completions" in projection
+    want_chats = "chats" in projection
+    want_pr_summaries = "pr_summaries" in projection
+    completion_fields = projection.get("completions")
+    chat_fields = projection.get("chats")
+    pr_fields = projection.get("pr_summaries")
+    tenant_columns = (tenant or Tenant()).model_dump()
 
-    for daily_stat in daily_stats:
+    for daily_stat in select_days(daily_stats, filters, index):
         date = daily_stat.date
 
         # Process IDE code completions
-        for editor in daily_stat.copilot_ide_code_completions.editors:
+        for editor in (
+            daily_stat.copilot_ide_code_completions.editors if want_completions else []
+        ):
+            if not filters.includes_editor(editor.name):
+                continue
             for model in editor.models:
+                if not filters.includes_model(model.name):
+                    continue
                 for language in model.languages:
+                    if not filters.includes_language(language.name):
+                        continue
                     completion_record = {
                         "date": date,
+                        **tenant_columns,
                         "editor": editor.name,
                         "model": model.name,
                         "is_custom_model": model.is_custom_model,
@@ -38,13 +147,18 @@ def flatten_copilot_data(
                             language.total_code_lines_suggested
                         ),
                     }
-                    completions.append(completion_record)
+                    completions.append(_project(completion_record, completion_fields))
 
         # Process IDE chats
-        for editor in daily_stat.copilot_ide_chat.editors:
+        for editor in daily_stat.copilot_ide_chat.editors if want_chats else []:
+            if not filters.includes_editor(editor.name):
+                continue
             for model in editor.models:
+                if not filters.includes_model(model.name):
+                    continue
                 chat_record = {
                     "date": date,
+                    **tenant_columns,
                     "chat_type": "ide",
                     "editor": editor.name,
                     "model": model.name,
@@ -55,12 +169,15 @@ def flatten_copilot_data(
                     "total_chat_insertion_events": model.total_chat_insertion_events
                     or 0,
                 }
-                chats.append(chat_record)
+                chats.append(_project(chat_record, chat_fields))
 
         # Process dotcom chats
-        for model in daily_stat.copilot_dotcom_chat.models:
+        for model in daily_stat.copilot_dotcom_chat.models if want_chats else []:
+            if not filters.includes_model(model.name):
+                continue
             chat_record = {
                 "date": date,
+                **tenant_columns,
                 "chat_type": "dotcom",
                 "editor": None,
                 "model": model.name,
@@ -70,19 +187,242 @@ def flatten_copilot_data(
                 "total_chat_copy_events": model.total_chat_copy_events or 0,
                 "total_chat_insertion_events": model.total_chat_insertion_events or 0,
             }
-            chats.append(chat_record)
+            chats.append(_project(chat_record, chat_fields))
 
         # Process PR summaries
-        for repo in daily_stat.copilot_dotcom_pull_requests.repositories:
+        for repo in (
+            daily_stat.copilot_dotcom_pull_requests.repositories
+            if want_pr_summaries
+            else []
+        ):
             for model in repo.models:
+                if not filters.includes_model(model.name):
+                    continue
                 pr_record = {
                     "date": date,
+                    **tenant_columns,
                     "repository": repo.name,
                     "model": model.name,
                     "is_custom_model": model.is_custom_model,
                     "total_engaged_users": model.total_engaged_users,
                     "total_pr_summaries_created": model.total_pr_summaries_created,
                 }
-                pr_summaries.append(pr_record)
+                pr_summaries.append(_project(pr_record, pr_fields))
 
     return completions, chats, pr_summaries
+
+
+class TenantBatch(NamedTuple):
+    """
+    A tenant's loaded daily records with their DateIndex, built once when
+    they are loaded and shared by every table flattened from them.
+    """
+
+    tenant: Tenant
+    daily_stats: list[DailyCopilotStats]
+    index: DateIndex | None = None
+
+    @classmethod
+    def indexed(cls, tenant: Tenant, daily_stats: list[DailyCopilotStats]) -> Self:
+        return cls(tenant, daily_stats, DateIndex.from_daily_stats(daily_stats))
+
+
+def flatten_tenants(
+    batches: Iterable[TenantBatch],
+    filters: MetricsFilter | None = None,
+    projection: Projection | None = None,
+) -> tuple[list[dict[str, Any]], list[dict[str, Any]], list[dict[str, Any]]]:
+    """
+    Flattens the daily records of many tenants into one set of tables, each
+    record tagged with its tenant, so they can be aggregated and uploaded in
+    a single pass.
+    """
+    completions = []
+    chats = []
+    pr_summaries = []
+
+    for tenant, daily_stats, index in batches:
+        tenant_completions, tenant_chats, tenant_pr_summaries = flatten_copilot_data(
+            daily_stats, filters, projection, tenant, index
+        )
+        completions.extend(tenant_completions)
+        chats.extend(tenant_chats)
+        pr_summaries.extend(tenant_pr_summaries)
+
+    return completions, chats, pr_summaries
+
+
+COMPLETION_COUNTERS = (
+    "total_code_acceptances",
+    "total_code_suggestions",
+    "total_code_lines_accepted",
+    "total_code_lines_suggested",
+)
+CHAT_COUNTERS = ("total_chats", "total_chat_copy_events", "total_chat_insertion_events")
+
+
+class SummaryTables(NamedTuple):
+    """
+    Compact per-day tables built from the API's pre-aggregated levels.
+
+    Engaged-user counts come straight from the API and are not additive:
+    a user active in two editors is counted once in the daily total. The
+    code and chat counters are summed from the leaves in the same pass.
+    """
+
+    daily: list[dict[str, Any]]
+    languages: list[dict[str, Any]]
+    editors: list[dict[str, Any]]
+    models: list[dict[str, Any]]
+
+
+def flatten_summaries(
+    daily_stats: list[DailyCopilotStats],
+    filters: MetricsFilter | None = None,
+    tenant: Tenant | None = None,
+    index: DateIndex | None = None,
+) -> SummaryTables:
+    """
+    Flattens the day, language, editor and model summary levels into their
+    own tables, one row per day and summary key.
+
+    Only the filter's date range applies, looked up in index as in
+    flatten_copilot_data: the API's engaged-user counts cannot be
+    re-derived for a subset of editors, models or languages.
+    """
+    filters = filters or MetricsFilter()
+    tenant_columns = (tenant or Tenant()).model_dump()
+    tables = SummaryTables([], [], [], [])
+
+    for daily_stat in select_days(daily_stats, filters, index):
+        date = daily_stat.date
+        completions = daily_stat.copilot_ide_code_completions
+        ide_chat = daily_stat.copilot_ide_chat
+        dotcom_chat = daily_stat.copilot_dotcom_chat
+
+        day_counters = dict.fromkeys(COMPLETION_COUNTERS, 0)
+        language_counters: dict[str, dict[str, int]] = {}
+
+        for editor in completions.editors:
+            editor_counters = dict.fromkeys(COMPLETION_COUNTERS + CHAT_COUNTERS, 0)
+            for model in editor.models:
+                tables.models.append(
+                    {
+                        "date": date,
+                        **tenant_columns,
+                        "feature": "code_completions",
+                        "editor": editor.name,
+                        "model": model.name,
+                        "is_custom_model": model.is_custom_model,
+                        "total_engaged_users": model.total_engaged_users,
+                    }
+                )
+                for language in model.languages:
+                    counters = language_counters.setdefault(
+                        language.name, dict.fromkeys(COMPLETION_COUNTERS, 0)
+                    )
+                    for counter in COMPLETION_COUNTERS:
+                        value = getattr(language, counter)
+                        counters[counter] += value
+                        editor_counters[counter] += value
+                        day_counters[counter] += value
+            tables.editors.append(
+                {
+                    "date": date,
+                    **tenant_columns,
+                    "feature": "code_completions",
+                    "editor": editor.name,
+                    "total_engaged_users": editor.total_engaged_users,
+                    **editor_counters,
+                }
+            )
+
+        language_users = {
+            language.name: language.total_engaged_users
+            for language in completions.languages
+        }
+        for name in sorted(language_counters.keys() | language_users.keys()):
+            tables.languages.append(
+                {
+                    "date": date,
+                    **tenant_columns,
+                    "language": name,
+                    # None when the API did not report this language's users
+                    "total_engaged_users": language_users.get(name),
+                    **language_counters.get(
+                        name, dict.fromkeys(COMPLETION_COUNTERS, 0)
+                    ),
+                }
+            )
+
+        for editor in ide_chat.editors:
+            editor_counters = dict.fromkeys(COMPLETION_COUNTERS + CHAT_COUNTERS, 0)
+            for model in editor.models:
+                tables.models.append(
+                    {
+                        "date": date,
+                        **tenant_columns,
+                        "feature": "ide_chat",
+                        "editor": editor.name,
+                        "model": model.name,
+                        "is_custom_model": model.is_custom_model,
+                        "total_engaged_users": model.total_engaged_users,
+                    }
+                )
+                for counter in CHAT_COUNTERS:
+                    editor_counters[counter] += getattr(model, counter) or 0
+            tables.editors.append(
+                {
+                    "date": date,
+                    **tenant_columns,
+                    "feature": "ide_chat",
+                    "editor": editor.name,
+                    "total_engaged_users": editor.total_engaged_users,
+                    **editor_counters,
+                }
+            )
+
+        for model in dotcom_chat.models:
+            tables.models.append(
+                {
+                    "date": date,
+                    **tenant_columns,
+                    "feature": "dotcom_chat",
+                    "editor": None,
+                    "model": model.name,
+                    "is_custom_model": model.is_custom_model,
+                    "total_engaged_users": model.total_engaged_users,
+                }
+            )
+
+        tables.daily.append(
+            {
+                "date": date,
+                **tenant_columns,
+                "total_active_users": daily_stat.total_active_users,
+                "total_engaged_users": daily_stat.total_engaged_users,
+                "code_completions_engaged_users": completions.total_engaged_users,
+                "ide_chat_engaged_users": ide_chat.total_engaged_users,
+                "dotcom_chat_engaged_users": dotcom_chat.total_engaged_users,
+                "dotcom_pull_requests_engaged_users": (
+                    daily_stat.copilot_dotcom_pull_requests.total_engaged_users
+                ),
+                **day_counters,
+            }
+        )
+
+    return tables
+
+
+def flatten_tenant_summaries(
+    batches: Iterable[TenantBatch],
+    filters: MetricsFilter | None = None,
+) -> SummaryTables:
+    """Flattens the summary levels of many tenants into one set of tables."""
+    tables = SummaryTables([], [], [], [])
+    for tenant, daily_stats, index in batches:
+        for rows, tenant_rows in zip(
+            tables, flatten_summaries(daily_stats, filters, tenant, index), strict=True
+        ):
+            rows.extend(tenant_rows)
+    return tables
@@ -0,0 +1,321 @@
+from collections.abc import Callable
+from enum import StrEnum
+from itertools import chain, repeat
+from operator import itemgetter
+from typing import Any, NamedTuple
+
+import numpy as np
+import numpy.typing as npt
+from pydantic import BaseModel, Field
+from rich.table import Table
+
+from .processing import CHAT_COUNTERS, COMPLETION_COUNTERS, TENANT_FIELDS
+
+DEFAULT_SAMPLE_SIZE = 5
+
+# Counters the API reports per leaf and summary level
+COUNTERS = (*COMPLETION_COUNTERS, *CHAT_COUNTERS, "total_pr_summaries_created")
+# User counts, which may be missing but never negative
+USER_COUNTS = (
+    "total_active_users",
+    "total_engaged_users",
+    "code_completions_engaged_users",
+    "ide_chat_engaged_users",
+    "dotcom_chat_engaged_users",
+    "dotcom_pull_requests_engaged_users",
+)
+_EDITOR_KEY = ("date", *TENANT_FIELDS, "editor")
+
+# One flag per row of a table
+Mask = npt.NDArray[np.bool_]
+
+
+class QualityPolicy(StrEnum):
+    """
+    What to do with rows that break a data-quality rule.
+
+    WARN reports them and keeps them. FAIL raises QualityError. QUARANTINE
+    reports them and removes them from the tables. OFF skips the checks.
+    """
+
+    WARN = "warn"
+    FAIL = "fail"
+    QUARANTINE = "quarantine"
+    OFF = "off"
+
+
+class QualityError(Exception):
+    """Raised when rows break a rule under QualityPolicy.FAIL."""
+
+    def __init__(self, report: "QualityReport"):
+        super().__init__(f"Data quality checks failed: {report.summary()}")
+        self.report = report
+
+    def __reduce__(self):
+        # Keeps the report when raised in a worker process
+        return type(self), (self.report,)
+
+
+class Columns:
+    """
+    The counter and user-count columns of one flattened table, extracted
+    into a float matrix in a single pass, with NaN for missing values.
+    """
+
+    def __init__(self, rows: list[dict[str, Any]]):
+        self.rows = rows
+        self.names = frozenset(rows[0]) if rows else frozenset()
+        numeric = [name for name in COUNTERS + USER_COUNTS if name in self.names]
+        self._index = {name: i for i, name in enumerate(numeric)}
+        values = map(itemgetter(numeric[0], *numeric[1:]), rows) if numeric else ()
+        if len(numeric) > 1:
+            values = chain.from_iterable(values)
+        # A flat list converts far faster than a list of row tuples
+        self._matrix = np.array(list(values), dtype=float).reshape(
+            len(rows), len(numeric)
+        )
+
+    def matrix(self, *names: str) -> npt.NDArray[np.float64] | None:
+        """
+        Returns the named columns, one per matrix column, or None when the
+        table lacks one of them.
+        """
+        if not names or not self._index.keys() >= set(names):
+            return None
+        return self._matrix[:, [self._index[name] for name in names]]
+
+    def present(self, names: tuple[str, ...]) -> tuple[str, ...]:
+        return tuple(name for name in names if name in self._index)
+
+
+class Rule(NamedTuple):
+    name: str
+    description: str
+    tables: tuple[str, ...]
+    # Returns a mask of the rows breaking the rule, or None when the table
+    # lacks the columns it needs
+    check: Callable[[Columns, dict[str, Columns]], Mask | None]
+
+
+def _exceeds(larger: str, smaller: str):
+    def check(columns: Columns, tables: dict[str, Columns]) -> Mask | None:
+        matrix = columns.matrix(larger, smaller)
+        return None if matrix is None else matrix[:, 0] > matrix[:, 1]
+
+    return check
+
+
+def _negative(columns: Columns, tables: dict[str, Columns]) -> Mask | None:
+    matrix = columns.matrix(*columns.present(COUNTERS + USER_COUNTS))
+    return None if matrix is None else (matrix < 0).any(axis=1)
+
+
+def _missing(columns: Columns, tables: dict[str, Columns]) -> Mask | None:
+    matrix = columns.matrix(*columns.present(COUNTERS))
+    return None if matrix is None else np.isnan(matrix).any(axis=1)
+
+
+def _exceeds_editor_users(columns: Columns, tables: dict[str, Columns]) -> Mask | None:
+    editors = tables.get("editor_totals")
+    users = columns.matrix("total_engaged_users")
+    if editors is None or users is None or not columns.names.issuperset(_EDITOR_KEY):
+        return None
+    # Leaves are code completions; model rows name their feature
+    fields = (*_EDITOR_KEY, "feature") if "feature" in columns.names else _EDITOR_KEY
+    key = itemgetter(fields[0], *fields[1:])
+    editor_users = {
+        key(row): row["total_engaged_users"]
+        for row in editors.rows
+        if "feature" in fields or row["feature"] == "code_completions"
+    }
+    limits = np.fromiter(
+        map(editor_users.get, map(key, columns.rows), repeat(np.inf)),
+        dtype=float,
+        count=len(columns.rows),
+    )
+    return users[:, 0] > limits
+
+
+def _exceeds_day_users(columns: Columns, tables: dict[str, Columns]) -> Mask | None:
+    features = columns.present(USER_COUNTS[2:])
+    matrix = columns.matrix("total_engaged_users", *features)
+    if matrix is None or not features:
+        return None
+    return (matrix[:, 1:] > matrix[:, :1]).any(axis=1)
+
+
+RULES = (
+    Rule(
+        "acceptances_exceed_suggestions",
+        "more code acceptances than suggestions",
+        ("code_completions", "language_totals", "editor_totals", "daily_totals"),
+        _exceeds("total_code_acceptances", "total_code_suggestions"),
+    ),
+    Rule(
+        "lines_accepted_exceed_suggested",
+        "more lines accepted than suggested",
+        ("code_completions", "language_totals", "editor_totals", "daily_totals"),
+        _exceeds("total_code_lines_accepted", "total_code_lines_suggested"),
+    ),
+    Rule(
+        "engaged_users_exceed_editor",
+        "more engaged users than their editor's total",
+        ("code_completions", "model_totals"),
+        _exceeds_editor_users,
+    ),
+    Rule(
+        "engaged_users_exceed_day",
+        "more engaged users in a feature than on the whole day",
+        ("daily_totals",),
+        _exceeds_day_users,
+    ),
+    Rule(
+        "negative_counts",
+        "a negative counter or user count",
+        (
+            "code_completions",
+            "chats",
+            "pr_summaries",
+            "daily_totals",
+            "language_totals",
+            "editor_totals",
+            "model_totals",
+        ),
+        _negative,
+    ),
+    Rule(
+        "missing_counters",
+        "a missing counter",
+        (
+            "code_completions",
+            "chats",
+            "pr_summaries",
+            "daily_totals",
+            "language_totals",
+            "editor_totals",
+        ),
+        _missing,
+    ),
+)
+
+
+class RuleViolations(BaseModel):
+    rule: str
+    table: str
+    description: str
+    count: int
+    samples: list[dict[str, Any]] = Field(default_factory=list)
+    # Positions of the offending rows in the checked table
+    positions: list[int] = Field(default_factory=list, exclude=True, repr=False)
+
+
+class QualityReport(BaseModel):
+    rows_checked: dict[str, int] = Field(default_factory=dict)
+    violations: list[RuleViolations] = Field(default_factory=list)
+    # Rows removed under QualityPolicy.QUARANTINE, by table
+    quarantined: dict[str, list[dict[str, Any]]] = Field(default_factory=dict)
+
+    @property
+    def ok(self) -> bool:
+        return not self.violations
+
+    def extend(self, other: "QualityReport") -> None:
+        """Adds the rows checked and found by another report, such as a chunk's."""
+        for name, count in other.rows_checked.items():
+            self.rows_checked[name] = self.rows_checked.get(name, 0) + count
+        self.violations.extend(other.violations)
+        for name, rows in other.quarantined.items():
+            self.quarantined.setdefault(name, []).extend(rows)
+
+    def summary(self) -> str:
+        return "; ".join(
+            f"{violation.count} {violation.table} rows with {violation.description}"
+            for violation in self.violations
+        )
+
+    def table(self) -> Table:
+        table = Table(title="Data quality")
+        table.add_column("Rule")
+        table.add_column("Table")
+        table.add_column("Rows", justify="right")
+        table.add_column("First offending row")
+        for violation in self.violations:
+            table.add_row(
+                violation.rule,
+                violation.table,
+                str(violation.count),
+                str(violation.samples[0]) if violation.samples else "",
+            )
+        return table
+
+
+def check_quality(
+    tables: dict[str, list[dict[str, Any]]],
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+) -> QualityReport:
+    """
+    Checks flattened tables, named as in BigQuery, against RULES.
+
+    The numeric columns of each table are extracted in one pass and every
+    rule runs as array operations over them, rather than as a Python loop
+    per row and rule. Rules whose columns a table was not flattened with
+    are skipped.
+    """
+    columns = {name: Columns(rows) for name, rows in tables.items() if rows}
+    report = QualityReport(
+        rows_checked={name: len(rows) for name, rows in tables.items()}
+    )
+    for rule in RULES:
+        for name in rule.tables:
+            if name not in columns:
+                continue
+            mask = rule.check(columns[name], columns)
+            if mask is None or not mask.any():
+                continue
+            positions = np.flatnonzero(mask)
+            report.violations.append(
+                RuleViolations(
+                    rule=rule.name,
+                    table=name,
+                    description=rule.description,
+                    count=len(positions),
+                    samples=[tables[name][i] for i in positions[:sample_size]],
+                    positions=positions.tolist(),
+                )
+            )
+    return report
+
+
+def enforce_quality(
+    tables: dict[str, list[dict[str, Any]]],
+    policy: QualityPolicy = QualityPolicy.WARN,
+    sample_size: int = DEFAULT_SAMPLE_SIZE,
+) -> tuple[dict[str, list[dict[str, Any]]], QualityReport]:
+    """
+    Checks tables and applies policy to the rows that break a rule.
+
+    Returns:
+        Tuple of (tables, report), where tables has offending rows removed
+        under QualityPolicy.QUARANTINE and is otherwise unchanged
+
+    Raises:
+        QualityError: When rows break a rule under QualityPolicy.FAIL
+    """
+    if policy == QualityPolicy.OFF:
+        return tables, QualityReport()
+    report = check_quality(tables, sample_size)
+    if report.ok:
+        return tables, report
+    if policy == QualityPolicy.FAIL:
+        raise QualityError(report)
+    if policy == QualityPolicy.QUARANTINE:
+        tables = dict(tables)
+        for name in {violation.table for violation in report.violations}:
+            mask = np.zeros(len(tables[name]), dtype=bool)
+            for violation in report.violations:
+                if violation.table == name:
+                    mask[violation.positions] = True
+            rows = tables[name]
+            tables[name] = [row for row, bad in zip(rows, mask, strict=True) if not bad]
+            report.quarantined[name] = [rows[i] for i in np.flatnonzero(mask)]
+    return tables, report
@@ -0,0 +1,104 @@
+import hashlib
+import json
+import os
+from typing import Any
+
+import pandas as pd
+from pydantic import BaseModel, Field
+
+# Bump when panels are drawn differently from the same inputs
+RENDER_CACHE_VERSION = 2
+MANIFEST = "manifest.json"
+
+
+def fingerprint(*values: Any) -> str:
+    """
+    Returns a digest of chart inputs: DataFrames, including their index,
+    column names and dtypes, or JSON-serializable values.
+    """
+    digest = hashlib.sha1()
+    for value in values:
+        if isinstance(value, pd.DataFrame):
+            digest.update(repr((list(value.columns), list(value.dtypes))).encode())
+            digest.update(pd.util.hash_pandas_object(value, index=True).to_numpy())
+        else:
+            digest.update(json.dumps(value, sort_keys=True, default=str).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def file_digest(path: str) -> str | None:
+    if not os.path.exists(path):
+        return None
+    with open(path, "rb") as f:
+        return hashlib.file_digest(f, "sha1").hexdigest()
+
+
+class RenderManifest(BaseModel):
+    options: str = ""
+    # Fingerprint of the inputs of each cached entry
+    entries: dict[str, str] = Field(default_factory=dict)
+    # Output file as last written, to tell whether it can be left alone
+    outputs: dict[str, str] = Field(default_factory=dict)
+
+
+class RenderCache:
+    """
+    Rendered dashboard pieces from earlier runs, keyed by fingerprints of the
+    inputs they were drawn from.
+
+    Entries are JSON files in cache_dir. Every entry is dropped when the
+    rendering options change, since they apply to all of them.
+    """
+
+    def __init__(self, cache_dir: str, options: str):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+        manifest_path = os.path.join(cache_dir, MANIFEST)
+        manifest = RenderManifest()
+        if os.path.exists(manifest_path):
+            with open(manifest_path, encoding="utf-8") as f:
+                manifest = RenderManifest.model_validate_json(f.read())
+        if manifest.options != options:
+            manifest = RenderManifest(options=options)
+        self.manifest = manifest
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.json")
+
+    def fresh(self, key: str, inputs: str) -> bool:
+        """Returns whether key was last rendered from the same inputs."""
+        return self.manifest.entries.get(key) == inputs
+
+    def get(self, key: str, inputs: str) -> Any | None:
+        """Returns the entry rendered from these inputs, if there is one."""
+        if not self.fresh(key, inputs) or not os.path.exists(self._path(key)):
+            return None
+        with open(self._path(key), encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, key: str, inputs: str, content: str | None = None) -> None:
+        """
+        Records key as rendered from inputs, with its JSON content unless
+        the rendered output itself is what is reused.
+        """
+        if content is not None:
+            with open(self._path(key), "w", encoding="utf-8") as f:
+                f.write(content)
+        self.manifest.entries[key] = inputs
+
+    def output_unchanged(self, path: str) -> bool:
+        """Returns whether path still holds what record_output last saw."""
+        recorded = self.manifest.outputs.get(os.path.abspath(path))
+        return recorded is not None and recorded == file_digest(path)
+
+    def record_output(self, path: str) -> None:
+        digest = file_digest(path)
+        if digest is not None:
+            self.manifest.outputs[os.path.abspath(path)] = digest
+
+    def save(self) -> None:
+        path = os.path.join(self.cache_dir, MANIFEST)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            f.write(self.manifest.model_dump_json(indent=2))
+        os.replace(f"{path}.tmp", path)
@@ -0,0 +1,295 @@
+import math
+import os
+import urllib.request
+from collections.abc import Callable, Iterable
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from typing import Any, Self
+from urllib.parse import quote
+
+import numpy as np
+import pandas as pd
+
+from .models import CopilotSeat, CopilotSeatsPage, Tenant
+
+GITHUB_API = "https://api.github.com"
+SEATS_PER_PAGE = 100
+DEFAULT_FETCH_CONCURRENCY = 8
+# Last-activity day of seats that were never used, before every real day
+NEVER = -1
+
+# Returns the raw JSON of one 1-based page of the seats endpoint
+PageFetcher = Callable[[int], bytes]
+
+
+def seats_url(org: str | None = None, enterprise: str | None = None) -> str:
+    """Returns the billing seats endpoint of an org, or else an enterprise."""
+    if org:
+        return f"{GITHUB_API}/orgs/{quote(org, safe='')}/copilot/billing/seats"
+    if enterprise:
+        return (
+            f"{GITHUB_API}/enterprises/{quote(enterprise, safe='')}"
+            "/copilot/billing/seats"
+        )
+    raise ValueError("An org or enterprise is required to fetch seats")
+
+
+def github_page_fetcher(url: str, token: str) -> PageFetcher:
+    """Returns a PageFetcher for a seats endpoint of the GitHub REST API."""
+    headers = {
+        "Accept": "application/vnd.github+json",
+        "Authorization": f"Bearer {token}",
+        "X-GitHub-Api-Version": "2022-11-28",
+    }
+
+    def fetch(page: int) -> bytes:
+        request = urllib.request.Request(
+            f"{url}?per_page={SEATS_PER_PAGE}&page={page}", headers=headers
+        )
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.read()
+
+    return fetch
+
+
+def fetch_seats(
+    fetch_page: PageFetcher, concurrency: int = DEFAULT_FETCH_CONCURRENCY
+) -> list[CopilotSeat]:
+    """
+    Fetches every page of seats.
+
+    The first page reports total_seats, so the remaining pages are known up
+    front and fetched concurrently instead of by following Link headers one
+    at a time. Seats are returned in page order.
+    """
+    first = CopilotSeatsPage.model_validate_json(fetch_page(1))
+    pages = math.ceil(first.total_seats / SEATS_PER_PAGE)
+
+    def fetch(page: int) -> list[CopilotSeat]:
+        return CopilotSeatsPage.model_validate_json(fetch_page(page)).seats
+
+    seats = list(first.seats)
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for page_seats in pool.map(fetch, range(2, pages + 1)):
+            seats.extend(page_seats)
+    return seats
+
+
+def parse_seats(raw_data: Any) -> list[CopilotSeat]:
+    """
+    Validates seats saved from the API: one page, a list of pages as written
+    by `gh api --paginate --slurp`, or a plain list of seats.
+    """
+    items = raw_data if isinstance(raw_data, list) else [raw_data]
+    seats = []
+    for item in items:
+        if isinstance(item, dict) and "seats" in item:
+            seats.extend(CopilotSeatsPage.model_validate(item).seats)
+        else:
+            seats.append(CopilotSeat.model_validate(item))
+    return seats
+
+
+def editor_name(last_activity_editor: str | None) -> str | None:
+    """Returns the editor part of a last_activity_editor like vscode/1.90.0/..."""
+    if not last_activity_editor:
+        return None
+    return last_activity_editor.split("/", 1)[0]
+
+
+def flatten_seats(
+    seats: Iterable[CopilotSeat], tenant: Tenant | None = None
+) -> list[dict[str, Any]]:
+    """Flattens seats into one row per seat, with the tenant's columns."""
+    tenant_columns = (tenant or Tenant()).model_dump()
+    return [
+        {
+            **tenant_columns,
+            "login": seat.assignee.login,
+            "assignee_type": seat.assignee.type,
+            "assigning_team": seat.assigning_team.slug if seat.assigning_team else None,
+            "plan_type": seat.plan_type,
+            "created_date": seat.created_at.date().isoformat(),
+            "pending_cancellation_date": seat.pending_cancellation_date,
+            "last_activity_at": (
+                seat.last_activity_at.isoformat() if seat.last_activity_at else None
+            ),
+            "last_activity_date": (
+                seat.last_activity_at.date().isoformat()
+                if seat.last_activity_at
+                else None
+            ),
+            "last_activity_editor": seat.last_activity_editor,
+            "editor": editor_name(seat.last_activity_editor),
+        }
+        for seat in seats
+    ]
+
+
+def _encode(values: list[str | None]) -> tuple[np.ndarray, np.ndarray]:
+    """Dictionary-encodes strings into int32 codes, -1 for None."""
+    categories = sorted({value for value in values if value is not None})
+    lookup = {value: code for code, value in enumerate(categories)}
+    codes = np.fromiter(
+        (lookup[value] if value is not None else -1 for value in values),
+        dtype=np.int32,
+        count=len(values),
+    )
+    return codes, np.array(categories, dtype=np.str_)
+
+
+def _decode(codes: np.ndarray, categories: np.ndarray) -> list[str | None]:
+    return [str(categories[code]) if code >= 0 else None for code in codes]
+
+
+class SeatTable:
+    """
+    Seats stored column-wise, indexed by login and by last-activity day.
+
+    Days are date ordinals in int32 columns and editors, teams and plans are
+    dictionary-encoded, so 50k seats take a few hundred kilobytes besides
+    their logins. Seats sorted by last activity make "idle for N days" a
+    binary search, and seats sorted by creation day give the number of
+    assigned seats on any day the same way.
+    """
+
+    def __init__(
+        self,
+        login: np.ndarray,
+        created_day: np.ndarray,
+        last_activity_day: np.ndarray,
+        editor: tuple[np.ndarray, np.ndarray],
+        team: tuple[np.ndarray, np.ndarray],
+        plan: tuple[np.ndarray, np.ndarray],
+    ):
+        self.login = login
+        self.created_day = created_day
+        self.last_activity_day = last_activity_day
+        self.editor, self.editors = editor
+        self.team, self.teams = team
+        self.plan, self.plans = plan
+
+        self._by_login = {str(value): row for row, value in enumerate(login)}
+        self._activity_order = np.argsort(last_activity_day, kind="stable")
+        self._sorted_activity = last_activity_day[self._activity_order]
+        self._sorted_created = np.sort(created_day)
+
+    @classmethod
+    def from_seats(cls, seats: list[CopilotSeat]) -> Self:
+        return cls(
+            login=np.array([seat.assignee.login for seat in seats], dtype=np.str_),
+            created_day=np.fromiter(
+                (seat.created_at.date().toordinal() for seat in seats),
+                dtype=np.int32,
+                count=len(seats),
+            ),
+            last_activity_day=np.fromiter(
+                (
+                    seat.last_activity_at.date().toordinal()
+                    if seat.last_activity_at
+                    else NEVER
+                    for seat in seats
+                ),
+                dtype=np.int32,
+                count=len(seats),
+            ),
+            editor=_encode([editor_name(seat.last_activity_editor) for seat in seats]),
+            team=_encode(
+                [
+                    seat.assigning_team.slug if seat.assigning_team else None
+                    for seat in seats
+                ]
+            ),
+            plan=_encode([seat.plan_type for seat in seats]),
+        )
+
+    def __len__(self) -> int:
+        return len(self.login)
+
+    def save(self, path: str) -> None:
+        """Writes the columns to a compressed .npz file."""
+        temp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            temp_path,
+            login=self.login,
+            created_day=self.created_day,
+            last_activity_day=self.last_activity_day,
+            editor=self.editor,
+            editors=self.editors,
+            team=self.team,
+            teams=self.teams,
+            plan=self.plan,
+            plans=self.plans,
+        )
+        os.replace(temp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Self:
+        with np.load(path) as columns:
+            return cls(
+                login=columns["login"],
+                created_day=columns["created_day"],
+                last_activity_day=columns["last_activity_day"],
+                editor=(columns["editor"], columns["editors"]),
+                team=(columns["team"], columns["teams"]),
+                plan=(columns["plan"], columns["plans"]),
+            )
+
+    def find(self, login: str) -> dict[str, Any] | None:
+        """Returns a seat by its assignee's login."""
+        row = self._by_login.get(login)
+        return None if row is None else self.frame(np.array([row])).iloc[0].to_dict()
+
+    def idle(self, days: int, as_of: date | None = None) -> np.ndarray:
+        """
+        Returns the rows of seats with no activity in the days before as_of,
+        including those never used, least recently active first.
+        """
+        cutoff = (as_of or date.today()).toordinal() - days
+        count = np.searchsorted(self._sorted_activity, cutoff, side="right")
+        return self._activity_order[:count]
+
+    def frame(self, rows: np.ndarray | None = None) -> pd.DataFrame:
+        """Decodes the given rows, or every seat, into a DataFrame."""
+        rows = np.arange(len(self)) if rows is None else rows
+
+        def to_dates(days: np.ndarray) -> list[str | None]:
+            return [
+                date.fromordinal(int(day)).isoformat() if day != NEVER else None
+                for day in days
+            ]
+
+        return pd.DataFrame(
+            {
+                "login": self.login[rows],
+                "created_date": to_dates(self.created_day[rows]),
+                "last_activity_date": to_dates(self.last_activity_day[rows]),
+                "editor": _decode(self.editor[rows], self.editors),
+                "assigning_team": _decode(self.team[rows], self.teams),
+                "plan_type": _decode(self.plan[rows], self.plans),
+            }
+        )
+
+    def join_daily(self, daily: pd.DataFrame) -> pd.DataFrame:
+        """
+        Adds seat counts to daily metrics rows, such as flatten_summaries'
+        daily table.
+
+        assigned_seats counts seats created on or before each day,
+        seats_active_since those whose last activity is on or after it, and
+        utilization is total_active_users over assigned_seats.
+        """
+        days = np.array(
+            [date.fromisoformat(day).toordinal() for day in daily["date"]],
+            dtype=np.int32,
+        )
+        assigned = np.searchsorted(self._sorted_created, days, side="right")
+        active_since = len(self) - np.searchsorted(
+            self._sorted_activity, days, side="left"
+        )
+        joined = daily.assign(assigned_seats=assigned, seats_active_since=active_since)
+        if "total_active_users" in joined:
+            joined["utilization"] = joined["total_active_users"] / joined[
+                "assigned_seats"
+            ].replace(0, np.nan)
+        return joined
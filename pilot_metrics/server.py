@@ -0,0 +1,520 @@
+import hashlib
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right, insort
+from collections import OrderedDict
+from collections.abc import Callable
+from functools import cache
+from http import HTTPStatus
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any
+from urllib.parse import parse_qs, urlparse
+
+from .jsonio import loads, read_input
+from .models import DailyCopilotStats, Tenant
+from .processing import Projection, flatten_copilot_data
+
+COMPLETION_METRICS = (
+    "total_code_acceptances",
+    "total_code_suggestions",
+    "total_code_lines_accepted",
+    "total_code_lines_suggested",
+)
+CHAT_METRICS = ("total_chats", "total_chat_copy_events", "total_chat_insertion_events")
+DERIVED_METRICS = ("acceptance_rate",)
+DIMENSIONS = ("tenant", "editor", "model", "language")
+# Query results kept until the data changes, least recently used first out
+DEFAULT_CACHE_SIZE = 256
+
+SERVE_PROJECTION: Projection = {
+    "completions": frozenset({"editor", "model", "language", *COMPLETION_METRICS}),
+    "chats": frozenset({"editor", "model", *CHAT_METRICS}),
+}
+
+_ACCEPTANCES = COMPLETION_METRICS.index("total_code_acceptances")
+_SUGGESTIONS = COMPLETION_METRICS.index("total_code_suggestions")
+
+
+def _add(target: list[int], values: tuple[int, ...] | list[int]) -> None:
+    for index, value in enumerate(values):
+        target[index] += value
+
+
+def _matches(keys: tuple, conditions: list[tuple[int, str]]) -> bool:
+    # Rows without a dimension, such as chats without a language, are not
+    # filtered by it
+    return all(keys[index] in (None, value) for index, value in conditions)
+
+
+def _metric_value(metric: str, sums: list[int]) -> float:
+    if metric == "acceptance_rate":
+        suggestions = sums[_SUGGESTIONS]
+        return sums[_ACCEPTANCES] / suggestions * 100 if suggestions else 0.0
+    return sums[COMPLETION_METRICS.index(metric)]
+
+
+def _conditions(where: dict[str, str] | None) -> list[tuple[int, str]]:
+    conditions = []
+    for dimension, value in (where or {}).items():
+        if dimension not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension '{dimension}'")
+        conditions.append((DIMENSIONS.index(dimension), value))
+    return conditions
+
+
+class _Day:
+    """Pre-aggregated metrics of one tenant on one date."""
+
+    __slots__ = (
+        "fingerprint",
+        "leaves",
+        "totals",
+        "dimension_totals",
+        "chat_leaves",
+        "chats",
+    )
+
+    def __init__(
+        self,
+        fingerprint: str,
+        tenant: str,
+        completions: list[dict[str, Any]],
+        chats: list[dict[str, Any]],
+    ):
+        self.fingerprint = fingerprint
+        self.leaves = [
+            (
+                (tenant, row["editor"], row["model"], row["language"]),
+                tuple(row[metric] for metric in COMPLETION_METRICS),
+            )
+            for row in completions
+        ]
+        self.totals = [0] * len(COMPLETION_METRICS)
+        self.dimension_totals: dict[str, dict[str, list[int]]] = {
+            dimension: {} for dimension in DIMENSIONS
+        }
+        for keys, values in self.leaves:
+            _add(self.totals, values)
+            for dimension, key in zip(DIMENSIONS, keys, strict=True):
+                sums = self.dimension_totals[dimension].setdefault(
+                    key, [0] * len(COMPLETION_METRICS)
+                )
+                _add(sums, values)
+        self.chat_leaves = [
+            (
+                (tenant, row["editor"], row["model"], None),
+                tuple(row[metric] for metric in CHAT_METRICS),
+            )
+            for row in chats
+        ]
+        self.chats = [0] * len(CHAT_METRICS)
+        for _, values in self.chat_leaves:
+            _add(self.chats, values)
+
+
+class MetricsStore:
+    """
+    In-memory aggregates of flattened Copilot metrics, indexed by date and
+    dimension, that refresh incrementally from their source files.
+
+    Only days whose raw record changed since the last refresh are validated
+    and flattened again. Up to cache_size query results are cached until
+    the next change.
+    """
+
+    def __init__(
+        self,
+        sources: list[tuple[Tenant, str]],
+        cache_size: int = DEFAULT_CACHE_SIZE,
+    ):
+        self._sources = sources
+        self.cache_size = cache_size
+        self._mtimes: dict[int, int] = {}
+        self._days: dict[tuple[str, str], _Day] = {}
+        self._by_date: dict[str, list[_Day]] = {}
+        self._dates: list[str] = []
+        self._cache: OrderedDict[tuple, dict[str, Any]] = OrderedDict()
+        self._lock = threading.RLock()
+        # Serializes writers; readers only wait for the final swap-in
+        self._write_lock = threading.Lock()
+
+    @property
+    def dates(self) -> list[str]:
+        with self._lock:
+            return list(self._dates)
+
+    def refresh(self) -> int:
+        """
+        Picks up new and revised daily records from changed source files.
+
+        Returns:
+            Number of days added or replaced
+        """
+        changed = 0
+        with self._write_lock:
+            for index, (tenant, path) in enumerate(self._sources):
+                mtime = os.stat(path).st_mtime_ns
+                if self._mtimes.get(index) == mtime:
+                    continue
+                with read_input(path) as content:
+                    raw_records = loads(content)
+                for record in raw_records:
+                    if self._put_record(tenant, record):
+                        changed += 1
+                self._mtimes[index] = mtime
+            if changed:
+                self._clear_cache()
+        return changed
+
+    def add_records(self, tenant: Tenant, raw_records: list[dict[str, Any]]) -> int:
+        """Adds raw daily records, replacing earlier revisions of the same day."""
+        with self._write_lock:
+            changed = sum(self._put_record(tenant, record) for record in raw_records)
+            if changed:
+                self._clear_cache()
+            return changed
+
+    def _clear_cache(self) -> None:
+        # Also drops results cached by queries made while records were put
+        with self._lock:
+            self._cache.clear()
+
+    def _cached(self, key: tuple) -> dict[str, Any] | None:
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+        return result
+
+    def _remember(self, key: tuple, result: dict[str, Any]) -> None:
+        self._cache[key] = result
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _put_record(self, tenant: Tenant, record: dict[str, Any]) -> bool:
+        fingerprint = hashlib.sha1(
+            json.dumps(record, sort_keys=True).encode()
+        ).hexdigest()
+        key = (tenant.label, record.get("date", ""))
+        existing = self._days.get(key)
+        if existing is not None and existing.fingerprint == fingerprint:
+            return False
+
+        daily_stat = DailyCopilotStats.model_validate(record)
+        completions, chats, _ = flatten_copilot_data(
+            [daily_stat], projection=SERVE_PROJECTION, tenant=tenant
+        )
+        day = _Day(fingerprint, tenant.label, completions, chats)
+
+        with self._lock:
+            if existing is not None:
+                self._by_date[daily_stat.date].remove(existing)
+            elif daily_stat.date not in self._by_date:
+                insort(self._dates, daily_stat.date)
+                self._by_date[daily_stat.date] = []
+            self._by_date[daily_stat.date].append(day)
+            self._days[key] = day
+            self._cache.clear()
+        return True
+
+    def _date_range(self, since: str | None, until: str | None) -> list[str]:
+        start = bisect_left(self._dates, since) if since else 0
+        end = bisect_right(self._dates, until) if until else len(self._dates)
+        return self._dates[start:end]
+
+    def query(
+        self,
+        metric: str = "total_code_acceptances",
+        by: str | None = None,
+        since: str | None = None,
+        until: str | None = None,
+        where: dict[str, str] | None = None,
+    ) -> dict[str, Any]:
+        """
+        Returns a metric per date, optionally split by a dimension and
+        restricted to rows whose dimensions match `where`.
+
+        Returns:
+            Dict with "dates", "series" (label -> value per date) and
+            "totals" (label -> value over the whole range)
+        """
+        if metric not in COMPLETION_METRICS + DERIVED_METRICS:
+            raise ValueError(f"Unknown metric '{metric}'")
+        if by and by not in DIMENSIONS:
+            raise ValueError(f"Unknown dimension '{by}'")
+        conditions = _conditions(where)
+
+        cache_key = (metric, by, since, until, tuple(sorted((where or {}).items())))
+        with self._lock:
+            cached = self._cached(cache_key)
+            if cached is not None:
+                return cached
+
+            dates = self._date_range(since, until)
+            by_index = DIMENSIONS.index(by) if by else None
+            width = len(COMPLETION_METRICS)
+            per_date: dict[str, list[list[int]]] = {}
+
+            for position, date in enumerate(dates):
+                for day in self._by_date[date]:
+                    if conditions:
+                        # Dimension filters need the leaves; days are small
+                        for keys, values in day.leaves:
+                            if _matches(keys, conditions):
+                                label = "total" if by_index is None else keys[by_index]
+                                if label not in per_date:
+                                    per_date[label] = [[0] * width for _ in dates]
+                                _add(per_date[label][position], values)
+                    elif by is None:
+                        if "total" not in per_date:
+                            per_date["total"] = [[0] * width for _ in dates]
+                        _add(per_date["total"][position], day.totals)
+                    else:
+                        for label, sums in day.dimension_totals[by].items():
+                            if label not in per_date:
+                                per_date[label] = [[0] * width for _ in dates]
+                            _add(per_date[label][position], sums)
+
+            series = {}
+            totals = {}
+            for label, rows in sorted(per_date.items()):
+                series[label] = [_metric_value(metric, sums) for sums in rows]
+                overall = [0] * width
+                for sums in rows:
+                    _add(overall, sums)
+                totals[label] = _metric_value(metric, overall)
+
+            result = {"dates": dates, "series": series, "totals": totals}
+            self._remember(cache_key, result)
+            return result
+
+    def chat_totals(
+        self,
+        since: str | None = None,
+        until: str | None = None,
+        where: dict[str, str] | None = None,
+    ) -> dict[str, int]:
+        """
+        Returns chat counters summed over a date range, restricted to rows
+        whose dimensions match `where` as in query. Chats have no language,
+        and dotcom chats no editor, so those filters do not exclude them.
+        """
+        conditions = _conditions(where)
+        cache_key = ("chats", since, until, tuple(sorted((where or {}).items())))
+        with self._lock:
+            cached = self._cached(cache_key)
+            if cached is not None:
+                return cached
+
+            sums = [0] * len(CHAT_METRICS)
+            for date in self._date_range(since, until):
+                for day in self._by_date[date]:
+                    if not conditions:
+                        _add(sums, day.chats)
+                        continue
+                    for keys, values in day.chat_leaves:
+                        if _matches(keys, conditions):
+                            _add(sums, values)
+
+            result = dict(zip(CHAT_METRICS, sums, strict=True))
+            self._remember(cache_key, result)
+            return result
+
+    def dimensions(self) -> dict[str, Any]:
+        """Returns the date range and the distinct values of each dimension."""
+        with self._lock:
+            values: dict[str, set[str]] = {dimension: set() for dimension in DIMENSIONS}
+            for days in self._by_date.values():
+                for day in days:
+                    for dimension in DIMENSIONS:
+                        values[dimension].update(day.dimension_totals[dimension])
+            return {
+                "dates": [self._dates[0], self._dates[-1]] if self._dates else [],
+                "metrics": list(COMPLETION_METRICS + DERIVED_METRICS),
+                **{dimension: sorted(values[dimension]) for dimension in DIMENSIONS},
+            }
+
+
+def start_refresher(store: MetricsStore, interval: float) -> threading.Event:
+    """
+    Refreshes the store in a background thread every `interval` seconds.
+
+    Returns:
+        Event that stops the thread when set
+    """
+    stop = threading.Event()
+
+    def run() -> None:
+        while not stop.wait(interval):
+            try:
+                store.refresh()
+            except Exception as e:
+                print(f"Refresh failed: {e}")
+
+    threading.Thread(target=run, name="pilot-metrics-refresh", daemon=True).start()
+    return stop
+
+
+@cache
+def _plotly_js() -> bytes:
+    # Imported lazily so the server starts without loading plotly
+    from plotly.offline import get_plotlyjs
+
+    return get_plotlyjs().encode()
+
+
+def _single(params: dict[str, list[str]], name: str) -> str | None:
+    values = params.get(name)
+    return values[0] if values and values[0] else None
+
+
+def _where(params: dict[str, list[str]]) -> dict[str, str]:
+    return {
+        dimension: value
+        for dimension in DIMENSIONS
+        if (value := _single(params, dimension))
+    }
+
+
+def _make_handler(store: MetricsStore) -> type[BaseHTTPRequestHandler]:
+    def api_query(params: dict[str, list[str]]) -> dict[str, Any]:
+        return store.query(
+            metric=_single(params, "metric") or "total_code_acceptances",
+            by=_single(params, "by"),
+            since=_single(params, "since"),
+            until=_single(params, "until"),
+            where=_where(params),
+        )
+
+    def api_chats(params: dict[str, list[str]]) -> dict[str, Any]:
+        return store.chat_totals(
+            since=_single(params, "since"),
+            until=_single(params, "until"),
+            where=_where(params),
+        )
+
+    routes: dict[str, Callable[[dict[str, list[str]]], dict[str, Any]]] = {
+        "/api/query": api_query,
+        "/api/chats": api_chats,
+        "/api/dimensions": lambda _: store.dimensions(),
+    }
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self) -> None:
+            url = urlparse(self.path)
+            if url.path == "/":
+                self._send(HTTPStatus.OK, "text/html", DASHBOARD_PAGE.encode())
+            elif url.path == "/plotly.min.js":
+                self._send(HTTPStatus.OK, "application/javascript", _plotly_js())
+            elif url.path in routes:
+                try:
+                    body = routes[url.path](parse_qs(url.query))
+                except ValueError as e:
+                    self._send_json(HTTPStatus.BAD_REQUEST, {"error": str(e)})
+                else:
+                    self._send_json(HTTPStatus.OK, body)
+            else:
+                self._send_json(HTTPStatus.NOT_FOUND, {"error": "Not found"})
+
+        def _send_json(self, status: HTTPStatus, body: dict[str, Any]) -> None:
+            self._send(status, "application/json", json.dumps(body).encode())
+
+        def _send(self, status: HTTPStatus, content_type: str, body: bytes) -> None:
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format: str, *args: Any) -> None:
+            pass
+
+    return Handler
+
+
+def create_server(store: MetricsStore, host: str, port: int) -> ThreadingHTTPServer:
+    """Creates an HTTP server exposing the store's JSON API and dashboard."""
+    return ThreadingHTTPServer((host, port), _make_handler(store))
+
+
+DASHBOARD_PAGE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>GitHub Copilot Usage Dashboard</title>
+<script src="/plotly.min.js"></script>
+<style>
+  body { font-family: sans-serif; margin: 1.5em; }
+  form { display: flex; flex-wrap: wrap; gap: 1em; margin-bottom: 1em; }
+  #chats { display: flex; gap: 2em; font-size: 1.2em; }
+</style>
+</head>
+<body>
+<h1>GitHub Copilot Usage Dashboard</h1>
+<form id="controls">
+  <label>Metric <select name="metric"></select></label>
+  <label>Split by <select name="by">
+    <option value="language">language</option>
+    <option value="editor">editor</option>
+    <option value="model">model</option>
+    <option value="tenant">tenant</option>
+    <option value="">none</option>
+  </select></label>
+  <label>Since <input type="date" name="since"></label>
+  <label>Until <input type="date" name="until"></label>
+  <label>Editor <select name="editor"><option value="">all</option></select></label>
+  <label>Language <select name="language"><option value="">all</option></select></label>
+  <label>Tenant <select name="tenant"><option value="">all</option></select></label>
+</form>
+<div id="timeseries"></div>
+<div id="totals"></div>
+<div id="chats"></div>
+<script>
+const form = document.getElementById("controls");
+
+function addOptions(select, values) {
+  for (const value of values) {
+    select.add(new Option(value, value));
+  }
+}
+
+async function fetchJson(path, params) {
+  const response = await fetch(path + "?" + params.toString());
+  return response.json();
+}
+
+async function update() {
+  const params = new URLSearchParams(new FormData(form));
+  const [query, chats] = await Promise.all([
+    fetchJson("/api/query", params),
+    fetchJson("/api/chats", params),
+  ]);
+  const metric = params.get("metric");
+  const traces = Object.entries(query.series).map(([label, values]) => ({
+    type: "bar", name: label, x: query.dates, y: values,
+  }));
+  Plotly.react("timeseries", traces, {
+    title: metric + " over time", barmode: "stack", height: 500,
+  });
+  Plotly.react("totals", [{
+    type: "bar", x: Object.keys(query.totals), y: Object.values(query.totals),
+  }], {title: metric + " over the selected range", height: 400});
+  document.getElementById("chats").innerHTML = Object.entries(chats)
+    .map(([name, value]) => `<div><b>${name}</b>: ${value}</div>`).join("");
+}
+
+async function init() {
+  const dimensions = await fetchJson("/api/dimensions", new URLSearchParams());
+  addOptions(form.metric, dimensions.metrics);
+  addOptions(form.editor, dimensions.editor);
+  addOptions(form.language, dimensions.language);
+  addOptions(form.tenant, dimensions.tenant.filter((value) => value));
+  form.addEventListener("change", update);
+  await update();
+}
+
+init();
+</script>
+</body>
+</html>
+"""
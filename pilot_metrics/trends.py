@@ -0,0 +1,175 @@
+from collections.abc import Iterable
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from .cardinality import CardinalityLimits
+from .processing import Projection, SummaryTables
+
+TREND_WINDOWS = (7, 28)
+TREND_DIMENSIONS = ("language", "editor")
+# Value of the dimension column for rows that cover every language and editor
+ALL = "all"
+
+_COUNTERS = (
+    "total_code_acceptances",
+    "total_code_suggestions",
+    "total_code_lines_accepted",
+)
+_USERS = "active_users"
+
+# Completion columns trends read when computed from leaf rows
+TREND_PROJECTION: Projection = {
+    "completions": frozenset({"date", *TREND_DIMENSIONS, *_COUNTERS}),
+}
+
+
+def _wide(
+    df: pd.DataFrame, dimension: str | None, users_column: str | None
+) -> pd.DataFrame:
+    """
+    Pivots a long table into one column per (metric, dimension value) on a
+    gap-free daily index, so every window below is a plain row window.
+    """
+    df = df.assign(date=pd.to_datetime(df["date"]))
+    key = dimension or "_all"
+    if dimension is None:
+        df = df.assign(_all=ALL)
+    values = list(_COUNTERS)
+    if users_column is not None:
+        df = df.rename(columns={users_column: _USERS})
+        values.append(_USERS)
+
+    wide = df.pivot_table(
+        index="date", columns=key, values=values, aggfunc="sum", fill_value=0
+    )
+    days = pd.date_range(wide.index.min(), wide.index.max(), freq="D")
+    return wide.reindex(days, fill_value=0).astype(float)
+
+
+def trend_frame(
+    df: pd.DataFrame,
+    dimension: str | None = None,
+    users_column: str | None = None,
+    windows: Iterable[int] = TREND_WINDOWS,
+) -> pd.DataFrame:
+    """
+    Computes rolling trends of a flattened table for every value of a
+    dimension at once.
+
+    Each window is a sliding sum over the date axis of the wide
+    date x (metric, value) frame, so the cost is O(days x columns) whatever
+    the window length. Windows at the start of the data average over the
+    days available. Week-over-week deltas compare the latest 7 days with
+    the 7 days before them.
+
+    Returns:
+        Long frame of date, dimension, value and one column per trend metric
+    """
+    wide = _wide(df, dimension, users_column)
+    has_users = users_column is not None
+    trends: dict[str, pd.DataFrame] = {}
+
+    for window in windows:
+        sums = wide.rolling(window, min_periods=1).sum()
+        days = wide.iloc[:, 0].rolling(window, min_periods=1).count()
+        trends[f"lines_accepted_avg_{window}d"] = sums["total_code_lines_accepted"].div(
+            days, axis=0
+        )
+        trends[f"acceptance_rate_{window}d"] = sums["total_code_acceptances"] / sums[
+            "total_code_suggestions"
+        ].replace(0, np.nan)
+        if has_users:
+            trends[f"active_users_avg_{window}d"] = sums[_USERS].div(days, axis=0)
+
+    week = wide.rolling(7, min_periods=7).sum()
+    previous = week.shift(7)
+    trends["lines_accepted_wow"] = (
+        week["total_code_lines_accepted"]
+        / previous["total_code_lines_accepted"].replace(0, np.nan)
+        - 1
+    )
+    rate = week["total_code_acceptances"] / week["total_code_suggestions"].replace(
+        0, np.nan
+    )
+    previous_rate = previous["total_code_acceptances"] / previous[
+        "total_code_suggestions"
+    ].replace(0, np.nan)
+    # Percentage-point change
+    trends["acceptance_rate_wow"] = rate - previous_rate
+    if has_users:
+        trends["active_users_wow"] = (
+            week[_USERS] / previous[_USERS].replace(0, np.nan) - 1
+        )
+
+    long = pd.concat(
+        {name: frame.stack(future_stack=True) for name, frame in trends.items()},
+        axis=1,
+    )
+    long.index.names = ["date", "value"]
+    long = long.reset_index()
+    long.insert(1, "dimension", dimension or ALL)
+    return long
+
+
+def compute_trends(
+    completions_data: list[dict[str, Any]],
+    summaries: SummaryTables | None = None,
+    windows: Iterable[int] = TREND_WINDOWS,
+    limits: CardinalityLimits | None = None,
+) -> pd.DataFrame:
+    """
+    Computes overall, per-language and per-editor trends.
+
+    With limits, languages and editors beyond them are folded into one
+    "Other" value before their trends are computed. Its user counts are the
+    sum of its values' counts, so they overcount users shared between them.
+
+    Active users are only known from summary tables: overall trends use the
+    day's total_active_users and dimension trends the engaged users the API
+    reports for each language or editor. Leaf rows give code metrics only.
+
+    Returns:
+        Long frame with dimension "all", "language" and "editor" rows
+    """
+    windows = tuple(windows)
+    if summaries is not None:
+        editors = [
+            row for row in summaries.editors if row["feature"] == "code_completions"
+        ]
+        sources = [
+            (pd.DataFrame(summaries.daily), None, "total_active_users"),
+            (pd.DataFrame(summaries.languages), "language", "total_engaged_users"),
+            (pd.DataFrame(editors), "editor", "total_engaged_users"),
+        ]
+    else:
+        completions = pd.DataFrame(completions_data)
+        sources = [
+            (completions, dimension, None) for dimension in (None, *TREND_DIMENSIONS)
+        ]
+
+    frames = []
+    for df, dimension, users in sources:
+        if df.empty:
+            continue
+        if users is None or users not in df:
+            users = None
+        else:
+            # None for languages the API reported no user count for
+            df = df.assign(**{users: pd.to_numeric(df[users]).fillna(0)})
+        if limits is not None and dimension is not None:
+            df = limits.fold(df, dimension)
+        frames.append(trend_frame(df, dimension, users, windows))
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
+
+
+def latest_deltas(trends: pd.DataFrame, dimension: str, metric: str) -> pd.Series:
+    """Returns each value's week-over-week delta on the last day, by value."""
+    rows = trends[trends["dimension"] == dimension]
+    if rows.empty:
+        return pd.Series(dtype=float)
+    latest = rows[rows["date"] == rows["date"].max()]
+    return latest.set_index("value")[metric].dropna().sort_values()
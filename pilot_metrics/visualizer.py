@@ -1,396 +1,1198 @@
+import html
+import json
 import os
 import webbrowser
-from typing import Any
+from collections.abc import Callable, Iterable, Mapping
+from enum import StrEnum
+from functools import cache, partial
+from typing import Any, NamedTuple
 
 import pandas as pd
+import plotly
 import plotly.graph_objects as go
 import plotly.offline as pyo
 from plotly.subplots import make_subplots
+from pydantic import BaseModel, ConfigDict, Field
+
+from .aggregates import AggregateState
+from .cardinality import CardinalityLimits, fold_columns, fold_values, other_last
+from .compression import Codec, codec_for_path, open_output
+from .dates import DateIndex
+from .instrumentation import stage
+from .jsonio import dumps, loads
+from .processing import (
+    CHAT_COUNTERS,
+    TENANT_FIELDS,
+    Projection,
+    SummaryTables,
+    merge_projections,
+)
+from .render_cache import RENDER_CACHE_VERSION, RenderCache, fingerprint
+from .trends import ALL, TREND_WINDOWS, compute_trends, latest_deltas
+
+# Flattened tables and columns each dashboard chart reads
+CHART_FIELDS: dict[str, Projection] = {
+    "accumulated_lines": {
+        "completions": frozenset({"date", "language", "total_code_lines_accepted"}),
+    },
+    "acceptances_by_language": {
+        "completions": frozenset(
+            {"date", "language", "total_code_acceptances", "total_code_lines_accepted"}
+        ),
+    },
+    "lines_by_editor": {
+        "completions": frozenset({"editor", "total_code_lines_accepted"}),
+    },
+    "active_users": {
+        "completions": frozenset({"date", "total_engaged_users", *TENANT_FIELDS}),
+    },
+    "acceptance_rate": {
+        "completions": frozenset(
+            {"language", "total_code_suggestions", "total_code_acceptances"}
+        ),
+    },
+    "pr_summaries": {
+        "pr_summaries": frozenset({"repository", "total_pr_summaries_created"}),
+    },
+    "chat_usage": {
+        "chats": frozenset(
+            {"total_chats", "total_chat_copy_events", "total_chat_insertion_events"}
+        ),
+    },
+}
+
+DASHBOARD_PROJECTION = merge_projections(*CHART_FIELDS.values())
+
+# Without dimension filters the completion charts read the summary tables
+# from processing.flatten_summaries instead of the flattened leaves
+SUMMARY_DASHBOARD_PROJECTION = merge_projections(
+    {"summaries": None}, CHART_FIELDS["pr_summaries"], CHART_FIELDS["chat_usage"]
+)
+
+
+def tenant_labels(df: pd.DataFrame) -> pd.Series:
+    """Returns an "enterprise/org/team" label for each row of a flattened table."""
+    columns = [column for column in TENANT_FIELDS if column in df.columns]
+    if not columns:
+        return pd.Series("", index=df.index)
+    return (
+        df[columns]
+        .fillna("")
+        .astype(str)
+        .agg("/".join, axis=1)
+        .str.replace(r"/{2,}", "/", regex=True)
+        .str.strip("/")
+    )
+
+
+def cumulative_lines_frame(aggregates: AggregateState) -> pd.DataFrame:
+    """Returns the state's cumulative accepted lines as a date x language frame."""
+    frame = pd.DataFrame.from_dict(
+        aggregates.cumulative_language_lines, orient="index"
+    ).fillna(0)
+    frame.index = pd.to_datetime(frame.index)
+    return frame.sort_index()[sorted(frame.columns)]
+
+
+class DashboardData(BaseModel):
+    """The aggregated series every dashboard chart is drawn from."""
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    timeframe: str
+    tenants: list[str]
+    # date x language frames
+    cumulative_lines: pd.DataFrame
+    language_acceptances: pd.DataFrame
+    # date, total_code_lines_accepted
+    daily_lines: pd.DataFrame
+    # editor, total_code_lines_accepted
+    editor_lines: pd.DataFrame
+    # date, tenant, active_users
+    daily_users: pd.DataFrame
+    # language, total_code_suggestions, total_code_acceptances, acceptance_rate
+    language_rates: pd.DataFrame
+    # repository, total_pr_summaries_created
+    repo_summaries: pd.DataFrame | None = None
+    chat_totals: dict[str, int] | None = None
+    # Long trend table from trends.compute_trends
+    trends: pd.DataFrame | None = None
+
+
+class Engine(StrEnum):
+    """
+    Library the dashboard's chart series are aggregated with. POLARS runs
+    them as one optimized, multi-threaded lazy query, see polars_engine.
+    """
+
+    PANDAS = "pandas"
+    POLARS = "polars"
+
+
+def _dated_frame(rows: list[dict[str, Any]]) -> pd.DataFrame:
+    df = pd.DataFrame(rows)
+    # Each distinct date string is parsed once, not once per row
+    df["date"] = DateIndex.from_rows(rows).datetimes().astype("datetime64[ns]")
+    df["tenant"] = tenant_labels(df)
+    return df
+
+
+def language_pivot(df: pd.DataFrame, metric: str) -> pd.DataFrame:
+    """Returns metric summed as a date x language frame, "Other" last."""
+    return other_last(
+        df.pivot_table(
+            index="date", columns="language", values=metric, aggfunc="sum", fill_value=0
+        )
+    )
+
+
+def fold_languages(
+    languages: pd.DataFrame, limits: CardinalityLimits
+) -> tuple[pd.DataFrame, frozenset[str] | None]:
+    """
+    Folds the languages beyond limits into "Other". Returns the folded
+    frame and the languages kept, None when all of them are.
+    """
+    kept = limits.kept(languages, "language")
+    if kept is not None:
+        languages = languages.assign(language=fold_values(languages["language"], kept))
+    return languages, kept
+
+
+def repository_totals(
+    repositories: pd.DataFrame, limits: CardinalityLimits
+) -> pd.DataFrame:
+    """Returns PR summaries per repository, folded by limits."""
+    return (
+        limits.fold(repositories, "repository")
+        .groupby("repository")["total_pr_summaries_created"]
+        .sum()
+        .reset_index()
+    )
+
+
+def build_dashboard_data(
+    *,
+    tenants: list[str],
+    language_lines: pd.DataFrame,
+    language_acceptances: pd.DataFrame,
+    daily_lines: pd.DataFrame,
+    editor_lines: pd.DataFrame,
+    daily_users: pd.DataFrame,
+    language_totals: pd.DataFrame,
+    repo_summaries: pd.DataFrame | None = None,
+    chat_totals: Mapping[str, Any] | None = None,
+    trends: pd.DataFrame | None = None,
+    aggregates: AggregateState | None = None,
+    kept_languages: frozenset[str] | None = None,
+) -> DashboardData:
+    """
+    Builds DashboardData from the series an engine aggregated. Every engine
+    ends here, so the timeframe, cumulative lines, acceptance rates and
+    chat totals are derived the same way whichever one ran.
+
+    language_lines and language_acceptances are date x language pivots;
+    language_totals holds each language's summed suggestions and
+    acceptances. With incremental aggregates the cumulative lines are read
+    from them, folded by kept_languages, instead of language_lines.
+    """
+    start_date = daily_lines["date"].min().strftime("%Y-%m-%d")
+    end_date = daily_lines["date"].max().strftime("%Y-%m-%d")
+    timeframe = f"Data from {start_date} to {end_date}"
+    if len(tenants) > 1:
+        timeframe += f" across {len(tenants)} tenants"
+
+    if aggregates is not None and aggregates.cumulative_language_lines:
+        # The state's history is folded by the languages kept for the input
+        cumulative_lines = fold_columns(
+            cumulative_lines_frame(aggregates), kept_languages
+        )
+    else:
+        cumulative_lines = language_lines.cumsum()
+
+    language_rates = language_totals.assign(
+        acceptance_rate=(
+            language_totals["total_code_acceptances"]
+            / language_totals["total_code_suggestions"]
+            * 100
+        ).fillna(0)
+    )
+
+    return DashboardData(
+        timeframe=timeframe,
+        tenants=tenants,
+        cumulative_lines=cumulative_lines,
+        language_acceptances=language_acceptances,
+        daily_lines=daily_lines,
+        editor_lines=editor_lines,
+        daily_users=daily_users,
+        language_rates=language_rates,
+        repo_summaries=repo_summaries,
+        chat_totals=None
+        if chat_totals is None
+        else {metric: int(chat_totals[metric]) for metric in CHAT_COUNTERS},
+        trends=trends,
+    )
+
+
+def aggregate_dashboard_data(
+    completions_data: list[dict[str, Any]],
+    chats_data: list[dict[str, Any]],
+    pr_data: list[dict[str, Any]],
+    aggregates: AggregateState | None = None,
+    summaries: SummaryTables | None = None,
+    limits: CardinalityLimits | None = None,
+    engine: Engine = Engine.PANDAS,
+) -> DashboardData:
+    """
+    Aggregates flattened Copilot data into the dashboard's chart series.
+
+    With summary tables the completion charts are read from them and the
+    completion leaves are not needed. Active users are then the day's
+    reported total_active_users; from leaves alone only the largest leaf
+    count per day is known, which undercounts users spread across editors.
+
+    With limits, languages, editors and repositories beyond their limit are
+    folded into one "Other" series here, so no chart draws more series
+    than the limits allow.
+
+    Both engines give the same DashboardData.
+    """
+    if engine == Engine.POLARS:
+        # polars_engine builds DashboardData, so it imports this module
+        from . import polars_engine
+
+        return polars_engine.aggregate_dashboard_data(
+            completions_data, chats_data, pr_data, aggregates, summaries, limits
+        )
+    limits = limits or CardinalityLimits()
+    if summaries is not None:
+        languages = _dated_frame(summaries.languages)
+        daily = _dated_frame(summaries.daily)
+        editors = pd.DataFrame(
+            [row for row in summaries.editors if row["feature"] == "code_completions"],
+            columns=pd.Index(["editor", "total_code_lines_accepted"]),
+        )
+        daily_users = daily[["date", "tenant", "total_active_users"]].rename(
+            columns={"total_active_users": "active_users"}
+        )
+    else:
+        languages = daily = editors = _dated_frame(completions_data)
+        # Manifests only list disjoint tenants, so their users add up; within
+        # a tenant the largest leaf count is used as a proxy for the day's
+        # users
+        daily_users = (
+            daily.groupby(["date", "tenant"])["total_engaged_users"]
+            .max()
+            .reset_index(name="active_users")
+        )
+
+    languages, kept_languages = fold_languages(languages, limits)
+    editors = limits.fold(editors, "editor")
+
+    return build_dashboard_data(
+        tenants=sorted(daily["tenant"].unique()),
+        language_lines=language_pivot(languages, "total_code_lines_accepted"),
+        language_acceptances=language_pivot(languages, "total_code_acceptances"),
+        daily_lines=daily.groupby("date")["total_code_lines_accepted"]
+        .sum()
+        .reset_index(),
+        editor_lines=editors.groupby("editor")["total_code_lines_accepted"]
+        .sum()
+        .reset_index(),
+        daily_users=daily_users,
+        language_totals=languages.groupby("language")
+        .agg({"total_code_suggestions": "sum", "total_code_acceptances": "sum"})
+        .reset_index(),
+        repo_summaries=repository_totals(pd.DataFrame(pr_data), limits)
+        if pr_data
+        else None,
+        chat_totals=pd.DataFrame(chats_data)[list(CHAT_COUNTERS)].sum()
+        if chats_data
+        else None,
+        trends=compute_trends(completions_data, summaries, limits=limits),
+        aggregates=aggregates,
+        kept_languages=kept_languages,
+    )
 
 
 def create_dashboard(
     completions_data: list[dict[str, Any]],
     chats_data: list[dict[str, Any]],
     pr_data: list[dict[str, Any]],
+    aggregates: AggregateState | None = None,
+    summaries: SummaryTables | None = None,
+    output_file: str = "dashboard.html",
+    pages: bool = False,
+    render_cache: str | None = None,
+    limits: CardinalityLimits | None = None,
+    engine: Engine = Engine.PANDAS,
 ) -> None:
     """
     Creates an interactive HTML dashboard from flattened Copilot data.
-    Saves as 'dashboard.html' and opens in browser.
+    Saves as output_file and opens in browser. Output files ending in .gz,
+    .zst or .bz2 are compressed and not opened.
+
+    With pages, output_file is a directory that receives a tabbed dashboard
+    with one page per panel, see write_paged_dashboard.
+
+    When incremental aggregates are given, the accumulated lines chart is
+    read from them and covers their whole history instead of the input.
+    When summary tables are given, the completion charts are read from
+    them instead of completions_data. Limits fold the languages, editors
+    and repositories beyond them into an "Other" series. The series are
+    aggregated with engine.
     """
-    if not completions_data:
+    has_completions = summaries.languages if summaries else completions_data
+    if not has_completions:
         print("No completion data to visualize")
         return
 
-    df = pd.DataFrame(completions_data)
-    chats_df = pd.DataFrame(chats_data) if chats_data else pd.DataFrame()
-    pr_df = pd.DataFrame(pr_data) if pr_data else pd.DataFrame()
-    df["date"] = pd.to_datetime(df["date"])
+    with stage("aggregate", "rows") as timing:
+        data = aggregate_dashboard_data(
+            completions_data,
+            chats_data,
+            pr_data,
+            aggregates,
+            summaries,
+            limits,
+            engine,
+        )
+        timing.items = len(completions_data) + len(chats_data) + len(pr_data)
+        if summaries is not None:
+            timing.items += sum(len(rows) for rows in summaries)
 
-    # Calculate timeframe for title
-    start_date = df["date"].min().strftime("%Y-%m-%d")
-    end_date = df["date"].max().strftime("%Y-%m-%d")
-    timeframe = f"Data from {start_date} to {end_date}"
+    render_dashboard(data, output_file, pages, render_cache)
 
-    # Create subplots
-    fig = make_subplots(
-        rows=4,
-        cols=2,
-        specs=[
-            [{"colspan": 2}, None],  # Full width chart
-            [{"secondary_y": True}, {"type": "pie"}],
-            [{"secondary_y": False}, {"secondary_y": False}],
-            [{"secondary_y": False}, {"secondary_y": False}],
-        ],
-    )
 
-    # 1. Accumulated Lines of Code Over Time (Full Width) - Stacked by Language
-    daily_language_totals = (
-        df.groupby(["date", "language"])["total_code_lines_accepted"]
-        .sum()
-        .reset_index()
-        .pivot(index="date", columns="language", values="total_code_lines_accepted")
-        .fillna(0)
-    )
+def render_options(pages: bool) -> str:
+    """Fingerprints what, besides its data, decides how a dashboard is drawn."""
+    return fingerprint(RENDER_CACHE_VERSION, plotly.__version__, pages)
 
-    # Calculate cumulative sum for each language
-    cumulative_language_totals = daily_language_totals.cumsum()
-
-    # Add traces for each language
-    for language in cumulative_language_totals.columns:
-        fig.add_trace(
-            go.Bar(
-                x=cumulative_language_totals.index,
-                y=cumulative_language_totals[language],
-                name=f"{language}",
-                legendgroup="group1",
-                hovertemplate=f"<b>{language}</b><br>"
-                + "Date: %{x}<br>"
-                + "Lines: %{y:,}<br>"
-                + "<extra></extra>",
-            ),
-            row=1,
-            col=1,
-        )
 
-    # 2. Code Acceptances by Language Over Time (Stacked Bar Chart)
-    language_pivot = (
-        df.groupby(["date", "language"])["total_code_acceptances"]
-        .sum()
-        .reset_index()
-        .pivot(index="date", columns="language", values="total_code_acceptances")
-        .fillna(0)
-    )
+class DashboardOutput(NamedTuple):
+    # File to open: the HTML file, or index.html of a paged dashboard
+    path: str
+    # Panels drawn when a render cache was used, None without one
+    drawn: list[str] | None = None
+    # False when a render cache found the file already up to date
+    written: bool = True
 
-    for language in language_pivot.columns:
-        fig.add_trace(
-            go.Bar(
-                x=language_pivot.index,
-                y=language_pivot[language],
-                name=f"{language}",
-                legendgroup="group1",
-                hovertemplate="<b>%{fullData.name}</b><br>"
-                + "Date: %{x}<br>"
-                + "Acceptances: %{y}<br>"
-                + "<extra></extra>",
-            ),
-            row=2,
-            col=1,
+
+def write_dashboard(
+    data: DashboardData,
+    output_file: str = "dashboard.html",
+    pages: bool = False,
+    render_cache: str | None = None,
+) -> DashboardOutput:
+    """
+    Draws aggregated dashboard data and writes it, without printing or
+    opening anything.
+
+    With a render_cache directory, panels whose inputs are unchanged since
+    the last run are reused instead of drawn, and an output file that would
+    come out the same is not written again.
+    """
+    cache = None
+    if render_cache is not None:
+        cache = RenderCache(render_cache, render_options(pages))
+
+    if pages:
+        with stage("write_pages", "bytes") as timing:
+            index_path = write_paged_dashboard(data, output_file, cache)
+            timing.bytes_written = timing.items = sum(
+                os.path.getsize(os.path.join(root, name))
+                for root, _, names in os.walk(os.path.dirname(index_path))
+                for name in names
+            )
+        if cache is not None:
+            cache.save()
+        return DashboardOutput(index_path)
+
+    if cache is None:
+        drawn = None
+        with stage("build_figure"):
+            figure = build_dashboard_spec(data)
+    else:
+        with stage("build_figure"):
+            figure, drawn = build_cached_dashboard_figure(data, cache)
+        if not drawn and cache.output_unchanged(output_file):
+            cache.save()
+            return DashboardOutput(output_file, drawn, written=False)
+
+    with stage("write_html", "bytes") as timing:
+        write_figure_html(figure, output_file)
+        timing.bytes_written = timing.items = os.path.getsize(output_file)
+    if cache is not None:
+        cache.record_output(output_file)
+        cache.save()
+    return DashboardOutput(output_file, drawn)
+
+
+def render_dashboard(
+    data: DashboardData,
+    output_file: str = "dashboard.html",
+    pages: bool = False,
+    render_cache: str | None = None,
+) -> None:
+    """
+    Writes aggregated dashboard data as create_dashboard does, see
+    write_dashboard, and opens it in the browser unless it is unchanged.
+    """
+    output = write_dashboard(data, output_file, pages, render_cache)
+    if output.drawn is not None:
+        print(
+            f"Drew {len(output.drawn)} of {len(PANEL_LAYOUT)} panels, reused the rest"
         )
+    if not output.written:
+        print(f"Dashboard '{output.path}' is unchanged")
+        return
+    print(f"Dashboard saved as '{output.path}'")
+    # Compressed dashboards are meant to be shipped elsewhere, not opened
+    if pages or codec_for_path(output.path) == Codec.NONE:
+        _open_in_browser(output.path)
 
-    # Add line chart overlay for total lines accepted
-    lines_over_time = (
-        df.groupby("date")["total_code_lines_accepted"].sum().reset_index()
-    )
 
-    fig.add_trace(
-        go.Scatter(
-            x=lines_over_time["date"],
-            y=lines_over_time["total_code_lines_accepted"],
-            mode="lines",
-            name="Total Lines Accepted",
-            line={"color": "red", "width": 1, "dash": "dot"},
-            legendgroup="group1_lines",
-            hovertemplate="<b>Total Lines Accepted</b><br>"
-            + "Date: %{x}<br>"
-            + "Lines: %{y}<br>"
-            + "<extra></extra>",
-            yaxis="y2",
-        ),
-        row=2,
-        col=1,
-        secondary_y=True,
-    )
+def _open_in_browser(output_file: str) -> None:
+    try:
+        # Get absolute path for file:// URL
+        abs_path = os.path.abspath(output_file)
+        webbrowser.open(f"file://{abs_path}")
+        print("Dashboard opened in browser")
+    except Exception as e:
+        print(f"Could not open browser automatically: {e}")
+        print(f"Please open '{output_file}' manually in your browser")
 
-    # 3. Accepted Lines of Code by Editor (Pie Chart)
-    editor_accepted_lines = (
-        df.groupby("editor")["total_code_lines_accepted"].sum().reset_index()
-    )
 
-    fig.add_trace(
-        go.Pie(
-            labels=editor_accepted_lines["editor"],
-            values=editor_accepted_lines["total_code_lines_accepted"],
-            name="Accepted Lines",
-            hovertemplate="<b>%{label}</b><br>"
-            + "Lines: %{value}<br>"
-            + "Percentage: %{percent}<br>"
+DATE_AXIS = {"title": {"text": "Date"}, "tickformat": "%m/%d", "tickangle": 45}
+
+
+def _axis(title: str) -> dict[str, Any]:
+    return {"title": {"text": title}}
+
+
+class Panel(BaseModel):
+    """
+    One dashboard chart, independent of where it is drawn.
+
+    Traces and axes are plain plotly.js specs, so drawing a panel does not
+    run plotly's per-property validation.
+    """
+
+    name: str
+    title: str
+    traces: list[dict[str, Any]] = Field(default_factory=list)
+    # Drawn against a secondary y axis on the right
+    secondary_traces: list[dict[str, Any]] = Field(default_factory=list)
+    xaxis: dict[str, Any] = Field(default_factory=dict)
+    yaxis: dict[str, Any] = Field(default_factory=dict)
+    secondary_yaxis: dict[str, Any] = Field(default_factory=dict)
+
+
+def _accumulated_lines_panel(data: DashboardData) -> Panel:
+    # Accumulated Lines of Code Over Time - Stacked by Language
+    cumulative_language_totals = data.cumulative_lines
+    dates = cumulative_language_totals.index.to_numpy()
+    traces = [
+        {
+            "type": "bar",
+            "x": dates,
+            "y": cumulative_language_totals[language].to_numpy(),
+            "name": f"{language}",
+            "legendgroup": "group1",
+            "hovertemplate": f"<b>{language}</b><br>"
+            + "Date: %{x}<br>"
+            + "Lines: %{y:,}<br>"
             + "<extra></extra>",
-        ),
-        row=2,
-        col=2,
+        }
+        for language in cumulative_language_totals.columns
+    ]
+    return Panel(
+        name="accumulated_lines",
+        title="Accumulated Lines of Code Over Time",
+        traces=traces,
+        xaxis=DATE_AXIS,
+        yaxis=_axis("Accumulated Lines of Code"),
     )
 
-    # 4. Unique Active Users Per Day
-    # Get unique active users per day from the original daily stats
-    daily_users = []
-    for daily_stat in df.groupby("date"):
-        date = daily_stat[0]
-        # Sum total_engaged_users across all editors for this date
-        total_users = daily_stat[1][
-            "total_engaged_users"
-        ].max()  # Should be same across all rows for a date
-        daily_users.append({"date": date, "active_users": total_users})
-
-    daily_users_df = pd.DataFrame(daily_users)
-
-    fig.add_trace(
-        go.Bar(
-            x=daily_users_df["date"],
-            y=daily_users_df["active_users"],
-            name="Active Users",
-            legendgroup="group3",
-            hovertemplate="<b>Active Users</b><br>"
+
+def _acceptances_by_language_panel(data: DashboardData) -> Panel:
+    # Code Acceptances by Language Over Time (Stacked Bar Chart)
+    language_pivot = data.language_acceptances
+    dates = language_pivot.index.to_numpy()
+    traces = [
+        {
+            "type": "bar",
+            "x": dates,
+            "y": language_pivot[language].to_numpy(),
+            "name": f"{language}",
+            "legendgroup": "group1",
+            "hovertemplate": "<b>%{fullData.name}</b><br>"
             + "Date: %{x}<br>"
-            + "Users: %{y}<br>"
+            + "Acceptances: %{y}<br>"
             + "<extra></extra>",
-        ),
-        row=3,
-        col=1,
-    )
+        }
+        for language in language_pivot.columns
+    ]
 
-    # 5. Acceptance Rate by Language
-    language_rates = (
-        df.groupby("language")
-        .agg({"total_code_suggestions": "sum", "total_code_acceptances": "sum"})
-        .reset_index()
+    # Line chart overlay for total lines accepted
+    lines_over_time = data.daily_lines
+    total_lines = {
+        "type": "scatter",
+        "x": lines_over_time["date"].to_numpy(),
+        "y": lines_over_time["total_code_lines_accepted"].to_numpy(),
+        "mode": "lines",
+        "name": "Total Lines Accepted",
+        "line": {"color": "red", "width": 1, "dash": "dot"},
+        "legendgroup": "group1_lines",
+        "hovertemplate": "<b>Total Lines Accepted</b><br>"
+        + "Date: %{x}<br>"
+        + "Lines: %{y}<br>"
+        + "<extra></extra>",
+    }
+    return Panel(
+        name="acceptances_by_language",
+        title="Code Acceptances by Language Over Time",
+        traces=traces,
+        secondary_traces=[total_lines],
+        xaxis=DATE_AXIS,
+        yaxis=_axis("Code Acceptances"),
+        secondary_yaxis=_axis("Lines of Code"),
     )
-    language_rates["acceptance_rate"] = (
-        language_rates["total_code_acceptances"]
-        / language_rates["total_code_suggestions"]
-        * 100
-    ).fillna(0)
 
-    fig.add_trace(
-        go.Bar(
-            x=language_rates["language"],
-            y=language_rates["acceptance_rate"],
-            name="Acceptance Rate (%)",
-            legendgroup="group4",
-            hovertemplate="<b>%{x}</b><br>"
-            + "Acceptance Rate: %{y:.1f}%<br>"
-            + "<extra></extra>",
-        ),
-        row=3,
-        col=2,
+
+def _lines_by_editor_panel(data: DashboardData) -> Panel:
+    # Accepted Lines of Code by Editor (Pie Chart, no axes)
+    editor_accepted_lines = data.editor_lines
+    pie = {
+        "type": "pie",
+        "labels": editor_accepted_lines["editor"].to_numpy(),
+        "values": editor_accepted_lines["total_code_lines_accepted"].to_numpy(),
+        "name": "Accepted Lines",
+        "hovertemplate": "<b>%{label}</b><br>"
+        + "Lines: %{value}<br>"
+        + "Percentage: %{percent}<br>"
+        + "<extra></extra>",
+    }
+    return Panel(
+        name="lines_by_editor", title="Accepted Lines of Code by Editor", traces=[pie]
     )
 
-    # 6. PR Summaries by Repository
-    if not pr_df.empty:
-        repo_summaries = (
-            pr_df.groupby("repository")["total_pr_summaries_created"]
-            .sum()
-            .reset_index()
-        )
-        fig.add_trace(
-            go.Bar(
-                x=repo_summaries["repository"],
-                y=repo_summaries["total_pr_summaries_created"],
-                name="PR Summaries",
-                legendgroup="group5",
-                hovertemplate="<b>%{x}</b><br>"
-                + "PR Summaries: %{y}<br>"
+
+def _active_users_panel(data: DashboardData) -> Panel:
+    # Unique Active Users Per Day, stacked by tenant
+    daily_users_df = data.daily_users
+    traces = []
+    for tenant in data.tenants:
+        tenant_users = daily_users_df[daily_users_df["tenant"] == tenant]
+        name = tenant or "Active Users"
+        traces.append(
+            {
+                "type": "bar",
+                "x": tenant_users["date"].to_numpy(),
+                "y": tenant_users["active_users"].to_numpy(),
+                "name": name,
+                "legendgroup": "group3",
+                "hovertemplate": f"<b>{name}</b><br>"
+                + "Date: %{x}<br>"
+                + "Users: %{y}<br>"
                 + "<extra></extra>",
-            ),
-            row=4,
-            col=1,
+            }
         )
+    return Panel(
+        name="active_users",
+        title="Unique Active Users Per Day",
+        traces=traces,
+        xaxis=DATE_AXIS,
+        yaxis=_axis("Active Users"),
+    )
+
+
+def _acceptance_rate_panel(data: DashboardData) -> Panel:
+    # Acceptance Rate by Language
+    language_rates = data.language_rates
+    bar = {
+        "type": "bar",
+        "x": language_rates["language"].to_numpy(),
+        "y": language_rates["acceptance_rate"].to_numpy(),
+        "name": "Acceptance Rate (%)",
+        "legendgroup": "group4",
+        "hovertemplate": "<b>%{x}</b><br>"
+        + "Acceptance Rate: %{y:.1f}%<br>"
+        + "<extra></extra>",
+    }
+    return Panel(
+        name="acceptance_rate",
+        title="Acceptance Rate by Language",
+        traces=[bar],
+        xaxis=_axis("Language"),
+        yaxis=_axis("Acceptance Rate (%)"),
+    )
+
+
+def _pr_summaries_panel(data: DashboardData) -> Panel:
+    # PR Summaries by Repository
+    if data.repo_summaries is not None:
+        repo_summaries = data.repo_summaries
+        bar = {
+            "type": "bar",
+            "x": repo_summaries["repository"].to_numpy(),
+            "y": repo_summaries["total_pr_summaries_created"].to_numpy(),
+            "name": "PR Summaries",
+            "legendgroup": "group5",
+            "hovertemplate": "<b>%{x}</b><br>"
+            + "PR Summaries: %{y}<br>"
+            + "<extra></extra>",
+        }
     else:
-        # Add empty placeholder if no PR data
-        fig.add_trace(
-            go.Bar(x=[], y=[], name="No PR Data", showlegend=False),
-            row=4,
-            col=1,
-        )
+        # Empty placeholder if no PR data
+        bar = {
+            "type": "bar",
+            "x": [],
+            "y": [],
+            "name": "No PR Data",
+            "showlegend": False,
+        }
+    return Panel(
+        name="pr_summaries",
+        title="PR Summaries by Repository",
+        traces=[bar],
+        xaxis=_axis("Repository"),
+        yaxis=_axis("PR Summaries Created"),
+    )
 
-    # 7. Chat Usage (Chats/Copies/Inserts)
-    if not chats_df.empty:
+
+def _chat_usage_panel(data: DashboardData) -> Panel:
+    # Chat Usage (Chats/Copies/Inserts)
+    if data.chat_totals is not None:
         # Aggregate all chat data (total across all editors/types)
-        total_chats = chats_df["total_chats"].sum()
-        total_copies = chats_df["total_chat_copy_events"].sum()
-        total_inserts = chats_df["total_chat_insertion_events"].sum()
+        total_chats = data.chat_totals["total_chats"]
+        total_copies = data.chat_totals["total_chat_copy_events"]
+        total_inserts = data.chat_totals["total_chat_insertion_events"]
 
         # Create simple bar chart
         categories = ["Total Chats", "Copies", "Inserts"]
         values = [total_chats, total_copies, total_inserts]
         colors = ["lightblue", "orange", "green"]
 
-        fig.add_trace(
-            go.Bar(
-                x=categories,
-                y=values,
-                name="Chat Usage",
-                marker_color=colors,
-                legendgroup="group6",
-                hovertemplate="<b>%{x}</b><br>" + "Count: %{y}<br>" + "<extra></extra>",
-            ),
-            row=4,
-            col=2,
-        )
+        bar = {
+            "type": "bar",
+            "x": categories,
+            "y": values,
+            "name": "Chat Usage",
+            "marker": {"color": colors},
+            "legendgroup": "group6",
+            "hovertemplate": "<b>%{x}</b><br>" + "Count: %{y}<br>" + "<extra></extra>",
+        }
     else:
-        # Add empty placeholder if no chat data
-        fig.add_trace(
-            go.Bar(x=[], y=[], name="No Chat Data", showlegend=False),
-            row=4,
-            col=2,
-        )
-
-    # Add subplot titles manually
-    fig.add_annotation(
-        text="Accumulated Lines of Code Over Time",
-        xref="paper",
-        yref="paper",
-        x=0.5,
-        y=0.98,
-        showarrow=False,
-        font={"size": 16},
-        xanchor="center",
-    )
-    fig.add_annotation(
-        text="Code Acceptances by Language Over Time",
-        xref="paper",
-        yref="paper",
-        x=0.225,
-        y=0.76,
-        showarrow=False,
-        font={"size": 14},
-        xanchor="center",
-    )
-    fig.add_annotation(
-        text="Accepted Lines of Code by Editor",
-        xref="paper",
-        yref="paper",
-        x=0.775,
-        y=0.76,
-        showarrow=False,
-        font={"size": 14},
-        xanchor="center",
+        # Empty placeholder if no chat data
+        bar = {
+            "type": "bar",
+            "x": [],
+            "y": [],
+            "name": "No Chat Data",
+            "showlegend": False,
+        }
+    return Panel(
+        name="chat_usage",
+        title="Chat Usage (Chats/Copies/Inserts)",
+        traces=[bar],
+        xaxis=_axis("Chat Metrics"),
+        yaxis=_axis("Count"),
     )
-    fig.add_annotation(
-        text="Unique Active Users Per Day",
-        xref="paper",
-        yref="paper",
-        x=0.225,
-        y=0.52,
-        showarrow=False,
-        font={"size": 14},
-        xanchor="center",
+
+
+def _overall_trends(data: DashboardData) -> pd.DataFrame:
+    if data.trends is None or data.trends.empty:
+        return pd.DataFrame()
+    return data.trends[data.trends["dimension"] == ALL]
+
+
+def _rolling_acceptance_rate_panel(data: DashboardData) -> Panel:
+    overall = _overall_trends(data)
+    traces = [
+        {
+            "type": "scatter",
+            "x": overall["date"].to_numpy(),
+            "y": overall[f"acceptance_rate_{window}d"].to_numpy() * 100,
+            "mode": "lines",
+            "name": f"Acceptance Rate ({window}-day)",
+            "line": {"dash": dash},
+            "legendgroup": "group7",
+            "hovertemplate": f"<b>{window}-day Acceptance Rate</b><br>"
+            + "Date: %{x}<br>"
+            + "Rate: %{y:.1f}%<br>"
+            + "<extra></extra>",
+        }
+        for window, dash in zip(TREND_WINDOWS, ("solid", "dot"), strict=True)
+        if f"acceptance_rate_{window}d" in overall
+    ]
+    return Panel(
+        name="rolling_acceptance_rate",
+        title="Rolling Acceptance Rate (7/28-day)",
+        traces=traces,
+        xaxis=DATE_AXIS,
+        yaxis=_axis("Acceptance Rate (%)"),
     )
-    fig.add_annotation(
-        text="Acceptance Rate by Language",
-        xref="paper",
-        yref="paper",
-        x=0.775,
-        y=0.52,
-        showarrow=False,
-        font={"size": 14},
-        xanchor="center",
+
+
+def _rolling_active_users_panel(data: DashboardData) -> Panel:
+    overall = _overall_trends(data)
+    traces = [
+        {
+            "type": "scatter",
+            "x": overall["date"].to_numpy(),
+            "y": overall[f"active_users_avg_{window}d"].to_numpy(),
+            "mode": "lines",
+            "name": f"Active Users ({window}-day avg)",
+            "line": {"dash": dash},
+            "legendgroup": "group8",
+            "hovertemplate": f"<b>{window}-day Average Active Users</b><br>"
+            + "Date: %{x}<br>"
+            + "Users: %{y:,.0f}<br>"
+            + "<extra></extra>",
+        }
+        for window, dash in zip(TREND_WINDOWS, ("solid", "dot"), strict=True)
+        if f"active_users_avg_{window}d" in overall
+    ]
+    if not traces:
+        # Active users are only known from the summary tables
+        traces = [
+            {
+                "type": "scatter",
+                "x": [],
+                "y": [],
+                "name": "No Active User Data",
+                "showlegend": False,
+            }
+        ]
+    return Panel(
+        name="rolling_active_users",
+        title="Rolling Active Users (7/28-day average)",
+        traces=traces,
+        xaxis=DATE_AXIS,
+        yaxis=_axis("Active Users"),
     )
-    fig.add_annotation(
-        text="PR Summaries by Repository",
-        xref="paper",
-        yref="paper",
-        x=0.225,
-        y=0.28,
-        showarrow=False,
-        font={"size": 14},
-        xanchor="center",
+
+
+def _week_over_week_panel(data: DashboardData, dimension: str) -> Panel:
+    # Week-over-Week Change in Lines Accepted on the latest day
+    deltas = (
+        latest_deltas(data.trends, dimension, "lines_accepted_wow")
+        if data.trends is not None and not data.trends.empty
+        else pd.Series(dtype=float)
     )
-    fig.add_annotation(
-        text="Chat Usage (Chats/Copies/Inserts)",
-        xref="paper",
-        yref="paper",
-        x=0.775,
-        y=0.28,
-        showarrow=False,
-        font={"size": 14},
-        xanchor="center",
+    bar = {
+        "type": "bar",
+        "x": deltas.index.to_numpy(),
+        "y": deltas.to_numpy() * 100,
+        "name": f"WoW Lines Accepted by {dimension.title()}",
+        "legendgroup": f"group_wow_{dimension}",
+        "showlegend": False,
+        "hovertemplate": "<b>%{x}</b><br>"
+        + "Week over week: %{y:+.1f}%<br>"
+        + "<extra></extra>",
+    }
+    return Panel(
+        name=f"wow_by_{dimension}",
+        title=f"Week-over-Week Lines Accepted by {dimension.title()}",
+        traces=[bar],
+        xaxis=_axis(dimension.title()),
+        yaxis=_axis("Change (%)"),
     )
 
-    # Update layout
+
+# Panel builders in dashboard order, with their (row, col) on the single page
+PANEL_LAYOUT: dict[str, tuple[Callable[[DashboardData], Panel], int, int]] = {
+    "accumulated_lines": (_accumulated_lines_panel, 1, 1),
+    "acceptances_by_language": (_acceptances_by_language_panel, 2, 1),
+    "lines_by_editor": (_lines_by_editor_panel, 2, 2),
+    "active_users": (_active_users_panel, 3, 1),
+    "acceptance_rate": (_acceptance_rate_panel, 3, 2),
+    "pr_summaries": (_pr_summaries_panel, 4, 1),
+    "chat_usage": (_chat_usage_panel, 4, 2),
+    "rolling_acceptance_rate": (_rolling_acceptance_rate_panel, 5, 1),
+    "rolling_active_users": (_rolling_active_users_panel, 5, 2),
+    "wow_by_language": (partial(_week_over_week_panel, dimension="language"), 6, 1),
+    "wow_by_editor": (partial(_week_over_week_panel, dimension="editor"), 6, 2),
+}
+
+
+def build_panels(data: DashboardData) -> list[Panel]:
+    """Builds every dashboard panel, in dashboard order."""
+    return [build(data) for build, _, _ in PANEL_LAYOUT.values()]
+
+
+# DashboardData fields each panel is drawn from
+PANEL_INPUTS: dict[str, tuple[str, ...]] = {
+    "accumulated_lines": ("cumulative_lines",),
+    "acceptances_by_language": ("language_acceptances", "daily_lines"),
+    "lines_by_editor": ("editor_lines",),
+    "active_users": ("daily_users", "tenants"),
+    "acceptance_rate": ("language_rates",),
+    "pr_summaries": ("repo_summaries",),
+    "chat_usage": ("chat_totals",),
+    "rolling_acceptance_rate": ("trends",),
+    "rolling_active_users": ("trends",),
+    "wow_by_language": ("trends",),
+    "wow_by_editor": ("trends",),
+}
+
+
+def dashboard_skeleton(timeframe: str) -> go.Figure:
+    """Returns the empty single-page dashboard grid with its title."""
+    fig = make_subplots(
+        rows=6,
+        cols=2,
+        specs=[
+            [{"colspan": 2}, None],  # Full width chart
+            [{"secondary_y": True}, {"type": "pie"}],
+            [{"secondary_y": False}, {"secondary_y": False}],
+            [{"secondary_y": False}, {"secondary_y": False}],
+            [{"secondary_y": False}, {"secondary_y": False}],
+            [{"secondary_y": False}, {"secondary_y": False}],
+        ],
+    )
     fig.update_layout(
-        height=1400,  # Increased height for 4 rows
+        height=2100,  # 350px per row
         title_text=f"GitHub Copilot Usage Dashboard<br><sub>{timeframe}</sub>",
         title_x=0.5,
         showlegend=True,
         barmode="stack",  # Make bars stack
     )
+    return fig
 
-    # Update axes labels
-    # Row 1 - Accumulated Lines (full width)
-    fig.update_xaxes(
-        title_text="Date",
-        row=1,
-        col=1,
-        tickformat="%m/%d",
-        tickangle=45,
-    )
-    fig.update_yaxes(title_text="Accumulated Lines of Code", row=1, col=1)
-
-    # Row 2 - Code acceptances and pie chart
-    fig.update_xaxes(
-        title_text="Date",
-        row=2,
-        col=1,
-        tickformat="%m/%d",  # Show as MM/DD format
-        tickangle=45,  # Rotate labels for better readability
+
+class _Placement(NamedTuple):
+    # Trace properties that put a trace on the panel's subplot
+    refs: dict[str, Any]
+    secondary_refs: dict[str, Any]
+    # Layout keys of the panel's x, y and secondary y axes, if it has axes
+    axes: tuple[str, ...]
+    # Paper coordinates of the middle of the panel's top edge
+    top: tuple[float, float]
+
+
+def _axis_ref(axis) -> str:
+    # Layout key "yaxis3" is referred to by traces as "y3"
+    return axis.plotly_name.replace("axis", "")
+
+
+@cache
+def _dashboard_grid() -> tuple[dict[str, Any], dict[str, _Placement]]:
+    """
+    Lays out the single-page grid once with make_subplots, which validates
+    it, and returns its layout as a dict with where each panel goes.
+    """
+    fig = dashboard_skeleton("")
+    placements = {}
+    for name, (_, row, col) in PANEL_LAYOUT.items():
+        subplot = fig.get_subplot(row, col)
+        if not hasattr(subplot, "xaxis"):
+            # Pie subplots are a domain rather than axes
+            placements[name] = _Placement(
+                refs={"domain": {"x": list(subplot.x), "y": list(subplot.y)}},
+                secondary_refs={},
+                axes=(),
+                top=((subplot.x[0] + subplot.x[1]) / 2, subplot.y[1]),
+            )
+            continue
+        xaxis, yaxis = subplot.xaxis, subplot.yaxis
+        refs = {"xaxis": _axis_ref(xaxis), "yaxis": _axis_ref(yaxis)}
+        axes = (xaxis.plotly_name, yaxis.plotly_name)
+        secondary_refs = {}
+        secondary = fig.get_subplot(row, col, secondary_y=True)
+        if secondary is not None:
+            secondary_refs = {**refs, "yaxis": _axis_ref(secondary.yaxis)}
+            axes = (*axes, secondary.yaxis.plotly_name)
+        placements[name] = _Placement(
+            refs=refs,
+            secondary_refs=secondary_refs,
+            axes=axes,
+            top=((xaxis.domain[0] + xaxis.domain[1]) / 2, yaxis.domain[1]),
+        )
+    layout = fig.to_dict()["layout"]
+    del layout["title"]
+    return layout, placements
+
+
+def dashboard_title(timeframe: str) -> dict[str, Any]:
+    return {
+        "text": f"GitHub Copilot Usage Dashboard<br><sub>{timeframe}</sub>",
+        "x": 0.5,
+    }
+
+
+def panel_fragment(panel: Panel) -> dict[str, Any]:
+    """
+    Returns what a panel adds to the single-page dashboard: its traces
+    placed on its subplot, its axes merged over the grid's and its title
+    annotation.
+    """
+    layout, placements = _dashboard_grid()
+    placement = placements[panel.name]
+    _, row, _ = PANEL_LAYOUT[panel.name]
+    traces = [{**trace, **placement.refs} for trace in panel.traces]
+    traces += [
+        {**trace, **placement.secondary_refs} for trace in panel.secondary_traces
+    ]
+    axes = {
+        key: {**layout[key], **props}
+        for key, props in zip(
+            placement.axes,
+            (panel.xaxis, panel.yaxis, panel.secondary_yaxis),
+            strict=False,
+        )
+    }
+    x, y = placement.top
+    # Subplot titles sit just above each panel
+    annotation = {
+        "text": panel.title,
+        "xref": "paper",
+        "yref": "paper",
+        "x": x,
+        "y": y,
+        "yshift": 10,
+        "showarrow": False,
+        "font": {"size": 16 if row == 1 else 14},
+        "xanchor": "center",
+        "yanchor": "bottom",
+    }
+    return {"traces": traces, "axes": axes, "annotation": annotation}
+
+
+def assemble_dashboard(
+    timeframe: str, fragments: Iterable[dict[str, Any]]
+) -> dict[str, Any]:
+    """Puts panel fragments, in dashboard order, onto the grid."""
+    grid, _ = _dashboard_grid()
+    layout = {**grid, "title": dashboard_title(timeframe), "annotations": []}
+    figure = {"data": [], "layout": layout}
+    for fragment in fragments:
+        figure["data"].extend(fragment["traces"])
+        layout.update(fragment["axes"])
+        layout["annotations"].append(fragment["annotation"])
+    return figure
+
+
+def build_dashboard_spec(data: DashboardData) -> dict[str, Any]:
+    """
+    Builds the single-page dashboard as a plotly.js figure dict holding
+    numpy arrays, for writing with jsonio.dumps.
+
+    Only the grid goes through plotly's validation, once per process;
+    traces are written as the panels specify them.
+    """
+    return assemble_dashboard(
+        data.timeframe, (panel_fragment(panel) for panel in build_panels(data))
     )
-    fig.update_yaxes(title_text="Code Acceptances", row=2, col=1)
-    fig.update_yaxes(title_text="Lines of Code", row=2, col=1, secondary_y=True)
-
-    # Note: Pie chart doesn't need axis labels
-
-    # Row 3 - Active users and acceptance rate
-    fig.update_xaxes(
-        title_text="Date",
-        row=3,
-        col=1,
-        tickformat="%m/%d",  # Show as MM/DD format
-        tickangle=45,  # Rotate labels for better readability
+
+
+def build_dashboard_figure(data: DashboardData) -> go.Figure:
+    """
+    Builds the single-page dashboard as a validated plotly Figure, for
+    callers that work with plotly objects. Much slower than
+    build_dashboard_spec with many languages.
+    """
+    return go.Figure(build_dashboard_spec(data))
+
+
+def build_cached_dashboard_figure(
+    data: DashboardData, cache: RenderCache
+) -> tuple[dict[str, Any], list[str]]:
+    """
+    Builds the single-page dashboard as a figure dict, drawing only the
+    panels whose inputs changed since the cache was filled.
+
+    Each panel is cached as its panel_fragment, serialized.
+
+    Returns:
+        Figure dict and the names of the panels that were drawn
+    """
+    fragments = {}
+    drawn = []
+    for name, (build, _, _) in PANEL_LAYOUT.items():
+        inputs = fingerprint(*(getattr(data, field) for field in PANEL_INPUTS[name]))
+        fragment = cache.get(name, inputs)
+        if fragment is None:
+            fragment_json = dumps(panel_fragment(build(data)))
+            cache.put(name, inputs, fragment_json.decode())
+            fragment = loads(fragment_json)
+            drawn.append(name)
+        fragments[name] = fragment
+    return assemble_dashboard(data.timeframe, fragments.values()), drawn
+
+
+def build_panel_spec(panel: Panel) -> dict[str, Any]:
+    """Builds a standalone figure dict for one panel."""
+    layout = {
+        "title": {"text": panel.title, "x": 0.5},
+        "barmode": "stack",
+        "height": 600,
+        "xaxis": panel.xaxis,
+        "yaxis": panel.yaxis,
+        "template": _dashboard_grid()[0]["template"],
+    }
+    secondary_refs = {}
+    if panel.secondary_traces:
+        layout["yaxis2"] = {"overlaying": "y", "side": "right", **panel.secondary_yaxis}
+        secondary_refs = {"yaxis": "y2"}
+    data = [
+        *panel.traces,
+        *({**trace, **secondary_refs} for trace in panel.secondary_traces),
+    ]
+    return {"data": data, "layout": layout}
+
+
+_FIGURE_TEMPLATE = """<html>
+<head><meta charset="utf-8" /></head>
+<body>
+<div id="dashboard" style="height:100%; width:100%;"></div>
+<script type="text/javascript">{plotly_js}</script>
+<script type="text/javascript">
+const figure = {figure};
+Plotly.newPlot("dashboard", figure.data, figure.layout, {{responsive: true}});
+</script>
+</body>
+</html>
+"""
+
+
+def figure_script_json(figure: dict[str, Any]) -> str:
+    """Serializes a figure dict for embedding in a <script> element."""
+    return dumps(figure).decode().replace("</", "<\\/")
+
+
+def write_figure_html(figure: dict[str, Any], output_file: str) -> None:
+    """
+    Writes a figure dict as a standalone HTML page with plotly.js inline,
+    compressed when output_file ends in .gz, .zst or .bz2.
+    """
+    page = _FIGURE_TEMPLATE.format(
+        plotly_js=pyo.get_plotlyjs(), figure=figure_script_json(figure)
     )
-    fig.update_yaxes(title_text="Active Users", row=3, col=1)
+    with open_output(output_file) as f:
+        f.write(page.encode())
 
-    fig.update_xaxes(title_text="Language", row=3, col=2)
-    fig.update_yaxes(title_text="Acceptance Rate (%)", row=3, col=2)
 
-    # Row 4 - PR summaries and chat usage
-    fig.update_xaxes(title_text="Repository", row=4, col=1)
-    fig.update_yaxes(title_text="PR Summaries Created", row=4, col=1)
+PANELS_DIR = "panels"
+PLOTLY_JS = "plotly.min.js"
 
-    fig.update_xaxes(title_text="Chat Metrics", row=4, col=2)
-    fig.update_yaxes(title_text="Count", row=4, col=2)
+_PAGED_TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<meta charset="utf-8">
+<title>GitHub Copilot Usage Dashboard</title>
+<style>
+body {{ font-family: sans-serif; margin: 0; }}
+header {{ text-align: center; padding: 12px; }}
+nav {{ display: flex; flex-wrap: wrap; gap: 4px; padding: 0 12px;
+       border-bottom: 1px solid #ccc; }}
+nav button {{ border: 1px solid #ccc; border-bottom: none; background: #f4f4f4;
+              padding: 6px 12px; cursor: pointer; }}
+nav button.active {{ background: #fff; font-weight: bold; }}
+.panel {{ display: none; padding: 12px; }}
+.panel.active {{ display: block; }}
+</style>
+<script src="{plotly_js}"></script>
+</head>
+<body>
+<header><h2>GitHub Copilot Usage Dashboard</h2><div>{timeframe}</div></header>
+<nav>{tabs}</nav>
+{pages}
+<script>
+const loaded = {{}};
+function showPanel(name) {{
+  document.querySelectorAll(".panel, nav button").forEach(
+    el => el.classList.toggle("active", el.dataset.panel === name));
+  if (loaded[name]) {{
+    return;
+  }}
+  loaded[name] = true;
+  // Sidecars are scripts so the dashboard also works from file:// URLs,
+  // where browsers block fetch()
+  const script = document.createElement("script");
+  script.src = "{panels_dir}/" + name + ".js";
+  document.head.appendChild(script);
+}}
+function renderPanel(name, figure) {{
+  Plotly.newPlot("panel-" + name, figure.data, figure.layout, {{responsive: true}});
+}}
+document.querySelectorAll("nav button").forEach(
+  button => button.addEventListener("click", () => showPanel(button.dataset.panel)));
+showPanel("{first}");
+</script>
+</body>
+</html>
+"""
 
-    # Save and open dashboard
-    output_file = "dashboard.html"
-    pyo.plot(fig, filename=output_file, auto_open=False)
 
-    print(f"Dashboard saved as '{output_file}'")
+def write_paged_dashboard(
+    data: DashboardData, output_dir: str, cache: RenderCache | None = None
+) -> str:
+    """
+    Writes a dashboard with one tab per panel into output_dir.
 
-    # Open in browser
-    try:
-        # Get absolute path for file:// URL
-        abs_path = os.path.abspath(output_file)
-        webbrowser.open(f"file://{abs_path}")
-        print("Dashboard opened in browser")
-    except Exception as e:
-        print(f"Could not open browser automatically: {e}")
-        print(f"Please open '{output_file}' manually in your browser")
+    index.html only holds the tabs. Each panel's figure lives in its own
+    sidecar under panels/, loaded the first time its tab is opened, so the
+    initial page stays the same size whatever the size of the data.
+    plotly.js is written once next to index.html and shared by all panels.
+
+    With a cache, plotly.js and the sidecars of panels whose inputs did not
+    change are left as the last run wrote them.
+
+    Returns:
+        Path of index.html
+    """
+    panels_dir = os.path.join(output_dir, PANELS_DIR)
+    os.makedirs(panels_dir, exist_ok=True)
+
+    plotly_js = os.path.join(output_dir, PLOTLY_JS)
+    if cache is None or not cache.output_unchanged(plotly_js):
+        with open(plotly_js, "w", encoding="utf-8") as f:
+            f.write(pyo.get_plotlyjs())
+        if cache is not None:
+            cache.record_output(plotly_js)
+
+    panels = []
+    for name, (build, _, _) in PANEL_LAYOUT.items():
+        sidecar = os.path.join(panels_dir, f"{name}.js")
+        if cache is not None:
+            inputs = fingerprint(
+                *(getattr(data, field) for field in PANEL_INPUTS[name])
+            )
+            title = cache.get(name, inputs)
+            if title is not None and cache.output_unchanged(sidecar):
+                panels.append((name, title))
+                continue
+        panel = build(data)
+        figure = figure_script_json(build_panel_spec(panel))
+        with open(sidecar, "w") as f:
+            f.write(f'renderPanel("{panel.name}", {figure});\n')
+        if cache is not None:
+            # Only the title is needed to reuse the sidecar
+            cache.put(name, inputs, json.dumps(panel.title))
+            cache.record_output(sidecar)
+        panels.append((name, panel.title))
+
+    tabs = "".join(
+        f'<button data-panel="{name}">{html.escape(title)}</button>'
+        for name, title in panels
+    )
+    pages = "\n".join(
+        f'<div class="panel" id="panel-{name}" data-panel="{name}"></div>'
+        for name, _ in panels
+    )
+    index_path = os.path.join(output_dir, "index.html")
+    with open(index_path, "w", encoding="utf-8") as f:
+        f.write(
+            _PAGED_TEMPLATE.format(
+                plotly_js=PLOTLY_JS,
+                panels_dir=PANELS_DIR,
+                timeframe=html.escape(data.timeframe),
+                tabs=tabs,
+                pages=pages,
+                first=panels[0][0],
+            )
+        )
+    return index_path
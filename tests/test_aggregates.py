@@ -0,0 +1,108 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from pilot_metrics.aggregates import AggregateState, RevisionError, RevisionPolicy
+from pilot_metrics.models import CopilotData
+from pilot_metrics.processing import flatten_copilot_data
+
+TEST_DATA = Path(__file__).parent.parent / "data" / "test_data.json"
+
+
+def _daily_stats():
+    return CopilotData.model_validate(json.loads(TEST_DATA.read_text())).root
+
+
+def _expected_cumulative(daily_stats):
+    completions, _, _ = flatten_copilot_data(daily_stats)
+    return (
+        pd.DataFrame(completions)
+        .groupby(["date", "language"])["total_code_lines_accepted"]
+        .sum()
+        .unstack(fill_value=0)
+        .cumsum()
+    )
+
+
+def test_incremental_apply_matches_full_recompute():
+    """Test that appending days one at a time equals a full cumsum."""
+    daily_stats = _daily_stats()
+    state = AggregateState()
+
+    for daily_stat in daily_stats:
+        result = state.apply([daily_stat])
+        assert result.added == [daily_stat.date]
+
+    expected = _expected_cumulative(daily_stats)
+    for date, row in expected.iterrows():
+        cumulative = state.cumulative_language_lines[date]
+        assert {k: v for k, v in row.items() if v} == {
+            k: v for k, v in cumulative.items() if v
+        }
+    assert state.dates == [stat.date for stat in daily_stats]
+
+
+def test_reapplying_unchanged_days_is_a_no_op():
+    """Test that days already in the state are detected and skipped."""
+    state = AggregateState()
+    state.apply(_daily_stats())
+    before = state.model_dump()
+
+    result = state.apply(_daily_stats())
+
+    assert len(result.unchanged) == 3
+    assert state.model_dump() == before
+
+
+def test_revised_past_day_updates_later_cumulative_sums():
+    """Test that a revision of an old day is propagated forward."""
+    state = AggregateState()
+    state.apply(_daily_stats())
+    last = state.dates[-1]
+    python_before = state.cumulative_language_lines[last]["python"]
+
+    revised = _daily_stats()[0]
+    language = revised.copilot_ide_code_completions.editors[0].models[0].languages[0]
+    assert language.name == "python"
+    language.total_code_lines_accepted += 100
+
+    with pytest.raises(RevisionError):
+        state.apply([revised], policy=RevisionPolicy.ERROR)
+    assert state.apply([revised], policy=RevisionPolicy.KEEP).kept == [revised.date]
+    assert state.cumulative_language_lines[last]["python"] == python_before
+
+    result = state.apply([revised])
+
+    assert result.revised == [revised.date]
+    assert state.cumulative_language_lines[last]["python"] == python_before + 100
+    assert state.dimension_totals["language"]["python"][
+        "total_code_lines_accepted"
+    ] == (python_before + 100)
+
+
+def test_state_round_trips_through_file(tmp_path):
+    """Test that the state can be saved and loaded."""
+    path = tmp_path / "state.json"
+    assert AggregateState.load(str(path)) == AggregateState()
+
+    state = AggregateState()
+    state.apply(_daily_stats())
+    state.save(str(path))
+
+    assert AggregateState.load(str(path)) == state
+
+
+def test_state_file_can_be_compressed(tmp_path):
+    """Test that a .gz state file is written compressed and loaded back."""
+    import gzip
+
+    state = AggregateState()
+    state.apply(_daily_stats())
+    path = tmp_path / "state.json.gz"
+
+    state.save(str(path))
+
+    assert json.loads(gzip.decompress(path.read_bytes()))["daily_totals"]
+    assert AggregateState.load(str(path)) == state
@@ -0,0 +1,88 @@
+import copy
+import json
+from pathlib import Path
+
+import pytest
+
+from pilot_metrics.aggregates import RevisionError, RevisionPolicy
+from pilot_metrics.archive import SnapshotArchive
+from pilot_metrics.filters import MetricsFilter
+from pilot_metrics.models import DailyCopilotStats, Tenant
+
+TEST_DATA = Path(__file__).parent.parent / "data" / "test_data.json"
+
+
+def _raw_records():
+    return json.loads(TEST_DATA.read_text())
+
+
+def test_overlapping_snapshots_are_stored_once(tmp_path):
+    """Test that days repeated across snapshot windows are archived once."""
+    records = _raw_records()
+    archive = SnapshotArchive(str(tmp_path))
+
+    first = archive.ingest(records[:2], source="day-2.json")
+    second = archive.ingest(records, source="day-3.json")
+    archive.save()
+
+    assert first.added == ["2024-01-15", "2024-01-16"]
+    assert second.added == ["2024-01-17"]
+    assert second.unchanged == ["2024-01-15", "2024-01-16"]
+    assert len(list((tmp_path / "objects").rglob("*.json"))) == 3
+
+    reopened = SnapshotArchive(str(tmp_path))
+    assert reopened.records() == records
+    assert reopened.records(filters=MetricsFilter(since="2024-01-16")) == records[1:]
+
+
+def test_only_new_revisions_are_validated(tmp_path, monkeypatch):
+    """Test that days archived with the same content are not validated again."""
+    records = _raw_records()
+    archive = SnapshotArchive(str(tmp_path))
+    archive.ingest(records[:2])
+
+    validated = []
+    validate = DailyCopilotStats.model_validate
+    monkeypatch.setattr(
+        DailyCopilotStats,
+        "model_validate",
+        lambda record: validated.append(record.get("date")) or validate(record),
+    )
+    archive.ingest(records)
+
+    assert validated == ["2024-01-17"]
+    with pytest.raises(ValueError):
+        archive.ingest([{"total_active_users": 1}])
+
+
+def test_revised_day_replaces_archived_record(tmp_path):
+    """Test that a later snapshot's revision of a day becomes current."""
+    records = _raw_records()
+    revised = copy.deepcopy(records[0])
+    revised["total_active_users"] += 1
+    archive = SnapshotArchive(str(tmp_path))
+    tenant = Tenant(org="acme")
+
+    archive.ingest(records, tenant)
+    result = archive.ingest([revised], tenant)
+
+    assert result.revised == ["2024-01-15"]
+    assert archive.records(tenant)[0] == revised
+    assert archive.index.tenants["acme"].days["2024-01-15"].revision == 2
+    assert archive.records(Tenant(org="globex")) == []
+
+
+def test_revision_policies(tmp_path):
+    """Test that KEEP ignores revisions and ERROR rejects them."""
+    records = _raw_records()
+    revised = copy.deepcopy(records[0])
+    revised["total_active_users"] += 1
+    archive = SnapshotArchive(str(tmp_path))
+    archive.ingest(records)
+
+    result = archive.ingest([revised], policy=RevisionPolicy.KEEP)
+    assert result.kept == ["2024-01-15"]
+    assert archive.records()[0] == records[0]
+
+    with pytest.raises(RevisionError):
+        archive.ingest([revised], policy=RevisionPolicy.ERROR)
@@ -0,0 +1,162 @@
+import json
+from concurrent.futures import Future
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from pilot_metrics.bigquery_streaming import (
+    ProtoRowEncoder,
+    StreamingUploadError,
+    StreamMode,
+    stream_rows,
+    stream_to_bigquery,
+)
+from pilot_metrics.bigquery_uploader import COMPLETIONS_SCHEMA
+
+
+class FakeWriter:
+    """Local RowWriter that acknowledges appends only when awaited."""
+
+    def __init__(self, table_id="p.d.t", schema=None, mode=StreamMode.COMMITTED):
+        self.table_id = table_id
+        self.mode = mode
+        self.appends = []
+        self.rows = {}
+        self.pending = 0
+        self.max_pending = 0
+        self.failures = 0
+        self.finalized = False
+        self.committed = False
+
+    def encode(self, row):
+        return json.dumps(row).encode()
+
+    def append(self, rows, offset):
+        self.appends.append((offset, len(rows)))
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        future = MagicMock(spec=Future)
+
+        def result():
+            self.pending -= 1
+            if self.failures:
+                self.failures -= 1
+                raise RuntimeError("transient append failure")
+            # Offsets make resends idempotent
+            for index, row in enumerate(rows):
+                self.rows[offset + index] = row
+
+        future.result.side_effect = result
+        return future
+
+    def finalize(self):
+        self.finalized = True
+
+    def commit(self):
+        self.committed = True
+
+
+def _rows(count):
+    return ({"date": "2024-01-15", "total_chats": index} for index in range(count))
+
+
+def test_stream_rows_batches_by_size_with_offsets():
+    """Test that rows are split into size-capped batches with running offsets."""
+    writer = FakeWriter()
+    row_size = len(writer.encode(next(_rows(1))))
+
+    written = stream_rows(_rows(10), writer, max_batch_bytes=row_size * 3)
+
+    assert written == 10
+    assert writer.appends == [(0, 3), (3, 3), (6, 3), (9, 1)]
+    assert sorted(writer.rows) == list(range(10))
+    assert writer.finalized and writer.committed
+
+
+def test_stream_rows_bounds_in_flight_appends():
+    """Test that no more than max_in_flight appends are unacknowledged."""
+    writer = FakeWriter()
+
+    stream_rows(_rows(50), writer, max_batch_bytes=1, max_in_flight=3)
+
+    assert len(writer.appends) == 50
+    assert writer.max_pending == 3
+    assert writer.pending == 0
+
+
+def test_stream_rows_resends_from_failed_offset():
+    """Test that a failed append is retried in order without duplicating rows."""
+    writer = FakeWriter()
+    writer.failures = 1
+
+    written = stream_rows(_rows(6), writer, max_batch_bytes=1, max_in_flight=2)
+
+    assert written == 6
+    assert [
+        json.loads(row)["total_chats"] for _, row in sorted(writer.rows.items())
+    ] == [
+        0,
+        1,
+        2,
+        3,
+        4,
+        5,
+    ]
+    # The failed batch and the one in flight behind it are sent again
+    assert writer.appends[:4] == [(0, 1), (1, 1), (0, 1), (1, 1)]
+
+
+def test_stream_rows_gives_up_after_retries():
+    """Test that persistent failures raise StreamingUploadError."""
+    writer = FakeWriter()
+    writer.failures = 100
+
+    with pytest.raises(StreamingUploadError, match="offset 0"):
+        stream_rows(_rows(2), writer, max_retries=2)
+
+    assert not writer.committed
+
+
+def test_proto_row_encoder_round_trip():
+    """Test that rows are encoded as proto messages with DATE as epoch days."""
+    from google.protobuf import descriptor_pool, message_factory
+    from google.protobuf.descriptor_pb2 import FileDescriptorProto
+
+    encoder = ProtoRowEncoder(COMPLETIONS_SCHEMA)
+    payload = encoder.encode(
+        {"date": "1970-01-11", "language": "python", "total_code_acceptances": 7}
+    )
+
+    pool = descriptor_pool.DescriptorPool()
+    pool.Add(FileDescriptorProto(name="t.proto", message_type=[encoder.descriptor]))
+    message = message_factory.GetMessageClass(
+        pool.FindMessageTypeByName("CopilotRow")
+    ).FromString(payload)
+    assert message.date == 10
+    assert message.language == "python"
+    assert message.total_code_acceptances == 7
+    assert not message.HasField("editor")
+
+
+def test_stream_to_bigquery_uses_writer_factory():
+    """Test that each non-empty table gets its own write stream."""
+    writers = []
+
+    def factory(table_id, schema, mode):
+        writer = FakeWriter(table_id, schema, mode)
+        writers.append(writer)
+        return writer
+
+    with (
+        patch.dict(
+            "os.environ",
+            {"GCP_PROJECT_ID": "test-project", "BQ_DATASET": "test-dataset"},
+        ),
+        patch("pilot_metrics.bigquery_streaming.bigquery.Client"),
+    ):
+        written = stream_to_bigquery(
+            _rows(5), iter([]), mode=StreamMode.PENDING, writer_factory=factory
+        )
+
+    assert written == {"test-project.test-dataset.code_completions": 5}
+    assert [writer.mode for writer in writers] == [StreamMode.PENDING]
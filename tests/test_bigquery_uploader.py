@@ -188,3 +188,156 @@ def test_upload_to_bigquery_empty_data():
 
         # Verify no data upload was attempted for empty data
         mock_client.load_table_from_json.assert_not_called()
+
+
+def test_upload_to_bigquery_adds_tenant_columns_to_existing_tables():
+    """Test that tables created before tenant columns existed are migrated."""
+    from google.cloud import bigquery
+
+    mock_client = MagicMock()
+    old_table = MagicMock()
+    old_table.schema = [bigquery.SchemaField("date", "DATE")]
+
+    with (
+        patch.dict(
+            "os.environ",
+            {"GCP_PROJECT_ID": "test-project", "BQ_DATASET": "test-dataset"},
+        ),
+        patch(
+            "pilot_metrics.bigquery_uploader.bigquery.Client", return_value=mock_client
+        ),
+    ):
+        mock_client.get_table.return_value = old_table
+
+        upload_to_bigquery([], [])
+
+    assert mock_client.update_table.call_count == 2
+    column_names = [field.name for field in old_table.schema]
+    assert {"enterprise", "org", "team"} <= set(column_names)
+
+
+def test_upload_to_bigquery_loads_summary_tables():
+    """Test that summary tables are created and loaded next to the leaf tables."""
+    from pilot_metrics.processing import SummaryTables
+
+    mock_client = MagicMock()
+    summaries = SummaryTables(
+        daily=[{"date": "2024-01-15", "total_active_users": 5}],
+        languages=[{"date": "2024-01-15", "language": "python"}],
+        editors=[],
+        models=[],
+    )
+
+    with (
+        patch.dict(
+            "os.environ",
+            {"GCP_PROJECT_ID": "test-project", "BQ_DATASET": "test-dataset"},
+        ),
+        patch(
+            "pilot_metrics.bigquery_uploader.bigquery.Client", return_value=mock_client
+        ),
+    ):
+        upload_to_bigquery([], [], summaries)
+
+    assert mock_client.get_table.call_count == 6
+    loaded = [call.args[1] for call in mock_client.load_table_from_json.call_args_list]
+    assert loaded == [
+        "test-project.test-dataset.daily_totals",
+        "test-project.test-dataset.language_totals",
+    ]
+
+
+@pytest.mark.parametrize("resumable", [False, True])
+def test_upload_tables_against_fake_bigquery(resumable):
+    """Test a real client uploading to the in-process fake BigQuery."""
+    from pilot_metrics.bigquery_fake import FakeBigQuery
+    from pilot_metrics.bigquery_uploader import upload_tables
+
+    rows = [
+        {"date": "2024-01-15", "editor": "vscode", "total_code_acceptances": n}
+        for n in range(3)
+    ]
+
+    with (
+        FakeBigQuery() as fake,
+        # Payloads at least this large go through a resumable upload
+        patch(
+            "google.cloud.bigquery.client._MAX_MULTIPART_SIZE",
+            0 if resumable else 5 * 1024 * 1024,
+        ),
+    ):
+        upload_tables(
+            fake.client("proj"), "proj.ds", {"code_completions": rows, "chats": []}
+        )
+
+    assert set(fake.datasets) == {"proj.ds"}
+    assert set(fake.tables) == {"proj.ds.code_completions", "proj.ds.chats"}
+    (load,) = fake.loads
+    assert load.table_id == "proj.ds.code_completions"
+    assert load.rows == 3
+    assert load.payload_bytes > 0
+    assert fake.rows("proj.ds.code_completions") == rows
+
+
+def test_fake_bigquery_never_reuses_upload_ids():
+    """Test that interleaved resumable uploads each load into their own table."""
+    import json
+    import urllib.request
+
+    from pilot_metrics.bigquery_fake import FakeBigQuery
+
+    def start(fake, table):
+        metadata = {
+            "jobReference": {"projectId": "proj", "jobId": table},
+            "configuration": {
+                "load": {
+                    "destinationTable": {
+                        "projectId": "proj",
+                        "datasetId": "ds",
+                        "tableId": table,
+                    }
+                }
+            },
+        }
+        request = urllib.request.Request(
+            f"{fake.url}/upload/bigquery/v2/projects/proj/jobs?uploadType=resumable",
+            data=json.dumps(metadata).encode(),
+            method="POST",
+        )
+        with urllib.request.urlopen(request) as response:
+            return response.headers["Location"]
+
+    def finish(location, row):
+        payload = json.dumps(row).encode() + b"\n"
+        request = urllib.request.Request(
+            location,
+            data=payload,
+            method="PUT",
+            headers={"Content-Range": f"bytes 0-{len(payload) - 1}/{len(payload)}"},
+        )
+        urllib.request.urlopen(request).close()
+
+    with FakeBigQuery() as fake:
+        upload_a = start(fake, "a")
+        upload_b = start(fake, "b")
+        finish(upload_a, {"table": "a"})
+        upload_c = start(fake, "c")
+        finish(upload_b, {"table": "b"})
+        finish(upload_c, {"table": "c"})
+
+    assert len({upload_a, upload_b, upload_c}) == 3
+    for table in ("a", "b", "c"):
+        assert fake.rows(f"proj.ds.{table}") == [{"table": table}]
+
+
+def test_fake_bigquery_requires_start():
+    """Test that the fake's URL needs a running server and stop is idempotent."""
+    from pilot_metrics.bigquery_fake import FakeBigQuery
+
+    fake = FakeBigQuery()
+    with pytest.raises(RuntimeError, match="not started"):
+        _ = fake.url
+    fake.stop()
+    with fake:
+        assert fake.url.startswith("http://127.0.0.1:")
+    fake.stop()
@@ -0,0 +1,72 @@
+import pandas as pd
+
+from pilot_metrics.cardinality import OTHER, CardinalityLimits, fold_columns
+from pilot_metrics.visualizer import aggregate_dashboard_data
+
+
+def _completion_rows(lines_by_language: dict[str, int], days: int = 3) -> list[dict]:
+    return [
+        {
+            "date": f"2024-01-{day:02d}",
+            "editor": "vscode" if index % 2 else "jetbrains",
+            "language": language,
+            "total_engaged_users": 1,
+            "total_code_acceptances": lines,
+            "total_code_suggestions": 2 * lines,
+            "total_code_lines_accepted": lines,
+            "total_code_lines_suggested": 2 * lines,
+        }
+        for day in range(1, days + 1)
+        for index, (language, lines) in enumerate(lines_by_language.items())
+    ]
+
+
+def test_fold_keeps_the_top_values_by_metric():
+    """Test that values beyond the limit become Other and ties keep name order."""
+    df = pd.DataFrame(
+        {
+            "language": ["go", "rust", "python", "c", "go"],
+            "total_code_lines_accepted": [1, 3, 5, 3, 1],
+        }
+    )
+    limits = CardinalityLimits(language=2)
+
+    assert limits.kept(df, "language") == {"python", "c"}
+    assert limits.fold(df, "language")["language"].tolist() == [
+        OTHER,
+        OTHER,
+        "python",
+        "c",
+        OTHER,
+    ]
+    # Within the limit, or without one, nothing is folded
+    assert CardinalityLimits(language=4).fold(df, "language") is df
+    assert CardinalityLimits().fold(df, "language") is df
+
+
+def test_fold_columns_sums_the_rest_into_a_last_column():
+    """Test that a wide frame keeps its top columns and sums the others."""
+    frame = pd.DataFrame({"c": [1, 2], "go": [3, 4], "python": [5, 6]})
+
+    folded = fold_columns(frame, frozenset({"python"}))
+
+    assert folded.columns.tolist() == ["python", OTHER]
+    assert folded[OTHER].tolist() == [4, 6]
+
+
+def test_dashboard_series_are_folded_before_charting():
+    """Test that every language and editor chart draws at most its limit + Other."""
+    rows = _completion_rows({f"lang-{i}": 10 - i for i in range(8)}, days=14)
+
+    data = aggregate_dashboard_data(
+        rows, [], [], limits=CardinalityLimits(language=3, editor=1)
+    )
+
+    expected = ["lang-0", "lang-1", "lang-2", OTHER]
+    assert data.cumulative_lines.columns.tolist() == expected
+    assert data.language_acceptances.columns.tolist() == expected
+    assert data.language_rates["language"].tolist() == sorted(expected)
+    assert data.cumulative_lines[OTHER].iloc[-1] == 14 * sum(range(3, 8))
+    assert data.editor_lines["editor"].tolist() == [OTHER, "jetbrains"]
+    languages = data.trends.loc[data.trends["dimension"] == "language", "value"]
+    assert set(languages) == set(expected)
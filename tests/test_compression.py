@@ -0,0 +1,53 @@
+import gzip
+import json
+
+import pytest
+
+from pilot_metrics.compression import Codec, open_output, sniff_codec
+from pilot_metrics.jsonio import loads, read_input
+
+RECORDS = [{"date": "2024-01-15", "total_active_users": 3}]
+
+
+@pytest.mark.parametrize(
+    ("suffix", "codec"),
+    [(".gz", Codec.GZIP), (".zst", Codec.ZSTD), (".bz2", Codec.BZ2)],
+)
+def test_compressed_files_round_trip(tmp_path, suffix, codec):
+    """Test that outputs are compressed by suffix and read back transparently."""
+    if codec == Codec.ZSTD:
+        pytest.importorskip("zstandard")
+    path = tmp_path / f"records.json{suffix}"
+    with open_output(str(path)) as f:
+        f.write(json.dumps(RECORDS).encode())
+
+    assert sniff_codec(path.read_bytes()[:4]) == codec
+    with read_input(str(path)) as content:
+        assert loads(content) == RECORDS
+
+    # Without the suffix the codec is recognized by its magic bytes
+    renamed = path.rename(tmp_path / "records.json")
+    with read_input(str(renamed), mmap_threshold=1) as content:
+        assert loads(content) == RECORDS
+
+
+def test_plain_files_are_not_decompressed(tmp_path):
+    """Test that uncompressed input is passed through untouched."""
+    path = tmp_path / "records.json"
+    path.write_text(json.dumps(RECORDS))
+
+    assert sniff_codec(path.read_bytes()[:4]) == Codec.NONE
+    with read_input(str(path)) as content:
+        assert loads(content) == RECORDS
+
+
+def test_compressed_stdin(monkeypatch):
+    """Test that compressed stdin is recognized by its magic bytes."""
+    import io
+    import sys
+
+    stdin = io.TextIOWrapper(io.BytesIO(gzip.compress(json.dumps(RECORDS).encode())))
+    monkeypatch.setattr(sys, "stdin", stdin)
+
+    with read_input("-") as content:
+        assert loads(content) == RECORDS
@@ -0,0 +1,104 @@
+from datetime import date
+
+import numpy as np
+import pytest
+
+from pilot_metrics.dates import DateIndex, scan_days, select_days, sort_days
+from pilot_metrics.filters import MetricsFilter
+from pilot_metrics.models import DailyCopilotStats
+
+
+def _stats(*days: str) -> list[DailyCopilotStats]:
+    return [
+        DailyCopilotStats.model_validate(
+            {
+                "date": day,
+                "total_active_users": 1,
+                "total_engaged_users": 1,
+                "copilot_ide_code_completions": {"languages": []},
+                "copilot_ide_chat": {},
+                "copilot_dotcom_chat": {},
+                "copilot_dotcom_pull_requests": {},
+            }
+        )
+        for day in days
+    ]
+
+
+def test_scan_days_finds_out_of_order_and_duplicate_days():
+    """Test that one pass reports both kinds of ordering problem."""
+    scan = scan_days(_stats("2024-01-01", "2024-01-03", "2024-01-02", "2024-01-03"))
+
+    assert scan.out_of_order == ["2024-01-02"]
+    assert scan.duplicates == ["2024-01-03"]
+
+
+def test_sort_days_only_sorts_when_needed():
+    """Test that sorted records come back as the same list."""
+    in_order = _stats("2024-01-01", "2024-01-02")
+    assert sort_days(in_order)[0] is in_order
+
+    shuffled, scan = sort_days(_stats("2024-01-02", "2024-01-01"))
+    assert [daily_stat.date for daily_stat in shuffled] == ["2024-01-01", "2024-01-02"]
+    assert scan.out_of_order == ["2024-01-01"]
+
+
+def test_date_index_slices_sorted_rows():
+    """Test that ranges over rows in date order are contiguous slices."""
+    rows = [
+        {"date": day, "n": i}
+        for i, day in enumerate(
+            ["2024-01-01", "2024-01-01", "2024-01-02", "2024-01-04"]
+        )
+    ]
+    index = DateIndex.from_rows(rows)
+
+    assert index.order is None
+    assert index.offsets.tolist() == [0, 2, 3, 4]
+    assert index.positions(date(2024, 1, 2), date(2024, 1, 3)) == slice(2, 3)
+    assert index.positions(date(2024, 1, 5)) == slice(4, 4)
+    assert [row["n"] for row in index.take(rows, until=date(2024, 1, 1))] == [0, 1]
+
+
+def test_date_index_orders_unsorted_rows():
+    """Test that unsorted rows are reached through their stable sort order."""
+    rows = [
+        {"date": day, "n": i}
+        for i, day in enumerate(
+            ["2024-01-03", "2024-01-01", "2024-01-03", "2024-01-02"]
+        )
+    ]
+    index = DateIndex.from_rows(rows)
+
+    assert [row["n"] for row in index.take(rows, since=date(2024, 1, 2))] == [3, 0, 2]
+    assert [
+        (day.isoformat(), list(positions)) for day, positions in index.groups()
+    ] == [
+        ("2024-01-01", [1]),
+        ("2024-01-02", [3]),
+        ("2024-01-03", [0, 2]),
+    ]
+    assert index.datetimes()[0] == np.datetime64("2024-01-03")
+
+
+def test_select_days_applies_the_filter_range():
+    """Test that a filter's date range selects records in date order."""
+    daily_stats = _stats("2024-01-03", "2024-01-01", "2024-01-02")
+
+    selected = select_days(daily_stats, MetricsFilter(since="2024-01-02"))
+
+    assert [daily_stat.date for daily_stat in selected] == ["2024-01-02", "2024-01-03"]
+    assert select_days(daily_stats, MetricsFilter()) is daily_stats
+
+
+def test_select_days_uses_a_given_index(monkeypatch):
+    """Test that records indexed when loaded are not indexed again."""
+    daily_stats = _stats("2024-01-03", "2024-01-01", "2024-01-02")
+    index = DateIndex.from_daily_stats(daily_stats)
+    monkeypatch.setattr(
+        DateIndex, "from_daily_stats", lambda _: pytest.fail("indexed again")
+    )
+
+    selected = select_days(daily_stats, MetricsFilter(until="2024-01-02"), index)
+
+    assert [daily_stat.date for daily_stat in selected] == ["2024-01-01", "2024-01-02"]
@@ -0,0 +1,144 @@
+import os
+
+import pandas as pd
+import pytest
+
+from pilot_metrics.export import ExportFormat, export_tables, partition_path
+
+
+def _completion(date: str, org: str | None = None, language: str = "python") -> dict:
+    return {
+        "date": date,
+        "enterprise": None,
+        "org": org,
+        "team": None,
+        "editor": "vscode",
+        "model": "default",
+        "is_custom_model": False,
+        "language": language,
+        "total_engaged_users": 1,
+        "total_code_acceptances": 2,
+        "total_code_suggestions": 3,
+        "total_code_lines_accepted": 4,
+        "total_code_lines_suggested": 5,
+    }
+
+
+def test_partition_path_escapes_org():
+    """Test Hive partition folders, with unsafe and missing org values."""
+    assert partition_path("2024-01-15") == "date=2024-01-15"
+    assert partition_path("2024-01-15", "a/b", by_org=True) == (
+        "org=a%2Fb/date=2024-01-15"
+    )
+    assert partition_path("2024-01-15", None, by_org=True) == (
+        "org=__HIVE_DEFAULT_PARTITION__/date=2024-01-15"
+    )
+
+
+def test_export_parquet_is_readable_as_hive_dataset(tmp_path):
+    """Test that Parquet partitions read back with dictionary-encoded columns."""
+    ds = pytest.importorskip("pyarrow.dataset")
+    pa = pytest.importorskip("pyarrow")
+    rows = [
+        _completion("2024-01-15", "acme", "python"),
+        _completion("2024-01-15", "acme", "go"),
+        _completion("2024-01-16", "globex", "python"),
+    ]
+
+    result = export_tables(
+        {"code_completions": rows}, str(tmp_path), by_org=True, row_group_rows=1
+    )
+
+    assert result.rows == {"code_completions": 3}
+    assert len(result.files) == 2
+    dataset = ds.dataset(
+        tmp_path / "code_completions", format="parquet", partitioning="hive"
+    )
+    table = dataset.to_table(filter=ds.field("date") == "2024-01-15")
+    assert sorted(table.column("language").to_pylist()) == ["go", "python"]
+    assert table.column("org").to_pylist() == ["acme", "acme"]
+    assert pa.types.is_dictionary(dataset.schema.field("editor").type)
+
+    # One row per row group
+    (fragment,) = dataset.get_fragments(filter=ds.field("date") == "2024-01-15")
+    assert fragment.metadata.num_row_groups == 2
+
+
+def test_export_is_append_only(tmp_path):
+    """Test that a second export only writes days not exported before."""
+    pytest.importorskip("pyarrow")
+    first = export_tables(
+        {"code_completions": [_completion("2024-01-15")]}, str(tmp_path)
+    )
+
+    result = export_tables(
+        {"code_completions": [_completion("2024-01-15"), _completion("2024-01-16")]},
+        str(tmp_path),
+    )
+
+    assert result.skipped == [os.path.relpath(first.files[0], tmp_path)]
+    assert result.rows == {"code_completions": 1}
+    assert len(list(tmp_path.glob("code_completions/date=*/*.parquet"))) == 2
+
+
+def test_export_keys_files_by_tenant_and_content(tmp_path):
+    """Test that other tenants are appended and revised days replaced."""
+    export_tables(
+        {"code_completions": [_completion("2024-01-15", "acme")]},
+        str(tmp_path),
+        ExportFormat.CSV,
+    )
+
+    # A second tenant's rows of the same day, without --partition-by-org
+    added = export_tables(
+        {"code_completions": [_completion("2024-01-15", "globex")]},
+        str(tmp_path),
+        ExportFormat.CSV,
+    )
+    # acme revises the day
+    revised = export_tables(
+        {"code_completions": [_completion("2024-01-15", "acme", language="go")]},
+        str(tmp_path),
+        ExportFormat.CSV,
+    )
+
+    assert added.rows == revised.rows == {"code_completions": 1}
+    assert len(revised.replaced) == 1
+    day = tmp_path / "code_completions" / "date=2024-01-15"
+    rows = pd.concat(pd.read_csv(path) for path in day.glob("*.csv"))
+    assert sorted(zip(rows["org"], rows["language"], strict=True)) == [
+        ("acme", "go"),
+        ("globex", "python"),
+    ]
+
+
+def test_export_leaves_unkeyed_partitions_alone(tmp_path):
+    """Test that partitions with files of an unknown tenant are not written."""
+    day = tmp_path / "code_completions" / "date=2024-01-15"
+    day.mkdir(parents=True)
+    (day / "part-0123.csv").write_text("org\nacme\n")
+
+    result = export_tables(
+        {"code_completions": [_completion("2024-01-15", "globex")]},
+        str(tmp_path),
+        ExportFormat.CSV,
+    )
+
+    assert result.unkeyed == ["code_completions/date=2024-01-15"]
+    assert result.rows == {}
+    assert [path.name for path in day.iterdir()] == ["part-0123.csv"]
+
+
+def test_export_csv_drops_partition_columns(tmp_path):
+    """Test CSV export, with the date kept in the path only."""
+    result = export_tables(
+        {"code_completions": [_completion("2024-01-15")]},
+        str(tmp_path),
+        ExportFormat.CSV,
+    )
+
+    (path,) = result.files
+    assert "date=2024-01-15" in path
+    df = pd.read_csv(path)
+    assert "date" not in df.columns
+    assert df["total_code_lines_accepted"].tolist() == [4]
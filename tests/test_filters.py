@@ -0,0 +1,95 @@
+from datetime import date
+
+from pilot_metrics.filters import MetricsFilter, filter_raw_records
+
+
+def _raw_record(day: str) -> dict:
+    return {
+        "date": day,
+        "total_active_users": 10,
+        "total_engaged_users": 8,
+        "copilot_ide_code_completions": {
+            "total_engaged_users": 6,
+            "editors": [
+                {
+                    "name": "vscode",
+                    "total_engaged_users": 4,
+                    "models": [
+                        {
+                            "name": "default",
+                            "is_custom_model": False,
+                            "total_engaged_users": 4,
+                            "languages": [
+                                {"name": "python", "total_code_acceptances": 5},
+                                {"name": "go", "total_code_acceptances": 3},
+                            ],
+                        }
+                    ],
+                },
+                {
+                    "name": "jetbrains",
+                    "total_engaged_users": 2,
+                    "models": [
+                        {
+                            "name": "default",
+                            "is_custom_model": False,
+                            "languages": [{"name": "python"}],
+                        }
+                    ],
+                },
+            ],
+            "languages": [],
+        },
+        "copilot_ide_chat": {
+            "total_engaged_users": 3,
+            "editors": [
+                {
+                    "name": "jetbrains",
+                    "models": [
+                        {"name": "default", "is_custom_model": False, "total_chats": 1}
+                    ],
+                }
+            ],
+        },
+        "copilot_dotcom_chat": {
+            "total_engaged_users": 1,
+            "models": [{"name": "default", "is_custom_model": False}],
+        },
+        "copilot_dotcom_pull_requests": {"total_engaged_users": 0, "repositories": []},
+    }
+
+
+def test_empty_filter_returns_records_unchanged():
+    """Test that an empty filter is a no-op."""
+    records = [_raw_record("2024-01-15")]
+    assert MetricsFilter().is_empty
+    assert filter_raw_records(records, MetricsFilter()) is records
+
+
+def test_date_range_is_inclusive():
+    """Test that since/until keep boundary days and drop the rest."""
+    records = [_raw_record(f"2024-01-{day}") for day in ("14", "15", "16", "17")]
+    filters = MetricsFilter(since=date(2024, 1, 15), until=date(2024, 1, 16))
+
+    selected = filter_raw_records(records, filters)
+
+    assert [record["date"] for record in selected] == ["2024-01-15", "2024-01-16"]
+
+
+def test_dimension_filters_prune_nested_lists():
+    """Test that non-matching editors and languages are removed."""
+    filters = MetricsFilter(
+        editors=frozenset({"vscode"}), languages=frozenset({"python"})
+    )
+    record = _raw_record("2024-01-15")
+
+    (pruned,) = filter_raw_records([record], filters)
+
+    editors = pruned["copilot_ide_code_completions"]["editors"]
+    assert [editor["name"] for editor in editors] == ["vscode"]
+    assert [lang["name"] for lang in editors[0]["models"][0]["languages"]] == ["python"]
+    assert pruned["copilot_ide_chat"]["editors"] == []
+    # Dotcom chat has no editor, so the editor filter does not apply to it
+    assert len(pruned["copilot_dotcom_chat"]["models"]) == 1
+    # The input record is not mutated
+    assert len(record["copilot_ide_code_completions"]["editors"]) == 2
@@ -0,0 +1,46 @@
+import json
+
+from pilot_metrics.instrumentation import record_timings, stage
+
+
+def test_stage_outside_recording_is_not_collected():
+    """Test that stages are no-ops unless timings are being recorded."""
+    with stage("parse") as timing:
+        timing.items = 10
+
+    with record_timings() as timings:
+        pass
+
+    assert timing.wall_seconds == 0.0
+    assert timings.stages == []
+
+
+def test_record_timings_collects_stages_in_order():
+    """Test that stages record wall time, counts and peak memory."""
+    with record_timings(trace_memory=True) as timings:
+        with stage("parse", "bytes") as timing:
+            timing.bytes_read = timing.items = 1024
+        with stage("flatten", "rows") as timing:
+            rows = [{"value": index} for index in range(10_000)]
+            timing.items = len(rows)
+
+    assert [s.name for s in timings.stages] == ["parse", "flatten"]
+    flatten = timings.stages[1]
+    assert flatten.wall_seconds > 0
+    assert flatten.items_per_second > 0
+    assert flatten.peak_memory_bytes > 100_000
+
+
+def test_timings_report_is_saved_as_json(tmp_path):
+    """Test the JSON report and the rendered table."""
+    with record_timings() as timings, stage("validate", "records") as timing:
+        timing.items = 3
+
+    path = tmp_path / "timings.json"
+    timings.save(str(path))
+    report = json.loads(path.read_text())
+
+    assert report["stages"][0]["name"] == "validate"
+    assert report["stages"][0]["items"] == 3
+    assert report["total_seconds"] >= 0
+    assert timings.table().row_count == 1
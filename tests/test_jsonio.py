@@ -0,0 +1,100 @@
+import gzip
+import io
+import json
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pilot_metrics import jsonio
+from pilot_metrics.jsonio import (
+    JsonBackend,
+    dumps,
+    iter_array,
+    iter_records,
+    loads,
+    read_input,
+    resolve_backend,
+)
+
+RECORDS = [{"date": "2024-01-15", "total_active_users": 3}]
+
+
+@pytest.mark.parametrize("backend", [JsonBackend.AUTO, JsonBackend.STDLIB])
+def test_loads_accepts_bytes_views_and_text(backend):
+    """Test that every input type parses the same with each backend."""
+    raw = json.dumps(RECORDS).encode()
+
+    assert loads(raw, backend) == RECORDS
+    assert loads(memoryview(raw), backend) == RECORDS
+    assert loads(raw.decode(), backend) == RECORDS
+    with pytest.raises(json.JSONDecodeError):
+        loads(b"invalid json", backend)
+
+
+@pytest.mark.parametrize("backend", [JsonBackend.AUTO, JsonBackend.STDLIB])
+def test_dumps_writes_arrays_and_series(backend):
+    """Test that numpy and pandas values are written the same by each backend."""
+    dates = pd.Series(pd.to_datetime(["2024-01-01", "2024-01-02"]))
+    value = {
+        "x": dates.to_numpy(),
+        "y": np.array([1.5, np.nan]),
+        "n": np.arange(2),
+        "text": pd.Series(["a", "b"]),
+        "total": np.int64(3),
+    }
+
+    assert json.loads(dumps(value, backend)) == {
+        "x": ["2024-01-01T00:00:00", "2024-01-02T00:00:00"],
+        "y": [1.5, None],
+        "n": [0, 1],
+        "text": ["a", "b"],
+        "total": 3,
+    }
+
+
+def test_orjson_backend_requires_orjson(monkeypatch):
+    """Test that AUTO falls back to the stdlib when orjson is missing."""
+    monkeypatch.setattr(jsonio, "_has_orjson", lambda: False)
+    monkeypatch.setitem(sys.modules, "orjson", None)
+
+    assert resolve_backend() == JsonBackend.STDLIB
+    with pytest.raises(ImportError, match="pilot-metrics\\[fast\\]"):
+        resolve_backend(JsonBackend.ORJSON)
+
+
+@pytest.mark.parametrize("threshold", [None, 1])
+def test_read_input_reads_or_maps_files(tmp_path, threshold):
+    """Test that small files are read and large ones memory-mapped."""
+    path = tmp_path / "records.json"
+    path.write_text(json.dumps(RECORDS))
+
+    with read_input(str(path), threshold) as content:
+        assert isinstance(content, bytes if threshold is None else memoryview)
+        assert loads(content) == RECORDS
+
+
+@pytest.mark.parametrize("block_size", [1, 7, 1024])
+def test_iter_array_streams_elements_across_blocks(block_size):
+    """Test that elements split across any block boundary are parsed whole."""
+    values = [*RECORDS, 12345, -0.5, "caf\u00e9", [], {"nested": [1, {"a": None}]}]
+    data = json.dumps(values, indent=2, ensure_ascii=False).encode()
+
+    assert list(iter_array(io.BytesIO(data), block_size)) == values
+    assert list(iter_array(io.BytesIO(b" [ ] "), block_size)) == []
+
+
+@pytest.mark.parametrize("data", [b"", b'{"date": 1}', b"[1,]", b"[1 2]", b"[1"])
+def test_iter_array_rejects_other_json(data):
+    """Test that only a well-formed top-level array is accepted."""
+    with pytest.raises(json.JSONDecodeError):
+        list(iter_array(io.BytesIO(data), 2))
+
+
+def test_iter_records_decompresses_files(tmp_path):
+    """Test that compressed files are streamed like plain ones."""
+    path = tmp_path / "records.json.gz"
+    path.write_bytes(gzip.compress(json.dumps(RECORDS).encode()))
+
+    assert list(iter_records(str(path))) == RECORDS
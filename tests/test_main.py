@@ -1,15 +1,18 @@
 import json
 import os
 import tempfile
-from unittest.mock import MagicMock, mock_open, patch
+from pathlib import Path
+from unittest.mock import MagicMock, patch
 
 import pytest
 from typer.testing import CliRunner
 
 from pilot_metrics.main import app, load_data
 
+TEST_DATA = str(Path(__file__).parent.parent / "data" / "test_data.json")
 
-def test_load_data_from_file():
+
+def test_load_data_from_file(tmp_path):
     """Test loading data from a file."""
     sample_data = [
         {
@@ -30,17 +33,15 @@ def test_load_data_from_file():
         }
     ]
 
-    mock_file_content = json.dumps(sample_data)
+    test_file = tmp_path / "test_file.json"
+    test_file.write_text(json.dumps(sample_data))
 
-    with (
-        patch("builtins.open", mock_open(read_data=mock_file_content)),
-        patch("pilot_metrics.main.console.print") as mock_print,
-    ):
-        result = load_data("test_file.json")
+    with patch("pilot_metrics.main.console.print") as mock_print:
+        result = load_data(str(test_file))
 
         assert len(result) == 1
         assert result[0].date == "2024-01-15"
-        mock_print.assert_any_call("[cyan]Reading data from 'test_file.json'...[/cyan]")
+        mock_print.assert_any_call(f"[cyan]Reading data from '{test_file}'...[/cyan]")
 
 
 def test_load_data_from_stdin():
@@ -65,7 +66,7 @@ def test_load_data_from_stdin():
     ]
 
     mock_stdin = MagicMock()
-    mock_stdin.read.return_value = json.dumps(sample_data)
+    mock_stdin.buffer.read.return_value = json.dumps(sample_data).encode()
 
     with (
         patch("sys.stdin", mock_stdin),
@@ -95,20 +96,26 @@ def test_load_data_file_not_found():
         )
 
 
-def test_load_data_invalid_json():
-    """Test handling of invalid JSON."""
+@pytest.mark.parametrize("filtered", [False, True])
+def test_load_data_invalid_json(tmp_path, filtered):
+    """Test handling of invalid JSON on both parsing paths."""
     from click.exceptions import Exit
 
+    from pilot_metrics.filters import MetricsFilter
+
+    invalid_file = tmp_path / "invalid.json"
+    invalid_file.write_text("invalid json")
+    filters = MetricsFilter(editors=frozenset({"vscode"})) if filtered else None
+
     with (
-        patch("builtins.open", mock_open(read_data="invalid json")),
         patch("pilot_metrics.main.console.print") as mock_print,
         pytest.raises(Exit),
     ):
-        load_data("invalid.json")
+        load_data(str(invalid_file), filters)
 
-        mock_print.assert_any_call(
-            "[bold red]Error: Invalid JSON data provided.[/bold red]"
-        )
+    mock_print.assert_any_call(
+        "[bold red]Error: Invalid JSON data provided.[/bold red]"
+    )
 
 
 def test_visualize_command():
@@ -217,6 +224,185 @@ def test_upload_to_bq_command():
         os.unlink(temp_file)
 
 
+def test_upload_to_bq_pipelined_reads_manifest_sources(tmp_path):
+    """Test that --pipelined hands every manifest tenant's input to the pipeline."""
+    for org in ("a", "b"):
+        (tmp_path / f"{org}.json").write_text(json.dumps([{"date": "2024-01-15"}]))
+    manifest = tmp_path / "tenants.json"
+    manifest.write_text(
+        json.dumps([{"org": "a", "path": "a.json"}, {"org": "b", "path": "b.json"}])
+    )
+    runner = CliRunner()
+
+    with patch(
+        "pilot_metrics.main.upload_pipelined",
+        return_value={"p.d.code_completions": 3},
+    ) as mock_upload:
+        result = runner.invoke(
+            app, ["upload-to-bq", "--tenants", str(manifest), "--pipelined"]
+        )
+
+    assert result.exit_code == 0
+    assert "3 rows loaded" in result.stdout
+    sources = mock_upload.call_args[0][0]
+    assert [tenant.org for tenant, _ in sources] == ["a", "b"]
+    assert list(sources[0][1]()) == [{"date": "2024-01-15"}]
+
+
+def test_upload_to_bq_pipelined_rejects_stream_sink():
+    """Test that --pipelined cannot be combined with the streaming sink."""
+    runner = CliRunner()
+    result = runner.invoke(
+        app, ["upload-to-bq", TEST_DATA, "--pipelined", "--sink", "stream"]
+    )
+
+    assert result.exit_code == 1
+    assert "--pipelined only supports --sink load" in result.stdout
+
+
+def test_visualize_command_with_filters():
+    """Test that visualize filters records before flattening."""
+    runner = CliRunner()
+
+    with patch("pilot_metrics.main.create_dashboard") as mock_viz:
+        result = runner.invoke(
+            app,
+            [
+                "visualize",
+                TEST_DATA,
+                "--since",
+                "2024-01-16",
+                "--editor",
+                "vscode",
+                "--language",
+                "python",
+            ],
+        )
+
+        assert result.exit_code == 0
+        assert "Successfully parsed 2 daily records" in result.stdout
+        completions = mock_viz.call_args[0][0]
+        assert {(c["editor"], c["language"]) for c in completions} == {
+            ("vscode", "python")
+        }
+        assert min(c["date"] for c in completions) == "2024-01-16"
+        # Summary tables cannot honour dimension filters
+        assert mock_viz.call_args[0][4] is None
+
+
+def test_visualize_command_with_tenant_manifest(tmp_path):
+    """Test that a tenant manifest loads every tenant into one dashboard."""
+    runner = CliRunner()
+    manifest = tmp_path / "tenants.json"
+    manifest.write_text(
+        json.dumps(
+            [
+                {"org": "acme", "path": TEST_DATA},
+                {"org": "globex", "team": "labs", "path": TEST_DATA},
+            ]
+        )
+    )
+
+    with patch("pilot_metrics.main.create_dashboard") as mock_viz:
+        result = runner.invoke(app, ["visualize", "--tenants", str(manifest)])
+
+    assert result.exit_code == 0
+    daily_totals = mock_viz.call_args[0][4].daily
+    assert {(d["org"], d["team"]) for d in daily_totals} == {
+        ("acme", None),
+        ("globex", "labs"),
+    }
+
+
+def test_visualize_command_updates_state_file(tmp_path):
+    """Test that --state-file is created, updated and passed to the dashboard."""
+    runner = CliRunner()
+    state_file = tmp_path / "state.json"
+
+    with patch("pilot_metrics.main.create_dashboard") as mock_viz:
+        first = runner.invoke(
+            app, ["visualize", TEST_DATA, "--state-file", str(state_file)]
+        )
+        second = runner.invoke(
+            app, ["visualize", TEST_DATA, "--state-file", str(state_file)]
+        )
+
+    assert first.exit_code == 0
+    assert "3 days added" in first.stdout
+    assert "0 days added, 0 revised, 3 unchanged" in second.stdout
+    aggregates = mock_viz.call_args[0][3]
+    assert aggregates.dates == ["2024-01-15", "2024-01-16", "2024-01-17"]
+
+
+def test_archive_command_feeds_visualize(tmp_path):
+    """Test that archived snapshots are de-duplicated before visualizing."""
+    runner = CliRunner()
+    records = json.loads(Path(TEST_DATA).read_text())
+    older = tmp_path / "older.json"
+    older.write_text(json.dumps(records[:2]))
+    archive_dir = tmp_path / "archive"
+
+    result = runner.invoke(
+        app, ["archive", str(archive_dir), str(older), TEST_DATA, "--org", "acme"]
+    )
+
+    assert result.exit_code == 0
+    assert "3 days added, 0 revised, 2 unchanged" in result.stdout
+
+    with patch("pilot_metrics.main.create_dashboard") as mock_viz:
+        result = runner.invoke(app, ["visualize", "--archive", str(archive_dir)])
+
+    assert result.exit_code == 0
+    assert "Successfully parsed 3 daily records" in result.stdout
+    daily_totals = mock_viz.call_args[0][4].daily
+    assert [(d["org"], d["date"]) for d in daily_totals] == [
+        ("acme", "2024-01-15"),
+        ("acme", "2024-01-16"),
+        ("acme", "2024-01-17"),
+    ]
+
+
+def test_trends_command_exports_csv(tmp_path):
+    """Test that the trends command writes the long trend table."""
+    import pandas as pd
+
+    runner = CliRunner()
+    output = tmp_path / "trends.csv.gz"
+
+    result = runner.invoke(app, ["trends", TEST_DATA, "--output", str(output)])
+
+    assert result.exit_code == 0
+    table = pd.read_csv(output)
+    assert set(table["dimension"]) == {"all", "language", "editor"}
+    assert {"acceptance_rate_28d", "active_users_avg_7d"} <= set(table.columns)
+
+
+def test_timings_and_profile_options(tmp_path):
+    """Test that --timings and --profile write their reports."""
+    runner = CliRunner()
+    timings_file = tmp_path / "timings.json"
+    profile_file = tmp_path / "run.prof"
+
+    with patch("pilot_metrics.main.create_dashboard"):
+        result = runner.invoke(
+            app,
+            [
+                "--timings",
+                "--timings-file",
+                str(timings_file),
+                "--profile",
+                str(profile_file),
+                "visualize",
+                TEST_DATA,
+            ],
+        )
+
+    assert result.exit_code == 0
+    stages = [stage["name"] for stage in json.loads(timings_file.read_text())["stages"]]
+    assert stages == ["parse", "validate", "flatten", "quality"]
+    assert profile_file.stat().st_size > 0
+
+
 def test_help_command():
     """Test the help command."""
     runner = CliRunner()
@@ -226,3 +412,200 @@ def test_help_command():
     assert "pilot-metrics" in result.stdout
     assert "visualize" in result.stdout
     assert "upload-to-bq" in result.stdout
+
+
+def test_export_command_writes_partitions(tmp_path):
+    """Test that export writes each table's days as CSV partitions."""
+    runner = CliRunner()
+    output = tmp_path / "export"
+
+    result = runner.invoke(
+        app, ["export", TEST_DATA, "--output", str(output), "--format", "csv"]
+    )
+
+    assert result.exit_code == 0
+    assert "replaced by revised days" in result.stdout
+    assert sorted(path.name for path in output.iterdir()) == [
+        "chats",
+        "code_completions",
+        "pr_summaries",
+    ]
+    assert list(output.glob("code_completions/date=2024-01-15/part-*.csv"))
+
+
+def test_export_command_with_max_memory_appends_tenant_chunks(tmp_path):
+    """Test that chunked export gives each tenant its own file per day."""
+    runner = CliRunner()
+    output = tmp_path / "export"
+    manifest = tmp_path / "tenants.json"
+    manifest.write_text(
+        json.dumps(
+            [{"org": "acme", "path": TEST_DATA}, {"org": "globex", "path": TEST_DATA}]
+        )
+    )
+
+    result = runner.invoke(
+        app,
+        [
+            "export",
+            "--tenants",
+            str(manifest),
+            "--output",
+            str(output),
+            "--format",
+            "csv",
+            "--max-memory",
+            "1K",
+        ],
+    )
+
+    assert result.exit_code == 0
+    day = list(output.glob("code_completions/date=2024-01-15/part-*.csv"))
+    assert len(day) == 2
+
+
+def test_export_command_with_max_memory_enforces_quality(tmp_path):
+    """Test that chunked export quarantines rows breaking a quality rule."""
+    runner = CliRunner()
+    with open(TEST_DATA) as f:
+        records = json.load(f)
+    language = records[1]["copilot_ide_code_completions"]["editors"][0]["models"][0][
+        "languages"
+    ][0]
+    language["total_code_acceptances"] = language["total_code_suggestions"] + 1
+    input_file = tmp_path / "data.json"
+    input_file.write_text(json.dumps(records))
+    quarantine_file = tmp_path / "quarantine.json"
+
+    def export(*args):
+        return runner.invoke(
+            app,
+            [
+                "export",
+                str(input_file),
+                "--output",
+                str(tmp_path / "export"),
+                "--format",
+                "csv",
+                "--max-memory",
+                "1K",
+                *args,
+            ],
+        )
+
+    failed = export("--quality", "fail")
+    quarantined = export(
+        "--quality", "quarantine", "--quarantine-file", str(quarantine_file)
+    )
+
+    assert failed.exit_code == 1
+    assert "Data quality checks failed" in failed.output
+    assert quarantined.exit_code == 0
+    left_out = json.loads(quarantine_file.read_text())
+    assert [row["language"] for row in left_out["code_completions"]] == [
+        language["name"]
+    ]
+
+
+def test_visualize_command_with_max_memory(tmp_path):
+    """Test that --max-memory renders dashboard data aggregated in chunks."""
+    runner = CliRunner()
+
+    with patch("pilot_metrics.main.render_dashboard") as mock_render:
+        result = runner.invoke(
+            app, ["visualize", TEST_DATA, "--max-memory", "1", "--editor", "vscode"]
+        )
+
+    assert result.exit_code == 0
+    data = mock_render.call_args[0][0]
+    assert data.timeframe == "Data from 2024-01-15 to 2024-01-17"
+    assert list(data.editor_lines["editor"]) == ["vscode"]
+
+
+def test_seats_command_reports_idle_seats(tmp_path):
+    """Test that seats reports idle seats and saves a reusable table."""
+    seats = {
+        "total_seats": 2,
+        "seats": [
+            {
+                "assignee": {"login": login},
+                "created_at": "2024-01-01T00:00:00Z",
+                "last_activity_at": last_activity,
+            }
+            for login, last_activity in (
+                ("alice", "2024-03-01T09:00:00Z"),
+                ("bob", None),
+            )
+        ],
+    }
+    input_file = tmp_path / "seats.json"
+    input_file.write_text(json.dumps(seats))
+    saved = tmp_path / "seats.npz"
+    output = tmp_path / "idle.csv"
+    runner = CliRunner()
+
+    args = ["--as-of", "2024-03-10", "--output", str(output)]
+    result = runner.invoke(app, ["seats", str(input_file), "--save", str(saved), *args])
+    assert result.exit_code == 0
+    assert "2 seats: 1 idle for 30+ days, 1 never active" in result.stdout
+    assert "bob" in output.read_text()
+
+    result = runner.invoke(app, ["seats", str(saved), "--idle-days", "5", *args])
+    assert result.exit_code == 0
+    assert "2 seats: 2 idle for 5+ days" in result.stdout
+
+
+def test_visualize_command_warns_about_unordered_days(tmp_path):
+    """Test that out-of-order and duplicate days are reported and sorted."""
+    runner = CliRunner()
+    with open(TEST_DATA) as f:
+        records = json.load(f)
+    input_file = tmp_path / "data.json"
+    input_file.write_text(json.dumps([records[1], records[0], records[0]]))
+
+    with patch("pilot_metrics.main.create_dashboard") as mock_viz:
+        result = runner.invoke(app, ["visualize", str(input_file)])
+
+    assert result.exit_code == 0
+    assert "out of date order" in result.output
+    assert f"1 duplicate days: {records[0]['date']}" in result.output
+    dates = [row["date"] for row in mock_viz.call_args[0][4].daily]
+    assert dates == sorted(dates)
+
+
+def test_visualize_command_quality_policies(tmp_path):
+    """Test that --quality fail stops and quarantine leaves rows out."""
+    runner = CliRunner()
+    with open(TEST_DATA) as f:
+        records = json.load(f)
+    language = records[0]["copilot_ide_code_completions"]["editors"][0]["models"][0][
+        "languages"
+    ][0]
+    language["total_code_acceptances"] = language["total_code_suggestions"] + 1
+    input_file = tmp_path / "data.json"
+    input_file.write_text(json.dumps(records))
+    quarantine_file = tmp_path / "quarantine.json"
+
+    with patch("pilot_metrics.main.create_dashboard") as mock_viz:
+        failed = runner.invoke(app, ["visualize", str(input_file), "--quality", "fail"])
+        quarantined = runner.invoke(
+            app,
+            [
+                "visualize",
+                str(input_file),
+                "--quality",
+                "quarantine",
+                "--quarantine-file",
+                str(quarantine_file),
+            ],
+        )
+
+    assert failed.exit_code == 1
+    assert "Data quality checks failed" in failed.output
+    assert quarantined.exit_code == 0
+    # Without dimension filters the dashboard reads the language summaries
+    left_out = json.loads(quarantine_file.read_text())
+    assert list(left_out) == ["language_totals"]
+    assert left_out["language_totals"][0]["language"] == language["name"]
+    charted = mock_viz.call_args[0][4].languages
+    assert left_out["language_totals"][0] not in charted
@@ -119,3 +119,79 @@ def test_invalid_data():
 
     with pytest.raises(ValueError):
         ChatModel(name="test", is_custom_model="not_boolean")  # should be boolean
+
+
+def test_tenant_label_skips_missing_parts():
+    """Test that tenant labels join only the identifiers that are set."""
+    from pilot_metrics.models import Tenant
+
+    assert Tenant(enterprise="globex", org="labs", team="ml").label == "globex/labs/ml"
+    assert Tenant(org="acme").label == "acme"
+    assert Tenant().label == ""
+
+
+def test_completions_language_summary_is_typed():
+    """Test that the completions-level language summary is validated."""
+    from pilot_metrics.models import CopilotIdeCodeCompletions, LanguageSummary
+
+    completions = CopilotIdeCodeCompletions.model_validate(
+        {"languages": [{"name": "python", "total_engaged_users": 12}]}
+    )
+
+    assert completions.languages == [
+        LanguageSummary(name="python", total_engaged_users=12)
+    ]
+    with pytest.raises(ValueError):
+        CopilotIdeCodeCompletions.model_validate(
+            {"languages": [{"total_engaged_users": 12}]}
+        )
+
+
+def test_sections_are_required_unless_projected_away():
+    """Test that only the pruned validation path accepts missing sections."""
+    from pilot_metrics.processing import drop_unused_sections
+
+    record = {
+        "date": "2024-01-15",
+        "total_active_users": 10,
+        "total_engaged_users": 8,
+        "copilot_dotcom_pull_requests": {"repositories": []},
+    }
+
+    with pytest.raises(ValueError):
+        DailyCopilotStats.model_validate(record)
+    (pruned,) = drop_unused_sections([record], {"chats": None})
+    with pytest.raises(ValueError):
+        DailyCopilotStats.model_validate(pruned)  # The chat sections are used
+    (pruned,) = drop_unused_sections([record], {"pr_summaries": None})
+    assert DailyCopilotStats.model_validate(pruned).copilot_ide_chat.editors == []
+
+
+def test_manifest_rejects_overlapping_tenants():
+    """Test that a manifest cannot list a tenant along with part of it."""
+    from pilot_metrics.models import Tenant, TenantManifest
+
+    assert Tenant(org="acme").covers(Tenant(org="acme", team="web"))
+    assert not Tenant(org="acme", team="web").covers(Tenant(org="acme"))
+    assert not Tenant().covers(Tenant(org="acme"))
+
+    TenantManifest.model_validate(
+        [
+            {"org": "acme", "team": "web", "path": "web.json"},
+            {"org": "acme", "team": "data", "path": "data.json"},
+            {"enterprise": "globex", "path": "globex.json"},
+        ]
+    )
+    for overlapping in (
+        {"org": "acme", "path": "acme.json"},
+        {"enterprise": "globex", "org": "labs", "path": "labs.json"},
+        {"org": "acme", "team": "web", "path": "web-again.json"},
+    ):
+        with pytest.raises(ValueError, match="overlap"):
+            TenantManifest.model_validate(
+                [
+                    {"org": "acme", "team": "web", "path": "web.json"},
+                    {"enterprise": "globex", "path": "globex.json"},
+                    overlapping,
+                ]
+            )
@@ -0,0 +1,107 @@
+import json
+from pathlib import Path
+
+import pytest
+
+from pilot_metrics.bigquery_fake import FakeBigQuery
+from pilot_metrics.filters import MetricsFilter
+from pilot_metrics.models import Tenant
+from pilot_metrics.pipeline import Pipeline
+
+TEST_DATA = Path(__file__).parent.parent / "data" / "test_data.json"
+
+
+def test_dashboard_from_bytes_writes_without_opening_a_browser(tmp_path, monkeypatch):
+    """Test that a dashboard is built from in-memory JSON with stage timings."""
+    monkeypatch.setattr(
+        "webbrowser.open", lambda url: pytest.fail("browser was opened")
+    )
+    output = tmp_path / "dashboard.html"
+
+    result = Pipeline().dashboard(
+        TEST_DATA.read_bytes(), Tenant(org="acme"), output_file=str(output)
+    )
+
+    assert output.exists()
+    assert result.output == str(output)
+    assert result.days == len(json.loads(TEST_DATA.read_text()))
+    assert not result.dashboard.daily_lines.empty
+    assert [timing.name for timing in result.timings][:4] == [
+        "validate",
+        "flatten",
+        "quality",
+        "aggregate",
+    ]
+
+
+def test_parse_caches_validated_input():
+    """Test that the same payload and filter are only validated once."""
+    pipeline = Pipeline()
+    data = TEST_DATA.read_bytes()
+    filters = MetricsFilter(editors=["vscode"])
+
+    first = pipeline.flatten(data, filters=filters)
+    second = pipeline.flatten(data, filters=filters)
+    other_filter = pipeline.flatten(data)
+
+    assert [timing.name for timing in first.timings] == [
+        "validate",
+        "flatten",
+        "quality",
+    ]
+    assert [timing.name for timing in second.timings] == ["flatten", "quality"]
+    assert second.tables == first.tables
+    assert "validate" in [timing.name for timing in other_filter.timings]
+
+
+def test_flatten_accepts_raw_records():
+    """Test that parsed records give the same tables as their JSON."""
+    pipeline = Pipeline()
+
+    from_records = pipeline.flatten(json.loads(TEST_DATA.read_text()))
+    from_json = pipeline.flatten(TEST_DATA.read_text())
+
+    assert from_records.tables == from_json.tables
+    assert from_records.rows["daily_totals"] == from_records.days
+
+
+def test_map_uploads_tenants_concurrently():
+    """Test that tenants uploaded on threads share one client and table setup."""
+    data = TEST_DATA.read_bytes()
+    tenants = [Tenant(org=org) for org in ("a", "b", "c", "d")]
+
+    with FakeBigQuery() as fake:
+        pipeline = Pipeline(dataset_id="proj.ds", client=fake.client("proj"))
+        results = pipeline.map(
+            pipeline.upload, [(tenant, data) for tenant in tenants], max_workers=4
+        )
+
+        loaded = fake.rows("proj.ds.code_completions")
+
+    per_tenant = results[0].rows["code_completions"]
+    assert len(loaded) == 4 * per_tenant
+    assert {row["org"] for row in loaded} == {"a", "b", "c", "d"}
+    assert all(result.rows == results[0].rows for result in results)
+    # Each call records only its own stages
+    assert all(
+        sum(timing.name == "flatten" for timing in result.timings) == 1
+        for result in results
+    )
+
+
+def test_map_exports_tenants(tmp_path):
+    """Test that map passes the tenant to methods with other positionals."""
+    data = TEST_DATA.read_bytes()
+    pipeline = Pipeline()
+
+    results = pipeline.map(
+        pipeline.export,
+        [(Tenant(org=org), data) for org in ("a", "b")],
+        output_dir=str(tmp_path),
+        by_org=True,
+    )
+
+    assert [result.output for result in results] == [str(tmp_path)] * 2
+    completions = tmp_path / "code_completions"
+    assert {path.name for path in completions.iterdir()} == {"org=a", "org=b"}
+    assert results[0].rows == results[1].rows
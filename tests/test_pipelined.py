@@ -0,0 +1,163 @@
+import json
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import pytest
+from pydantic import ValidationError
+
+from pilot_metrics.bigquery_fake import FakeBigQuery
+from pilot_metrics.bigquery_uploader import UPLOAD_PROJECTION
+from pilot_metrics.filters import MetricsFilter
+from pilot_metrics.models import CopilotData, Tenant
+from pilot_metrics.pipelined import stream_source, upload_pipelined
+from pilot_metrics.processing import flatten_copilot_data
+from pilot_metrics.quality import QualityError, QualityPolicy, QualityReport
+
+
+def _record(day: int, languages: int = 2) -> dict:
+    return {
+        "date": f"2024-01-{day:02d}",
+        "total_active_users": 10,
+        "total_engaged_users": 8,
+        "copilot_ide_code_completions": {
+            "total_engaged_users": 8,
+            "languages": [],
+            "editors": [
+                {
+                    "name": "vscode",
+                    "total_engaged_users": 8,
+                    "models": [
+                        {
+                            "name": "default",
+                            "is_custom_model": False,
+                            "total_engaged_users": 8,
+                            "languages": [
+                                {
+                                    "name": f"language-{i}",
+                                    "total_engaged_users": 4,
+                                    "total_code_acceptances": day,
+                                    "total_code_suggestions": 2 * day,
+                                    "total_code_lines_accepted": day,
+                                    "total_code_lines_suggested": 2 * day,
+                                }
+                                for i in range(languages)
+                            ],
+                        }
+                    ],
+                }
+            ],
+        },
+        "copilot_ide_chat": {},
+        "copilot_dotcom_chat": {},
+        "copilot_dotcom_pull_requests": {},
+    }
+
+
+def test_upload_pipelined_loads_every_source(tmp_path):
+    """Test that chunks of listed and streamed sources all reach their tables."""
+    records = [_record(day) for day in range(1, 21)]
+    path = tmp_path / "records.json"
+    path.write_text(json.dumps(records))
+    sources = [
+        (Tenant(org="a"), lambda: records),
+        (Tenant(org="b"), partial(stream_source, str(path))),
+    ]
+
+    with FakeBigQuery() as fake, ThreadPoolExecutor(2) as executor:
+        written = upload_pipelined(
+            sources,
+            client=fake.client("proj"),
+            dataset_id="proj.ds",
+            executor=executor,
+            workers=2,
+            chunk_days=3,
+            queue_size=1,
+            load_rows_at=10,
+        )
+
+    expected, _, _ = flatten_copilot_data(
+        CopilotData.model_validate(records).root, projection=UPLOAD_PROJECTION
+    )
+    loaded = fake.rows("proj.ds.code_completions")
+    assert written["proj.ds.code_completions"] == len(loaded) == 2 * len(expected)
+    assert {row["org"] for row in loaded} == {"a", "b"}
+    assert written["proj.ds.daily_totals"] == 40
+    # Rows are loaded in jobs as they accumulate, not once at the end
+    assert sum(load.table_id.endswith("code_completions") for load in fake.loads) > 1
+
+
+def test_upload_pipelined_applies_filters_in_workers():
+    """Test that dimension filters reach the workers and skip summaries."""
+    records = [_record(day) for day in range(1, 8)]
+    filters = MetricsFilter(since="2024-01-03", languages=["language-0"])
+
+    with FakeBigQuery() as fake:
+        written = upload_pipelined(
+            [(Tenant(), lambda: records)],
+            filters,
+            client=fake.client("proj"),
+            dataset_id="proj.ds",
+            workers=2,
+        )
+
+    assert written == {"proj.ds.code_completions": 5}
+    assert "proj.ds.daily_totals" not in fake.tables
+    assert {row["language"] for row in fake.rows("proj.ds.code_completions")} == {
+        "language-0"
+    }
+
+
+def test_upload_pipelined_raises_worker_errors():
+    """Test that a failing chunk stops the pipeline with its own error."""
+    records = [_record(1), {"date": "2024-01-02", "total_active_users": "many"}]
+
+    with (
+        FakeBigQuery() as fake,
+        ThreadPoolExecutor(1) as executor,
+        pytest.raises(ValidationError),
+    ):
+        upload_pipelined(
+            [(Tenant(), lambda: records)],
+            client=fake.client("proj"),
+            dataset_id="proj.ds",
+            executor=executor,
+            workers=1,
+        )
+
+
+def test_upload_pipelined_enforces_quality_per_chunk():
+    """Test that workers quarantine or fail on rows breaking a quality rule."""
+    records = [_record(day) for day in range(1, 8)]
+    language = records[4]["copilot_ide_code_completions"]["editors"][0]["models"][0][
+        "languages"
+    ][0]
+    language["total_code_acceptances"] = language["total_code_suggestions"] + 1
+    sources = [(Tenant(), lambda: records)]
+
+    report = QualityReport()
+    with FakeBigQuery() as fake:
+        written = upload_pipelined(
+            sources,
+            client=fake.client("proj"),
+            dataset_id="proj.ds",
+            workers=2,
+            chunk_days=2,
+            quality=QualityPolicy.QUARANTINE,
+            report=report,
+        )
+        # Raised in a worker process, with its report
+        with pytest.raises(QualityError) as failed:
+            upload_pipelined(
+                sources,
+                client=fake.client("proj"),
+                dataset_id="proj.ds",
+                workers=2,
+                quality=QualityPolicy.FAIL,
+            )
+
+    assert report.rows_checked["code_completions"] == 14
+    assert [row["date"] for row in report.quarantined["code_completions"]] == [
+        "2024-01-05"
+    ]
+    assert written["proj.ds.code_completions"] == 13
+    assert failed.value.report.violations[0].rule == "acceptances_exceed_suggestions"
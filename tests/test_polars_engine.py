@@ -0,0 +1,68 @@
+import json
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from pilot_metrics.cardinality import CardinalityLimits
+from pilot_metrics.filters import MetricsFilter
+from pilot_metrics.models import CopilotData, Tenant
+from pilot_metrics.processing import (
+    TenantBatch,
+    flatten_tenant_summaries,
+    flatten_tenants,
+)
+from pilot_metrics.visualizer import (
+    DASHBOARD_PROJECTION,
+    SUMMARY_DASHBOARD_PROJECTION,
+    DashboardData,
+    Engine,
+    aggregate_dashboard_data,
+)
+
+pytest.importorskip("polars")
+pytest.importorskip("pyarrow")
+
+TEST_DATA = Path(__file__).parent.parent / "data" / "test_data.json"
+
+
+@pytest.mark.parametrize(
+    "limits",
+    [None, CardinalityLimits(language=3, editor=1, repository=2)],
+    ids=["all", "top-n"],
+)
+@pytest.mark.parametrize(
+    ("filters", "projection"),
+    [
+        (MetricsFilter(editors=["vscode", "jetbrains"]), DASHBOARD_PROJECTION),
+        (MetricsFilter(), SUMMARY_DASHBOARD_PROJECTION),
+    ],
+    ids=["leaves", "summaries"],
+)
+def test_polars_engine_matches_pandas(filters, projection, limits):
+    """Test that both engines give identical chart series."""
+    records = json.loads(TEST_DATA.read_text())
+    batches = [
+        TenantBatch(Tenant(org="acme"), CopilotData.model_validate(records).root),
+        TenantBatch(
+            Tenant(org="globex", team="web"), CopilotData.model_validate(records).root
+        ),
+    ]
+    completions, chats, pr_data = flatten_tenants(batches, filters, projection)
+    summaries = None
+    if not filters.has_dimensions:
+        summaries = flatten_tenant_summaries(batches, filters)
+
+    expected = aggregate_dashboard_data(
+        completions, chats, pr_data, None, summaries, limits
+    )
+    result = aggregate_dashboard_data(
+        completions, chats, pr_data, None, summaries, limits, Engine.POLARS
+    )
+
+    for field in DashboardData.model_fields:
+        value, expected_value = getattr(result, field), getattr(expected, field)
+        if isinstance(value, pd.DataFrame):
+            pd.testing.assert_frame_equal(value, expected_value)
+        else:
+            assert value == expected_value, field
@@ -169,3 +169,241 @@ def test_flatten_handles_none_values():
     chat = chats[0]
     assert chat["total_chat_copy_events"] == 0  # None converted to 0
     assert chat["total_chat_insertion_events"] == 0  # None converted to 0
+
+
+def test_flatten_applies_filters():
+    """Test that flattening skips days and leaves outside the filter."""
+    from datetime import date
+
+    from pilot_metrics.filters import MetricsFilter
+
+    raw_data = []
+    for day in ("2024-01-15", "2024-01-16"):
+        raw_data.append(
+            {
+                "date": day,
+                "total_active_users": 10,
+                "total_engaged_users": 8,
+                "copilot_ide_code_completions": {
+                    "editors": [
+                        {
+                            "name": "vscode",
+                            "models": [
+                                {
+                                    "name": "default",
+                                    "is_custom_model": False,
+                                    "languages": [{"name": "python"}, {"name": "go"}],
+                                }
+                            ],
+                        }
+                    ],
+                    "languages": [],
+                },
+                "copilot_ide_chat": {"editors": []},
+                "copilot_dotcom_chat": {"models": []},
+                "copilot_dotcom_pull_requests": {"repositories": []},
+            }
+        )
+    sample_stats = CopilotData.model_validate(raw_data).root
+    filters = MetricsFilter(since=date(2024, 1, 16), languages=frozenset({"go"}))
+
+    completions, _, _ = flatten_copilot_data(sample_stats, filters)
+
+    assert [(c["date"], c["language"]) for c in completions] == [("2024-01-16", "go")]
+
+
+def test_flatten_with_projection():
+    """Test that a projection limits the tables and columns produced."""
+    from pilot_metrics.processing import merge_projections
+
+    raw_data = [
+        {
+            "date": "2024-01-15",
+            "total_active_users": 10,
+            "total_engaged_users": 8,
+            "copilot_ide_code_completions": {
+                "editors": [
+                    {
+                        "name": "vscode",
+                        "models": [
+                            {
+                                "name": "default",
+                                "is_custom_model": False,
+                                "languages": [{"name": "python"}],
+                            }
+                        ],
+                    }
+                ],
+                "languages": [],
+            },
+            "copilot_ide_chat": {},
+            "copilot_dotcom_chat": {
+                "models": [{"name": "default", "is_custom_model": False}]
+            },
+            "copilot_dotcom_pull_requests": {},
+        }
+    ]
+    sample_stats = CopilotData.model_validate(raw_data).root
+    projection = merge_projections(
+        {"completions": frozenset({"date"})},
+        {"completions": frozenset({"language"})},
+    )
+
+    completions, chats, pr_data = flatten_copilot_data(
+        sample_stats, projection=projection
+    )
+
+    assert completions == [{"date": "2024-01-15", "language": "python"}]
+    assert chats == []
+    assert pr_data == []
+
+
+def test_drop_unused_sections():
+    """Test that sections a projection does not need are emptied."""
+    from pilot_metrics.processing import drop_unused_sections
+
+    raw_data = [
+        {
+            "date": "2024-01-15",
+            "copilot_ide_code_completions": {"editors": []},
+            "copilot_ide_chat": {"editors": []},
+            "copilot_dotcom_chat": {"models": []},
+            "copilot_dotcom_pull_requests": {"repositories": []},
+        }
+    ]
+
+    (record,) = drop_unused_sections(raw_data, {"chats": None})
+
+    assert record["copilot_ide_chat"] == {"editors": []}
+    assert record["copilot_dotcom_chat"] == {"models": []}
+    assert record["copilot_ide_code_completions"] == {"languages": []}
+    assert record["copilot_dotcom_pull_requests"] == {}
+    assert raw_data[0]["copilot_ide_code_completions"] == {"editors": []}
+
+
+def test_flatten_tenants_tags_records():
+    """Test that records of several tenants are flattened in one pass."""
+    from pilot_metrics.models import Tenant
+    from pilot_metrics.processing import TenantBatch, flatten_tenants
+
+    raw_data = [
+        {
+            "date": "2024-01-15",
+            "total_active_users": 10,
+            "total_engaged_users": 8,
+            "copilot_ide_code_completions": {"languages": []},
+            "copilot_ide_chat": {},
+            "copilot_dotcom_chat": {
+                "models": [{"name": "default", "is_custom_model": False}]
+            },
+            "copilot_dotcom_pull_requests": {},
+        }
+    ]
+    daily_stats = CopilotData.model_validate(raw_data).root
+
+    _, chats, _ = flatten_tenants(
+        [
+            TenantBatch(Tenant(org="acme", team="web"), daily_stats),
+            TenantBatch(Tenant(enterprise="globex", org="labs"), daily_stats),
+        ]
+    )
+
+    assert [(c["enterprise"], c["org"], c["team"]) for c in chats] == [
+        (None, "acme", "web"),
+        ("globex", "labs", None),
+    ]
+
+
+def test_flatten_summaries_keeps_api_engaged_users():
+    """Test that the day, language, editor and model summaries are flattened."""
+    from pilot_metrics.filters import MetricsFilter
+    from pilot_metrics.processing import flatten_summaries
+
+    language = {
+        "total_engaged_users": 3,
+        "total_code_acceptances": 1,
+        "total_code_suggestions": 2,
+        "total_code_lines_accepted": 3,
+        "total_code_lines_suggested": 4,
+    }
+    raw_data = [
+        {
+            "date": date,
+            "total_active_users": 50,
+            "total_engaged_users": 40,
+            "copilot_ide_code_completions": {
+                "total_engaged_users": 30,
+                "languages": [{"name": "python", "total_engaged_users": 25}],
+                "editors": [
+                    {
+                        "name": editor,
+                        "total_engaged_users": 20,
+                        "models": [
+                            {
+                                "name": "default",
+                                "is_custom_model": False,
+                                "total_engaged_users": 20,
+                                "languages": [{"name": "python", **language}],
+                            }
+                        ],
+                    }
+                    for editor in ("vscode", "jetbrains")
+                ],
+            },
+            "copilot_ide_chat": {
+                "total_engaged_users": 5,
+                "editors": [
+                    {
+                        "name": "vscode",
+                        "total_engaged_users": 5,
+                        "models": [
+                            {
+                                "name": "default",
+                                "is_custom_model": False,
+                                "total_engaged_users": 5,
+                                "total_chats": 7,
+                            }
+                        ],
+                    }
+                ],
+            },
+            "copilot_dotcom_chat": {},
+            "copilot_dotcom_pull_requests": {},
+        }
+        for date in ("2024-01-15", "2024-01-16")
+    ]
+    daily_stats = CopilotData.model_validate(raw_data).root
+
+    daily, languages, editors, models = flatten_summaries(
+        daily_stats, MetricsFilter(since="2024-01-16")
+    )
+
+    assert [(d["date"], d["total_active_users"]) for d in daily] == [("2024-01-16", 50)]
+    assert daily[0]["code_completions_engaged_users"] == 30
+    assert daily[0]["total_code_lines_accepted"] == 6
+    # Engaged users come from the API summary, counters from the leaves
+    assert languages == [
+        {
+            "date": "2024-01-16",
+            "enterprise": None,
+            "org": None,
+            "team": None,
+            "language": "python",
+            "total_engaged_users": 25,
+            "total_code_acceptances": 2,
+            "total_code_suggestions": 4,
+            "total_code_lines_accepted": 6,
+            "total_code_lines_suggested": 8,
+        }
+    ]
+    assert [(e["feature"], e["editor"], e["total_engaged_users"]) for e in editors] == [
+        ("code_completions", "vscode", 20),
+        ("code_completions", "jetbrains", 20),
+        ("ide_chat", "vscode", 5),
+    ]
+    assert editors[2]["total_chats"] == 7
+    assert [(m["feature"], m["editor"], m["model"]) for m in models] == [
+        ("code_completions", "vscode", "default"),
+        ("code_completions", "jetbrains", "default"),
+        ("ide_chat", "vscode", "default"),
+    ]
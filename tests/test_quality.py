@@ -0,0 +1,99 @@
+import pytest
+
+from pilot_metrics.quality import (
+    QualityError,
+    QualityPolicy,
+    check_quality,
+    enforce_quality,
+)
+
+
+def _leaf(**counters) -> dict:
+    return {
+        "date": "2024-01-01",
+        "enterprise": None,
+        "org": "acme",
+        "team": None,
+        "editor": "vscode",
+        "language": "python",
+        "total_engaged_users": 5,
+        "total_code_acceptances": 1,
+        "total_code_suggestions": 2,
+        "total_code_lines_accepted": 1,
+        "total_code_lines_suggested": 2,
+        **counters,
+    }
+
+
+def _tables() -> dict[str, list[dict]]:
+    return {
+        "code_completions": [
+            _leaf(),
+            _leaf(total_code_acceptances=3),
+            _leaf(total_code_lines_accepted=5),
+            _leaf(total_engaged_users=11),
+            _leaf(total_code_suggestions=-1),
+        ],
+        "chats": [
+            {"date": "2024-01-01", "total_chats": 1, "total_chat_copy_events": None}
+        ],
+        "editor_totals": [
+            {
+                "date": "2024-01-01",
+                "enterprise": None,
+                "org": "acme",
+                "team": None,
+                "feature": "code_completions",
+                "editor": "vscode",
+                "total_engaged_users": 10,
+            }
+        ],
+    }
+
+
+def test_check_quality_reports_each_rule():
+    """Test that every broken rule is counted with samples of its rows."""
+    report = check_quality(_tables())
+
+    found = {
+        (violation.rule, violation.table): violation for violation in report.violations
+    }
+    assert set(found) == {
+        ("acceptances_exceed_suggestions", "code_completions"),
+        ("lines_accepted_exceed_suggested", "code_completions"),
+        ("engaged_users_exceed_editor", "code_completions"),
+        ("negative_counts", "code_completions"),
+        ("missing_counters", "chats"),
+    }
+    # One acceptance of -1 suggestions breaks two rules
+    assert found["acceptances_exceed_suggestions", "code_completions"].count == 2
+    assert found["engaged_users_exceed_editor", "code_completions"].samples == [
+        _leaf(total_engaged_users=11)
+    ]
+    assert report.rows_checked["code_completions"] == 5
+
+
+def test_check_quality_skips_rules_without_their_columns():
+    """Test that projected tables are only checked on the columns they have."""
+    report = check_quality({"code_completions": [{"total_code_acceptances": 3}]})
+
+    assert report.ok
+
+
+def test_enforce_quality_policies():
+    """Test that warn keeps, quarantine removes and fail raises."""
+    tables = _tables()
+
+    kept, report = enforce_quality(tables, QualityPolicy.WARN)
+    assert kept is tables and not report.ok
+
+    kept, report = enforce_quality(tables, QualityPolicy.QUARANTINE)
+    assert kept["code_completions"] == [_leaf()]
+    assert kept["chats"] == []
+    assert len(report.quarantined["code_completions"]) == 4
+    assert tables["code_completions"][1] == _leaf(total_code_acceptances=3)
+
+    with pytest.raises(QualityError, match="more code acceptances"):
+        enforce_quality(tables, QualityPolicy.FAIL)
+
+    assert enforce_quality(tables, QualityPolicy.OFF)[1].ok
@@ -0,0 +1,111 @@
+import json
+from datetime import date
+
+import pandas as pd
+
+from pilot_metrics.models import Tenant
+from pilot_metrics.seats import (
+    SeatTable,
+    fetch_seats,
+    flatten_seats,
+    parse_seats,
+)
+
+
+def _seat(login: str, last_activity: str | None, created: str = "2024-01-01") -> dict:
+    return {
+        "assignee": {"login": login, "id": 1, "type": "User"},
+        "assigning_team": {"slug": "platform"} if login.startswith("p") else None,
+        "created_at": f"{created}T00:00:00Z",
+        "last_activity_at": f"{last_activity}T12:00:00Z" if last_activity else None,
+        "last_activity_editor": (
+            "vscode/1.90.0/copilot/1.200.0" if last_activity else None
+        ),
+        "plan_type": "business",
+    }
+
+
+SEATS = [
+    _seat("alice", "2024-03-01"),
+    _seat("bob", "2024-01-15"),
+    _seat("pat", None, created="2024-02-01"),
+    _seat("carol", "2024-02-20"),
+]
+
+
+def test_fetch_seats_requests_pages_concurrently_in_order():
+    """Test that every page is fetched once and seats keep page order."""
+    requested = []
+
+    def fetch_page(page: int) -> bytes:
+        requested.append(page)
+        seats = [_seat(f"user-{page}-{i}", "2024-03-01") for i in range(100)]
+        if page == 3:
+            seats = seats[:50]
+        return json.dumps({"total_seats": 250, "seats": seats}).encode()
+
+    seats = fetch_seats(fetch_page, concurrency=2)
+
+    assert sorted(requested) == [1, 2, 3]
+    assert len(seats) == 250
+    assert seats[100].assignee.login == "user-2-0"
+    assert seats[-1].assignee.login == "user-3-49"
+
+
+def test_parse_seats_accepts_pages_and_seat_lists():
+    """Test the shapes seat data is saved in."""
+    page = {"total_seats": 2, "seats": SEATS[:2]}
+
+    assert len(parse_seats(page)) == 2
+    assert len(parse_seats([page, {"total_seats": 2, "seats": SEATS[2:]}])) == 4
+    assert [seat.assignee.login for seat in parse_seats(SEATS[:1])] == ["alice"]
+
+
+def test_flatten_seats():
+    """Test one row per seat with tenant columns and the editor name."""
+    rows = flatten_seats(parse_seats(SEATS), Tenant(org="acme"))
+
+    assert rows[0]["org"] == "acme"
+    assert rows[0]["editor"] == "vscode"
+    assert rows[0]["last_activity_date"] == "2024-03-01"
+    assert rows[2]["assigning_team"] == "platform"
+    assert rows[2]["last_activity_at"] is None
+
+
+def test_seat_table_idle_query_and_login_index():
+    """Test idle seats are found by activity, never-active seats first."""
+    table = SeatTable.from_seats(parse_seats(SEATS))
+
+    idle = table.frame(table.idle(30, as_of=date(2024, 3, 10)))
+    assert idle["login"].tolist() == ["pat", "bob"]
+    assert idle["last_activity_date"].tolist() == [None, "2024-01-15"]
+
+    assert table.find("carol")["editor"] == "vscode"
+    assert table.find("pat")["assigning_team"] == "platform"
+    assert table.find("nobody") is None
+
+
+def test_seat_table_round_trips_through_npz(tmp_path):
+    """Test that a saved seat table loads with the same columns."""
+    table = SeatTable.from_seats(parse_seats(SEATS))
+    path = str(tmp_path / "seats.npz")
+
+    table.save(path)
+    loaded = SeatTable.load(path)
+
+    pd.testing.assert_frame_equal(loaded.frame(), table.frame())
+    assert len(loaded.idle(30, as_of=date(2024, 3, 10))) == 2
+
+
+def test_seat_table_join_daily():
+    """Test seat counts and utilization joined onto daily totals."""
+    table = SeatTable.from_seats(parse_seats(SEATS))
+    daily = pd.DataFrame(
+        {"date": ["2024-01-20", "2024-02-25"], "total_active_users": [1, 3]}
+    )
+
+    joined = table.join_daily(daily)
+
+    assert joined["assigned_seats"].tolist() == [3, 4]
+    assert joined["seats_active_since"].tolist() == [2, 1]
+    assert joined["utilization"].tolist() == [1 / 3, 3 / 4]
@@ -0,0 +1,144 @@
+import json
+import threading
+import urllib.request
+from pathlib import Path
+
+import pytest
+
+from pilot_metrics.models import Tenant
+from pilot_metrics.server import MetricsStore, create_server
+
+TEST_DATA = Path(__file__).parent.parent / "data" / "test_data.json"
+
+
+@pytest.fixture
+def data_file(tmp_path):
+    path = tmp_path / "metrics.json"
+    path.write_text(TEST_DATA.read_text())
+    return path
+
+
+def test_store_query_by_dimension(data_file):
+    """Test that queries aggregate a metric per date and dimension."""
+    store = MetricsStore([(Tenant(), str(data_file))])
+    assert store.refresh() == 3
+
+    result = store.query("total_code_acceptances", by="editor")
+
+    assert result["dates"] == ["2024-01-15", "2024-01-16", "2024-01-17"]
+    raw = json.loads(data_file.read_text())
+    expected_vscode = sum(
+        language["total_code_acceptances"]
+        for model in raw[0]["copilot_ide_code_completions"]["editors"][0]["models"]
+        for language in model["languages"]
+    )
+    assert result["series"]["vscode"][0] == expected_vscode
+    assert result["totals"]["vscode"] == sum(result["series"]["vscode"])
+
+
+def test_store_query_with_filters_and_range(data_file):
+    """Test that dimension filters and date ranges restrict the rows."""
+    store = MetricsStore([(Tenant(), str(data_file))])
+    store.refresh()
+
+    everything = store.query("total_code_lines_accepted", by="language")
+    filtered = store.query(
+        "total_code_lines_accepted",
+        by="language",
+        since="2024-01-16",
+        where={"editor": "vscode"},
+    )
+
+    assert filtered["dates"] == ["2024-01-16", "2024-01-17"]
+    assert sum(filtered["totals"].values()) < sum(everything["totals"].values())
+    with pytest.raises(ValueError, match="Unknown metric"):
+        store.query("nope")
+
+
+def test_store_refresh_only_applies_changed_days(data_file):
+    """Test that refresh replaces revised days and adds new ones."""
+    store = MetricsStore([(Tenant(), str(data_file))])
+    store.refresh()
+    before = store.query("total_code_acceptances")["totals"]["total"]
+
+    raw = json.loads(data_file.read_text())
+    editors = raw[0]["copilot_ide_code_completions"]["editors"]
+    editors[0]["models"][0]["languages"][0]["total_code_acceptances"] += 10
+    raw.append({**raw[-1], "date": "2024-01-18"})
+    data_file.write_text(json.dumps(raw))
+
+    assert store.refresh() == 2
+    assert store.refresh() == 0
+    after = store.query("total_code_acceptances")
+    assert after["dates"][-1] == "2024-01-18"
+    assert after["totals"]["total"] == before + 10 + after["series"]["total"][-1]
+
+
+def test_store_chat_totals_apply_filters(data_file, tmp_path):
+    """Test that chat totals take the same tenant and dimension filters."""
+    other_file = tmp_path / "other.json"
+    other_file.write_text(data_file.read_text())
+    store = MetricsStore(
+        [(Tenant(org="acme"), str(data_file)), (Tenant(org="globex"), str(other_file))]
+    )
+    store.refresh()
+
+    everything = store.chat_totals()
+    acme = store.chat_totals(where={"tenant": "acme"})
+    jetbrains = store.chat_totals(since="2024-01-17", where={"editor": "jetbrains"})
+
+    assert everything["total_chats"] == 2 * acme["total_chats"] == 2 * 457
+    # Dotcom chats have no editor, so an editor filter keeps them
+    assert jetbrains["total_chats"] == 2 * (20 + 45)
+    assert store.chat_totals(where={"language": "python"}) == everything
+    with pytest.raises(ValueError, match="Unknown dimension"):
+        store.chat_totals(where={"repository": "x"})
+
+
+def test_store_cache_is_bounded_and_cleared(data_file):
+    """Test that cached results are evicted beyond the size and on changes."""
+    store = MetricsStore([(Tenant(), str(data_file))], cache_size=2)
+    store.refresh()
+
+    first = store.query(since="2024-01-15")
+    store.query(since="2024-01-16")
+    assert store.query(since="2024-01-15") is first
+    store.query(since="2024-01-17")
+    store.query(since="2024-01-16")
+    # The least recently used result went first
+    assert store.query(since="2024-01-15") is not first
+
+    cached = store.query(since="2024-01-15")
+    raw = json.loads(data_file.read_text())
+    raw.append({**raw[-1], "date": "2024-01-18"})
+    data_file.write_text(json.dumps(raw))
+    store.refresh()
+    assert store.query(since="2024-01-15")["dates"] != cached["dates"]
+
+
+def test_server_json_api(data_file):
+    """Test the HTTP API and dashboard page."""
+    store = MetricsStore([(Tenant(org="acme"), str(data_file))])
+    store.refresh()
+    server = create_server(store, "127.0.0.1", 0)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+
+    try:
+        with urllib.request.urlopen(f"{base}/api/dimensions") as response:
+            dimensions = json.load(response)
+        with urllib.request.urlopen(
+            f"{base}/api/query?metric=acceptance_rate&by=tenant&until=2024-01-15"
+        ) as response:
+            query = json.load(response)
+        with urllib.request.urlopen(f"{base}/") as response:
+            page = response.read().decode()
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert dimensions["tenant"] == ["acme"]
+    assert query["dates"] == ["2024-01-15"]
+    assert 0 < query["totals"]["acme"] <= 100
+    assert "/api/query" in page
@@ -0,0 +1,98 @@
+from datetime import date, timedelta
+
+import pandas as pd
+import pytest
+
+from pilot_metrics.processing import SummaryTables
+from pilot_metrics.trends import compute_trends, latest_deltas, trend_frame
+
+
+def _rows(days, languages, lines):
+    start = date(2024, 1, 1)
+    return [
+        {
+            "date": (start + timedelta(days=day)).isoformat(),
+            "language": language,
+            "editor": "vscode",
+            "total_code_acceptances": lines(day, language),
+            "total_code_suggestions": 2 * lines(day, language),
+            "total_code_lines_accepted": lines(day, language),
+        }
+        for day in days
+        for language in languages
+    ]
+
+
+def test_rolling_windows_match_a_per_group_loop():
+    """Test the vectorized windows against a naive per-language computation."""
+    # Day 5 is missing and must count as a day without activity
+    rows = _rows(
+        [d for d in range(20) if d != 5],
+        ["go", "python"],
+        lambda d, lang: d + len(lang),
+    )
+
+    trends = trend_frame(pd.DataFrame(rows), "language", windows=(7,))
+
+    for language in ("go", "python"):
+        daily = {
+            row["date"]: row["total_code_lines_accepted"]
+            for row in rows
+            if row["language"] == language
+        }
+        got = trends[trends["value"] == language].set_index("date")
+        for offset in range(20):
+            day = date(2024, 1, 1) + timedelta(days=offset)
+            window = [
+                daily.get((day - timedelta(days=back)).isoformat(), 0)
+                for back in range(min(7, offset + 1))
+            ]
+            expected = sum(window) / len(window)
+            assert got.loc[pd.Timestamp(day), "lines_accepted_avg_7d"] == pytest.approx(
+                expected
+            )
+            assert got.loc[pd.Timestamp(day), "acceptance_rate_7d"] == pytest.approx(
+                0.5
+            )
+
+
+def test_week_over_week_deltas():
+    """Test that a doubled second week reads as +100% per language."""
+    rows = _rows(range(14), ["go", "python"], lambda d, lang: 10 if d < 7 else 20)
+
+    trends = compute_trends(rows)
+
+    deltas = latest_deltas(trends, "language", "lines_accepted_wow")
+    assert deltas.to_dict() == {"go": 1.0, "python": 1.0}
+    overall = trends[trends["dimension"] == "all"]
+    assert overall["lines_accepted_wow"].iloc[-1] == pytest.approx(1.0)
+    assert overall["acceptance_rate_wow"].iloc[-1] == pytest.approx(0.0)
+    # Leaf rows carry no de-duplicated user counts
+    assert "active_users_avg_7d" not in trends
+
+
+def test_active_user_trends_come_from_summaries():
+    """Test that summary tables add active-user moving averages."""
+    counters = {
+        "total_code_acceptances": 1,
+        "total_code_suggestions": 2,
+        "total_code_lines_accepted": 3,
+    }
+    summaries = SummaryTables(
+        daily=[
+            {"date": "2024-01-01", "total_active_users": 10, **counters},
+            {"date": "2024-01-02", "total_active_users": 20, **counters},
+        ],
+        languages=[
+            {"date": "2024-01-01", "language": "go", "total_engaged_users": None}
+            | counters
+        ],
+        editors=[],
+        models=[],
+    )
+
+    trends = compute_trends([], summaries)
+
+    overall = trends[trends["dimension"] == "all"]
+    assert list(overall["active_users_avg_7d"]) == [10, 15]
+    assert set(trends["dimension"]) == {"all", "language"}
@@ -1,8 +1,22 @@
 from unittest.mock import patch
 
+import plotly.graph_objects as go
+import pytest
+
 from pilot_metrics.visualizer import create_dashboard
 
 
+@pytest.fixture(autouse=True)
+def _in_tmp_path(tmp_path, monkeypatch):
+    # Dashboards written to the default path land in the test's directory
+    monkeypatch.chdir(tmp_path)
+
+
+def _write_empty(figure, output_file):
+    # Stands in for write_figure_html, which the tests capture the figure from
+    open(output_file, "wb").close()
+
+
 def test_create_dashboard_empty_data():
     """Test dashboard creation with empty data."""
     with patch("builtins.print") as mock_print:
@@ -39,17 +53,17 @@ def test_create_dashboard_with_data():
 
     # Mock the plotly and webbrowser functions
     with (
-        patch("pilot_metrics.visualizer.pyo.plot") as mock_plot,
+        patch(
+            "pilot_metrics.visualizer.write_figure_html", side_effect=_write_empty
+        ) as mock_plot,
         patch("pilot_metrics.visualizer.webbrowser.open") as mock_browser,
         patch("builtins.print") as mock_print,
     ):
         create_dashboard(sample_data, [], [])
 
-        # Verify plotly plot was called
+        # Verify the figure was written
         mock_plot.assert_called_once()
-        call_args = mock_plot.call_args
-        assert call_args[1]["filename"] == "dashboard.html"
-        assert call_args[1]["auto_open"] is False
+        assert mock_plot.call_args[0][1] == "dashboard.html"
 
         # Verify browser was opened
         mock_browser.assert_called_once()
@@ -76,7 +90,9 @@ def test_create_dashboard_browser_error():
 
     # Mock plotly but make webbrowser fail
     with (
-        patch("pilot_metrics.visualizer.pyo.plot") as mock_plot,
+        patch(
+            "pilot_metrics.visualizer.write_figure_html", side_effect=_write_empty
+        ) as mock_plot,
         patch(
             "pilot_metrics.visualizer.webbrowser.open",
             side_effect=Exception("Browser error"),
@@ -117,7 +133,7 @@ def test_create_dashboard_file_path():
     ]
 
     with (
-        patch("pilot_metrics.visualizer.pyo.plot"),
+        patch("pilot_metrics.visualizer.write_figure_html", side_effect=_write_empty),
         patch("pilot_metrics.visualizer.webbrowser.open") as mock_browser,
         patch("pilot_metrics.visualizer.os.path.abspath") as mock_abspath,
     ):
@@ -159,14 +175,16 @@ def test_data_processing_in_dashboard():
 
     # Mock plotly to capture the figure
     with (
-        patch("pilot_metrics.visualizer.pyo.plot") as mock_plot,
+        patch(
+            "pilot_metrics.visualizer.write_figure_html", side_effect=_write_empty
+        ) as mock_plot,
         patch("pilot_metrics.visualizer.webbrowser.open"),
         patch("builtins.print"),
     ):
         create_dashboard(sample_data, [], [])
 
         # Get the figure object passed to plot
-        fig = mock_plot.call_args[0][0]
+        fig = go.Figure(mock_plot.call_args[0][0])
 
         # Verify figure has the expected structure
         assert fig.data  # Should have traces
@@ -175,3 +193,328 @@ def test_data_processing_in_dashboard():
         # Verify layout includes title with timeframe
         assert "GitHub Copilot Usage Dashboard" in fig.layout.title.text
         assert "Data from" in fig.layout.title.text
+
+
+def test_dashboard_projection_covers_charts():
+    """Test that the dashboard renders from data flattened with its projection."""
+    import json
+    from pathlib import Path
+
+    from pilot_metrics.models import CopilotData
+    from pilot_metrics.processing import flatten_copilot_data
+    from pilot_metrics.visualizer import DASHBOARD_PROJECTION
+
+    data_file = Path(__file__).parent.parent / "data" / "test_data.json"
+    daily_stats = CopilotData.model_validate(json.loads(data_file.read_text())).root
+    completions, chats, pr_data = flatten_copilot_data(
+        daily_stats, projection=DASHBOARD_PROJECTION
+    )
+
+    assert "model" not in completions[0]
+    with (
+        patch(
+            "pilot_metrics.visualizer.write_figure_html", side_effect=_write_empty
+        ) as mock_plot,
+        patch("pilot_metrics.visualizer.webbrowser.open"),
+        patch("builtins.print"),
+    ):
+        create_dashboard(completions, chats, pr_data)
+
+    mock_plot.assert_called_once()
+
+
+def test_active_users_are_stacked_by_tenant():
+    """Test that each tenant gets its own active-users trace."""
+    sample_data = [
+        {
+            "date": "2024-01-15",
+            "org": org,
+            "editor": "vscode",
+            "language": "python",
+            "total_engaged_users": users,
+            "total_code_acceptances": 1,
+            "total_code_suggestions": 2,
+            "total_code_lines_accepted": 3,
+            "total_code_lines_suggested": 4,
+        }
+        for org, users in (("acme", 5), ("globex", 7))
+    ]
+
+    with (
+        patch(
+            "pilot_metrics.visualizer.write_figure_html", side_effect=_write_empty
+        ) as mock_plot,
+        patch("pilot_metrics.visualizer.webbrowser.open"),
+        patch("builtins.print"),
+    ):
+        create_dashboard(sample_data, [], [])
+
+    fig = go.Figure(mock_plot.call_args[0][0])
+    users = {
+        trace.name: list(trace.y)
+        for trace in fig.data
+        if trace.name in {"acme", "globex"}
+    }
+    assert users == {"acme": [5], "globex": [7]}
+    assert "across 2 tenants" in fig.layout.title.text
+
+
+def test_accumulated_lines_read_from_aggregate_state():
+    """Test that the accumulated chart uses the state's full history."""
+    from pilot_metrics.aggregates import AggregateState
+
+    state = AggregateState(
+        cumulative_language_lines={
+            "2024-01-01": {"python": 10},
+            "2024-01-15": {"python": 50, "go": 5},
+        }
+    )
+    sample_data = [
+        {
+            "date": "2024-01-15",
+            "editor": "vscode",
+            "language": "python",
+            "total_engaged_users": 1,
+            "total_code_acceptances": 1,
+            "total_code_suggestions": 2,
+            "total_code_lines_accepted": 40,
+            "total_code_lines_suggested": 4,
+        }
+    ]
+
+    with (
+        patch(
+            "pilot_metrics.visualizer.write_figure_html", side_effect=_write_empty
+        ) as mock_plot,
+        patch("pilot_metrics.visualizer.webbrowser.open"),
+        patch("builtins.print"),
+    ):
+        create_dashboard(sample_data, [], [], state)
+
+    fig = go.Figure(mock_plot.call_args[0][0])
+    accumulated = {trace.name: list(trace.y) for trace in fig.data[:2]}
+    assert accumulated == {"go": [0, 5], "python": [10, 50]}
+
+
+def test_active_users_read_from_daily_totals():
+    """Test that summary tables chart the day's reported active users."""
+    from pilot_metrics.processing import SummaryTables
+
+    counters = {
+        "total_code_acceptances": 1,
+        "total_code_suggestions": 2,
+        "total_code_lines_accepted": 3,
+        "total_code_lines_suggested": 4,
+    }
+    summaries = SummaryTables(
+        daily=[
+            {"date": "2024-01-15", "total_active_users": 42, **counters},
+            {"date": "2024-01-16", "total_active_users": 40, **counters},
+        ],
+        languages=[
+            {"date": date, "language": "python", "total_engaged_users": 9, **counters}
+            for date in ("2024-01-15", "2024-01-16")
+        ],
+        editors=[
+            {"date": "2024-01-15", "feature": "code_completions", "editor": "vscode"}
+            | counters
+        ],
+        models=[],
+    )
+
+    with (
+        patch(
+            "pilot_metrics.visualizer.write_figure_html", side_effect=_write_empty
+        ) as mock_plot,
+        patch("pilot_metrics.visualizer.webbrowser.open"),
+        patch("builtins.print"),
+    ):
+        create_dashboard([], [], [], summaries=summaries)
+
+    fig = go.Figure(mock_plot.call_args[0][0])
+    (users,) = [trace for trace in fig.data if trace.name == "Active Users"]
+    assert list(users.y) == [42, 40]
+    assert "Data from 2024-01-15 to 2024-01-16" in fig.layout.title.text
+
+
+def test_compressed_dashboard_is_not_opened(tmp_path):
+    """Test that a compressed dashboard is written without opening a browser."""
+    import gzip
+
+    sample_data = [
+        {
+            "date": "2024-01-15",
+            "editor": "vscode",
+            "language": "python",
+            "total_engaged_users": 1,
+            "total_code_acceptances": 1,
+            "total_code_suggestions": 2,
+            "total_code_lines_accepted": 3,
+            "total_code_lines_suggested": 4,
+        }
+    ]
+    output_file = tmp_path / "dashboard.html.gz"
+
+    with (
+        patch("pilot_metrics.visualizer.webbrowser.open") as mock_browser,
+        patch("builtins.print"),
+    ):
+        create_dashboard(sample_data, [], [], output_file=str(output_file))
+
+    mock_browser.assert_not_called()
+    html = gzip.decompress(output_file.read_bytes()).decode()
+    assert "GitHub Copilot Usage Dashboard" in html
+
+
+def test_trend_panels_are_added():
+    """Test that rolling trend panels are drawn from the input."""
+    sample_data = [
+        {
+            "date": f"2024-01-{day:02d}",
+            "editor": "vscode",
+            "language": "python",
+            "total_engaged_users": 1,
+            "total_code_acceptances": day,
+            "total_code_suggestions": 2 * day,
+            "total_code_lines_accepted": day,
+            "total_code_lines_suggested": 2 * day,
+        }
+        for day in range(1, 15)
+    ]
+
+    with (
+        patch(
+            "pilot_metrics.visualizer.write_figure_html", side_effect=_write_empty
+        ) as mock_plot,
+        patch("pilot_metrics.visualizer.webbrowser.open"),
+        patch("builtins.print"),
+    ):
+        create_dashboard(sample_data, [], [])
+
+    fig = go.Figure(mock_plot.call_args[0][0])
+    traces = {trace.name: trace for trace in fig.data}
+    assert list(traces["Acceptance Rate (7-day)"].y) == [50.0] * 14
+    assert list(traces["WoW Lines Accepted by Language"].x) == ["python"]
+
+
+def test_paged_dashboard_loads_panels_on_demand(tmp_path):
+    """Test that each panel of a paged dashboard is written to its own sidecar."""
+    import json
+
+    from pilot_metrics.visualizer import PANEL_LAYOUT
+
+    sample_data = [
+        {
+            "date": f"2024-01-{day:02d}",
+            "editor": "vscode",
+            "language": f"lang{day}",
+            "total_engaged_users": 1,
+            "total_code_acceptances": day,
+            "total_code_suggestions": 2 * day,
+            "total_code_lines_accepted": day,
+            "total_code_lines_suggested": 2 * day,
+        }
+        for day in range(1, 29)
+    ]
+    output_dir = tmp_path / "dashboard"
+
+    with (
+        patch("pilot_metrics.visualizer.webbrowser.open") as mock_browser,
+        patch("builtins.print"),
+    ):
+        create_dashboard(sample_data, [], [], output_file=str(output_dir), pages=True)
+
+    index = (output_dir / "index.html").read_text()
+    assert mock_browser.call_args[0][0].endswith("index.html")
+    assert "plotly.min.js" in index
+    # Chart data is only in the sidecars
+    assert "lang28" not in index
+    assert len(index) < 10_000
+
+    sidecars = {path.stem for path in (output_dir / "panels").iterdir()}
+    assert sidecars == set(PANEL_LAYOUT)
+    sidecar = (output_dir / "panels" / "accumulated_lines.js").read_text()
+    prefix = 'renderPanel("accumulated_lines", '
+    assert sidecar.startswith(prefix)
+    figure = json.loads(sidecar.removeprefix(prefix).rstrip().removesuffix(");"))
+    assert len(figure["data"]) == 28
+    assert figure["layout"]["title"]["text"] == "Accumulated Lines of Code Over Time"
+
+
+def _completion_rows(days: int, lines: int = 1) -> list[dict]:
+    return [
+        {
+            "date": f"2024-01-{day:02d}",
+            "editor": "vscode",
+            "language": "python",
+            "total_engaged_users": 1,
+            "total_code_acceptances": day,
+            "total_code_suggestions": 2 * day,
+            "total_code_lines_accepted": lines * day,
+            "total_code_lines_suggested": 2 * day,
+        }
+        for day in range(1, days + 1)
+    ]
+
+
+def test_cached_dashboard_figure_redraws_changed_panels(tmp_path):
+    """Test that cached panels assemble into the figure drawn from scratch."""
+    import json
+
+    from pilot_metrics.jsonio import dumps
+    from pilot_metrics.render_cache import RenderCache
+    from pilot_metrics.visualizer import (
+        PANEL_LAYOUT,
+        aggregate_dashboard_data,
+        build_cached_dashboard_figure,
+        build_dashboard_spec,
+        render_options,
+    )
+
+    data = aggregate_dashboard_data(_completion_rows(14), [], [])
+    cache = RenderCache(str(tmp_path), render_options(pages=False))
+    figure, drawn = build_cached_dashboard_figure(data, cache)
+    assert drawn == list(PANEL_LAYOUT)
+    assert json.loads(dumps(figure)) == json.loads(dumps(build_dashboard_spec(data)))
+    cache.save()
+
+    editor_lines = data.editor_lines.assign(total_code_lines_accepted=1)
+    changed = data.model_copy(update={"editor_lines": editor_lines})
+    cache = RenderCache(str(tmp_path), render_options(pages=False))
+    figure, drawn = build_cached_dashboard_figure(changed, cache)
+    assert drawn == ["lines_by_editor"]
+    assert json.loads(dumps(figure)) == json.loads(dumps(build_dashboard_spec(changed)))
+
+
+def test_render_cache_skips_unchanged_dashboard(tmp_path):
+    """Test that an unchanged dashboard is neither drawn nor written again."""
+    output_file = tmp_path / "dashboard.html"
+    cache_dir = str(tmp_path / "cache")
+
+    opened = []
+
+    def render(rows):
+        with (
+            patch("pilot_metrics.visualizer.webbrowser.open", opened.append),
+            patch("builtins.print") as mock_print,
+        ):
+            create_dashboard(
+                rows, [], [], output_file=str(output_file), render_cache=cache_dir
+            )
+        return " ".join(str(call.args[0]) for call in mock_print.call_args_list)
+
+    assert "Drew 11 of 11 panels" in render(_completion_rows(14))
+    written = output_file.stat().st_mtime_ns
+    assert len(opened) == 1
+
+    printed = render(_completion_rows(14))
+    assert "is unchanged" in printed
+    assert "saved as" not in printed
+    assert output_file.stat().st_mtime_ns == written
+    # The unchanged dashboard is not opened again
+    assert len(opened) == 1
+
+    # Acceptance rate, active users, PR summary and chat panels are reused
+    printed = render(_completion_rows(14, lines=2))
+    assert "Drew 7 of 11 panels" in printed
+    assert "is unchanged" not in printed